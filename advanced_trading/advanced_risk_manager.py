@@ -2,8 +2,12 @@
 Sistema avanzado de gestión de riesgo institucional
 Stop loss dinámico, take profit escalonado, y límites de exposición
 """
+import time
 import numpy as np
-from typing import List, Tuple
+from typing import Callable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from advanced_trading.config.trading_config import TRADING_CONFIG
 
 def calculate_dynamic_sl(atr: float, current_spread: float, volatility_factor: float = 1.0) -> float:
     """
@@ -15,15 +19,16 @@ def calculate_dynamic_sl(atr: float, current_spread: float, volatility_factor: f
         volatility_factor: Multiplicador de volatilidad (1.0 = normal)
     
     Returns:
-        Stop loss distance in percentage
+        Stop loss distance in percentage (acepta también arrays NumPy)
     """
     # SL = máximo entre 2*ATR y 3*spread, ajustado por volatilidad
     atr_sl = atr * 2 * volatility_factor
     spread_sl = current_spread * 3 * volatility_factor
-    return max(atr_sl, spread_sl)
+    return np.maximum(atr_sl, spread_sl)
 
 def generate_tp_targets(entry_price: float, direction: int, 
-                       volatility_factor: float = 1.0) -> List[float]:
+                       volatility_factor: float = 1.0,
+                       levels: Optional[List[float]] = None) -> List[float]:
     """
     Genera objetivos de take profit escalonados
     
@@ -31,12 +36,13 @@ def generate_tp_targets(entry_price: float, direction: int,
         entry_price: Precio de entrada
         direction: 1 para LONG, -1 para SHORT
         volatility_factor: Ajuste por volatilidad
+        levels: Niveles de TP (por defecto DEFAULT_TP_LEVELS)
     
     Returns:
         Lista de precios objetivo para TP
     """
     # Usar TP_LEVELS y TP_ALLOCATION de la nueva configuración
-    base_levels = [0.005, 0.01, 0.02]  # 0.5%, 1%, 2%
+    base_levels = levels if levels is not None else TRADING_CONFIG['DEFAULT_TP_LEVELS']  # 0.5%, 1%, 2%
     
     # Adjust for volatility
     adjusted_levels = [level * volatility_factor for level in base_levels]
@@ -91,21 +97,111 @@ def check_daily_limits(daily_pnl: float, daily_trades: int,
 class AdvancedRiskManager:
     """Gestor avanzado de riesgo con state management"""
     
-    def __init__(self, account_balance: float, risk_per_trade: float = 0.015):
+    def __init__(self, account_balance: float, risk_per_trade: float = 0.015,
+                 exposure_tracker=None, portfolio=None, clock: Callable[[], float] = time.time):
         self.account_balance = account_balance
         self.risk_per_trade = risk_per_trade
-        self.daily_pnl = 0.0
-        self.daily_trades = 0
         self.open_positions = []
-    
+        # ExposureTracker opcional: límites completos con reseteo diario por zona horaria.
+        # Si existe es la única fuente de daily_pnl / daily_trades
+        self.exposure_tracker = exposure_tracker
+        # PortfolioRisk opcional: exposición agregada entre posiciones concurrentes
+        self.portfolio = portfolio
+        # Límites vigentes; hot_reload sustituye el mapping entero con apply_config
+        self.limits = TRADING_CONFIG
+        self._clock = clock
+        self._daily_pnl = 0.0
+        self._daily_trades = 0
+        self._next_reset = self._trading_day_end()
+
+    @property
+    def daily_pnl(self) -> float:
+        """PnL realizado del día de trading (USD)"""
+        if self.exposure_tracker is not None:
+            return self.exposure_tracker.daily_pnl
+        return self._daily_pnl
+
+    @daily_pnl.setter
+    def daily_pnl(self, value: float):
+        if self.exposure_tracker is not None:
+            self.exposure_tracker.daily_pnl = value
+        else:
+            self._daily_pnl = value
+
+    @property
+    def daily_trades(self) -> int:
+        if self.exposure_tracker is not None:
+            return self.exposure_tracker.daily_trades
+        return self._daily_trades
+
+    @daily_trades.setter
+    def daily_trades(self, value: int):
+        if self.exposure_tracker is not None:
+            self.exposure_tracker.daily_trades = value
+        else:
+            self._daily_trades = value
+
+    def _trading_day_end(self) -> float:
+        from advanced_trading.exposure_tracker import trading_day_bounds  # evita el import circular
+        return trading_day_bounds(self._clock(), ZoneInfo(self.limits['RESET_TZ']),
+                                  self.limits['RESET_HOUR_LOCAL'])[1]
+
+    def _maybe_reset(self):
+        """Sin tracker: resetea los contadores al cruzar RESET_TZ / RESET_HOUR_LOCAL"""
+        if self.exposure_tracker is None and self._clock() >= self._next_reset:
+            self.reset_daily_stats()
+            self._next_reset = self._trading_day_end()
+
+    def apply_config(self, config):
+        """Aplica un RuntimeConfig recargado conservando PnL, trades y posiciones (también al tracker)"""
+        self.risk_per_trade = config.trading['RISK_PER_TRADE']
+        self.limits = config.trading
+        if self.exposure_tracker is not None:
+            self.exposure_tracker.apply_config(config)
+    
+    def checkpoint_state(self) -> Tuple[dict, dict]:
+        """Contadores diarios para checkpoint.py (daily: no se restauran en otro día de trading)"""
+        return {}, {'daily': True, 'daily_pnl': self.daily_pnl, 'daily_trades': self.daily_trades,
+                    'open_positions': list(self.open_positions)}
+
+    def restore_state(self, arrays: dict, meta: dict):
+        """Con tracker los contadores diarios vienen de trades (from_db) y no se pisan"""
+        if self.exposure_tracker is None:
+            self.daily_pnl = meta['daily_pnl']
+            self.daily_trades = meta['daily_trades']
+        self.open_positions = list(meta['open_positions'])
+
     def update_daily_stats(self, pnl_change: float, trades: int = 1):
-        """Actualiza estadísticas diarias"""
-        self.daily_pnl += pnl_change
-        self.daily_trades += trades
-    
-    def can_trade(self) -> Tuple[bool, str]:
+        """Actualiza estadísticas diarias (PnL en USD); con tracker se registran en él"""
+        if self.exposure_tracker is not None:
+            self.exposure_tracker.record_daily(pnl_change, trades)
+            return
+        self._maybe_reset()
+        self._daily_pnl += pnl_change
+        self._daily_trades += trades
+    
+    def reset_daily_stats(self):
+        """Resetea los contadores diarios (sin tracker; con tracker los resetea él)"""
+        self._daily_pnl = 0.0
+        self._daily_trades = 0
+    
+    def can_trade(self, event_id: Optional[str] = None) -> Tuple[bool, str]:
         """Verifica si se puede realizar otro trade"""
-        return check_daily_limits(self.daily_pnl, self.daily_trades)
+        if self.exposure_tracker is not None:
+            return self.exposure_tracker.can_open(event_id)
+        self._maybe_reset()
+        pnl_pct = self.daily_pnl / self.account_balance if self.account_balance else 0.0
+        return check_daily_limits(pnl_pct, self.daily_trades,
+                                  self.limits['MAX_DAILY_LOSS'],
+                                  self.limits['MAX_DAILY_TRADES'])
+    
+    def can_add_position(self, symbol: str, side: str, size: float, price: float,
+                         event_id: Optional[str] = None) -> Tuple[bool, str]:
+        """Verifica límites diarios y, si hay cartera, apalancamiento y VaR agregados"""
+        ok, message = self.can_trade(event_id)
+        if not ok or self.portfolio is None:
+            return ok, message
+        return self.portfolio.check_order(symbol, side, size, price)
     
     def calculate_trade_parameters(self, symbol: str, entry_price: float,
                                  atr: float, spread: float) -> dict:
@@ -117,7 +213,7 @@ class AdvancedRiskManager:
             self.account_balance, self.risk_per_trade, entry_price, sl_price
         )
         
-        tp_prices = generate_tp_targets(entry_price, 1)  # Assuming long for calculation
+        tp_prices = generate_tp_targets(entry_price, 1, levels=self.limits['DEFAULT_TP_LEVELS'])  # Assuming long for calculation
         
         return {
             'position_size': position_size,
@@ -0,0 +1,252 @@
+"""
+Checkpoints del estado en memoria y arranque en caliente
+Guarda periódicamente el estado de las ventanas móviles (historial de
+RelativeArbitrage, ventanas de ExecutionMarketView, contadores de
+AdvancedRiskManager) como ficheros .npy + meta.json en un directorio de
+generación; el puntero LATEST se sustituye con os.replace, así que un
+reinicio a mitad de escritura ve siempre el checkpoint anterior completo.
+Al arrancar, los arrays se abren con mmap y el hueco desde el último
+checkpoint se rellena con market_data.
+
+Cada componente expone checkpoint_state() -> (arrays, meta) y
+restore_state(arrays, meta). Los que marcan meta['daily'] sólo se
+restauran dentro del mismo día de trading. En run() el estado se captura
+en el loop y la escritura (np.save + fsync) va a un hilo.
+"""
+
+import asyncio
+import copy
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from advanced_trading.config.trading_config import TRADING_CONFIG
+from advanced_trading.exposure_tracker import trading_day_bounds
+from advanced_trading.replay import ticks_from_db
+from advanced_trading.snapshot_store import atomic_write
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+LATEST = 'LATEST'
+
+
+class CheckpointManager:
+    """
+    Checkpoints por generaciones en un directorio
+
+    directory/
+      gen-000042/<componente>.<array>.npy, meta.json
+      LATEST                                 nombre de la generación vigente
+    """
+
+    def __init__(self, directory: str, components: Optional[Dict[str, object]] = None,
+                 interval_sec: float = 60.0, keep: int = 2, clock: Callable[[], float] = time.time):
+        self.directory = directory
+        self.components: Dict[str, object] = dict(components or {})
+        self.interval_sec = interval_sec
+        self.keep = keep
+        self._clock = clock
+        self.last_saved: Optional[float] = None
+        self._write_lock = threading.Lock()  # save() en hilo y en el loop no comparten generación
+        os.makedirs(directory, exist_ok=True)
+
+    def register(self, name: str, component) -> 'CheckpointManager':
+        if '.' in name:
+            raise ValueError(f"Nombre de componente inválido: {name}")
+        self.components[name] = component
+        return self
+
+    # Escritura
+
+    def _generations(self):
+        return sorted(d for d in os.listdir(self.directory) if d.startswith('gen-') and not d.endswith('.tmp'))
+
+    def latest_path(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.directory, LATEST)) as f:
+                name = f.read().strip()
+        except FileNotFoundError:
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isdir(path) else None
+
+    def capture(self) -> Dict[str, Any]:
+        """
+        Estado de todos los componentes en este instante
+
+        Copia arrays y meta para que la escritura pueda hacerse en otro hilo
+        mientras los componentes siguen cambiando en el loop.
+        """
+        components = {}
+        for component_name, component in self.components.items():
+            arrays, component_meta = component.checkpoint_state()
+            components[component_name] = ({key: np.array(array, copy=True) for key, array in arrays.items()},
+                                          copy.deepcopy(component_meta))
+        return {'saved_at': self._clock(), 'components': components}
+
+    def save(self, state: Optional[Dict[str, Any]] = None) -> str:
+        """Escribe una generación nueva (del estado capturado o del actual) y mueve LATEST a ella"""
+        state = state if state is not None else self.capture()
+        with self._write_lock:
+            return self._write(state)
+
+    def _write(self, state: Dict[str, Any]) -> str:
+        saved_at = state['saved_at']
+        generations = self._generations()
+        number = int(generations[-1][4:]) + 1 if generations else 1
+        name = f'gen-{number:06d}'
+        tmp = os.path.join(self.directory, name + '.tmp')
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+
+        meta = {'format': FORMAT_VERSION, 'saved_at': saved_at, 'components': {}}
+        for component_name, (arrays, component_meta) in state['components'].items():
+            for key, array in arrays.items():
+                with open(os.path.join(tmp, f'{component_name}.{key}.npy'), 'wb') as f:
+                    np.save(f, np.ascontiguousarray(array), allow_pickle=False)
+                    f.flush()
+                    os.fsync(f.fileno())
+            meta['components'][component_name] = {'arrays': sorted(arrays), 'meta': component_meta}
+        atomic_write(os.path.join(tmp, 'meta.json'), json.dumps(meta))
+
+        final = os.path.join(self.directory, name)
+        os.rename(tmp, final)
+        atomic_write(os.path.join(self.directory, LATEST), name)
+        for old in self._generations()[:-self.keep]:
+            shutil.rmtree(os.path.join(self.directory, old), ignore_errors=True)
+        self.last_saved = saved_at
+        return final
+
+    def maybe_save(self) -> Optional[str]:
+        """Guarda si ha pasado interval_sec desde el último checkpoint"""
+        if self.last_saved is None or self._clock() - self.last_saved >= self.interval_sec:
+            return self.save()
+        return None
+
+    async def run(self, stop: Optional[asyncio.Event] = None,
+                  sleep: Callable[[float], Awaitable] = asyncio.sleep):
+        """
+        Bucle periódico; guarda un último checkpoint al parar
+
+        Captura en el loop (sin carreras con los componentes) y escribe con
+        asyncio.to_thread para no bloquear el loop con el fsync. El último
+        se escribe en línea: en una cancelación no se puede esperar a un hilo.
+        """
+        stop = stop or asyncio.Event()
+        try:
+            while not stop.is_set():
+                await sleep(self.interval_sec)
+                await asyncio.to_thread(self.save, self.capture())
+        finally:
+            self.save()
+
+    # Lectura
+
+    def load(self, now: Optional[float] = None, mmap: bool = True) -> Optional[Dict]:
+        """
+        Restaura los componentes registrados desde LATEST
+
+        Devuelve el meta del checkpoint (con 'restored' y 'skipped') o None
+        si no hay checkpoint válido.
+        """
+        path = self.latest_path()
+        if path is None:
+            return None
+        try:
+            with open(os.path.join(path, 'meta.json')) as f:
+                meta = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Checkpoint ilegible en %s: %r", path, e)
+            return None
+        if meta.get('format') != FORMAT_VERSION:
+            logger.warning("Checkpoint con formato %s ignorado", meta.get('format'))
+            return None
+
+        now = self._clock() if now is None else now
+        tz = ZoneInfo(TRADING_CONFIG['RESET_TZ'])
+        same_day = (trading_day_bounds(meta['saved_at'], tz, TRADING_CONFIG['RESET_HOUR_LOCAL'])
+                    == trading_day_bounds(now, tz, TRADING_CONFIG['RESET_HOUR_LOCAL']))
+        meta['restored'], meta['skipped'] = [], []
+        for name, component in self.components.items():
+            saved = meta['components'].get(name)
+            if saved is None or (saved['meta'].get('daily') and not same_day):
+                meta['skipped'].append(name)
+                continue
+            arrays = {key: np.load(os.path.join(path, f'{name}.{key}.npy'),
+                                   mmap_mode='r' if mmap else None, allow_pickle=False)
+                      for key in saved['arrays']}
+            component.restore_state(arrays, saved['meta'])
+            meta['restored'].append(name)
+        self.last_saved = meta['saved_at']
+        return meta
+
+
+# --- Backfill desde market_data ---
+
+def _db_time(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def backfill(db_path: str, since: float, arbitrage=None, view=None,
+             btc_symbol: str = 'BTCUSDT', eth_symbol: str = 'ETHUSDT', max_pairs: int = 100) -> Dict[str, int]:
+    """
+    Rellena el hueco (since, ahora] con barras de market_data
+
+    arbitrage recibe un punto por minuto con ambas patas (como mucho
+    max_pairs, lo que cabe en su historial); view recibe todas las barras
+    posteriores a su última muestra por símbolo.
+    """
+    symbols = None if view is not None else [btc_symbol, eth_symbol]
+    pairs: Dict[float, Dict[str, float]] = {}
+    view_rows = 0
+    for snapshot in ticks_from_db(db_path, symbols, start=_db_time(since)):
+        if snapshot.ts <= since:
+            continue
+        if view is not None:
+            last = view.last_ts(snapshot.symbol)
+            if last is None or snapshot.ts > last:
+                view.update(snapshot)
+                view_rows += 1
+        if arbitrage is not None and snapshot.symbol in (btc_symbol, eth_symbol):
+            pairs.setdefault(snapshot.ts, {})[snapshot.symbol] = snapshot.price
+
+    complete = [p for _, p in sorted(pairs.items()) if len(p) == 2][-max_pairs:]
+    for prices in complete:
+        arbitrage.update_prices(prices[btc_symbol], prices[eth_symbol])
+    return {'arbitrage_pairs': len(complete), 'view_rows': view_rows}
+
+
+def warm_start(manager: CheckpointManager, db_path: Optional[str] = None, arbitrage=None, view=None,
+               lookback_sec: float = 2 * 3600, now: Optional[float] = None) -> Dict:
+    """
+    Checkpoint + backfill: deja los componentes listos para operar
+
+    Sin checkpoint, rellena las últimas lookback_sec de market_data.
+    """
+    began = time.perf_counter()
+    now = manager._clock() if now is None else now
+    meta = manager.load(now)
+    # Lo anterior a lookback_sec ya no cabe en ninguna ventana
+    since = max(meta['saved_at'], now - lookback_sec) if meta else now - lookback_sec
+    filled = {'arbitrage_pairs': 0, 'view_rows': 0}
+    if db_path and os.path.exists(db_path) and (arbitrage is not None or view is not None):
+        filled = backfill(db_path, since, arbitrage, view)
+    report = {
+        'checkpoint': manager.latest_path() if meta else None,
+        'restored': meta['restored'] if meta else [],
+        'skipped': meta['skipped'] if meta else list(manager.components),
+        'gap_sec': now - since,
+        'seconds': time.perf_counter() - began,
+    }
+    report.update(filled)
+    logger.info("Arranque en caliente: %s", report)
+    return report
@@ -32,6 +32,11 @@ TRADING_CONFIG = {
     'ZSCORE_EXIT': 0.5,
     'HEDGE_RATIO': 'rolling_beta',
     'ARBITRAGE_RISK_PCT': 0.01,
+    'ARBITRAGE_ANCHOR': 'BTCUSDT',       # pata común de los pares en sharded_runtime
+    'SHARD_WORKERS': 0,                  # procesos de estrategia (0 = núcleos - 1)
+    'SHARD_BUFFER_TICKS': 1024,          # ticks por símbolo en memoria compartida
+    'LEADER_LEASE_SEC': 10.0,            # lease del router de órdenes (multi-nodo)
+    'NODE_TTL_SEC': 15.0,                # nodo sin heartbeat = fuera del reparto
     
     # --- Volatility Breakout (OCO bidireccional) ---
     'VOLATILITY_BREAKOUT_ENABLED': True,  # estrategia de breakout bidireccional
@@ -46,10 +51,15 @@ TRADING_CONFIG = {
     'MARGIN_MODE': 'isolated',
     'HEDGE_MODE': True,
     'LEVERAGE': 3,
+    'REQUEST_WEIGHT_LIMIT_1M': 2400,     # límite de peso por IP (USDⓈ-M futures)
+    'REQUEST_WEIGHT_SAFETY': 0.9,        # no pasar del 90% del límite
+    'BATCH_ORDERS_MAX': 5,               # órdenes por llamada a batchOrders
 
     # --- Monitoring ---
     'HEARTBEAT_INTERVAL': 60,
     'HEALTH_CHECK_INTERVAL': 300,
+    'METRICS_HOST': '127.0.0.1',         # /metrics y /health sólo en local
+    'METRICS_PORT': 8000,                # puerto del HEALTHCHECK del Dockerfile
     'MAX_FEED_LATENCY_MS': 500,          # no operar si el feed viene tarde
     'MAX_FUNDING_BPS': 20,               # evitar entrar si funding > 0.20%/8h
     
@@ -57,6 +67,10 @@ TRADING_CONFIG = {
     'LOG_ORDER_BLOCKS': True,            # registrar órdenes bloqueadas por microestructura
     'LOG_MICROSTRUCTURE_VIOLATIONS': True, # registrar violaciones de spread/slippage
     'AUDIT_LOG_RETENTION_DAYS': 30,     # retener logs de auditoría por 30 días
+    'LOG_DIR': 'logs',
+    'LOG_MAX_BYTES': 50 * 1024 * 1024,   # rotar app.log al llegar a 50 MB...
+    'LOG_ROTATE_SEC': 86400,             # ...o una vez al día
+    'LOG_DEBUG_SAMPLE_EVERY': 100,       # DEBUG de rutas calientes: 1 de cada N
     
     # --- Alertas & Notificaciones ---
     'TELEGRAM_ALERTS_ENABLED': True,     # alertas de Telegram para eventos críticos
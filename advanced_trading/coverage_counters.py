@@ -0,0 +1,231 @@
+"""
+Contadores incrementales de cobertura de eventos
+Tabla resumen coverage_counters por (source, family, event_type, month)
+mantenida por triggers sobre macro_events / token_events, de modo que el
+validador lee ~100 filas resumen en lugar de escanear las tablas de eventos.
+Las filas con family = '*' agregan todas las familias (fechas distintas por tipo).
+
+La instalación de tabla y triggers es un paso explícito (install_counters /
+`python -m advanced_trading.coverage_counters --db ...`); compute_counts no
+modifica el esquema.
+"""
+
+import argparse
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, NamedTuple, Optional
+
+ALL_FAMILIES = '*'
+SOURCES = ('macro_events', 'token_events')
+
+COUNTERS_DDL = """
+    CREATE TABLE IF NOT EXISTS coverage_counters (
+        source TEXT NOT NULL,
+        family TEXT NOT NULL,
+        event_type TEXT NOT NULL,
+        month TEXT NOT NULL,
+        n_rows INTEGER NOT NULL DEFAULT 0,
+        n_dates INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (source, family, event_type, month)
+    )
+"""
+
+
+class CoverageSpec(NamedTuple):
+    """Conteo pedido por el validador"""
+    source: str
+    event_type: Optional[str] = None
+    family: Optional[str] = None
+    distinct_dates: bool = False
+
+
+def _family_match(alias: str, family_expr: str) -> str:
+    """Condición 'misma familia' (o cualquiera para la fila '*')"""
+    if family_expr == f"'{ALL_FAMILIES}'":
+        return '1'
+    return f"COALESCE({alias}.family, '') = {family_expr}"
+
+
+def _trigger_sql(source: str) -> list:
+    statements = []
+    for suffix, family_expr in (('fam', "COALESCE({row}.family, '')"), ('all', f"'{ALL_FAMILIES}'")):
+        # La fila '*' no cambia si sólo se mueve el evento de familia
+        changed = ['OLD.event_type IS NOT NEW.event_type', 'OLD.event_date IS NOT NEW.event_date']
+        if suffix == 'fam':
+            changed.append('OLD.family IS NOT NEW.family')
+        add_new = f"""
+            INSERT INTO coverage_counters (source, family, event_type, month, n_rows, n_dates)
+            VALUES ('{source}', {family_expr.format(row='NEW')}, NEW.event_type, substr(NEW.event_date, 1, 7), 1,
+                    (SELECT COUNT(*) FROM {source} e
+                     WHERE e.event_type = NEW.event_type AND e.event_date = NEW.event_date
+                     AND {_family_match('e', family_expr.format(row='NEW'))}) = 1)
+            ON CONFLICT (source, family, event_type, month)
+            DO UPDATE SET n_rows = n_rows + 1, n_dates = n_dates + excluded.n_dates;
+        """
+        remove_old = f"""
+            UPDATE coverage_counters SET
+                n_rows = n_rows - 1,
+                n_dates = n_dates - ((SELECT COUNT(*) FROM {source} e
+                                      WHERE e.event_type = OLD.event_type AND e.event_date = OLD.event_date
+                                      AND {_family_match('e', family_expr.format(row='OLD'))}) = 0)
+            WHERE source = '{source}' AND family = {family_expr.format(row='OLD')}
+              AND event_type = OLD.event_type AND month = substr(OLD.event_date, 1, 7);
+        """
+        statements.append(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{source}_cov_ins_{suffix} AFTER INSERT ON {source}
+            BEGIN {add_new} END
+        """)
+        statements.append(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{source}_cov_del_{suffix} AFTER DELETE ON {source}
+            BEGIN {remove_old} END
+        """)
+        statements.append(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{source}_cov_upd_{suffix}
+            AFTER UPDATE OF family, event_type, event_date ON {source}
+            WHEN {' OR '.join(changed)}
+            BEGIN {remove_old} {add_new} END
+        """)
+    return statements
+
+
+def rebuild_counters(conn: sqlite3.Connection):
+    """Recalcula la tabla resumen desde cero"""
+    with conn:
+        conn.execute('DELETE FROM coverage_counters')
+        for source in SOURCES:
+            conn.execute(f"""
+                INSERT INTO coverage_counters (source, family, event_type, month, n_rows, n_dates)
+                SELECT '{source}', COALESCE(family, ''), event_type, substr(event_date, 1, 7),
+                       COUNT(*), COUNT(DISTINCT event_date)
+                FROM {source} GROUP BY COALESCE(family, ''), event_type, substr(event_date, 1, 7)
+            """)
+            conn.execute(f"""
+                INSERT INTO coverage_counters (source, family, event_type, month, n_rows, n_dates)
+                SELECT '{source}', '{ALL_FAMILIES}', event_type, substr(event_date, 1, 7),
+                       COUNT(*), COUNT(DISTINCT event_date)
+                FROM {source} GROUP BY event_type, substr(event_date, 1, 7)
+            """)
+
+
+def counters_installed(conn: sqlite3.Connection) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'coverage_counters'"
+    ).fetchone() is not None
+
+
+def install_counters(conn: sqlite3.Connection) -> bool:
+    """
+    Crea tabla, índices y triggers (idempotente)
+
+    Returns:
+        True si la tabla resumen se creó ahora y se pobló desde cero
+    """
+    existed = counters_installed(conn)
+    with conn:
+        conn.execute(COUNTERS_DDL)
+        for source in SOURCES:
+            conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{source}_type_date ON {source} (event_type, event_date, family)')
+            for ddl in _trigger_sql(source):
+                conn.execute(ddl)
+    if not existed:
+        rebuild_counters(conn)
+    return not existed
+
+
+def _date_bounds(start: str, end: str):
+    """
+    Convierte [start, end] en el intervalo semiabierto [start, primer día del
+    mes siguiente a end); exige límites alineados a mes completo
+
+    Es el mismo predicado para la tabla resumen (por mes) y para el escaneo,
+    así que un event_date con hora del último día también entra en ambos.
+    """
+    if start[8:10] != '01' or end[8:10] not in ('28', '29', '30', '31'):
+        raise ValueError(f"Rango no alineado a meses: {start} - {end}")
+    year, month = int(end[:4]), int(end[5:7])
+    year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return start[:10], f'{year:04d}-{month:02d}-01'
+
+
+def count_from_counters(conn: sqlite3.Connection, spec: CoverageSpec, start: str, end: str) -> int:
+    """Conteo desde la tabla resumen"""
+    lower, upper = _date_bounds(start, end)
+    column = 'n_dates' if spec.distinct_dates else 'n_rows'
+    family = spec.family if spec.family is not None else ALL_FAMILIES
+    sql = f"""
+        SELECT COALESCE(SUM({column}), 0) FROM coverage_counters
+        WHERE source = ? AND family = ? AND month >= ? AND month < ?
+    """
+    params = [spec.source, family, lower[:7], upper[:7]]
+    if spec.event_type is not None:
+        sql += ' AND event_type = ?'
+        params.append(spec.event_type)
+    if spec.distinct_dates and spec.event_type is None:
+        raise ValueError("distinct_dates requiere event_type")
+    return conn.execute(sql, params).fetchone()[0]
+
+
+def count_from_scan(conn: sqlite3.Connection, spec: CoverageSpec, start: str, end: str) -> int:
+    """Conteo escaneando la tabla de eventos (modo --full)"""
+    aggregate = 'COUNT(DISTINCT event_date)' if spec.distinct_dates else 'COUNT(*)'
+    sql = f"SELECT {aggregate} FROM {spec.source} WHERE event_date >= ? AND event_date < ?"
+    params = list(_date_bounds(start, end))
+    if spec.event_type is not None:
+        sql += ' AND event_type = ?'
+        params.append(spec.event_type)
+    if spec.family is not None:
+        sql += ' AND family = ?'
+        params.append(spec.family)
+    return conn.execute(sql, params).fetchone()[0]
+
+
+def compute_counts(db_path: str, specs: Iterable[CoverageSpec], start: str, end: str,
+                   full: bool = False, workers: int = 4) -> Dict[CoverageSpec, int]:
+    """
+    Calcula todos los conteos pedidos
+
+    Con full=True escanea las tablas en paralelo (una conexión por hilo); si no,
+    lee la tabla resumen, que debe estar instalada (RuntimeError si no).
+    """
+    specs = list(specs)
+    if not full:
+        conn = sqlite3.connect(db_path)
+        try:
+            if not counters_installed(conn):
+                raise RuntimeError("coverage_counters no instalada: ejecuta "
+                                   "python -m advanced_trading.coverage_counters --db " + db_path)
+            return {spec: count_from_counters(conn, spec, start, end) for spec in specs}
+        finally:
+            conn.close()
+
+    def scan(spec: CoverageSpec) -> int:
+        conn = sqlite3.connect(db_path)
+        try:
+            return count_from_scan(conn, spec, start, end)
+        finally:
+            conn.close()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return dict(zip(specs, pool.map(scan, specs)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Instala (o reconstruye) los contadores de cobertura')
+    parser.add_argument('--db', default='trading_data.db')
+    parser.add_argument('--rebuild', action='store_true', help='Recalcula la tabla resumen desde cero')
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    try:
+        created = install_counters(conn)
+        if args.rebuild and not created:
+            rebuild_counters(conn)
+    finally:
+        conn.close()
+    print(f"✅ Contadores de cobertura {'instalados' if created else 'ya instalados'} en {args.db}"
+          + (' (reconstruidos)' if args.rebuild and not created else ''))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,195 @@
+"""
+Cobertura en ventanas relativas con buckets diarios
+Agrupa los eventos por (familia, día) una sola vez y guarda la suma
+acumulada por familia; cualquier conteo de ventana [inicio, fin] es una
+resta O(1), de modo que se pueden evaluar muchas ventanas y fechas de corte
+a la vez (p. ej. para bloquear calibraciones).
+"""
+
+import os
+import sqlite3
+from datetime import date, datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from advanced_trading.config.trading_config import TRADING_CONFIG
+
+DateLike = Union[str, date, datetime, np.datetime64]
+
+# Consultas por fuente: devuelven (family, día ISO, n)
+BUCKET_QUERIES = {
+    'events': """
+        SELECT family, date(t0_iso) AS day, COUNT(*) FROM events
+        WHERE executed = 1 AND date(t0_iso) IS NOT NULL GROUP BY family, day
+    """,
+    'history': """
+        SELECT family, day, SUM(n) FROM (
+            SELECT family, date(event_date) AS day, COUNT(*) AS n FROM macro_events GROUP BY family, day
+            UNION ALL
+            SELECT family, date(event_date) AS day, COUNT(*) AS n FROM token_events GROUP BY family, day
+        ) WHERE day IS NOT NULL GROUP BY family, day
+    """,
+}
+
+_CACHE: Dict[Tuple[str, str], Tuple[Tuple[int, ...], 'DailyBuckets']] = {}
+
+
+def _to_day(value: DateLike) -> np.datetime64:
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        value = value.date()
+    return np.datetime64(value, 'D')
+
+
+class DailyBuckets:
+    """Conteos diarios por familia con suma acumulada"""
+
+    def __init__(self, rows: Iterable[Tuple[str, str, int]]):
+        rows = [(family, np.datetime64(day, 'D'), n) for family, day, n in rows if family and day]
+        self.families: List[str] = sorted({r[0] for r in rows})
+        self._index = {family: i for i, family in enumerate(self.families)}
+        if rows:
+            self.first_day = min(r[1] for r in rows)
+            n_days = int((max(r[1] for r in rows) - self.first_day).astype(int)) + 1
+        else:
+            self.first_day = np.datetime64('1970-01-01', 'D')
+            n_days = 0
+
+        daily = np.zeros((len(self.families), n_days), dtype=np.int64)
+        for family, day, n in rows:
+            daily[self._index[family], int((day - self.first_day).astype(int))] += n
+        # cumsum[:, k] = eventos con día < first_day + k
+        self.cumsum = np.zeros((len(self.families), n_days + 1), dtype=np.int64)
+        np.cumsum(daily, axis=1, out=self.cumsum[:, 1:])
+
+    @classmethod
+    def from_db(cls, conn: sqlite3.Connection, source: str = 'events') -> 'DailyBuckets':
+        return cls(conn.execute(BUCKET_QUERIES[source]).fetchall())
+
+    @property
+    def n_days(self) -> int:
+        return self.cumsum.shape[1] - 1
+
+    def _offsets(self, days: np.ndarray) -> np.ndarray:
+        """Posición en cumsum del primer día NO incluido (recortada al rango)"""
+        offsets = (days - self.first_day).astype(np.int64)
+        return np.clip(offsets, 0, self.n_days)
+
+    def count(self, family: str, start: DateLike, end: DateLike) -> int:
+        """Eventos de la familia con día en [start, end] (inclusive)"""
+        row = self._index.get(family)
+        if row is None:
+            return 0
+        lo, hi = self._offsets(np.array([_to_day(start), _to_day(end) + 1]))
+        return int(self.cumsum[row, hi] - self.cumsum[row, lo]) if hi > lo else 0
+
+    def window_counts(self, as_of: Iterable[DateLike], windows_days: Iterable[int],
+                      families: Optional[List[str]] = None) -> np.ndarray:
+        """
+        Conteos para todas las combinaciones familia × fecha de corte × ventana
+
+        La ventana de N días que termina en as_of cubre (as_of - N, as_of].
+
+        Returns:
+            array (len(families), len(as_of), len(windows_days))
+        """
+        ends = _day_array(as_of) + 1
+        windows = np.asarray(list(windows_days), dtype=np.int64)
+        hi = self._offsets(ends)[:, None]
+        lo = self._offsets(ends[:, None] - windows[None, :].astype('timedelta64[D]'))
+        table = self._rows(families)
+        return table[:, hi] - table[:, lo]
+
+    def cumulative(self, as_of: Iterable[DateLike], families: Optional[List[str]] = None) -> np.ndarray:
+        """Eventos acumulados hasta cada as_of (inclusive): array (familias, fechas)"""
+        return self._rows(families)[:, self._offsets(_day_array(as_of) + 1)]
+
+    def _rows(self, families: Optional[List[str]]) -> np.ndarray:
+        """Filas de cumsum para las familias pedidas (desconocidas -> ceros)"""
+        if families is None:
+            return self.cumsum
+        padded = np.vstack([self.cumsum, np.zeros((1, self.n_days + 1), dtype=np.int64)])
+        return padded[np.array([self._index.get(f, -1) for f in families], dtype=np.int64)]
+
+
+def _day_array(values: Iterable[DateLike]) -> np.ndarray:
+    return np.array([_to_day(v) for v in values], dtype='datetime64[D]')
+
+
+def _signature(db_path: str) -> Tuple[int, ...]:
+    """
+    mtime/tamaño de la BD y de su -wal
+
+    En modo WAL las escrituras van al -wal hasta el checkpoint y el fichero
+    principal no cambia, así que mirar sólo la BD serviría buckets viejos.
+    """
+    signature: Tuple[int, ...] = ()
+    for path in (db_path, db_path + '-wal'):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            if path == db_path:
+                raise
+            signature += (0, 0)
+        else:
+            signature += (stat.st_mtime_ns, stat.st_size)
+    return signature
+
+
+def load_buckets(db_path: str, source: str = 'events') -> DailyBuckets:
+    """Buckets cacheados por fichero; se recalculan si cambia la BD o su -wal"""
+    signature = _signature(db_path)
+    cached = _CACHE.get((db_path, source))
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    conn = sqlite3.connect(db_path)
+    try:
+        buckets = DailyBuckets.from_db(conn, source)
+    finally:
+        conn.close()
+    _CACHE[(db_path, source)] = (signature, buckets)
+    return buckets
+
+
+def check_rolling_requirements(buckets: DailyBuckets, as_of: Optional[DateLike] = None,
+                               requirements: Optional[Dict] = None,
+                               window_days: int = 365) -> Dict[str, Dict]:
+    """
+    Evalúa MINIMUM_REQUIREMENTS (total y last_365d) por familia en as_of
+
+    Returns:
+        {familia: {'total': n, 'last_365d': n, 'ok': bool}}
+    """
+    requirements = requirements or TRADING_CONFIG['COVERAGE_VALIDATION']['MINIMUM_REQUIREMENTS']
+    as_of = as_of if as_of is not None else datetime.now(timezone.utc)
+    families = list(requirements)
+    recent = buckets.window_counts([as_of], [window_days], families)[:, 0, 0]
+    totals = buckets.cumulative([as_of], families)[:, 0]
+    report = {}
+    for family, total, last in zip(families, totals, recent):
+        minimum = requirements[family]
+        report[family] = {
+            'total': int(total),
+            'last_365d': int(last),
+            'ok': bool(total >= minimum['total'] and last >= minimum['last_365d']),
+        }
+    return report
+
+
+def calibration_gate(buckets: DailyBuckets, as_of_dates: Iterable[DateLike],
+                     requirements: Optional[Dict] = None, window_days: int = 365) -> np.ndarray:
+    """
+    Máscara booleana de fechas de corte en las que TODAS las familias cumplen
+
+    Evalúa todas las fechas en un único paso vectorizado.
+    """
+    requirements = requirements or TRADING_CONFIG['COVERAGE_VALIDATION']['MINIMUM_REQUIREMENTS']
+    families = list(requirements)
+    as_of_dates = list(as_of_dates)
+    recent = buckets.window_counts(as_of_dates, [window_days], families)[:, :, 0]
+    totals = buckets.cumulative(as_of_dates, families)
+    min_total = np.array([requirements[f]['total'] for f in families])[:, None]
+    min_recent = np.array([requirements[f]['last_365d'] for f in families])[:, None]
+    return np.all((totals >= min_total) & (recent >= min_recent), axis=0)
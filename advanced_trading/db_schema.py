@@ -0,0 +1,279 @@
+"""
+Esquema SQLite de trading_data.db
+Fuente única del DDL para los módulos que leen o escriben en la base de datos
+"""
+
+import sqlite3
+from typing import Iterable, Optional
+
+TABLES = {
+    'events': """
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_type TEXT NOT NULL,
+            family TEXT NOT NULL,
+            event_date TEXT NOT NULL,
+            t0_iso TEXT NOT NULL,
+            symbol TEXT DEFAULT 'BTCUSDT',
+            consensus REAL,
+            actual REAL,
+            deviation REAL,
+            impact TEXT,
+            executed INTEGER DEFAULT 0,
+            outcome TEXT,
+            pnl REAL,
+            execution_time_ms INTEGER,
+            spread_bps REAL,
+            slippage_bps REAL,
+            book_depth_usd REAL,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """,
+    'macro_events': """
+        CREATE TABLE IF NOT EXISTS macro_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_type TEXT NOT NULL,
+            family TEXT DEFAULT 'macro_US',
+            event_date TEXT NOT NULL,
+            consensus REAL,
+            actual REAL,
+            deviation REAL,
+            surprise_bps INTEGER,
+            impact TEXT,
+            market_reaction REAL,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """,
+    'token_events': """
+        CREATE TABLE IF NOT EXISTS token_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_type TEXT NOT NULL,
+            family TEXT DEFAULT 'crypto_events',
+            token_symbol TEXT NOT NULL,
+            event_date TEXT NOT NULL,
+            description TEXT,
+            impact_score REAL,
+            supply_affected REAL,
+            market_cap_usd REAL,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """,
+    'market_data': """
+        CREATE TABLE IF NOT EXISTS market_data (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            symbol TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            open REAL,
+            high REAL,
+            low REAL,
+            close REAL,
+            volume REAL,
+            spread_bps REAL,
+            book_depth_usd REAL,
+            volatility REAL,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """,
+    'trades': """
+        CREATE TABLE IF NOT EXISTS trades (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_id INTEGER,
+            symbol TEXT NOT NULL,
+            side TEXT NOT NULL,
+            entry_price REAL,
+            exit_price REAL,
+            size REAL,
+            pnl REAL,
+            entry_time TEXT,
+            exit_time TEXT,
+            execution_time_ms INTEGER,
+            spread_bps REAL,
+            slippage_bps REAL,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (event_id) REFERENCES events (id)
+        )
+    """,
+    'calibrations': """
+        CREATE TABLE IF NOT EXISTS calibrations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            family TEXT NOT NULL,
+            calibration_date TEXT NOT NULL,
+            parameters_before TEXT,
+            parameters_after TEXT,
+            metrics_before TEXT,
+            metrics_after TEXT,
+            improvement REAL,
+            approver TEXT,
+            approved_at TEXT,
+            data_hash TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """,
+    'snapshots': """
+        CREATE TABLE IF NOT EXISTS snapshots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            calibration_id INTEGER,
+            snapshot_date TEXT NOT NULL,
+            parameters TEXT,
+            metrics TEXT,
+            data_hash TEXT,
+            rollback_reason TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (calibration_id) REFERENCES calibrations (id)
+        )
+    """,
+    'event_fires': """
+        CREATE TABLE IF NOT EXISTS event_fires (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_id TEXT NOT NULL,
+            symbol TEXT,
+            action TEXT,
+            fired_at TEXT NOT NULL,
+            details TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """,
+    'order_audit': """
+        CREATE TABLE IF NOT EXISTS order_audit (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            symbol TEXT NOT NULL,
+            side TEXT,
+            amount REAL,
+            reason TEXT NOT NULL,
+            spread_bps REAL,
+            slippage_bps REAL,
+            book_depth_usd REAL,
+            details TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """,
+    'data_checksums': """
+        CREATE TABLE IF NOT EXISTS data_checksums (
+            table_name TEXT PRIMARY KEY,
+            last_id INTEGER NOT NULL,
+            n_rows INTEGER NOT NULL,
+            digest TEXT NOT NULL,
+            updated_at TEXT
+        )
+    """,
+    'data_versions': """
+        CREATE TABLE IF NOT EXISTS data_versions (
+            table_name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0,
+            hashed_version INTEGER NOT NULL DEFAULT -1
+        )
+    """,
+    'order_intents': """
+        CREATE TABLE IF NOT EXISTS order_intents (
+            client_order_id TEXT PRIMARY KEY,
+            event_id TEXT NOT NULL,
+            stage TEXT NOT NULL,
+            leg TEXT NOT NULL,
+            symbol TEXT NOT NULL,
+            side TEXT NOT NULL,
+            amount REAL NOT NULL,
+            type TEXT NOT NULL DEFAULT 'market',
+            price REAL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            not_before REAL NOT NULL DEFAULT 0,
+            claimed_at REAL,
+            order_id TEXT,
+            filled REAL,
+            avg_price REAL,
+            error TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            updated_at TEXT
+        )
+    """,
+    'event_windows': """
+        CREATE TABLE IF NOT EXISTS event_windows (
+            event_id INTEGER PRIMARY KEY,
+            symbol TEXT NOT NULL,
+            t0_iso TEXT NOT NULL,
+            window_minutes INTEGER NOT NULL,
+            side INTEGER NOT NULL DEFAULT 1,
+            ref_price REAL,
+            pre_return REAL,
+            t0_return REAL,
+            post_return REAL,
+            mae REAL,
+            mfe REAL,
+            volume REAL,
+            avg_spread_bps REAL,
+            max_spread_bps REAL,
+            bars INTEGER NOT NULL DEFAULT 0,
+            complete INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT
+        )
+    """,
+    'materialized_views': """
+        CREATE TABLE IF NOT EXISTS materialized_views (
+            name TEXT PRIMARY KEY,
+            last_source_id INTEGER NOT NULL DEFAULT 0,
+            refreshed_at TEXT
+        )
+    """,
+    'leases': """
+        CREATE TABLE IF NOT EXISTS leases (
+            name TEXT PRIMARY KEY,
+            holder TEXT,
+            token INTEGER NOT NULL DEFAULT 0,
+            expires_at REAL NOT NULL DEFAULT 0,
+            acquired_at REAL
+        )
+    """,
+    'cluster_nodes': """
+        CREATE TABLE IF NOT EXISTS cluster_nodes (
+            node_id TEXT PRIMARY KEY,
+            heartbeat_at REAL NOT NULL,
+            started_at REAL
+        )
+    """,
+    'idempotency_keys': """
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            key TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            holder TEXT NOT NULL,
+            token INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'claimed',
+            result TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            updated_at TEXT
+        )
+    """,
+}
+
+INDEXES = [
+    'CREATE INDEX IF NOT EXISTS idx_events_family ON events (family)',
+    'CREATE INDEX IF NOT EXISTS idx_events_executed ON events (executed)',
+    'CREATE INDEX IF NOT EXISTS idx_events_date ON events (event_date)',
+    'CREATE INDEX IF NOT EXISTS idx_market_data_symbol_time ON market_data (symbol, timestamp)',
+    'CREATE INDEX IF NOT EXISTS idx_trades_symbol ON trades (symbol)',
+    'CREATE INDEX IF NOT EXISTS idx_trades_time ON trades (entry_time)',
+    'CREATE INDEX IF NOT EXISTS idx_calibrations_family ON calibrations (family)',
+    'CREATE INDEX IF NOT EXISTS idx_event_fires_event ON event_fires (event_id)',
+    'CREATE INDEX IF NOT EXISTS idx_order_audit_created ON order_audit (created_at)',
+    'CREATE INDEX IF NOT EXISTS idx_idempotency_status ON idempotency_keys (status)',
+    'CREATE INDEX IF NOT EXISTS idx_order_intents_status ON order_intents (status, not_before)',
+    'CREATE INDEX IF NOT EXISTS idx_order_intents_event ON order_intents (event_id)',
+    'CREATE INDEX IF NOT EXISTS idx_event_windows_complete ON event_windows (complete)',
+]
+
+
+def ensure_schema(conn: sqlite3.Connection, tables: Optional[Iterable[str]] = None):
+    """Crea las tablas (todas o las indicadas) e índices si no existen"""
+    names = list(tables) if tables is not None else list(TABLES)
+    for name in names:
+        conn.execute(TABLES[name])
+    for index_sql in INDEXES:
+        table = index_sql.split(' ON ')[1].split()[0]
+        if table in names:
+            conn.execute(index_sql)
+    conn.commit()
+
+
+def table_columns(conn: sqlite3.Connection, table: str) -> list:
+    """Devuelve los nombres de columna de una tabla"""
+    return [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Pipeline asíncrono de ingesta de eventos
+Una sesión HTTP con pool de conexiones por fuente, descarga concurrente con
+reintentos y backoff, y una etapa en streaming que deduplica por hash de
+contenido, aplica ventana de debounce y límite de eventos por hora antes de
+hacer upsert en macro_events / token_events.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import aiohttp
+
+from advanced_trading.config.trading_config import TRADING_CONFIG
+from advanced_trading.db_schema import ensure_schema
+
+logger = logging.getLogger(__name__)
+
+# Tipo de evento que aporta cada fuente conocida
+SOURCE_KINDS = {
+    'tradingeconomics': 'macro',
+    'alphavantage': 'macro',
+    'messari': 'token',
+    'cryptocompare': 'token',
+}
+
+MACRO_FIELDS = ('event_type', 'family', 'event_date', 'consensus', 'actual', 'deviation',
+                'surprise_bps', 'impact', 'market_reaction')
+TOKEN_FIELDS = ('event_type', 'family', 'token_symbol', 'event_date', 'description',
+                'impact_score', 'supply_affected', 'market_cap_usd')
+MACRO_KEY = ('event_type', 'family', 'event_date')
+TOKEN_KEY = ('event_type', 'token_symbol', 'event_date')
+
+_END = object()
+
+
+def default_parser(payload: Any) -> List[Dict]:
+    """Acepta una lista de eventos o un objeto {'data': [...]} / {'events': [...]}"""
+    if isinstance(payload, dict):
+        payload = payload.get('data', payload.get('events', []))
+    return [item for item in payload if isinstance(item, dict)]
+
+
+class EventSource:
+    """Fuente HTTP de eventos"""
+
+    def __init__(self, name: str, url: str, kind: Optional[str] = None,
+                 parser: Callable[[Any], List[Dict]] = default_parser,
+                 params: Optional[Dict] = None, headers: Optional[Dict] = None,
+                 fallback: bool = False, max_connections: int = 4):
+        self.name = name
+        self.url = url
+        self.kind = kind or SOURCE_KINDS.get(name, 'macro')
+        self.parser = parser
+        self.params = params or {}
+        self.headers = headers or {}
+        self.fallback = fallback
+        self.max_connections = max_connections
+
+
+def build_default_sources(config: Optional[Dict] = None) -> List[EventSource]:
+    """
+    Fuentes de PREFERRED_DATA_SOURCES y FALLBACK_SOURCES con URL configurada
+
+    La URL de cada fuente se toma de EVENT_SOURCE_URL_<NOMBRE>; las fuentes sin
+    URL o sin tipo de evento conocido se omiten.
+    """
+    config = config or TRADING_CONFIG
+    sources = []
+    for fallback, names in ((False, config['PREFERRED_DATA_SOURCES']), (True, config['FALLBACK_SOURCES'])):
+        for name in names:
+            url = os.getenv(f'EVENT_SOURCE_URL_{name.upper()}')
+            if url and name in SOURCE_KINDS:
+                sources.append(EventSource(name, url, fallback=fallback))
+    return sources
+
+
+def content_hash(kind: str, record: Dict) -> str:
+    """Hash estable del contenido normalizado"""
+    canonical = json.dumps([kind, record], sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _event_ts(record: Dict) -> float:
+    value = str(record.get('event_date', ''))
+    try:
+        dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return 0.0
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def normalize(kind: str, raw: Dict) -> Optional[Dict]:
+    """Proyecta un evento crudo sobre las columnas de la tabla destino"""
+    fields = MACRO_FIELDS if kind == 'macro' else TOKEN_FIELDS
+    record = {k: raw[k] for k in fields if raw.get(k) is not None}
+    required = MACRO_KEY if kind == 'macro' else TOKEN_KEY
+    if kind == 'macro':
+        record.setdefault('family', 'macro_US')
+        if 'deviation' not in record and 'actual' in record and 'consensus' in record:
+            record['deviation'] = round(record['actual'] - record['consensus'], 10)
+    else:
+        record.setdefault('family', 'crypto_events')
+    if any(k not in record for k in required):
+        return None
+    return record
+
+
+class EventIngestionPipeline:
+    """Ingesta concurrente con dedupe, debounce y límite por hora"""
+
+    def __init__(self, db_path: str = 'trading_data.db', sources: Optional[List[EventSource]] = None,
+                 config: Optional[Dict] = None, rate_limit: bool = True,
+                 clock: Callable[[], float] = time.time, dedupe_cache_size: int = 50_000):
+        config = config or TRADING_CONFIG
+        self.db_path = db_path
+        self.sources = sources if sources is not None else build_default_sources(config)
+        self.timeout = config['API_TIMEOUT_SEC']
+        self.retry_attempts = config['API_RETRY_ATTEMPTS']
+        self.retry_delay = config['API_RETRY_DELAY_SEC']
+        self.max_events_per_hour = config['MAX_EVENTS_PER_HOUR']
+        self.debounce_sec = config['EVENT_DEBOUNCE_SEC']
+        self.duplicate_detection = config['DUPLICATE_DETECTION']
+        self.rate_limit = rate_limit
+        self._clock = clock
+
+        self._seen: 'OrderedDict[str, None]' = OrderedDict()
+        self._dedupe_cache_size = dedupe_cache_size
+        self._last_similar: Dict[tuple, tuple] = {}  # similar_key -> (event_ts, clave natural)
+        self._accepted_times: deque = deque()
+        self.stats: Dict[str, int] = {}
+
+    def _count(self, key: str, n: int = 1):
+        self.stats[key] = self.stats.get(key, 0) + n
+
+    # --- Descarga ---
+
+    async def _fetch(self, session: aiohttp.ClientSession, source: EventSource) -> List[Dict]:
+        """GET con reintentos y backoff exponencial"""
+        last_error: Optional[Exception] = None
+        for attempt in range(self.retry_attempts):
+            try:
+                async with session.get(source.url, params=source.params) as response:
+                    response.raise_for_status()
+                    payload = await response.json(content_type=None)
+                self._count(f'fetched_{source.name}')
+                return source.parser(payload)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                last_error = e
+                self._count('fetch_retries')
+                if attempt + 1 < self.retry_attempts:
+                    await asyncio.sleep(self.retry_delay * (2 ** attempt))
+        raise ConnectionError(f"{source.name}: {last_error}")
+
+    async def _produce(self, session: aiohttp.ClientSession, source: EventSource,
+                       out: asyncio.Queue) -> bool:
+        try:
+            events = await self._fetch(session, source)
+        except ConnectionError as e:
+            self._count('source_failures')
+            logger.warning(f"⚠️ Fuente {source.name} no disponible: {e}")
+            return False
+        for raw in events:
+            await out.put((source.kind, raw))
+        return True
+
+    async def _run_sources(self, sources: List[EventSource], out: asyncio.Queue,
+                           sessions: Dict[str, aiohttp.ClientSession]) -> Dict[str, bool]:
+        results = await asyncio.gather(*(self._produce(sessions[s.name], s, out) for s in sources))
+        return {s.name: ok for s, ok in zip(sources, results)}
+
+    async def _fetch_all(self, out: asyncio.Queue):
+        """Preferidas en paralelo; respaldos sólo para tipos sin ninguna preferida OK"""
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        sessions = {
+            s.name: aiohttp.ClientSession(
+                timeout=timeout, headers=s.headers,
+                connector=aiohttp.TCPConnector(limit=s.max_connections),
+            )
+            for s in self.sources
+        }
+        try:
+            preferred = [s for s in self.sources if not s.fallback]
+            status = await self._run_sources(preferred, out, sessions)
+            covered = {s.kind for s in preferred if status[s.name]}
+            fallbacks = [s for s in self.sources if s.fallback and s.kind not in covered]
+            if fallbacks:
+                await self._run_sources(fallbacks, out, sessions)
+        finally:
+            await asyncio.gather(*(session.close() for session in sessions.values()))
+            await out.put(_END)
+
+    # --- Filtros en streaming ---
+
+    def accept(self, kind: str, record: Dict) -> bool:
+        """
+        Aplica dedupe por hash, debounce de eventos similares y límite por hora
+
+        El hash y el debounce sólo se registran si el evento se acepta (uno
+        rechazado por el límite horario puede entrar después), y una nueva
+        versión del mismo evento (misma clave natural, p. ej. con actual
+        publicado) no se considera rebote.
+        """
+        digest = content_hash(kind, record) if self.duplicate_detection else None
+        if digest is not None and digest in self._seen:
+            self._count('duplicates')
+            return False
+
+        similar_key = (kind, record['event_type'], record.get('token_symbol'), record.get('family'))
+        identity = tuple(record[k] for k in (MACRO_KEY if kind == 'macro' else TOKEN_KEY))
+        event_ts = _event_ts(record)
+        last = self._last_similar.get(similar_key)
+        if last is not None and last[1] != identity and abs(event_ts - last[0]) < self.debounce_sec:
+            self._count('debounced')
+            return False
+
+        if self.rate_limit:
+            now = self._clock()
+            while self._accepted_times and now - self._accepted_times[0] >= 3600:
+                self._accepted_times.popleft()
+            if len(self._accepted_times) >= self.max_events_per_hour:
+                self._count('rate_limited')
+                return False
+            self._accepted_times.append(now)
+
+        if digest is not None:
+            self._seen[digest] = None
+            if len(self._seen) > self._dedupe_cache_size:
+                self._seen.popitem(last=False)
+        self._last_similar[similar_key] = (event_ts, identity)
+        return True
+
+    # --- Persistencia ---
+
+    def _upsert(self, conn: sqlite3.Connection, kind: str, record: Dict):
+        table, key = ('macro_events', MACRO_KEY) if kind == 'macro' else ('token_events', TOKEN_KEY)
+        where = ' AND '.join(f'{k} = ?' for k in key)
+        values = [record[k] for k in key]
+        updates = [k for k in record if k not in key]
+        if updates:
+            cursor = conn.execute(
+                f"UPDATE {table} SET {', '.join(f'{k} = ?' for k in updates)} WHERE {where}",
+                [record[k] for k in updates] + values,
+            )
+            found = cursor.rowcount > 0
+        else:
+            found = conn.execute(f"SELECT 1 FROM {table} WHERE {where} LIMIT 1", values).fetchone() is not None
+        if found:
+            self._count('updated')
+            return
+        columns = list(record)
+        conn.execute(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+            [record[k] for k in columns],
+        )
+        self._count('inserted')
+
+    async def run_once(self) -> Dict[str, int]:
+        """Ejecuta un ciclo completo de ingesta"""
+        self.stats = {}
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1000)
+        producer = asyncio.create_task(self._fetch_all(queue))
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            ensure_schema(conn, ['macro_events', 'token_events'])
+            with conn:
+                while True:
+                    item = await queue.get()
+                    if item is _END:
+                        break
+                    kind, raw = item
+                    self._count('received')
+                    record = normalize(kind, raw)
+                    if record is None:
+                        self._count('invalid')
+                        continue
+                    if self.accept(kind, record):
+                        self._upsert(conn, kind, record)
+        finally:
+            conn.close()
+            if not producer.done():
+                producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+        return self.stats
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Ingesta de eventos macro y de tokens')
+    parser.add_argument('--db', default='trading_data.db')
+    parser.add_argument('--backfill', action='store_true', help='Desactiva MAX_EVENTS_PER_HOUR')
+    args = parser.parse_args(argv)
+
+    pipeline = EventIngestionPipeline(args.db, rate_limit=not args.backfill)
+    if not pipeline.sources:
+        print("❌ No hay fuentes configuradas (EVENT_SOURCE_URL_<FUENTE>)")
+        return 1
+    stats = asyncio.run(pipeline.run_once())
+    print(f"✅ Ingesta completada: {stats}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
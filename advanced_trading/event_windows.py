@@ -0,0 +1,261 @@
+"""
+Vista materializada de ventanas de evento (METRICS_SOURCE)
+Para cada evento guarda en event_windows las métricas de la ventana
+T0 → T0+EVENT_WINDOW_MINUTES sobre las barras de market_data: retorno previo
+(misma duración antes de T0), retorno de la barra T0, retorno al cierre de la
+ventana, máxima excursión adversa/favorable según el lado del evento, volumen
+y spread.
+
+Se construye con un merge-join por símbolo: eventos ordenados por T0 contra
+barras ordenadas por timestamp, en una sola pasada con un buffer acotado a
+las ventanas que se solapan. refresh() sólo recalcula eventos nuevos o
+modificados, ventanas aún abiertas y las que tocan barras nuevas (id >
+última marca de agua en materialized_views).
+"""
+
+import argparse
+import sqlite3
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from advanced_trading.config.trading_config import TRADING_CONFIG
+from advanced_trading.db_schema import ensure_schema
+
+VIEW_NAME = 'event_windows'
+DEFAULT_WINDOW_MINUTES = TRADING_CONFIG['BACKTEST_METRICS']['METRICS_SOURCE']['EVENT_WINDOW_MINUTES']
+SHORT_IMPACTS = frozenset({'BEARISH', 'SHORT', 'SELL'})
+# Mismo criterio que _side() en SQL, para detectar cambios de impact
+SIDE_SQL = "CASE WHEN UPPER(e.impact) IN ({}) THEN -1 ELSE 1 END".format(
+    ', '.join(f"'{impact}'" for impact in sorted(SHORT_IMPACTS)))
+
+COLUMNS = ('event_id', 'symbol', 't0_iso', 'window_minutes', 'side', 'ref_price', 'pre_return', 't0_return',
+           'post_return', 'mae', 'mfe', 'volume', 'avg_spread_bps', 'max_spread_bps', 'bars', 'complete')
+
+
+class Bar(NamedTuple):
+    ts: float
+    open: Optional[float]
+    high: Optional[float]
+    low: Optional[float]
+    close: Optional[float]
+    volume: Optional[float]
+    spread_bps: Optional[float]
+
+
+class WindowEvent(NamedTuple):
+    event_id: int
+    symbol: str
+    t0_iso: str
+    t0: float
+    side: int
+
+
+def _epoch(value: str) -> float:
+    dt = datetime.fromisoformat(str(value).strip().replace('Z', '+00:00'))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def _side(impact: Optional[str]) -> int:
+    return -1 if impact and impact.upper() in SHORT_IMPACTS else 1
+
+
+def _ret(price: Optional[float], base: Optional[float]) -> Optional[float]:
+    return price / base - 1 if price is not None and base else None
+
+
+def window_row(event: WindowEvent, bars: Iterable[Bar], window_sec: float, complete: bool) -> Dict:
+    """Métricas de un evento a partir de las barras de [T0 - ventana, T0 + ventana)"""
+    pre = [b for b in bars if event.t0 - window_sec <= b.ts < event.t0]
+    post = [b for b in bars if event.t0 <= b.ts < event.t0 + window_sec]
+    first = post[0] if post else None
+    ref = first.open if first is not None and first.open is not None else (pre[-1].close if pre else None)
+    row = dict(zip(COLUMNS, (event.event_id, event.symbol, event.t0_iso, int(round(window_sec / 60)),
+                             event.side) + (None,) * 9 + (len(post), int(complete))))
+    row['ref_price'] = ref
+    if pre:
+        row['pre_return'] = _ret(pre[-1].close, pre[0].open if pre[0].open is not None else pre[0].close)
+    if post and ref:
+        highs = [b.high for b in post if b.high is not None]
+        lows = [b.low for b in post if b.low is not None]
+        up = max(highs) / ref - 1 if highs else None
+        down = min(lows) / ref - 1 if lows else None
+        favorable, adverse = (up, down) if event.side > 0 else (down, up)
+        row.update(t0_return=_ret(first.close, ref), post_return=_ret(post[-1].close, ref),
+                   mfe=favorable * event.side if favorable is not None else None,
+                   mae=adverse * event.side if adverse is not None else None)
+    spreads = [b.spread_bps for b in post if b.spread_bps is not None]
+    if post:
+        row['volume'] = sum(b.volume or 0.0 for b in post)
+    if spreads:
+        row['avg_spread_bps'] = sum(spreads) / len(spreads)
+        row['max_spread_bps'] = max(spreads)
+    return row
+
+
+def merge_windows(events: List[WindowEvent], bars: Iterable[Bar], window_sec: float,
+                  closed_until: Optional[float] = None) -> Iterator[Dict]:
+    """
+    Merge-join de eventos (ordenados por t0) contra barras (ordenadas por ts)
+    de un mismo símbolo
+
+    Cada barra se lee una vez; el buffer sólo guarda las barras que aún
+    necesita algún evento pendiente. Una ventana es completa cuando ya llegó
+    una barra posterior a su cierre (o si cierra antes de closed_until, el ts
+    de la última barra del símbolo cuando sólo se leen los rangos de ventana).
+    """
+    buffer: deque = deque()
+    pending = 0
+    for bar in bars:
+        while pending < len(events) and bar.ts >= events[pending].t0 + window_sec:
+            yield window_row(events[pending], buffer, window_sec, complete=True)
+            pending += 1
+        if pending == len(events):
+            return
+        buffer.append(bar)
+        start = events[pending].t0 - window_sec
+        while buffer and buffer[0].ts < start:
+            buffer.popleft()
+    for event in events[pending:]:
+        complete = closed_until is not None and event.t0 + window_sec <= closed_until
+        yield window_row(event, buffer, window_sec, complete=complete)
+
+
+def _ranges(events: List[WindowEvent], window_sec: float, sample: str) -> List[Tuple[str, str]]:
+    """
+    Rangos [inicio, fin) de timestamps que cubren las ventanas, fusionados y
+    en el formato de texto de market_data (sample) para usar el índice
+
+    Los límites se redondean al minuto con un minuto de margen; el filtro
+    exacto lo hace window_row.
+    """
+    separator = sample[10] if len(sample) > 10 else ' '
+    ranges: List[List[float]] = []
+    for event in events:
+        lo, hi = event.t0 - window_sec - 60, event.t0 + window_sec + 60
+        if ranges and lo <= ranges[-1][1]:
+            ranges[-1][1] = max(ranges[-1][1], hi)
+        else:
+            ranges.append([lo, hi])
+    text = lambda ts: datetime.fromtimestamp(ts, timezone.utc).strftime(f'%Y-%m-%d{separator}%H:%M')
+    return [(text(lo), text(hi)) for lo, hi in ranges]
+
+
+class EventWindows:
+    """Mantiene event_windows sobre events y market_data de una BD"""
+
+    def __init__(self, db_path: str, window_minutes: int = DEFAULT_WINDOW_MINUTES):
+        self.db_path = db_path
+        self.window_minutes = window_minutes
+        self.window_sec = window_minutes * 60.0
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        ensure_schema(self.conn, ['events', 'market_data', 'event_windows', 'materialized_views'])
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _watermark(self) -> int:
+        row = self.conn.execute('SELECT last_source_id FROM materialized_views WHERE name = ?',
+                                (VIEW_NAME,)).fetchone()
+        return row[0] if row else 0
+
+    def _stale_events(self, since_bar_id: int) -> List[WindowEvent]:
+        """Eventos sin fila, con fila desfasada (T0, símbolo, lado)/abierta o cuya ventana tocan barras nuevas"""
+        rows = self.conn.execute(
+            'SELECT e.id, e.symbol, e.t0_iso, e.impact FROM events e '
+            'LEFT JOIN event_windows w ON w.event_id = e.id '
+            'WHERE e.t0_iso IS NOT NULL AND (w.event_id IS NULL OR w.complete = 0 OR w.t0_iso != e.t0_iso '
+            f"OR w.symbol != COALESCE(e.symbol, 'BTCUSDT') OR w.side != {SIDE_SQL} OR w.window_minutes != ?)",
+            (self.window_minutes,)).fetchall()
+        if since_bar_id:
+            days = self.window_minutes / 1440.0
+            for symbol, first, last in self.conn.execute(
+                    'SELECT symbol, MIN(timestamp), MAX(timestamp) FROM market_data WHERE id > ? GROUP BY symbol',
+                    (since_bar_id,)).fetchall():
+                rows += self.conn.execute(
+                    'SELECT e.id, e.symbol, e.t0_iso, e.impact FROM events e '
+                    "JOIN event_windows w ON w.event_id = e.id WHERE w.complete = 1 AND COALESCE(e.symbol, 'BTCUSDT') = ? "
+                    'AND julianday(e.t0_iso) BETWEEN julianday(?) - ? AND julianday(?) + ?',
+                    (symbol, first, days, last, days)).fetchall()
+        events = {}
+        for event_id, symbol, t0_iso, impact in rows:
+            events[event_id] = WindowEvent(event_id, symbol or 'BTCUSDT', t0_iso, _epoch(t0_iso), _side(impact))
+        return list(events.values())
+
+    def _bars(self, symbol: str, events: List[WindowEvent], sample: str) -> Iterator[Bar]:
+        """Barras del símbolo en orden, sólo en los rangos que cubren las ventanas (índice)"""
+        for lo, hi in _ranges(events, self.window_sec, sample):
+            for row in self.conn.execute(
+                    'SELECT timestamp, open, high, low, close, volume, spread_bps FROM market_data '
+                    'WHERE symbol = ? AND timestamp >= ? AND timestamp < ? ORDER BY timestamp', (symbol, lo, hi)):
+                yield Bar(_epoch(row[0]), *row[1:])
+
+    def refresh(self, full: bool = False) -> Dict[str, int]:
+        """Recalcula las ventanas afectadas (todas si full) y avanza la marca de agua"""
+        started = time.perf_counter()
+        if full:
+            self.conn.execute('DELETE FROM event_windows')
+            self.conn.execute('DELETE FROM materialized_views WHERE name = ?', (VIEW_NAME,))
+        max_bar_id = self.conn.execute('SELECT MAX(id) FROM market_data').fetchone()[0] or 0
+        events = self._stale_events(self._watermark())
+        by_symbol: Dict[str, List[WindowEvent]] = {}
+        for event in events:
+            by_symbol.setdefault(event.symbol, []).append(event)
+
+        rows = []
+        for symbol, symbol_events in by_symbol.items():
+            symbol_events.sort(key=lambda e: e.t0)
+            first, last = self.conn.execute('SELECT MIN(timestamp), MAX(timestamp) FROM market_data '
+                                            'WHERE symbol = ?', (symbol,)).fetchone()
+            bars = self._bars(symbol, symbol_events, first) if first else iter(())
+            rows.extend(merge_windows(symbol_events, bars, self.window_sec, _epoch(last) if last else None))
+
+        now = datetime.now(timezone.utc).isoformat()
+        with self.conn:
+            self.conn.execute('DELETE FROM event_windows WHERE event_id NOT IN (SELECT id FROM events)')
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO event_windows ({', '.join(COLUMNS)}, updated_at) "
+                f"VALUES ({', '.join('?' * len(COLUMNS))}, ?)",
+                [tuple(row[c] for c in COLUMNS) + (now,) for row in rows])
+            self.conn.execute(
+                'INSERT INTO materialized_views (name, last_source_id, refreshed_at) VALUES (?, ?, ?) '
+                'ON CONFLICT(name) DO UPDATE SET last_source_id = excluded.last_source_id, '
+                'refreshed_at = excluded.refreshed_at', (VIEW_NAME, max_bar_id, now))
+        return {
+            'events': len(rows),
+            'complete': sum(row['complete'] for row in rows),
+            'symbols': len(by_symbol),
+            'ms': int((time.perf_counter() - started) * 1000),
+        }
+
+    def get(self, event_id: int) -> Optional[Dict]:
+        row = self.conn.execute('SELECT * FROM event_windows WHERE event_id = ?', (event_id,)).fetchone()
+        return dict(row) if row else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Materializa las ventanas de evento (event_windows)')
+    parser.add_argument('--db', default='trading_data.db')
+    parser.add_argument('--window-minutes', type=int, default=DEFAULT_WINDOW_MINUTES)
+    parser.add_argument('--full', action='store_true', help='Reconstruye la vista desde cero')
+    args = parser.parse_args(argv)
+
+    with EventWindows(args.db, args.window_minutes) as view:
+        stats = view.refresh(full=args.full)
+    print(f"✅ {stats['events']} ventanas recalculadas ({stats['complete']} completas, "
+          f"{stats['symbols']} símbolos) en {stats['ms']} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
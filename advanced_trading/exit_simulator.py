@@ -0,0 +1,123 @@
+"""
+Simulador vectorizado de salidas TP escalonado + SL sobre trades históricos
+Para un lote de entradas y su matriz de velas (trades × barras) calcula el
+primer toque de cada TP y del SL con máximos/mínimos acumulados y devuelve el
+PnL realizado por trade, sin bucles Python por trade ni por barra.
+"""
+
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+from advanced_trading.config.trading_config import TRADING_CONFIG
+
+ArrayLike = Union[float, np.ndarray]
+
+
+def build_bar_windows(series: np.ndarray, entry_indices: np.ndarray, horizon: int) -> np.ndarray:
+    """
+    Matriz (trades × horizon) con las barras posteriores a cada entrada
+
+    Las barras que caen fuera de la serie se rellenan con NaN.
+    """
+    series = np.asarray(series, dtype=float)
+    padded = np.concatenate([series, np.full(horizon, np.nan)])
+    windows = np.lib.stride_tricks.sliding_window_view(padded, horizon)
+    return windows[np.asarray(entry_indices) + 1]
+
+
+def _first_touch(cum_excursion: np.ndarray, threshold: np.ndarray) -> np.ndarray:
+    """Índice de la primera barra cuya excursión acumulada alcanza el umbral"""
+    # cum_excursion es monótona no decreciente: contar barras por debajo = primer toque
+    return (cum_excursion < threshold[:, None]).sum(axis=1)
+
+
+def simulate_exits(entry_prices: np.ndarray, directions: np.ndarray,
+                   highs: np.ndarray, lows: np.ndarray, closes: np.ndarray,
+                   sl_pct: ArrayLike, tp_levels: Optional[List[float]] = None,
+                   tp_allocation: Optional[List[float]] = None,
+                   volatility_factor: ArrayLike = 1.0,
+                   sizes: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """
+    Evalúa la escalera de TP y el SL de un lote de trades
+
+    Args:
+        entry_prices: (n,) precios de entrada
+        directions: (n,) 1 para LONG, -1 para SHORT
+        highs, lows, closes: (n, m) barras posteriores a la entrada (NaN = sin dato)
+        sl_pct: distancia de SL en % (escalar o (n,)), p.ej. calculate_dynamic_sl
+        tp_levels: niveles de TP (DEFAULT_TP_LEVELS por defecto)
+        tp_allocation: fracción de la posición por TP (TP_ALLOCATION por defecto)
+        volatility_factor: ajuste de niveles como en generate_tp_targets
+        sizes: (n,) tamaños en unidades para devolver PnL en USD
+
+    Returns:
+        Dict con pnl_pct, tp_hit_bar (n, k), sl_hit_bar, exit_bar y pnl_usd.
+        Las barras no alcanzadas valen -1. Si SL y TP caen en la misma barra se
+        asume que el SL se tocó primero (criterio conservador).
+    """
+    entry = np.asarray(entry_prices, dtype=float)
+    direction = np.asarray(directions, dtype=float)
+    highs = np.asarray(highs, dtype=float)
+    lows = np.asarray(lows, dtype=float)
+    closes = np.asarray(closes, dtype=float)
+    n, m = highs.shape
+
+    levels = np.asarray(tp_levels if tp_levels is not None else TRADING_CONFIG['DEFAULT_TP_LEVELS'])
+    allocation = np.asarray(tp_allocation if tp_allocation is not None else TRADING_CONFIG['TP_ALLOCATION'])
+    level_pct = levels[None, :] * np.broadcast_to(np.asarray(volatility_factor, dtype=float), (n,))[:, None]
+    sl = np.broadcast_to(np.asarray(sl_pct, dtype=float), (n,))
+
+    # Excursión favorable / adversa en % desde la entrada, según dirección
+    long = (direction > 0)[:, None]
+    up = highs / entry[:, None] - 1.0
+    down = 1.0 - lows / entry[:, None]
+    favorable = np.where(long, up, down)
+    adverse = np.where(long, down, up)
+    favorable = np.maximum.accumulate(np.nan_to_num(favorable, nan=-np.inf), axis=1)
+    adverse = np.maximum.accumulate(np.nan_to_num(adverse, nan=-np.inf), axis=1)
+
+    sl_bar = _first_touch(adverse, sl)
+    tp_bar = np.stack([_first_touch(favorable, level_pct[:, k]) for k in range(len(levels))], axis=1)
+
+    tp_filled = tp_bar < sl_bar[:, None]
+    closed_fraction = (tp_filled * allocation).sum(axis=1)
+    pnl_pct = (tp_filled * allocation * level_pct).sum(axis=1)
+
+    # Resto de la posición: SL si se tocó; si no, salida por tiempo a la última barra válida
+    stopped = sl_bar < m
+    valid = ~np.isnan(closes)
+    last_valid = np.where(valid.any(axis=1), m - 1 - np.argmax(valid[:, ::-1], axis=1), -1)
+    last_close = np.where(last_valid >= 0, closes[np.arange(n), np.maximum(last_valid, 0)], entry)
+    time_exit_pct = (last_close / entry - 1.0) * direction
+    remainder = 1.0 - closed_fraction
+    pnl_pct += remainder * np.where(stopped, -sl, time_exit_pct)
+
+    all_tps = tp_filled.all(axis=1)
+    exit_bar = np.where(all_tps, tp_bar.max(axis=1), np.where(stopped, sl_bar, last_valid))
+
+    result = {
+        'pnl_pct': pnl_pct,
+        'tp_hit_bar': np.where(tp_filled, tp_bar, -1),
+        'sl_hit_bar': np.where(stopped, sl_bar, -1),
+        'exit_bar': exit_bar,
+        'closed_at_tp': closed_fraction,
+    }
+    if sizes is not None:
+        result['pnl_usd'] = pnl_pct * entry * np.asarray(sizes, dtype=float)
+    return result
+
+
+def summarize_exits(result: Dict[str, np.ndarray]) -> Dict:
+    """Métricas agregadas para calibración"""
+    pnl = result['pnl_pct']
+    wins = pnl[pnl > 0].sum()
+    losses = -pnl[pnl < 0].sum()
+    return {
+        'trades': int(pnl.size),
+        'hit_rate': float((pnl > 0).mean()) if pnl.size else 0.0,
+        'avg_pnl_pct': float(pnl.mean()) if pnl.size else 0.0,
+        'profit_factor': float(wins / losses) if losses > 0 else float('inf'),
+        'tp_hit_rates': (result['tp_hit_bar'] >= 0).mean(axis=0).tolist() if pnl.size else [],
+        'sl_rate': float((result['sl_hit_bar'] >= 0).mean()) if pnl.size else 0.0,
+    }
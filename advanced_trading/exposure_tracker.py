@@ -0,0 +1,204 @@
+"""
+Tracker de límites diarios y exposición en tiempo real
+Reconstruye el estado desde la tabla trades una sola vez al arrancar y después
+se actualiza de forma incremental; todas las comprobaciones son O(1) y el
+reseteo diario sigue RESET_TZ / RESET_HOUR_LOCAL (consciente de DST).
+"""
+
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from advanced_trading.advanced_risk_manager import check_daily_limits
+from advanced_trading.config.trading_config import TRADING_CONFIG
+
+DB_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def trading_day_bounds(now_ts: float, tz: ZoneInfo, reset_hour: int) -> Tuple[float, float]:
+    """
+    Devuelve (inicio, fin) del día de trading que contiene now_ts, en epoch UTC
+
+    El día empieza a reset_hour hora local; se calcula sobre fechas locales para
+    que los cambios de horario (23h / 25h) queden bien resueltos.
+    """
+    local_now = datetime.fromtimestamp(now_ts, tz)
+    start_date = local_now.date()
+    if local_now.hour < reset_hour:
+        start_date -= timedelta(days=1)
+    start = datetime(start_date.year, start_date.month, start_date.day, reset_hour, tzinfo=tz)
+    next_date = start_date + timedelta(days=1)
+    end = datetime(next_date.year, next_date.month, next_date.day, reset_hour, tzinfo=tz)
+    return start.timestamp(), end.timestamp()
+
+
+def _to_db_time(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime(DB_TIME_FORMAT)
+
+
+def _parse_db_time(value: Optional[str]) -> Optional[float]:
+    """Parsea timestamps de SQLite (UTC, con o sin 'T'/'Z') a epoch"""
+    if not value:
+        return None
+    dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+class ExposureTracker:
+    """Contadores diarios, posiciones abiertas, trades por evento y cooldown"""
+
+    def __init__(self, account_balance: float, config: Optional[Dict] = None,
+                 clock: Callable[[], float] = time.time):
+        config = config or TRADING_CONFIG
+        self.account_balance = account_balance
+        self._set_limits(config)
+        self._clock = clock
+
+        self.daily_pnl = 0.0           # USD realizados en el día de trading
+        self.daily_trades = 0
+        self.event_trades: Dict[str, int] = {}
+        self.open_positions: Dict[str, Optional[str]] = {}  # trade_id -> event_id
+        self.last_close_ts: Optional[float] = None
+        self.day_start, self.next_reset = trading_day_bounds(clock(), self.reset_tz, self.reset_hour)
+
+    def _set_limits(self, config: Dict):
+        self.max_daily_loss = config['MAX_DAILY_LOSS']
+        self.max_daily_trades = config['MAX_DAILY_TRADES']
+        self.max_open_positions = config['MAX_OPEN_POSITIONS']
+        self.per_event_max_trades = config['PER_EVENT_MAX_TRADES']
+        self.cooldown_sec = config['COOLDOWN_SEC']
+        self.reset_tz = ZoneInfo(config['RESET_TZ'])
+        self.reset_hour = config['RESET_HOUR_LOCAL']
+
+    def apply_config(self, config):
+        """
+        Aplica un RuntimeConfig recargado conservando contadores y posiciones
+
+        Un cambio de RESET_TZ / RESET_HOUR_LOCAL rige desde el próximo reseteo:
+        el día de trading en curso no se recorta.
+        """
+        self._set_limits(config.trading)
+
+    # --- Estado ---
+
+    def rebuild_from_db(self, conn: sqlite3.Connection):
+        """Reconstruye el estado desde la tabla trades (solo al arrancar)"""
+        self.day_start, self.next_reset = trading_day_bounds(self._clock(), self.reset_tz, self.reset_hour)
+        day_start = _to_db_time(self.day_start)
+
+        self.daily_trades = 0
+        self.event_trades = {}
+        for event_id, n in conn.execute(
+            "SELECT event_id, COUNT(*) FROM trades WHERE datetime(entry_time) >= ? GROUP BY event_id",
+            (day_start,),
+        ):
+            self.daily_trades += n
+            if event_id is not None:
+                self.event_trades[str(event_id)] = n
+
+        self.daily_pnl = conn.execute(
+            "SELECT COALESCE(SUM(pnl), 0) FROM trades WHERE datetime(exit_time) >= ?",
+            (day_start,),
+        ).fetchone()[0]
+
+        self.open_positions = {
+            str(trade_id): (str(event_id) if event_id is not None else None)
+            for trade_id, event_id in conn.execute(
+                "SELECT id, event_id FROM trades WHERE exit_time IS NULL AND entry_time IS NOT NULL"
+            )
+        }
+
+        self.last_close_ts = _parse_db_time(
+            conn.execute("SELECT MAX(datetime(exit_time)) FROM trades").fetchone()[0]
+        )
+
+    @classmethod
+    def from_db(cls, db_path: str, account_balance: float, **kwargs) -> 'ExposureTracker':
+        tracker = cls(account_balance, **kwargs)
+        conn = sqlite3.connect(db_path)
+        try:
+            tracker.rebuild_from_db(conn)
+        finally:
+            conn.close()
+        return tracker
+
+    def _maybe_rollover(self, now: float):
+        """Resetea los contadores diarios al cruzar el reseteo local"""
+        if now < self.next_reset:
+            return
+        self.day_start, self.next_reset = trading_day_bounds(now, self.reset_tz, self.reset_hour)
+        self.daily_pnl = 0.0
+        self.daily_trades = 0
+        self.event_trades = {}
+
+    # --- Actualizaciones incrementales ---
+
+    def on_trade_opened(self, trade_id, event_id=None, ts: Optional[float] = None):
+        """Registra la apertura de un trade"""
+        self._maybe_rollover(ts if ts is not None else self._clock())
+        self.daily_trades += 1
+        event_key = str(event_id) if event_id is not None else None
+        if event_key is not None:
+            self.event_trades[event_key] = self.event_trades.get(event_key, 0) + 1
+        self.open_positions[str(trade_id)] = event_key
+
+    def on_trade_closed(self, trade_id, pnl: float, ts: Optional[float] = None):
+        """Registra el cierre de un trade con su PnL realizado (USD)"""
+        now = ts if ts is not None else self._clock()
+        self._maybe_rollover(now)
+        self.open_positions.pop(str(trade_id), None)
+        self.daily_pnl += pnl
+        self.last_close_ts = now
+
+    def record_daily(self, pnl: float, trades: int = 0, ts: Optional[float] = None):
+        """Suma PnL (USD) y trades al día de trading sin abrir/cerrar posiciones"""
+        self._maybe_rollover(ts if ts is not None else self._clock())
+        self.daily_pnl += pnl
+        self.daily_trades += trades
+
+    def update_balance(self, account_balance: float):
+        self.account_balance = account_balance
+
+    # --- Comprobaciones O(1) ---
+
+    def can_open(self, event_id=None) -> Tuple[bool, str]:
+        """Verifica todos los límites antes de abrir un trade"""
+        now = self._clock()
+        self._maybe_rollover(now)
+
+        pnl_pct = self.daily_pnl / self.account_balance if self.account_balance else 0.0
+        ok, message = check_daily_limits(pnl_pct, self.daily_trades,
+                                         self.max_daily_loss, self.max_daily_trades)
+        if not ok:
+            return False, f"{message} ({self.daily_trades}/{self.max_daily_trades} trades)"
+
+        if len(self.open_positions) >= self.max_open_positions:
+            return False, f"Max open positions reached: {len(self.open_positions)}/{self.max_open_positions}"
+
+        if event_id is not None:
+            event_count = self.event_trades.get(str(event_id), 0)
+            if event_count >= self.per_event_max_trades:
+                return False, f"Per-event trade limit reached for {event_id}: {event_count}/{self.per_event_max_trades}"
+
+        if self.last_close_ts is not None:
+            remaining = self.cooldown_sec - (now - self.last_close_ts)
+            if remaining > 0:
+                return False, f"Cooldown active: {remaining:.0f}s remaining"
+
+        return True, "Within limits"
+
+    def get_state(self) -> Dict:
+        """Estado actual para métricas / dashboard"""
+        return {
+            'daily_pnl': self.daily_pnl,
+            'daily_trades': self.daily_trades,
+            'open_positions': len(self.open_positions),
+            'event_trades': dict(self.event_trades),
+            'last_close_ts': self.last_close_ts,
+            'day_start': self.day_start,
+            'next_reset': self.next_reset,
+        }
@@ -0,0 +1,298 @@
+"""
+Recarga en caliente de parámetros de runtime
+Vigila trading_config.py, event_rules.json y settings.yaml (polling de mtime
+y SIGHUP, el ExecReload de la unidad systemd) y, si se indica la ruta
+'params', el params.json activo de snapshot_store, cuyos parámetros se
+superponen a TRADING_CONFIG: activar o hacer rollback de un snapshot llega
+así a los componentes como una recarga más, validada igual que las demás. Cada recarga construye un
+RuntimeConfig inmutable, lo valida y, sólo si es válido y distinto, lo
+aplica con apply_config() a los componentes registrados (AdvancedRiskManager,
+MacroAnalyzer, RelativeArbitrage, StaggeredExecution) sin tocar su estado en
+memoria (historial de precios, contadores diarios, ejecuciones).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import runpy
+import signal
+import threading
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+import yaml
+
+from advanced_trading.snapshot_store import ActiveParams
+
+logger = logging.getLogger(__name__)
+
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+_REPO_ROOT = os.path.dirname(_PACKAGE_DIR)
+
+DEFAULT_PATHS = {
+    'trading': os.path.join(_PACKAGE_DIR, 'config', 'trading_config.py'),
+    'event_rules': os.path.join(_PACKAGE_DIR, 'config', 'event_rules.json'),
+    'settings': os.path.join(_REPO_ROOT, 'config', 'settings.yaml'),
+}
+
+PARTIAL_FILL_POLICIES = ('cancel_remaining', 'keep_until_timeout')
+LOG_LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL')
+
+
+class ConfigError(ValueError):
+    """Configuración inválida; la activa no se modifica"""
+
+    def __init__(self, errors: List[str]):
+        super().__init__('; '.join(errors))
+        self.errors = errors
+
+
+def freeze(value: Any) -> Any:
+    """dict -> MappingProxyType, list -> tuple (recursivo)"""
+    if isinstance(value, Mapping):
+        return MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+def _thaw(value: Any) -> Any:
+    if isinstance(value, Mapping):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(v) for v in value]
+    return value
+
+
+@dataclass(frozen=True)
+class RuntimeConfig:
+    """Snapshot inmutable de la configuración de runtime"""
+    trading: Mapping[str, Any]
+    event_rules: Mapping[str, Any]
+    settings: Mapping[str, Any]
+    digest: str
+    version: int = 0
+    loaded_at: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'trading': _thaw(self.trading), 'event_rules': _thaw(self.event_rules),
+                'settings': _thaw(self.settings)}
+
+
+# --- Carga y validación ---
+
+def load_sources(paths: Optional[Dict[str, str]] = None) -> Dict[str, Dict]:
+    """
+    Lee los tres ficheros (trading_config.py se ejecuta en un namespace aislado)
+
+    Con paths['params'] los parámetros del snapshot activo sustituyen a las
+    claves de primer nivel de TRADING_CONFIG; sin params.json no cambia nada.
+    """
+    paths = dict(DEFAULT_PATHS, **(paths or {}))
+    trading = runpy.run_path(paths['trading'])['TRADING_CONFIG']
+    if paths.get('params'):
+        trading = dict(trading, **ActiveParams(paths['params']).get())
+    with open(paths['event_rules']) as f:
+        rules = json.load(f)
+    with open(paths['settings']) as f:
+        settings = yaml.safe_load(f) or {}
+    return {'trading': trading, 'event_rules': rules.get('event_rules', rules), 'settings': settings}
+
+
+def _in_range(errors: List[str], config: Mapping, key: str, low: float, high: float,
+              low_open: bool = False):
+    value = config.get(key)
+    if not isinstance(value, (int, float)) or isinstance(value, bool):
+        errors.append(f"{key} debe ser numérico (es {value!r})")
+    elif value > high or value < low or (low_open and value == low):
+        errors.append(f"{key}={value} fuera de rango [{low}, {high}]")
+
+
+def validate(raw: Dict[str, Dict]) -> List[str]:
+    """Lista de errores (vacía si la configuración es válida)"""
+    errors: List[str] = []
+    trading = raw['trading']
+    _in_range(errors, trading, 'RISK_PER_TRADE', 0, 0.1, low_open=True)
+    _in_range(errors, trading, 'MAX_DAILY_LOSS', 0, 1, low_open=True)
+    _in_range(errors, trading, 'MAX_DAILY_TRADES', 0, 1_000)
+    _in_range(errors, trading, 'CORRELATION_THRESHOLD', 0, 1)
+    _in_range(errors, trading, 'MIN_IMPACT_SCORE', 0, 1)
+    _in_range(errors, trading, 'ORDER_TIMEOUT_SEC', 0, 3_600, low_open=True)
+    if trading.get('PARTIAL_FILL_POLICY') not in PARTIAL_FILL_POLICIES:
+        errors.append(f"PARTIAL_FILL_POLICY desconocida: {trading.get('PARTIAL_FILL_POLICY')!r}")
+    levels, allocation = trading.get('DEFAULT_TP_LEVELS', []), trading.get('TP_ALLOCATION', [])
+    if len(levels) != len(allocation):
+        errors.append('DEFAULT_TP_LEVELS y TP_ALLOCATION deben tener la misma longitud')
+    elif allocation and abs(sum(allocation) - 1) > 1e-9:
+        errors.append(f"TP_ALLOCATION debe sumar 1 (suma {sum(allocation)})")
+
+    for event_type, rule in raw['event_rules'].items():
+        if not isinstance(rule.get('direction'), str):
+            errors.append(f"event_rules.{event_type}: falta direction")
+        if not rule.get('required_deviation', 0) >= 0:
+            errors.append(f"event_rules.{event_type}: required_deviation negativa")
+        if not rule.get('size_multiplier', 1) > 0:
+            errors.append(f"event_rules.{event_type}: size_multiplier debe ser > 0")
+
+    settings = raw['settings']
+    if 'default_notional_usd' in settings and not settings['default_notional_usd'] > 0:
+        errors.append('settings.default_notional_usd debe ser > 0')
+    if 'log_level' in settings and str(settings['log_level']).upper() not in LOG_LEVELS:
+        errors.append(f"settings.log_level desconocido: {settings['log_level']!r}")
+    return errors
+
+
+def build_config(raw: Dict[str, Dict], version: int = 0) -> RuntimeConfig:
+    errors = validate(raw)
+    if errors:
+        raise ConfigError(errors)
+    digest = hashlib.blake2b(
+        json.dumps(raw, sort_keys=True, default=str).encode(), digest_size=16
+    ).hexdigest()
+    return RuntimeConfig(freeze(raw['trading']), freeze(raw['event_rules']), freeze(raw['settings']),
+                         digest, version, time.time())
+
+
+def load_config(paths: Optional[Dict[str, str]] = None, version: int = 0) -> RuntimeConfig:
+    return build_config(load_sources(paths), version)
+
+
+# --- Reloader ---
+
+class ConfigReloader:
+    """
+    Vigila los ficheros de configuración y reparte snapshots validados
+
+    reload() es seguro desde cualquier hilo; el handler de SIGHUP sólo marca
+    la petición y el hilo de polling (o quien llame a reload) hace el trabajo.
+    """
+
+    def __init__(self, paths: Optional[Dict[str, str]] = None, poll_interval: float = 2.0,
+                 on_reload: Optional[Callable[[RuntimeConfig], None]] = None,
+                 on_error: Optional[Callable[[ConfigError], None]] = None):
+        self.paths = dict(DEFAULT_PATHS, **(paths or {}))
+        self.poll_interval = poll_interval
+        self.on_reload = on_reload
+        self.on_error = on_error
+        self.current = load_config(self.paths)
+        self.reloads = 0
+        self.failures = 0
+        self._targets: List[Any] = []
+        self._stamps = self._stat()
+        self._lock = threading.Lock()
+        self._requested = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _stat(self) -> Dict[str, Tuple]:
+        stamps = {}
+        for name, path in self.paths.items():
+            try:
+                st = os.stat(path)
+                stamps[name] = (st.st_ino, st.st_mtime_ns, st.st_size)
+            except FileNotFoundError:
+                stamps[name] = None
+        return stamps
+
+    def register(self, *targets) -> 'ConfigReloader':
+        """
+        Registra componentes con apply_config() y les aplica la config actual
+
+        Los constructores toman sus valores por defecto de TRADING_CONFIG, así
+        que registrar un componente recién creado no cambia su comportamiento.
+        """
+        with self._lock:
+            for target in targets:
+                target.apply_config(self.current)
+                self._targets.append(target)
+        return self
+
+    def reload(self, force: bool = False) -> bool:
+        """True si se ha aplicado una configuración nueva"""
+        with self._lock:
+            stamps = self._stat()
+            if not force and stamps == self._stamps:
+                return False
+            self._stamps = stamps
+            try:
+                config = load_config(self.paths, self.current.version + 1)
+            except ConfigError as e:
+                self.failures += 1
+                logger.error("Recarga rechazada, se mantiene la config v%d: %s", self.current.version, e)
+                if self.on_error:
+                    self.on_error(e)
+                return False
+            except Exception as e:  # fichero a medio escribir, sintaxis, ...
+                self.failures += 1
+                logger.error("Recarga fallida, se mantiene la config v%d: %r", self.current.version, e)
+                if self.on_error:
+                    self.on_error(ConfigError([repr(e)]))
+                return False
+            if config.digest == self.current.digest:
+                return False
+            if not self._apply(config):
+                return False
+            self.current = config
+            self.reloads += 1
+        logger.info("Config v%d aplicada (%s)", config.version, config.digest[:8])
+        if self.on_reload:
+            self.on_reload(config)
+        return True
+
+    def _apply(self, config: RuntimeConfig) -> bool:
+        """Aplica a todos los componentes o a ninguno (los ya aplicados vuelven a la config actual)"""
+        applied = []
+        for target in self._targets:
+            try:
+                target.apply_config(config)
+            except Exception as e:
+                self.failures += 1
+                logger.error("Recarga v%d rechazada por %s: %r; se restaura la config v%d",
+                             config.version, type(target).__name__, e, self.current.version)
+                for done in applied:
+                    try:
+                        done.apply_config(self.current)
+                    except Exception:
+                        logger.exception("No se pudo restaurar la config v%d en %s",
+                                         self.current.version, type(done).__name__)
+                if self.on_error:
+                    self.on_error(ConfigError([f'{type(target).__name__}: {e!r}']))
+                return False
+            applied.append(target)
+        return True
+
+    def request_reload(self, *_):
+        """Handler de SIGHUP: no recarga dentro del handler, sólo lo pide"""
+        self._requested.set()
+
+    def install_signal_handler(self, loop=None):
+        """SIGHUP -> recarga forzada (en el loop asyncio si se indica)"""
+        if loop is not None:
+            loop.add_signal_handler(signal.SIGHUP, self.request_reload)
+        else:
+            signal.signal(signal.SIGHUP, self.request_reload)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            requested = self._requested.wait(self.poll_interval)
+            if self._stopped.is_set():
+                break
+            self._requested.clear()
+            self.reload(force=requested)
+
+    def start(self) -> 'ConfigReloader':
+        if self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name='config-reloader', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._requested.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,354 @@
+"""
+Modo multi-nodo: reparto del análisis y router de órdenes con líder
+Varias réplicas comparten la misma base SQLite (volumen ./data). Todas
+analizan, repartiéndose los símbolos por rendezvous hashing sobre los nodos
+vivos (cluster_nodes). Sólo el titular del lease 'order-router' dispara
+eventos y envía órdenes.
+
+Cada cambio de titular incrementa el token del lease (fencing token). Los
+disparos y las órdenes se reclaman antes de ejecutarse con una clave
+determinista en idempotency_keys, y en la misma transacción se comprueba
+que el token sigue vigente. Un líder pausado que vuelve tras perder el lease
+no puede reclamar nada, y un failover nunca repite una clave ya reclamada.
+La clave de orden se usa además como newClientOrderId, así que Binance
+también rechaza un reenvío. Una orden cuyo envío falla sin rechazo definitivo
+queda 'unknown' y reconcile() la resuelve con find_order: si el venue no la
+tiene, la clave pasa a 'missing' y se puede volver a reclamar.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import socket
+import sqlite3
+import time
+from dataclasses import replace
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from advanced_trading.config.trading_config import TRADING_CONFIG
+from advanced_trading.db_schema import ensure_schema
+from advanced_trading.order_gateway import is_rejection
+from advanced_trading.records import OrderRequest, OrderResult
+
+logger = logging.getLogger(__name__)
+
+ROUTER_LEASE = 'order-router'
+KEY_PREFIX = 'ea'
+CLUSTER_TABLES = ('leases', 'cluster_nodes', 'idempotency_keys')
+
+
+class NotLeaderError(RuntimeError):
+    """El nodo no tiene (o ha perdido) el lease"""
+
+
+def default_node_id() -> str:
+    return f'{socket.gethostname()}-{os.getpid()}'
+
+
+def idempotency_key(*parts: Any) -> str:
+    """
+    Clave determinista apta como newClientOrderId de Binance
+
+    'ea-' + 32 hex de BLAKE2b = 35 caracteres (límite 36, [A-Za-z0-9_-]).
+    """
+    payload = json.dumps([str(p) for p in parts], separators=(',', ':')).encode()
+    return f'{KEY_PREFIX}-{hashlib.blake2b(payload, digest_size=16).hexdigest()}'
+
+
+def _utc_now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, timeout=5.0, isolation_level=None)  # transacciones explícitas
+    conn.execute('PRAGMA journal_mode=WAL')
+    ensure_schema(conn, CLUSTER_TABLES)
+    return conn
+
+
+class LeaseManager:
+    """
+    Lease con fencing token sobre una fila de la tabla leases
+
+    try_acquire() adquiere o renueva; el lease caduca si el titular no lo
+    renueva en ttl segundos. El titular se da por líder hasta su propia
+    expiración menos un margen, para dejar de actuar antes de que otro pueda
+    adquirirlo.
+    """
+
+    def __init__(self, db_path: str, name: str = ROUTER_LEASE, node_id: Optional[str] = None,
+                 ttl: float = TRADING_CONFIG['LEADER_LEASE_SEC'], clock: Callable[[], float] = time.time):
+        self.db_path = db_path
+        self.name = name
+        self.node_id = node_id or default_node_id()
+        self.ttl = ttl
+        self._clock = clock
+        self.conn = _connect(db_path)
+        self.token: Optional[int] = None
+        self._valid_until = 0.0
+
+    def close(self):
+        self.conn.close()
+
+    @property
+    def is_leader(self) -> bool:
+        return self.token is not None and self._clock() < self._valid_until
+
+    def try_acquire(self) -> bool:
+        """Adquiere el lease si está libre o caducado, o lo renueva si es nuestro"""
+        now = self._clock()
+        conn = self.conn
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT holder, token, expires_at FROM leases WHERE name = ?',
+                               (self.name,)).fetchone()
+            holder, token, expires_at = row if row else (None, 0, 0.0)
+            if holder == self.node_id and token == self.token and expires_at > now:
+                conn.execute('UPDATE leases SET expires_at = ? WHERE name = ?', (now + self.ttl, self.name))
+            elif holder is None or expires_at <= now or holder == self.node_id:
+                token += 1  # nuevo mandato (también tras perderlo y recuperarlo)
+                conn.execute('INSERT INTO leases (name, holder, token, expires_at, acquired_at) '
+                             'VALUES (?, ?, ?, ?, ?) ON CONFLICT(name) DO UPDATE SET holder = excluded.holder, '
+                             'token = excluded.token, expires_at = excluded.expires_at, '
+                             'acquired_at = excluded.acquired_at',
+                             (self.name, self.node_id, token, now + self.ttl, now))
+                logger.info("👑 %s es líder de %s (token %d)", self.node_id, self.name, token)
+            else:
+                conn.execute('COMMIT')
+                if self.token is not None:
+                    logger.warning("⚠️ %s pierde el lease %s frente a %s", self.node_id, self.name, holder)
+                self.token = None
+                return False
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        self.token = token
+        self._valid_until = now + self.ttl * 0.8
+        return True
+
+    def release(self):
+        """Cede el lease (parada ordenada): otro nodo puede tomarlo sin esperar al ttl"""
+        if self.token is None:
+            return
+        with_token = self.token
+        self.token = None
+        self.conn.execute('UPDATE leases SET expires_at = 0 WHERE name = ? AND holder = ? AND token = ?',
+                          (self.name, self.node_id, with_token))
+
+    def holder(self) -> Optional[Dict]:
+        row = self.conn.execute('SELECT holder, token, expires_at FROM leases WHERE name = ?',
+                                (self.name,)).fetchone()
+        return dict(zip(('holder', 'token', 'expires_at'), row)) if row else None
+
+    async def run(self, stop: Optional[asyncio.Event] = None,
+                  on_elected: Optional[Callable[[int], None]] = None,
+                  on_demoted: Optional[Callable[[], None]] = None,
+                  sleep: Callable[[float], Awaitable] = asyncio.sleep):
+        """Renueva cada ttl/3; avisa de los cambios de rol"""
+        stop = stop or asyncio.Event()
+        was_leader = False
+        try:
+            while not stop.is_set():
+                try:
+                    leader = self.try_acquire()
+                except sqlite3.OperationalError as e:  # BD bloqueada: se reintenta
+                    logger.warning("Lease %s no renovado: %r", self.name, e)
+                    leader = self.is_leader
+                if leader and not was_leader and on_elected:
+                    on_elected(self.token)
+                if was_leader and not leader and on_demoted:
+                    on_demoted()
+                was_leader = leader
+                await sleep(self.ttl / 3)
+        finally:
+            self.release()
+
+    # --- Claves idempotentes ---
+
+    def claim(self, key: str, kind: str, result: Optional[Dict] = None) -> bool:
+        """
+        Reclama una clave bajo el lease vigente
+
+        True si es nuestra ahora (o estaba 'missing': el venue confirmó que
+        no se envió); False si ya estaba reclamada (disparo u orden
+        duplicados). NotLeaderError si el token ya no es el vigente.
+        result se guarda con la clave (lo necesario para reconciliarla).
+        """
+        if not self.is_leader:
+            raise NotLeaderError(f"{self.node_id} no es líder de {self.name}")
+        conn = self.conn
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT holder, token, expires_at FROM leases WHERE name = ?',
+                               (self.name,)).fetchone()
+            if row is None or row[0] != self.node_id or row[1] != self.token or row[2] <= self._clock():
+                conn.execute('ROLLBACK')
+                stale, self.token = self.token, None
+                raise NotLeaderError(f"Token {stale} de {self.node_id} ya no es vigente")
+            inserted = conn.execute(
+                'INSERT INTO idempotency_keys (key, kind, holder, token, result, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(key) DO UPDATE SET holder = excluded.holder, '
+                "token = excluded.token, status = 'claimed', result = excluded.result, "
+                "updated_at = excluded.updated_at WHERE idempotency_keys.status = 'missing'",
+                (key, kind, self.node_id, self.token,
+                 json.dumps(result, default=str) if result is not None else None, _utc_now_iso())
+            ).rowcount
+            conn.execute('COMMIT')
+        except NotLeaderError:
+            raise
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return inserted == 1
+
+    def complete(self, key: str, status: str = 'done', result: Optional[Dict] = None):
+        self.conn.execute('UPDATE idempotency_keys SET status = ?, result = ?, updated_at = ? WHERE key = ?',
+                          (status, json.dumps(result, default=str) if result is not None else None,
+                           _utc_now_iso(), key))
+
+    def pending_claims(self, kind: Optional[str] = None) -> List[Dict]:
+        """Claves sin completar o en duda (líder caído a mitad de envío, envío sin respuesta)"""
+        sql = ('SELECT key, kind, holder, token, status, result, created_at FROM idempotency_keys '
+               "WHERE status IN ('claimed', 'unknown')")
+        params: tuple = ()
+        if kind:
+            sql += ' AND kind = ?'
+            params = (kind,)
+        cursor = self.conn.execute(sql, params)
+        names = [d[0] for d in cursor.description]
+        claims = [dict(zip(names, row)) for row in cursor]
+        for claim in claims:
+            claim['result'] = json.loads(claim['result']) if claim['result'] else None
+        return claims
+
+
+class ClusterMembership:
+    """Heartbeat de nodos y reparto de símbolos por rendezvous hashing"""
+
+    def __init__(self, db_path: str, node_id: Optional[str] = None,
+                 node_ttl: float = TRADING_CONFIG['NODE_TTL_SEC'], clock: Callable[[], float] = time.time):
+        self.node_id = node_id or default_node_id()
+        self.node_ttl = node_ttl
+        self._clock = clock
+        self.conn = _connect(db_path)
+        self.started_at = clock()
+
+    def close(self):
+        self.conn.close()
+
+    def heartbeat(self):
+        self.conn.execute('INSERT INTO cluster_nodes (node_id, heartbeat_at, started_at) VALUES (?, ?, ?) '
+                          'ON CONFLICT(node_id) DO UPDATE SET heartbeat_at = excluded.heartbeat_at',
+                          (self.node_id, self._clock(), self.started_at))
+
+    def leave(self):
+        self.conn.execute('DELETE FROM cluster_nodes WHERE node_id = ?', (self.node_id,))
+
+    def members(self) -> List[str]:
+        rows = self.conn.execute('SELECT node_id FROM cluster_nodes WHERE heartbeat_at > ? ORDER BY node_id',
+                                 (self._clock() - self.node_ttl,))
+        members = [r[0] for r in rows]
+        return members if self.node_id in members else sorted(members + [self.node_id])
+
+    @staticmethod
+    def owner(item: str, members: Iterable[str]) -> str:
+        """Nodo con mayor hash(nodo, item): al entrar/salir un nodo sólo se mueven sus símbolos"""
+        return max(members, key=lambda node: hashlib.blake2b(f'{node}|{item}'.encode(),
+                                                             digest_size=8).digest())
+
+    def assigned(self, items: Iterable[str]) -> List[str]:
+        members = self.members()
+        return [item for item in items if self.owner(item, members) == self.node_id]
+
+
+class LeaderOrderRouter:
+    """
+    Dispara eventos y enruta órdenes sólo si este nodo es líder
+
+    Las réplicas no líderes devuelven None (no es un error: el líder lo hará).
+    """
+
+    def __init__(self, lease: LeaseManager, gateway=None, journal=None):
+        self.lease = lease
+        self.gateway = gateway
+        self.journal = journal
+        self.duplicates = 0
+
+    def fire_event(self, event_id: str, symbol: Optional[str] = None, action: Optional[str] = None,
+                   details: Optional[Dict] = None) -> Optional[str]:
+        """Clave del disparo si le toca a este nodo; None si no es líder o ya se disparó"""
+        if not self.lease.is_leader:
+            return None
+        key = idempotency_key('fire', event_id, symbol, action)
+        if not self.lease.claim(key, 'fire'):
+            self.duplicates += 1
+            logger.info("🔁 Evento %s %s ya disparado (%s)", event_id, symbol or '', key)
+            return None
+        if self.journal is not None:
+            self.journal.record_event_fire(event_id, symbol, action, dict(details or {}, fire_key=key))
+        self.lease.complete(key)
+        return key
+
+    async def submit(self, request: OrderRequest, *key_parts: Any) -> Optional[OrderResult]:
+        """
+        Envía la orden con client_order_id = idempotency_key(key_parts)
+
+        key_parts identifican la intención (p. ej. event_id, pata, etapa),
+        no el intento: el mismo trade tras un failover produce la misma clave.
+        """
+        if not self.lease.is_leader:
+            return None
+        key = idempotency_key('order', *key_parts) if key_parts else request.client_order_id
+        if not key:
+            raise ValueError("Se necesitan key_parts o client_order_id para una orden idempotente")
+        if not self.lease.claim(key, 'order', {'symbol': request.symbol}):
+            self.duplicates += 1
+            logger.info("🔁 Orden %s ya enviada; se omite", key)
+            return None
+        keyed = replace(request, client_order_id=key)
+        try:
+            result = await self.gateway.place_order(keyed)
+        except Exception as e:
+            if is_rejection(e):
+                self.lease.complete(key, 'failed', {'symbol': request.symbol, 'error': repr(e)})
+            else:  # puede haber llegado al venue: lo resuelve reconcile()
+                self.lease.complete(key, 'unknown', {'symbol': request.symbol, 'error': repr(e)})
+                logger.warning("⚠️ Orden %s en duda tras %r", key, e)
+            raise
+        self.lease.complete(key, 'sent', {'symbol': request.symbol, 'order_id': result.order_id,
+                                          'status': result.status})
+        return result
+
+    async def reconcile(self) -> Dict[str, int]:
+        """
+        Resuelve las órdenes en duda consultando el venue por client_order_id
+
+        Incluye las reclamadas por un líder anterior (token distinto) que no
+        llegaron a completarse. Las no encontradas quedan 'missing' y se
+        pueden volver a enviar con la misma clave.
+        """
+        stats = {'found': 0, 'missing': 0}
+        if not self.lease.is_leader:
+            return stats
+        for claim in self.lease.pending_claims('order'):
+            if claim['status'] == 'claimed' and claim['token'] == self.lease.token:
+                continue  # envío en vuelo de este líder
+            symbol = (claim['result'] or {}).get('symbol')
+            if symbol is None:
+                logger.error("🚨 Orden %s sin símbolo: no se puede reconciliar", claim['key'])
+                continue
+            found = await self.gateway.find_order(symbol, claim['key'])
+            if found is not None:
+                self.lease.complete(claim['key'], 'sent', {'symbol': symbol, 'order_id': found.order_id,
+                                                           'status': found.status})
+                stats['found'] += 1
+            else:
+                self.lease.complete(claim['key'], 'missing', {'symbol': symbol})
+                stats['missing'] += 1
+        if any(stats.values()):
+            logger.info("🔄 Reconciliación de órdenes del líder: %s", stats)
+        return stats
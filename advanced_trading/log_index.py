@@ -0,0 +1,404 @@
+"""
+Índice de logs históricos en SQLite FTS5
+Lee logs/*.log (los app_<ts>.log legados, runner.log y los JSON de
+logging_setup) de forma incremental: por fichero se guarda inodo y offset, así
+que cada pasada sólo lee lo nuevo y un fichero rotado conserva lo ya
+indexado. Cada entrada guarda ts, nivel, logger, símbolo e id de evento en
+columnas indexadas; el texto va una sola vez a la tabla FTS5 (los mensajes
+se repiten mucho entre reinicios) y las entradas lo referencian por id.
+
+    python -m advanced_trading.log_index index
+    python -m advanced_trading.log_index search halt --symbol BTCUSDT --since 7d
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+from datetime import datetime, timezone, tzinfo
+from typing import Dict, Iterable, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+LEVELS = {'DEBUG': 10, 'INFO': 20, 'WARNING': 30, 'WARN': 30, 'ERROR': 40, 'CRITICAL': 50}
+MAX_MESSAGE = 8192  # trazas largas se truncan
+BATCH = 5_000
+DEFAULT_PATTERNS = ('*.log', '*.log.*')
+
+# 2025-08-25 12:46:51,991 - INFO - mensaje            (app.py)
+_DASHED = re.compile(r'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}),(\d{3}) - ([A-Z]+) - (.*)$')
+# 2025-08-26 15:24:00,227 ERROR bot_runner mensaje    (runner)
+_SPACED = re.compile(r'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}),(\d{3}) (DEBUG|INFO|WARNING|ERROR|CRITICAL) (\S+) (.*)$')
+# [2025-08-25_12-46-51] Iniciando app.py...
+_BRACKET = re.compile(r'^\[(\d{4}-\d{2}-\d{2})_(\d{2})-(\d{2})-(\d{2})\] (.*)$')
+# El runner reenvía la salida de app.py con su propio nivel: se usa el interior
+_EMBEDDED = re.compile(r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}),(\d{3}) - ([A-Z]+) - (.*)$')
+
+_SYMBOL = re.compile(r'\b([A-Z0-9]{2,12}(?:USDT|USDC|BUSD|FDUSD))\b')
+_EVENT_ID = re.compile(r'\bevent[_ ]?id[=: ]+["\']?([\w.:-]+)', re.IGNORECASE)
+
+SCHEMA = (
+    '''CREATE TABLE IF NOT EXISTS log_files (
+        id INTEGER PRIMARY KEY,
+        path TEXT NOT NULL UNIQUE,
+        inode INTEGER,
+        offset INTEGER NOT NULL DEFAULT 0,
+        lines INTEGER NOT NULL DEFAULT 0,
+        last_ts REAL,
+        last_level TEXT,
+        indexed_at REAL
+    )''',
+    '''CREATE TABLE IF NOT EXISTS log_entries (
+        id INTEGER PRIMARY KEY,
+        file_id INTEGER NOT NULL,
+        line INTEGER NOT NULL,
+        ts REAL,
+        level TEXT,
+        level_no INTEGER,
+        logger TEXT,
+        symbol TEXT,
+        event_id TEXT,
+        message_id INTEGER NOT NULL
+    )''',
+    '''CREATE TABLE IF NOT EXISTS log_messages (
+        id INTEGER PRIMARY KEY,
+        digest BLOB NOT NULL UNIQUE
+    )''',
+    "CREATE VIRTUAL TABLE IF NOT EXISTS log_fts USING fts5(message, tokenize='porter unicode61')",
+    'CREATE INDEX IF NOT EXISTS idx_log_entries_message ON log_entries (message_id)',
+    'CREATE INDEX IF NOT EXISTS idx_log_entries_ts ON log_entries (ts)',
+    'CREATE INDEX IF NOT EXISTS idx_log_entries_symbol_ts ON log_entries (symbol, ts)',
+    'CREATE INDEX IF NOT EXISTS idx_log_entries_event ON log_entries (event_id)',
+    'CREATE INDEX IF NOT EXISTS idx_log_entries_file ON log_entries (file_id)',
+)
+
+
+# --- Parseo ---
+
+def _epoch(stamp: str, millis: str, tz: Optional[tzinfo]) -> float:
+    dt = datetime.strptime(stamp, '%Y-%m-%d %H:%M:%S')
+    if tz is not None:
+        dt = dt.replace(tzinfo=tz)
+    return dt.timestamp() + int(millis) / 1000  # naive = hora local de la máquina
+
+
+def parse_line(line: str, tz: Optional[tzinfo] = None) -> Optional[Dict]:
+    """Cabecera de entrada -> dict; None si es una línea de continuación"""
+    if line.startswith('{'):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        if isinstance(record, dict) and 'ts' in record and 'msg' in record:
+            message = str(record['msg'])
+            if record.get('exc'):
+                message += '\n' + str(record['exc'])
+            return {
+                'ts': datetime.fromisoformat(record['ts']).timestamp(),
+                'level': record.get('level'),
+                'logger': record.get('logger'),
+                'message': message,
+                'symbol': record.get('symbol'),
+                'event_id': None if record.get('event_id') is None else str(record['event_id']),
+            }
+
+    match = _SPACED.match(line)
+    if match:
+        stamp, millis, level, name, message = match.groups()
+        inner = _EMBEDDED.search(message)
+        if inner:
+            stamp, millis, level, message = inner.groups()
+        return {'ts': _epoch(stamp, millis, tz), 'level': level, 'logger': name, 'message': message}
+    match = _DASHED.match(line)
+    if match:
+        stamp, millis, level, message = match.groups()
+        return {'ts': _epoch(stamp, millis, tz), 'level': level, 'logger': None, 'message': message}
+    match = _BRACKET.match(line)
+    if match:
+        day, hh, mm, ss, message = match.groups()
+        return {'ts': _epoch(f'{day} {hh}:{mm}:{ss}', '0', tz), 'level': None, 'logger': None,
+                'message': message}
+    return None
+
+
+def _enrich(entry: Dict) -> Dict:
+    if not entry.get('symbol'):
+        match = _SYMBOL.search(entry['message'])
+        entry['symbol'] = match.group(1) if match else None
+    if not entry.get('event_id'):
+        match = _EVENT_ID.search(entry['message'])
+        entry['event_id'] = match.group(1) if match else None
+    entry['message'] = entry['message'][:MAX_MESSAGE]
+    return entry
+
+
+def parse_time(value: Union[str, float, None], now: Optional[float] = None) -> Optional[float]:
+    """Epoch, '7d' / '12h' / '30m' relativo a ahora, o fecha ISO"""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    now = time.time() if now is None else now
+    match = re.fullmatch(r'(\d+(?:\.\d+)?)([smhd])', value.strip())
+    if match:
+        return now - float(match.group(1)) * {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[match.group(2)]
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+# --- Índice ---
+
+class LogIndex:
+    """Índice incremental de un directorio de logs"""
+
+    def __init__(self, db_path: str, log_dir: str = 'logs', patterns: Iterable[str] = DEFAULT_PATTERNS,
+                 tz: Optional[tzinfo] = None, clock=time.time):
+        self.db_path = db_path
+        self.log_dir = log_dir
+        self.patterns = tuple(patterns)
+        self.tz = tz
+        self._clock = clock
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        with self.conn:
+            for statement in SCHEMA:
+                self.conn.execute(statement)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self) -> 'LogIndex':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _files(self) -> Dict[str, os.stat_result]:
+        paths = set()
+        for pattern in self.patterns:
+            paths.update(glob.glob(os.path.join(self.log_dir, pattern)))
+        found = {}
+        for path in sorted(paths):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if os.path.isfile(path) and os.path.abspath(path) != os.path.abspath(self.db_path):
+                found[os.path.abspath(path)] = st
+        return found
+
+    def _follow_renames(self, files: Dict[str, os.stat_result]):
+        """Un fichero rotado (mismo inodo, otra ruta) conserva su registro y offset"""
+        by_inode = {st.st_ino: path for path, st in files.items()}
+        for row in self.conn.execute('SELECT id, path, inode FROM log_files').fetchall():
+            current = files.get(row['path'])
+            if current is not None and current.st_ino == row['inode']:
+                continue
+            new_path = by_inode.get(row['inode'])
+            if new_path and new_path != row['path']:
+                taken = self.conn.execute('SELECT 1 FROM log_files WHERE path = ?', (new_path,)).fetchone()
+                if taken is None:
+                    self.conn.execute('UPDATE log_files SET path = ? WHERE id = ?', (new_path, row['id']))
+
+    def _reset(self, file_id: int):
+        # Los textos quedan en log_messages/log_fts: otros ficheros pueden usarlos
+        self.conn.execute('DELETE FROM log_entries WHERE file_id = ?', (file_id,))
+
+    def _message_ids(self, entries: List[Dict]):
+        """Asigna message_id deduplicando por digest del texto"""
+        for entry in entries:
+            digest = hashlib.blake2b(entry['message'].encode(), digest_size=12).digest()
+            row = self.conn.execute('SELECT id FROM log_messages WHERE digest = ?', (digest,)).fetchone()
+            if row is None:
+                message_id = self.conn.execute('INSERT INTO log_messages (digest) VALUES (?)',
+                                               (digest,)).lastrowid
+                self.conn.execute('INSERT INTO log_fts (rowid, message) VALUES (?, ?)',
+                                  (message_id, entry['message']))
+            else:
+                message_id = row[0]
+            entry['message_id'] = message_id
+
+    def update(self) -> Dict[str, int]:
+        """Indexa lo nuevo de cada fichero; devuelve contadores de la pasada"""
+        stats = {'files': 0, 'new_entries': 0, 'bytes': 0, 'reset': 0}
+        with self.conn:
+            files = self._files()
+            self._follow_renames(files)
+            next_id = self.conn.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM log_entries').fetchone()[0]
+            for path, st in files.items():
+                row = self.conn.execute('SELECT * FROM log_files WHERE path = ?', (path,)).fetchone()
+                if row is None:
+                    file_id = self.conn.execute('INSERT INTO log_files (path, inode) VALUES (?, ?)',
+                                                (path, st.st_ino)).lastrowid
+                    row = self.conn.execute('SELECT * FROM log_files WHERE id = ?', (file_id,)).fetchone()
+                elif row['inode'] != st.st_ino or st.st_size < row['offset']:
+                    # Truncado o sustituido: se reindexa entero
+                    self._reset(row['id'])
+                    self.conn.execute('UPDATE log_files SET inode = ?, offset = 0, lines = 0, last_ts = NULL, '
+                                      'last_level = NULL WHERE id = ?', (st.st_ino, row['id']))
+                    row = self.conn.execute('SELECT * FROM log_files WHERE id = ?', (row['id'],)).fetchone()
+                    stats['reset'] += 1
+                if st.st_size == row['offset']:
+                    continue
+                added, read, next_id = self._index_file(row, next_id)
+                stats['files'] += 1
+                stats['new_entries'] += added
+                stats['bytes'] += read
+        return stats
+
+    def _index_file(self, row: sqlite3.Row, next_id: int):
+        offset, line_no = row['offset'], row['lines']
+        last_ts, last_level = row['last_ts'], row['last_level']
+        entries: List[Dict] = []
+        added = 0
+        current: Optional[Dict] = None
+
+        def flush():
+            nonlocal entries, added
+            if not entries:
+                return
+            for entry in entries:
+                _enrich(entry)
+            self._message_ids(entries)
+            self.conn.executemany(
+                'INSERT INTO log_entries (id, file_id, line, ts, level, level_no, logger, symbol, event_id, '
+                'message_id) VALUES (:id, :file_id, :line, :ts, :level, :level_no, :logger, :symbol, '
+                ':event_id, :message_id)', entries)
+            added += len(entries)
+            entries = []
+
+        with open(row['path'], 'rb') as f:
+            f.seek(offset)
+            for raw in f:
+                if not raw.endswith(b'\n'):
+                    break  # línea a medio escribir: se lee en la próxima pasada
+                offset += len(raw)
+                line_no += 1
+                line = raw.decode('utf-8', 'replace').rstrip('\r\n')
+                if not line.strip():
+                    continue
+                parsed = parse_line(line, self.tz)
+                if parsed is None and current is not None and len(current['message']) < MAX_MESSAGE:
+                    current['message'] += '\n' + line
+                    continue
+                if parsed is None:
+                    # Continuación de una entrada ya guardada en otra pasada
+                    parsed = {'ts': last_ts, 'level': last_level, 'logger': None, 'message': line}
+                if len(entries) >= BATCH:
+                    flush()  # en una cabecera: la entrada anterior ya tiene todas sus continuaciones
+                level = parsed['level'] or last_level
+                current = {'id': next_id, 'file_id': row['id'], 'line': line_no, 'ts': parsed['ts'],
+                           'level': level, 'level_no': LEVELS.get(level or '', None),
+                           'logger': parsed['logger'], 'symbol': parsed.get('symbol'),
+                           'event_id': parsed.get('event_id'), 'message': parsed['message']}
+                entries.append(current)
+                next_id += 1
+                last_ts, last_level = parsed['ts'] or last_ts, level
+        flush()
+        read = offset - row['offset']
+        self.conn.execute('UPDATE log_files SET offset = ?, lines = ?, last_ts = ?, last_level = ?, '
+                          'indexed_at = ? WHERE id = ?',
+                          (offset, line_no, last_ts, last_level, self._clock(), row['id']))
+        return added, read, next_id
+
+    # --- Consultas ---
+
+    def search(self, text: Optional[str] = None, symbol: Optional[str] = None, level: Optional[str] = None,
+               since: Union[str, float, None] = None, until: Union[str, float, None] = None,
+               event_id: Optional[str] = None, limit: int = 100) -> List[Dict]:
+        """
+        Entradas más recientes primero
+
+        text usa la sintaxis FTS5 ('halt', 'daily AND limit', '"trade limit"');
+        level es el nivel mínimo; since/until aceptan '7d', epoch o ISO.
+        """
+        where, params = [], []
+        if text:
+            where.append('e.message_id IN (SELECT rowid FROM log_fts WHERE log_fts MATCH ?)')
+            params.append(text)
+        if symbol:
+            where.append('e.symbol = ?')
+            params.append(symbol.upper())
+        if level:
+            where.append('e.level_no >= ?')
+            params.append(LEVELS[level.upper()])
+        if event_id:
+            where.append('e.event_id = ?')
+            params.append(event_id)
+        now = self._clock()
+        if since is not None:
+            where.append('e.ts >= ?')
+            params.append(parse_time(since, now))
+        if until is not None:
+            where.append('e.ts < ?')
+            params.append(parse_time(until, now))
+        sql = ('SELECT e.id, e.ts, e.level, e.logger, e.symbol, e.event_id, f.message, lf.path, e.line '
+               'FROM log_entries e JOIN log_fts f ON f.rowid = e.message_id JOIN log_files lf ON lf.id = e.file_id')
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY e.ts DESC, e.id DESC LIMIT ?'
+        params.append(limit)
+        return [dict(r) for r in self.conn.execute(sql, params)]
+
+    def stats(self) -> Dict[str, int]:
+        files, entries, messages = self.conn.execute(
+            'SELECT (SELECT COUNT(*) FROM log_files), (SELECT COUNT(*) FROM log_entries), '
+            '(SELECT COUNT(*) FROM log_messages)').fetchone()
+        return {'files': files, 'entries': entries, 'messages': messages}
+
+
+def _fmt_ts(ts: Optional[float]) -> str:
+    if ts is None:
+        return '-' * 19
+    return datetime.fromtimestamp(ts, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Índice FTS5 de logs')
+    parser.add_argument('--logs', default='logs', help='Directorio de logs')
+    parser.add_argument('--db', default=None, help='BD del índice (por defecto <logs>/log_index.db)')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('index')
+    search = sub.add_parser('search')
+    search.add_argument('text', nargs='?')
+    search.add_argument('--symbol')
+    search.add_argument('--level')
+    search.add_argument('--since')
+    search.add_argument('--until')
+    search.add_argument('--event-id')
+    search.add_argument('--limit', type=int, default=50)
+    search.add_argument('--no-update', action='store_true', help='No indexar antes de buscar')
+    args = parser.parse_args(argv)
+
+    with LogIndex(args.db or os.path.join(args.logs, 'log_index.db'), args.logs) as index:
+        if args.command == 'index' or not args.no_update:
+            started = time.perf_counter()
+            stats = index.update()
+            if args.command == 'index':
+                print(f"✅ {stats['new_entries']} entradas nuevas de {stats['files']} ficheros "
+                      f"({stats['bytes'] / 1e6:.1f} MB) en {time.perf_counter() - started:.2f}s "
+                      f"| total {index.stats()['entries']}")
+                return 0
+        started = time.perf_counter()
+        try:
+            rows = index.search(args.text, args.symbol, args.level, args.since, args.until,
+                                args.event_id, args.limit)
+        except sqlite3.OperationalError as e:
+            print(f"❌ Consulta inválida: {e}")
+            return 2
+        for row in rows:
+            message = row['message'].splitlines()[0]
+            print(f"{_fmt_ts(row['ts'])} {row['level'] or '-':8} {os.path.basename(row['path'])}:{row['line']}  "
+                  f"{message}")
+        print(f"🔎 {len(rows)} resultados en {(time.perf_counter() - started) * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
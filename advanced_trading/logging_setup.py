@@ -0,0 +1,255 @@
+"""
+Logging estructurado, asíncrono y rotado
+Los hilos de trading sólo encolan el registro (QueueHandler, sin I/O); un
+QueueListener en segundo plano lo serializa a JSON en logs/app.log y a
+consola. Un único fichero por proceso que rota por tamaño (LOG_MAX_BYTES) o
+por tiempo (LOG_ROTATE_SEC) y cuyos rotados, junto con los app_<ts>.log
+antiguos, se borran pasados AUDIT_LOG_RETENTION_DAYS.
+
+    runtime = setup_logging()                 # una vez, al arrancar
+    logger = logging.getLogger(__name__)
+    logger.debug("tick", extra={'sample': True, 'symbol': 'BTCUSDT'})
+"""
+
+import atexit
+import glob
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+import traceback
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from advanced_trading.config.trading_config import TRADING_CONFIG
+
+# Atributos estándar de LogRecord: el resto llega vía extra= y va al JSON
+_RESERVED = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+CONSOLE_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+
+
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por registro: ts, level, logger, msg, thread y los extra"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'thread': record.threadName,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and key not in entry:
+                entry[key] = value
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        elif record.exc_info:
+            entry['exc'] = ''.join(traceback.format_exception(*record.exc_info))
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Deja pasar 1 de cada `every` registros marcados con extra={'sample': True}
+
+    Sólo afecta a niveles <= max_level (DEBUG por defecto); la cuenta es por
+    (logger, plantilla del mensaje), así que un mensaje raro no queda
+    silenciado por otro frecuente. Se descarta antes de encolar.
+    """
+
+    def __init__(self, every: int = TRADING_CONFIG['LOG_DEBUG_SAMPLE_EVERY'], max_level: int = logging.DEBUG):
+        super().__init__()
+        self.every = max(1, int(every))
+        self.max_level = max_level
+        self.dropped = 0
+        self._seen: Dict[tuple, int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.max_level or not getattr(record, 'sample', False):
+            return True
+        key = (record.name, record.msg)
+        seen = self._seen.get(key, 0)
+        self._seen[key] = seen + 1
+        if seen % self.every:
+            self.dropped += 1
+            return False
+        record.sampled_every = self.every
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Como QueueHandler pero deja el formato final al listener"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()  # los args pueden mutar o no ser picklables
+        record.args = None
+        if record.exc_info:
+            record.exc_text = ''.join(traceback.format_exception(*record.exc_info))
+            record.exc_info = None
+        return record
+
+
+class RetentionFileHandler(logging.handlers.BaseRotatingHandler):
+    """
+    Rota por tamaño o por tiempo y aplica retención
+
+    Los rotados se llaman <fichero>.<YYYY-MM-DD_HH-MM-SS>; tras cada rotación
+    se borran los que superan retention_days (y los app_<ts>.log legados).
+    """
+
+    def __init__(self, filename: str, max_bytes: int = TRADING_CONFIG['LOG_MAX_BYTES'],
+                 rotate_sec: float = TRADING_CONFIG['LOG_ROTATE_SEC'],
+                 retention_days: float = TRADING_CONFIG['AUDIT_LOG_RETENTION_DAYS'],
+                 clock=time.time):
+        super().__init__(filename, 'a', encoding='utf-8', delay=False)
+        self.max_bytes = max_bytes
+        self.rotate_sec = rotate_sec
+        self.retention_days = retention_days
+        self._clock = clock
+        self.rollovers = 0
+        self._next_rollover = self._compute_next(self._opened_at())
+        purge_old_logs(os.path.dirname(self.baseFilename), retention_days,
+                       os.path.basename(self.baseFilename), clock())
+
+    def _opened_at(self) -> float:
+        try:
+            return os.stat(self.baseFilename).st_mtime if os.path.getsize(self.baseFilename) else self._clock()
+        except OSError:
+            return self._clock()
+
+    def _compute_next(self, now: float) -> float:
+        if not self.rotate_sec:
+            return float('inf')
+        return (now // self.rotate_sec + 1) * self.rotate_sec
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self._clock() >= self._next_rollover:
+            return True
+        if self.max_bytes and self.stream is not None:
+            return self.stream.tell() + len(self.format(record)) + 1 >= self.max_bytes
+        return False
+
+    def doRollover(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        now = self._clock()
+        stamp = datetime.fromtimestamp(now, timezone.utc).strftime('%Y-%m-%d_%H-%M-%S')
+        target = f'{self.baseFilename}.{stamp}'
+        suffix = 1
+        while os.path.exists(target):  # varias rotaciones por tamaño en el mismo segundo
+            target = f'{self.baseFilename}.{stamp}.{suffix}'
+            suffix += 1
+        if os.path.exists(self.baseFilename):
+            os.replace(self.baseFilename, target)
+        self.stream = self._open()
+        self._next_rollover = self._compute_next(now)
+        self.rollovers += 1
+        purge_old_logs(os.path.dirname(self.baseFilename), self.retention_days,
+                       os.path.basename(self.baseFilename), now)
+
+
+def purge_old_logs(log_dir: str, retention_days: float, filename: str = 'app.log',
+                   now: Optional[float] = None) -> int:
+    """Borra rotados y app_<ts>.log legados con mtime anterior a retention_days"""
+    now = time.time() if now is None else now
+    stem = os.path.splitext(filename)[0]
+    cutoff = now - retention_days * 86400
+    removed = 0
+    candidates = glob.glob(os.path.join(log_dir, glob.escape(filename) + '.*'))
+    candidates += glob.glob(os.path.join(log_dir, glob.escape(stem) + '_*.log'))
+    for path in candidates:
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            continue
+    return removed
+
+
+class LoggingRuntime:
+    """Handlers instalados por setup_logging(); stop() vacía la cola"""
+
+    def __init__(self, listener: logging.handlers.QueueListener, queue_handler: _QueueHandler,
+                 file_handler: RetentionFileHandler, sampler: SamplingFilter):
+        self.listener = listener
+        self.queue_handler = queue_handler
+        self.file_handler = file_handler
+        self.sampler = sampler
+        self._stopped = False
+
+    def set_level(self, level):
+        logging.getLogger().setLevel(level.upper() if isinstance(level, str) else level)
+
+    def apply_config(self, config):
+        """Hook de hot_reload: settings.log_level y LOG_DEBUG_SAMPLE_EVERY"""
+        self.set_level(config.settings.get('log_level', 'INFO'))
+        self.sampler.every = max(1, int(config.trading.get('LOG_DEBUG_SAMPLE_EVERY', self.sampler.every)))
+
+    def stop(self):
+        if self._stopped:
+            return
+        self._stopped = True
+        self.listener.stop()  # procesa lo que quede en la cola
+        root = logging.getLogger()
+        root.removeHandler(self.queue_handler)
+        for handler in self.listener.handlers:
+            handler.close()
+
+
+_runtime: Optional[LoggingRuntime] = None
+_runtime_lock = threading.Lock()
+
+
+def setup_logging(log_dir: Optional[str] = None, level='INFO', filename: str = 'app.log',
+                  console: bool = True, json_console: bool = False,
+                  max_bytes: int = TRADING_CONFIG['LOG_MAX_BYTES'],
+                  rotate_sec: float = TRADING_CONFIG['LOG_ROTATE_SEC'],
+                  retention_days: float = TRADING_CONFIG['AUDIT_LOG_RETENTION_DAYS'],
+                  sample_every: int = TRADING_CONFIG['LOG_DEBUG_SAMPLE_EVERY']) -> LoggingRuntime:
+    """
+    Instala el QueueHandler en el logger raíz y arranca el listener
+
+    Idempotente: una segunda llamada devuelve el runtime existente (tras
+    aplicar el nivel). El listener se detiene en atexit.
+    """
+    global _runtime
+    with _runtime_lock:
+        if _runtime is not None and not _runtime._stopped:
+            _runtime.set_level(level)
+            return _runtime
+
+        log_dir = log_dir or TRADING_CONFIG['LOG_DIR']
+        os.makedirs(log_dir, exist_ok=True)
+        file_handler = RetentionFileHandler(os.path.join(log_dir, filename), max_bytes, rotate_sec,
+                                            retention_days)
+        file_handler.setFormatter(JsonFormatter())
+        handlers = [file_handler]
+        if console:
+            stream_handler = logging.StreamHandler()
+            stream_handler.setFormatter(JsonFormatter() if json_console else logging.Formatter(CONSOLE_FORMAT))
+            handlers.append(stream_handler)
+
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        sampler = SamplingFilter(sample_every)
+        queue_handler = _QueueHandler(log_queue)
+        queue_handler.addFilter(sampler)
+        listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):  # sin handlers síncronos en el hilo de trading
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+        listener.start()
+
+        _runtime = LoggingRuntime(listener, queue_handler, file_handler, sampler)
+        _runtime.set_level(level)
+        atexit.register(_runtime.stop)
+        return _runtime
@@ -8,33 +8,47 @@ from datetime import datetime
 from typing import Dict, List, Optional
 import numpy as np
 
+from advanced_trading.config.trading_config import TRADING_CONFIG
+from advanced_trading.metrics import SIGNALS
+from advanced_trading.records import MacroSignal
+
 class MacroAnalyzer:
-    def __init__(self, impact_threshold: float = 0.2):
+    def __init__(self, impact_threshold: float = TRADING_CONFIG['MIN_IMPACT_SCORE']):
         self.impact_threshold = impact_threshold
         self.event_history = []
+
+    def apply_config(self, config):
+        """Aplica un RuntimeConfig recargado (MIN_IMPACT_SCORE); conserva el historial"""
+        self.impact_threshold = config.trading['MIN_IMPACT_SCORE']
         
     def analyze_event(self, event_type: str, consensus: float, actual: float, 
-                     previous: Optional[float] = None) -> Dict:
+                     previous: Optional[float] = None, event_date: Optional[str] = None) -> MacroSignal:
         """
         Analiza evento macro y devuelve señal de trading
+
+        event_date es la fecha de publicación del dato (la que se guarda en
+        macro_events); por defecto, el día del análisis.
         """
         deviation = self._calculate_deviation(consensus, actual)
         impact_score = self._calculate_impact_score(event_type, deviation)
         direction = self._determine_direction(event_type, consensus, actual)
         
-        analysis = {
-            'event_type': event_type,
-            'consensus': consensus,
-            'actual': actual,
-            'deviation': deviation,
-            'deviation_pct': (deviation / consensus * 100) if consensus != 0 else 0,
-            'impact_score': impact_score,
-            'direction': direction,
-            'timestamp': datetime.now().isoformat(),
-            'should_trade': impact_score >= self.impact_threshold
-        }
+        analysis = MacroSignal(
+            event_type=event_type,
+            consensus=consensus,
+            actual=actual,
+            deviation=deviation,
+            deviation_pct=(deviation / consensus * 100) if consensus != 0 else 0,
+            impact_score=impact_score,
+            direction=direction,
+            timestamp=datetime.now().isoformat(),
+            should_trade=impact_score >= self.impact_threshold,
+            event_date=event_date,
+        )
         
         self.event_history.append(analysis)
+        if analysis.should_trade:
+            SIGNALS.labels('macro', direction).inc()
         return analysis
     
     def _calculate_deviation(self, consensus: float, actual: float) -> float:
@@ -54,9 +68,11 @@ class MacroAnalyzer:
         return base_weight * deviation_impact
     
     def _determine_direction(self, event_type: str, consensus: float, actual: float) -> str:
-        """Determina dirección de trading basado en reglas macro"""
+        """Determina dirección de trading basado en reglas macro (STAY si no hay sorpresa)"""
         event_type = event_type.upper()
         
+        if actual == consensus:
+            return 'STAY'
         if event_type == 'CPI':
             return 'SELL' if actual > consensus else 'BUY'
         elif event_type == 'GDP':
@@ -73,20 +89,20 @@ class MacroAnalyzer:
         if not self.event_history:
             return {}
             
-        successful_trades = [e for e in self.event_history if e['should_trade']]
+        successful_trades = [e for e in self.event_history if e.should_trade]
         hit_rate = len([e for e in successful_trades if self._was_trade_successful(e)]) / len(successful_trades) if successful_trades else 0
         
         return {
             'total_events_analyzed': len(self.event_history),
             'trading_signals_generated': len(successful_trades),
             'estimated_hit_rate': hit_rate,
-            'avg_impact_score': np.mean([e['impact_score'] for e in self.event_history]) if self.event_history else 0
+            'avg_impact_score': np.mean([e.impact_score for e in self.event_history]) if self.event_history else 0
         }
     
-    def _was_trade_successful(self, event_analysis: Dict) -> bool:
+    def _was_trade_successful(self, event_analysis: MacroSignal) -> bool:
         """Determina si un trade hubiera sido exitoso (simplificado)"""
         # Esta es una simulación - en producción se conectaría con data real
-        return event_analysis['impact_score'] > 0.3  # Simulación simple
+        return event_analysis.impact_score > 0.3  # Simulación simple
 
 def consensus_vs_actual(event_type: str, consensus: float, actual: float) -> str:
     """
@@ -94,7 +110,13 @@ def consensus_vs_actual(event_type: str, consensus: float, actual: float) -> str
     """
     analyzer = MacroAnalyzer()
     result = analyzer.analyze_event(event_type, consensus, actual)
-    return result['direction']
+    return result.direction
+
+def calculate_deviation_percentage(consensus: float, actual: float) -> float:
+    """
+    Desviación del dato publicado respecto al consenso, en %
+    """
+    return (actual - consensus) / consensus * 100 if consensus != 0 else 0.0
 
 def get_trading_parameters(event_type: str, deviation: float) -> Dict:
     """
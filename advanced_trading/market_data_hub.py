@@ -0,0 +1,330 @@
+"""
+Hub de market data con fan-out
+Consume un único stream por símbolo (replay local o websocket) y reparte
+cada MarketSnapshot inmutable a todos los suscriptores (arbitraje,
+indicadores, ejecución) sin copiarlo. Cada suscriptor tiene un buzón con
+conflación por símbolo: un consumidor lento recibe el último valor en lugar
+de acumular una cola sin límite. Cada stream reporta tasa de mensajes y lag.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
+
+import aiohttp
+import numpy as np
+
+from advanced_trading.metrics import QUEUE_DEPTH, SIGNALS, TICKS_PROCESSED
+from advanced_trading.records import MarketSnapshot
+
+logger = logging.getLogger(__name__)
+
+
+class StreamStats:
+    """Tasa de mensajes (ventana deslizante) y lag exchange -> hub"""
+
+    def __init__(self, rate_window_sec: float = 10.0):
+        self.messages = 0
+        self.rate_window_sec = rate_window_sec
+        self.last_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+        self._lag_sum_ms = 0.0
+        self._recent: deque = deque()
+
+    def record(self, snapshot: MarketSnapshot):
+        self.messages += 1
+        lag_ms = max(0.0, (snapshot.recv_ts - snapshot.ts) * 1000)
+        self.last_lag_ms = lag_ms
+        self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+        self._lag_sum_ms += lag_ms
+        self._recent.append(snapshot.recv_ts)
+        while self._recent and snapshot.recv_ts - self._recent[0] > self.rate_window_sec:
+            self._recent.popleft()
+
+    def as_dict(self) -> Dict[str, float]:
+        span = self._recent[-1] - self._recent[0] if len(self._recent) > 1 else 0.0
+        return {
+            'messages': self.messages,
+            'rate_per_sec': (len(self._recent) - 1) / span if span > 0 else 0.0,
+            'last_lag_ms': self.last_lag_ms,
+            'avg_lag_ms': self._lag_sum_ms / self.messages if self.messages else 0.0,
+            'max_lag_ms': self.max_lag_ms,
+        }
+
+
+class Subscription:
+    """Buzón con conflación: como mucho un snapshot pendiente por símbolo"""
+
+    def __init__(self, name: str, symbols: Optional[Iterable[str]] = None):
+        self.name = name
+        self.symbols = frozenset(symbols) if symbols is not None else None
+        self.delivered = 0
+        self.conflated = 0
+        self._pending: 'OrderedDict[str, MarketSnapshot]' = OrderedDict()
+        self._ready = asyncio.Event()
+        self._closed = False
+
+    def wants(self, symbol: str) -> bool:
+        return self.symbols is None or symbol in self.symbols
+
+    def offer(self, snapshot: MarketSnapshot):
+        if snapshot.symbol in self._pending:
+            self.conflated += 1
+        self._pending[snapshot.symbol] = snapshot  # mantiene el orden de llegada del símbolo
+        self._ready.set()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def get(self) -> Optional[MarketSnapshot]:
+        """Siguiente snapshot; None cuando el hub se cierra y no queda nada"""
+        while not self._pending:
+            if self._closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        _, snapshot = self._pending.popitem(last=False)
+        self.delivered += 1
+        return snapshot
+
+    def close(self):
+        self._closed = True
+        self._ready.set()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> MarketSnapshot:
+        snapshot = await self.get()
+        if snapshot is None:
+            raise StopAsyncIteration
+        return snapshot
+
+
+class MarketDataHub:
+    """Un stream por símbolo, fan-out a N suscriptores"""
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self._clock = clock
+        self._streams: Dict[str, AsyncIterator] = {}
+        self._subscribers: List[Subscription] = []
+        self._latest: Dict[str, MarketSnapshot] = {}
+        self.stats: Dict[str, StreamStats] = {}
+        self._seq = 0
+
+    def add_stream(self, symbol: str, source: AsyncIterator):
+        """Registra la fuente de un símbolo (una sola por símbolo)"""
+        if symbol in self._streams:
+            raise ValueError(f"Ya existe un stream para {symbol}")
+        self._streams[symbol] = source
+        self.stats[symbol] = StreamStats()
+
+    def subscribe(self, name: str, symbols: Optional[Iterable[str]] = None) -> Subscription:
+        subscription = Subscription(name, symbols)
+        self._subscribers.append(subscription)
+        QUEUE_DEPTH.labels(f'hub.{name}').set_function(lambda: subscription.pending)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscription.close()
+        self._subscribers.remove(subscription)
+        QUEUE_DEPTH.remove(f'hub.{subscription.name}')
+
+    def latest(self, symbol: str) -> Optional[MarketSnapshot]:
+        return self._latest.get(symbol)
+
+    def publish(self, snapshot: MarketSnapshot) -> MarketSnapshot:
+        """Sella recv_ts/seq y entrega el mismo objeto a todos los interesados"""
+        self._seq += 1
+        snapshot = MarketSnapshot(
+            snapshot.symbol, snapshot.price, snapshot.ts, snapshot.bid, snapshot.ask,
+            snapshot.volume, snapshot.recv_ts or self._clock(), self._seq,
+        )
+        self._latest[snapshot.symbol] = snapshot
+        stats = self.stats.get(snapshot.symbol)
+        if stats is None:
+            stats = self.stats[snapshot.symbol] = StreamStats()
+        stats.record(snapshot)
+        TICKS_PROCESSED.labels(snapshot.symbol).inc()
+        logger.debug("tick %s %s", snapshot.symbol, snapshot.price, extra={'sample': True})
+        for subscription in self._subscribers:
+            if subscription.wants(snapshot.symbol):
+                subscription.offer(snapshot)
+        return snapshot
+
+    async def _pump(self, symbol: str, source: AsyncIterator):
+        async for snapshot in source:
+            self.publish(snapshot)
+            await asyncio.sleep(0)  # cede el loop: los consumidores rápidos no conflan
+
+    async def run(self):
+        """Consume todos los streams hasta que se agoten; luego cierra los buzones"""
+        try:
+            await asyncio.gather(*(self._pump(s, src) for s, src in self._streams.items()))
+        finally:
+            for subscription in self._subscribers:
+                subscription.close()
+
+    async def drain(self):
+        """Cede el loop hasta que todos los suscriptores vacían su buzón"""
+        while any(s.pending for s in self._subscribers if not s._closed):
+            await asyncio.sleep(0)
+
+    def metrics(self) -> Dict[str, Dict]:
+        return {
+            'streams': {symbol: stats.as_dict() for symbol, stats in self.stats.items()},
+            'subscribers': {
+                s.name: {'delivered': s.delivered, 'conflated': s.conflated, 'pending': s.pending}
+                for s in self._subscribers
+            },
+        }
+
+
+# --- Fuentes ---
+
+async def replay_source(snapshots: Iterable[MarketSnapshot], speed: Optional[float] = None,
+                        sleep: Callable[[float], object] = asyncio.sleep) -> AsyncIterator[MarketSnapshot]:
+    """Reproduce snapshots respetando su ts (speed=1 tiempo real, N veces, None = sin esperas)"""
+    previous_ts = None
+    for snapshot in snapshots:
+        if speed and previous_ts is not None and snapshot.ts > previous_ts:
+            await sleep((snapshot.ts - previous_ts) / speed)
+        previous_ts = snapshot.ts
+        yield snapshot
+
+
+def parse_binance_message(symbol: str, message: Dict) -> Optional[MarketSnapshot]:
+    """bookTicker ({b, a, B, A}) o aggTrade/trade ({p, q}); E/T en ms"""
+    data = message.get('data', message)
+    ts = (data.get('E') or data.get('T') or 0) / 1000
+    if 'b' in data and 'a' in data:
+        bid, ask = float(data['b']), float(data['a'])
+        return MarketSnapshot(symbol, (bid + ask) / 2, ts, bid=bid, ask=ask,
+                              volume=float(data.get('B', 0)) + float(data.get('A', 0)))
+    if 'p' in data:
+        return MarketSnapshot(symbol, float(data['p']), ts, volume=float(data.get('q', 0)))
+    return None
+
+
+async def websocket_source(url: str, symbol: str,
+                           parser: Callable[[str, Dict], Optional[MarketSnapshot]] = parse_binance_message,
+                           session: Optional[aiohttp.ClientSession] = None,
+                           clock: Callable[[], float] = time.time) -> AsyncIterator[MarketSnapshot]:
+    """Stream websocket de un símbolo; termina cuando el servidor cierra"""
+    own_session = session is None
+    session = session or aiohttp.ClientSession()
+    try:
+        async with session.ws_connect(url, heartbeat=30) as ws:
+            async for message in ws:
+                if message.type != aiohttp.WSMsgType.TEXT:
+                    break
+                snapshot = parser(symbol, json.loads(message.data))
+                if snapshot is not None:
+                    yield MarketSnapshot(snapshot.symbol, snapshot.price, snapshot.ts, snapshot.bid,
+                                         snapshot.ask, snapshot.volume, clock())
+    finally:
+        if own_session:
+            await session.close()
+
+
+# --- Adaptadores de consumidores ---
+
+class ArbitrageFeed:
+    """Alimenta RelativeArbitrage.update_prices con el último par BTC/ETH"""
+
+    def __init__(self, hub: MarketDataHub, arbitrage, btc_symbol: str = 'BTCUSDT',
+                 eth_symbol: str = 'ETHUSDT', on_signal: Optional[Callable[[Dict], None]] = None,
+                 lookback_period: int = 30):
+        self.arbitrage = arbitrage
+        self.btc_symbol = btc_symbol
+        self.eth_symbol = eth_symbol
+        self.on_signal = on_signal
+        self.lookback_period = lookback_period
+        self.subscription = hub.subscribe('arbitrage', [btc_symbol, eth_symbol])
+        self.last_snapshot: Optional[MarketSnapshot] = None
+        self._last: Dict[str, float] = {}
+
+    async def run(self):
+        async for snapshot in self.subscription:
+            self.last_snapshot = snapshot
+            self._last[snapshot.symbol] = snapshot.price
+            # Un punto de historial por par completo: ambas patas con precio nuevo
+            if len(self._last) < 2:
+                continue
+            prices = self._last
+            self._last = {}
+            self.arbitrage.update_prices(prices[self.btc_symbol], prices[self.eth_symbol])
+            if self.on_signal is not None:
+                signal = self.arbitrage.check_arbitrage_opportunity(self.lookback_period)
+                if signal:
+                    SIGNALS.labels('arbitrage', signal['signal']).inc()
+                    self.on_signal(signal)
+
+
+class ExecutionMarketView:
+    """
+    Vista de mercado para StaggeredExecution._get_market_data
+
+    Mantiene una ventana deslizante por símbolo y expone el mismo dict que
+    usaba la simulación (price_change_pct, volume, avg_volume, volatility,
+    initial_volatility, spread).
+    """
+
+    def __init__(self, hub: MarketDataHub, symbols: Optional[Iterable[str]] = None,
+                 window_sec: float = 120.0):
+        self.window_sec = window_sec
+        self.subscription = hub.subscribe('execution', symbols)
+        self._windows: Dict[str, deque] = {}
+        self._latest: Dict[str, MarketSnapshot] = {}
+
+    def update(self, snapshot: MarketSnapshot):
+        window = self._windows.setdefault(snapshot.symbol, deque())
+        window.append((snapshot.ts, snapshot.price, snapshot.volume))
+        while window and snapshot.ts - window[0][0] > self.window_sec:
+            window.popleft()
+        self._latest[snapshot.symbol] = snapshot
+
+    async def run(self):
+        async for snapshot in self.subscription:
+            self.update(snapshot)
+
+    def checkpoint_state(self) -> Tuple[Dict[str, np.ndarray], Dict]:
+        """Ventanas (ts, price, volume) por símbolo y último bid/ask para checkpoint.py"""
+        arrays = {symbol: np.array(window, dtype=float).reshape(-1, 3)
+                  for symbol, window in self._windows.items()}
+        latest = {symbol: [s.ts, s.price, s.bid, s.ask, s.volume] for symbol, s in self._latest.items()}
+        return arrays, {'latest': latest}
+
+    def restore_state(self, arrays: Dict[str, np.ndarray], meta: Dict):
+        for symbol, window in arrays.items():
+            self._windows[symbol] = deque(map(tuple, window.tolist()))
+        for symbol, (ts, price, bid, ask, volume) in meta.get('latest', {}).items():
+            self._latest[symbol] = MarketSnapshot(symbol, price, ts, bid=bid, ask=ask, volume=volume, recv_ts=ts)
+
+    def last_ts(self, symbol: str) -> Optional[float]:
+        window = self._windows.get(symbol)
+        return window[-1][0] if window else None
+
+    async def get_market_data(self, symbol: str) -> Dict:
+        return self.market_data(symbol)
+
+    def market_data(self, symbol: str) -> Dict:
+        window = self._windows.get(symbol)
+        if not window:
+            return {}
+        prices = np.fromiter((p for _, p, _ in window), dtype=float, count=len(window))
+        volumes = np.fromiter((v for _, _, v in window), dtype=float, count=len(window))
+        returns = np.diff(prices) / prices[:-1] if len(prices) > 1 else np.zeros(0)
+        half = len(returns) // 2
+        return {
+            'price_change_pct': prices[-1] / prices[0] - 1 if prices[0] else 0.0,
+            'volume': float(volumes[-1]),
+            'avg_volume': float(volumes.mean()),
+            'volatility': float(returns[half:].std()) if len(returns) else 0.0,
+            'initial_volatility': float(returns[:half].std()) if half else 0.0,
+            'spread': self._latest[symbol].spread,
+        }
@@ -0,0 +1,348 @@
+"""
+Métricas en proceso con exposición Prometheus
+Contadores e histogramas preagregados y particionados por hilo: cada hilo
+escribe sólo en su shard (sin locks en el camino caliente) y el scrape suma
+los shards. Los gauges de profundidad de cola se evalúan en el scrape con
+una función, así que no cuestan nada en el loop de trading. El servidor HTTP
+(/metrics y /health) corre en un hilo daemon aparte.
+
+    server = start_metrics_server()       # 127.0.0.1:METRICS_PORT
+"""
+
+import gc
+import json
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from advanced_trading.config.trading_config import TRADING_CONFIG
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+GC_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05, 0.1, 0.5)
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Metric(ABC):
+    """Base con soporte de etiquetas: labels(...) devuelve (y cachea) el hijo"""
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], '_Metric'] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self) -> '_Metric':
+        return type(self)(self.name, self.documentation)
+
+    def labels(self, *values) -> '_Metric':
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} espera etiquetas {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def remove(self, *values):
+        with self._lock:
+            self._children.pop(tuple(str(v) for v in values), None)
+
+    def _series(self) -> Iterable[Tuple[Tuple[str, ...], '_Metric']]:
+        if self.labelnames:
+            return list(self._children.items())
+        return [((), self)]
+
+    @abstractmethod
+    def samples(self, values: Tuple[str, ...], names: Tuple[str, ...]) -> List[str]:
+        ...
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for values, child in self._series():
+            lines.extend(child.samples(values, self.labelnames))
+        return lines
+
+
+class _Sharded(_Metric):
+    """Estado por hilo: el escritor sólo toca su shard"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._shards: Dict[int, list] = {}
+
+    @abstractmethod
+    def _empty_shard(self) -> list:
+        ...
+
+    def _shard(self) -> list:
+        ident = threading.get_ident()
+        shard = self._shards.get(ident)
+        if shard is None:
+            with self._lock:
+                shard = self._shards.setdefault(ident, self._empty_shard())
+        return shard
+
+
+class Counter(_Sharded):
+    kind = 'counter'
+
+    def _empty_shard(self) -> list:
+        return [0.0]
+
+    def inc(self, amount: float = 1.0):
+        self._shard()[0] += amount
+
+    @property
+    def value(self) -> float:
+        return sum(shard[0] for shard in list(self._shards.values()))
+
+    def samples(self, values, names) -> List[str]:
+        return [f'{self.name}{_label_text(names, values)} {_format_value(self.value)}']
+
+
+class Histogram(_Sharded):
+    """Buckets fijos; shard = [cuentas por bucket..., suma]"""
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> 'Histogram':
+        return Histogram(self.name, self.documentation, buckets=self.buckets)
+
+    def _empty_shard(self) -> list:
+        return [0] * (len(self.buckets) + 1) + [0.0]
+
+    def observe(self, value: float):
+        shard = self._shard()
+        shard[bisect_left(self.buckets, value)] += 1
+        shard[-1] += value
+
+    def time(self) -> '_Timer':
+        return _Timer(self)
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        """(cuentas por bucket no acumuladas, suma)"""
+        counts = [0] * (len(self.buckets) + 1)
+        total = 0.0
+        for shard in list(self._shards.values()):
+            for i in range(len(counts)):
+                counts[i] += shard[i]
+            total += shard[-1]
+        return counts, total
+
+    @property
+    def count(self) -> int:
+        return sum(self.snapshot()[0])
+
+    def samples(self, values, names) -> List[str]:
+        counts, total = self.snapshot()
+        lines = []
+        cumulative = 0
+        for bound, n in zip(self.buckets + (float('inf'),), counts):
+            cumulative += n
+            le = f'le="{_format_value(bound)}"'
+            lines.append(f'{self.name}_bucket{_label_text(names, values, le)} {cumulative}')
+        lines.append(f'{self.name}_sum{_label_text(names, values)} {_format_value(total)}')
+        lines.append(f'{self.name}_count{_label_text(names, values)} {cumulative}')
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started)
+
+
+class Gauge(_Metric):
+    """Valor puntual; con set_function se evalúa sólo al hacer scrape"""
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._value = 0.0
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float):
+        self._value = value
+
+    def inc(self, amount: float = 1.0):
+        self._value += amount
+
+    def set_function(self, function: Callable[[], float]):
+        self._function = function
+
+    @property
+    def value(self) -> float:
+        if self._function is not None:
+            try:
+                return float(self._function())
+            except Exception:  # el objeto observado ya no existe o falla
+                return float('nan')
+        return self._value
+
+    def samples(self, values, names) -> List[str]:
+        return [f'{self.name}{_label_text(names, values)} {_format_value(self.value)}']
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Métrica duplicada: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str) -> _Metric:
+        return self._metrics[name]
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+TICKS_PROCESSED = REGISTRY.counter('trading_ticks_processed_total', 'Ticks publicados en el hub', ['symbol'])
+SIGNALS = REGISTRY.counter('trading_signals_total', 'Señales generadas', ['source', 'signal'])
+ORDER_LATENCY = REGISTRY.histogram('trading_order_latency_seconds',
+                                   'Latencia de execute() hasta estado final', ['status'])
+QUEUE_DEPTH = REGISTRY.gauge('trading_queue_depth', 'Elementos pendientes por cola', ['queue'])
+DB_WRITE_LATENCY = REGISTRY.histogram('trading_db_write_seconds', 'Duración de cada commit del journal',
+                                      buckets=DB_BUCKETS)
+DB_ROWS_WRITTEN = REGISTRY.counter('trading_db_rows_written_total', 'Filas escritas por el journal')
+GC_PAUSE = REGISTRY.histogram('python_gc_pause_seconds', 'Pausas del recolector de ciclos',
+                              ['generation'], buckets=GC_BUCKETS)
+
+
+# --- GC ---
+
+_gc_started: Dict[int, float] = {}
+
+
+def _gc_callback(phase: str, info: Dict):
+    ident = threading.get_ident()
+    if phase == 'start':
+        _gc_started[ident] = time.perf_counter()
+    elif ident in _gc_started:
+        GC_PAUSE.labels(info['generation']).observe(time.perf_counter() - _gc_started.pop(ident))
+
+
+def install_gc_metrics():
+    """Registra el callback de gc (idempotente)"""
+    if _gc_callback not in gc.callbacks:
+        gc.callbacks.append(_gc_callback)
+
+
+# --- HTTP ---
+
+class MetricsServer:
+    """/metrics (texto Prometheus 0.0.4) y /health en un hilo daemon"""
+
+    def __init__(self, host: str = TRADING_CONFIG['METRICS_HOST'], port: int = TRADING_CONFIG['METRICS_PORT'],
+                 registry: Registry = REGISTRY, health: Optional[Callable[[], Dict]] = None):
+        self.registry = registry
+        self.health = health
+        self.started_at = time.time()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split('?', 1)[0]
+                if path == '/metrics':
+                    body = server.registry.render().encode()
+                    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+                    status = 200
+                elif path == '/health':
+                    report = {'status': 'ok', 'uptime_sec': round(time.time() - server.started_at, 1)}
+                    if server.health is not None:
+                        report.update(server.health())
+                    status = 200 if report['status'] == 'ok' else 503
+                    body = json.dumps(report).encode()
+                    content_type = 'application/json'
+                else:
+                    status, body, content_type = 404, b'not found\n', 'text/plain'
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug("metrics %s", format % args)
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self.host, self.port = self._httpd.server_address[:2]
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> 'MetricsServer':
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='metrics-http', daemon=True)
+        self._thread.start()
+        logger.info("Métricas en http://%s:%d/metrics", self.host, self.port)
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def start_metrics_server(host: Optional[str] = None, port: Optional[int] = None,
+                         health: Optional[Callable[[], Dict]] = None) -> MetricsServer:
+    install_gc_metrics()
+    return MetricsServer(host or TRADING_CONFIG['METRICS_HOST'],
+                         TRADING_CONFIG['METRICS_PORT'] if port is None else port, health=health).start()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Simulador Monte Carlo de estrés para los parámetros de riesgo
+Simula decenas de miles de secuencias de trades como arrays (paths × trades)
+con la misma semántica que generate_tp_targets, calculate_dynamic_sl y
+check_daily_limits; trocea los paths para acotar memoria y reparte los trozos
+entre varios procesos.
+"""
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from advanced_trading.advanced_risk_manager import calculate_dynamic_sl
+from advanced_trading.config.trading_config import TRADING_CONFIG
+
+
+def default_stress_params(config: Optional[Dict] = None) -> Dict:
+    """Parámetros del escenario base a partir de TRADING_CONFIG"""
+    config = config or TRADING_CONFIG
+    return {
+        'risk_per_trade': config['RISK_PER_TRADE'],
+        'max_daily_loss': config['MAX_DAILY_LOSS'],
+        'trades_per_day': config['MAX_DAILY_TRADES'],
+        'tp_levels': list(config['DEFAULT_TP_LEVELS']),
+        'tp_allocation': list(config['TP_ALLOCATION']),
+        'consecutive_losses_limit': config['BACKTEST_METRICS']['STOP_RULES']['CONSECUTIVE_LOSSES'],
+        'max_drawdown_limit': config['BACKTEST_METRICS']['PRIMARY_METRICS']['MAX_DRAWDOWN'],
+        'volatility_factor': 1.0,
+        'atr_pct': 0.003,            # ATR(1m, 20) típico en % del precio
+        'atr_dispersion': 0.5,       # sigma lognormal del ATR entre trades
+        'spread_pct': 0.0002,        # 2 bps
+        'drift': 0.0,                # sesgo a favor (θ = 2μ/σ², en 1/unidad de precio)
+        'cost_bps': 4.0,             # comisiones + slippage por trade (ida y vuelta)
+    }
+
+
+def _reach_probability(level: np.ndarray, sl: np.ndarray, drift: float) -> np.ndarray:
+    """
+    Probabilidad de que un browniano con deriva toque +level antes que -sl
+
+    Con θ = 0 se reduce a sl / (level + sl) (ruina del jugador).
+    """
+    if drift == 0:
+        return sl / (level + sl)
+    return -np.expm1(-drift * sl) / -np.expm1(-drift * (level + sl))
+
+
+def simulate_trade_returns(params: Dict, n_paths: int, n_trades: int,
+                           rng: np.random.Generator) -> np.ndarray:
+    """
+    Retorno sobre equity de cada trade, array (paths × trades)
+
+    Cada trade arriesga risk_per_trade del equity hasta el SL dinámico; la
+    escalera de TP se alcanza de forma anidada (tocar TP3 implica TP1 y TP2) y
+    la parte no cerrada en TP sale por el SL.
+    """
+    vf = params['volatility_factor']
+    atr = params['atr_pct'] * rng.lognormal(-0.5 * params['atr_dispersion'] ** 2,
+                                            params['atr_dispersion'], (n_paths, n_trades))
+    sl = calculate_dynamic_sl(atr, params['spread_pct'], vf)
+
+    levels = np.asarray(params['tp_levels']) * vf
+    allocation = np.asarray(params['tp_allocation'])
+    u = rng.random((n_paths, n_trades))
+
+    pnl_pct = np.zeros((n_paths, n_trades))
+    closed = np.zeros((n_paths, n_trades))
+    for level, alloc in zip(levels, allocation):
+        reached = u < _reach_probability(level, sl, params['drift'])
+        pnl_pct += reached * alloc * level
+        closed += reached * alloc
+    pnl_pct -= (1.0 - closed) * sl
+    pnl_pct -= params['cost_bps'] / 10_000
+
+    # Sizing por riesgo: notional = equity × risk / SL
+    return params['risk_per_trade'] * pnl_pct / sl
+
+
+def apply_daily_limits(returns: np.ndarray, trades_per_day: int,
+                       max_daily_loss: float) -> np.ndarray:
+    """
+    Anula los trades posteriores a alcanzar la pérdida diaria máxima
+
+    Misma regla que check_daily_limits: se bloquea cuando daily_pnl <= -max_daily_loss.
+    """
+    n_paths, n_trades = returns.shape
+    n_days = n_trades // trades_per_day
+    daily = returns[:, :n_days * trades_per_day].reshape(n_paths, n_days, trades_per_day)
+    breached = np.cumsum(daily, axis=2) <= -max_daily_loss
+    blocked = np.zeros_like(breached)
+    blocked[:, :, 1:] = np.cumsum(breached, axis=2)[:, :, :-1] > 0
+    return np.where(blocked, 0.0, daily).reshape(n_paths, n_days * trades_per_day)
+
+
+def max_consecutive_losses(returns: np.ndarray) -> np.ndarray:
+    """Racha máxima de pérdidas por path (los trades bloqueados no rompen la racha)"""
+    losses = returns < 0
+    wins = returns > 0
+    count = np.cumsum(losses, axis=1)
+    last_reset = np.maximum.accumulate(np.where(wins, count, 0), axis=1)
+    return (count - last_reset).max(axis=1)
+
+
+def max_drawdowns(returns: np.ndarray) -> np.ndarray:
+    """Drawdown máximo por path con equity compuesto"""
+    equity = np.cumprod(1.0 + returns, axis=1)
+    peaks = np.maximum.accumulate(np.maximum(equity, 1.0), axis=1)
+    return (1.0 - equity / peaks).max(axis=1)
+
+
+def simulate_chunk(params: Dict, n_paths: int, n_days: int, seed) -> Dict[str, np.ndarray]:
+    """Simula un trozo de paths y devuelve sólo los agregados por path"""
+    rng = np.random.default_rng(seed)
+    n_trades = n_days * params['trades_per_day']
+    returns = simulate_trade_returns(params, n_paths, n_trades, rng)
+    returns = apply_daily_limits(returns, params['trades_per_day'], params['max_daily_loss'])
+    return {
+        'max_drawdown': max_drawdowns(returns).astype(np.float32),
+        'max_loss_streak': max_consecutive_losses(returns).astype(np.int32),
+        'final_return': (np.prod(1.0 + returns, axis=1) - 1.0).astype(np.float32),
+        'blocked_trades': (returns == 0).sum(axis=1).astype(np.int32),
+    }
+
+
+def _simulate_chunk_args(args):
+    return simulate_chunk(*args)
+
+
+def run_stress_test(n_paths: int = 20_000, n_days: int = 60, params: Optional[Dict] = None,
+                    chunk_size: int = 2_000, workers: Optional[int] = None,
+                    seed: int = 42) -> Dict:
+    """
+    Ejecuta la simulación completa repartiendo trozos entre procesos
+
+    El resultado es determinista para una semilla dada, independientemente
+    del número de workers.
+    """
+    params = dict(default_stress_params(), **(params or {}))
+    sizes = [min(chunk_size, n_paths - start) for start in range(0, n_paths, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(params, size, n_days, s) for size, s in zip(sizes, seeds)]
+
+    workers = workers if workers is not None else (os.cpu_count() or 1)
+    if workers <= 1 or len(tasks) == 1:
+        chunks = [_simulate_chunk_args(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunks = list(pool.map(_simulate_chunk_args, tasks))
+
+    results = {k: np.concatenate([c[k] for c in chunks]) for k in chunks[0]}
+    return summarize(results, params, n_days)
+
+
+def summarize(results: Dict[str, np.ndarray], params: Dict, n_days: int) -> Dict:
+    """Distribuciones de drawdown y probabilidad de disparar STOP_RULES"""
+    dd = results['max_drawdown']
+    final = results['final_return']
+    percentiles = [50, 90, 95, 99]
+    return {
+        'paths': int(dd.size),
+        'days': n_days,
+        'trades_per_path': n_days * params['trades_per_day'],
+        'drawdown_mean': float(dd.mean()),
+        'drawdown_percentiles': {p: float(v) for p, v in zip(percentiles, np.percentile(dd, percentiles))},
+        'prob_drawdown_limit': float((dd >= params['max_drawdown_limit']).mean()),
+        'prob_consecutive_losses_stop': float(
+            (results['max_loss_streak'] >= params['consecutive_losses_limit']).mean()
+        ),
+        'loss_streak_percentiles': {p: float(v) for p, v in zip(percentiles, np.percentile(results['max_loss_streak'], percentiles))},
+        'final_return_mean': float(final.mean()),
+        'final_return_percentiles': {p: float(v) for p, v in zip([5, 50, 95], np.percentile(final, [5, 50, 95]))},
+        'avg_blocked_trades': float(results['blocked_trades'].mean()),
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Stress test Monte Carlo de parámetros de riesgo')
+    parser.add_argument('--paths', type=int, default=20_000)
+    parser.add_argument('--days', type=int, default=60)
+    parser.add_argument('--chunk-size', type=int, default=2_000)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--risk-per-trade', type=float, default=None)
+    parser.add_argument('--drift', type=float, default=None)
+    args = parser.parse_args(argv)
+
+    overrides = {}
+    if args.risk_per_trade is not None:
+        overrides['risk_per_trade'] = args.risk_per_trade
+    if args.drift is not None:
+        overrides['drift'] = args.drift
+
+    report = run_stress_test(args.paths, args.days, overrides, args.chunk_size, args.workers, args.seed)
+    print("🎲 STRESS TEST MONTE CARLO")
+    print("=" * 60)
+    print(f"   Paths: {report['paths']:,} × {report['trades_per_path']} trades ({report['days']} días)")
+    print(f"   Drawdown medio: {report['drawdown_mean']:.2%}")
+    for p, v in report['drawdown_percentiles'].items():
+        print(f"   Drawdown p{p}: {v:.2%}")
+    print(f"   P(DD ≥ MAX_DRAWDOWN): {report['prob_drawdown_limit']:.2%}")
+    print(f"   P(racha ≥ CONSECUTIVE_LOSSES): {report['prob_consecutive_losses_stop']:.2%}")
+    print(f"   Retorno final medio: {report['final_return_mean']:.2%}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
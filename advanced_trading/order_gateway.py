@@ -0,0 +1,510 @@
+"""
+Gateway de órdenes asíncrono
+Una sesión HTTP persistente por venue (keep-alive), control local del peso de
+peticiones de Binance (cabecera X-MBX-USED-WEIGHT-1M), envío concurrente de
+las patas de arbitraje (deshaciendo las supervivientes si una falla), ruta
+batchOrders, y cancelación según ORDER_TIMEOUT_SEC / PARTIAL_FILL_POLICY.
+
+Una orden cuyo envío falla sin rechazo definitivo (timeout, transporte, 5xx)
+queda 'unknown': puede estar viva en el venue y se resuelve por
+client_order_id con find_order, nunca se da por rechazada.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import os
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import replace
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence
+from urllib.parse import urlencode
+
+import aiohttp
+from yarl import URL
+
+from advanced_trading.config.trading_config import TRADING_CONFIG
+from advanced_trading.metrics import ORDER_LATENCY
+from advanced_trading.records import OrderRequest, OrderResult
+
+logger = logging.getLogger(__name__)
+
+WEIGHT_HEADER = 'X-MBX-USED-WEIGHT-1M'
+FINAL_STATUSES = frozenset({'filled', 'canceled', 'rejected', 'expired'})
+UNWOUND = 'unwound'                  # pata deshecha tras fallar otra (sin exposición)
+UNWIND_REQUIRED = 'unwind_required'  # no se pudo deshacer: exposición abierta
+UNKNOWN = 'unknown'                  # envío sin respuesta fiable: puede estar en el venue
+ORDER_NOT_FOUND = -2013       # Order does not exist
+DUPLICATE_CLIENT_ID = -4116   # ClientOrderId is duplicated
+TRANSIENT_CODES = frozenset({-1001, -1007})  # DISCONNECTED / TIMEOUT: el venue no sabe si la procesó
+
+# Peso por endpoint (USDⓈ-M futures)
+ENDPOINT_WEIGHTS = {
+    '/fapi/v1/order': 1,
+    '/fapi/v1/batchOrders': 5,
+}
+
+MAINNET_URL = 'https://fapi.binance.com'
+TESTNET_URL = 'https://testnet.binancefuture.com'
+
+
+class GatewayError(Exception):
+    """Error devuelto por el venue"""
+
+    def __init__(self, message: str, code: Optional[int] = None, status: Optional[int] = None):
+        super().__init__(message)
+        self.code = code
+        self.status = status
+
+
+def is_rejection(error: Exception) -> bool:
+    """
+    True sólo si el venue rechazó la orden con certeza (4xx con código de error)
+
+    5xx, 418/429, -1001/-1007, respuestas sin código y errores de transporte
+    no garantizan que la orden no se abriera.
+    """
+    return (isinstance(error, GatewayError) and error.code is not None
+            and error.status is not None and 400 <= error.status < 500 and error.status not in (418, 429)
+            and error.code not in TRANSIENT_CODES and error.code != DUPLICATE_CLIENT_ID)
+
+
+class RequestWeightTracker:
+    """
+    Presupuesto de peso por minuto
+
+    Suma localmente el peso de cada petición y se sincroniza con el valor que
+    informa el venue; si la siguiente petición superaría el margen de
+    seguridad, espera al siguiente minuto en lugar de arriesgar un 429/418.
+    """
+
+    def __init__(self, limit: int, safety: float = 0.9,
+                 clock: Callable[[], float] = time.time,
+                 sleep: Callable[[float], Awaitable] = asyncio.sleep):
+        self.limit = limit
+        self.budget = int(limit * safety)
+        self.used = 0
+        self.waits = 0
+        self._clock = clock
+        self._sleep = sleep
+        self._window = int(clock() // 60)
+        self._blocked_until = 0.0
+
+    def _roll(self):
+        window = int(self._clock() // 60)
+        if window != self._window:
+            self._window = window
+            self.used = 0
+
+    async def acquire(self, weight: int):
+        while True:
+            now = self._clock()
+            if now < self._blocked_until:
+                self.waits += 1
+                await self._sleep(self._blocked_until - now)
+                continue
+            self._roll()
+            if self.used + weight <= self.budget:
+                self.used += weight
+                return
+            self.waits += 1
+            await self._sleep((self._window + 1) * 60 - now)
+
+    def update_from_headers(self, headers: Dict[str, str]):
+        value = headers.get(WEIGHT_HEADER)
+        if value is not None:
+            self._roll()
+            self.used = max(self.used, int(value))
+
+    def block_for(self, seconds: float):
+        """Bloquea nuevas peticiones (Retry-After de un 429/418)"""
+        self._blocked_until = max(self._blocked_until, self._clock() + seconds)
+
+
+class OrderGateway(ABC):
+    """Interfaz común de los gateways de órdenes"""
+
+    def __init__(self, config: Optional[Dict] = None, clock: Callable[[], float] = time.time,
+                 sleep: Callable[[float], Awaitable] = asyncio.sleep):
+        config = config or TRADING_CONFIG
+        self.order_timeout = config['ORDER_TIMEOUT_SEC']
+        self.partial_fill_policy = config['PARTIAL_FILL_POLICY']
+        self._clock = clock
+        self._sleep = sleep
+
+    def apply_config(self, config):
+        """Aplica un RuntimeConfig recargado (timeout y política de fills parciales)"""
+        self.order_timeout = config.trading['ORDER_TIMEOUT_SEC']
+        self.partial_fill_policy = config.trading['PARTIAL_FILL_POLICY']
+
+    @abstractmethod
+    async def place_order(self, request: OrderRequest) -> OrderResult:
+        ...
+
+    @abstractmethod
+    async def get_order(self, symbol: str, order_id: str) -> OrderResult:
+        ...
+
+    @abstractmethod
+    async def cancel_order(self, symbol: str, order_id: str) -> OrderResult:
+        ...
+
+    @abstractmethod
+    async def find_order(self, symbol: str, client_order_id: str) -> Optional[OrderResult]:
+        """Orden por client_order_id; None si el venue no la conoce (reconciliación)"""
+
+    async def close(self):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def place_batch(self, requests: Sequence[OrderRequest]) -> List[OrderResult]:
+        """
+        Órdenes independientes a la vez
+
+        Un rechazo definitivo se devuelve como 'rejected'; cualquier otro
+        error (timeout, transporte, 5xx) como 'unknown'.
+        """
+        results = await asyncio.gather(*(self.place_order(r) for r in requests), return_exceptions=True)
+        return [
+            _failed_result(request, result, self._clock()) if isinstance(result, Exception) else result
+            for request, result in zip(requests, results)
+        ]
+
+    async def place_legs(self, requests: Sequence[OrderRequest]) -> List[OrderResult]:
+        """
+        Envía todas las patas a la vez; una pata rechazada se devuelve como 'rejected'
+
+        Las patas sin client_order_id reciben uno para poder consultarlas: una
+        pata 'unknown' se busca con find_order antes de decidir nada. Si falla
+        alguna, las demás se deshacen para no dejar una pata suelta: quedan
+        como 'unwound' (filled = 0, sin exposición) o, si no se pudo (o su
+        estado sigue siendo desconocido), como 'unwind_required'.
+        """
+        batch = uuid.uuid4().hex[:24]
+        requests = [r if r.client_order_id else replace(r, client_order_id=f'legs-{batch}-{i}')
+                    for i, r in enumerate(requests)]
+        results = await OrderGateway.place_batch(self, requests)
+        results = list(await asyncio.gather(*(
+            self._resolve(request, result) if result.status == UNKNOWN else _done(result)
+            for request, result in zip(requests, results)
+        )))
+        if len(results) < 2 or not any(_failed(r) for r in results):
+            return results
+        return list(await asyncio.gather(*(
+            self._unwind(request, result) if not _failed(result) else _done(result)
+            for request, result in zip(requests, results)
+        )))
+
+    async def _resolve(self, request: OrderRequest, result: OrderResult) -> OrderResult:
+        """Estado real de una pata en duda; sigue 'unknown' si el venue no responde"""
+        try:
+            found = await self.find_order(request.symbol, request.client_order_id)
+        except Exception as e:
+            logger.error(f"🚨 Pata {request.symbol} {request.side} en duda ({request.client_order_id}): {e!r}")
+            return result
+        if found is None:  # el venue no la tiene: no llegó a abrirse
+            return replace(result, status='rejected')
+        return found
+
+    async def _unwind(self, request: OrderRequest, result: OrderResult) -> OrderResult:
+        """Cancela lo pendiente de la pata y cierra lo ejecutado con una orden reduce-only opuesta"""
+        if result.status == UNKNOWN:  # sin order_id: no se puede cancelar ni cerrar con certeza
+            logger.error(f"🚨 Pata {request.symbol} {request.side} sin deshacer: estado desconocido "
+                         f"({request.client_order_id})")
+            return replace(result, status=UNWIND_REQUIRED)
+        try:
+            if result.status not in FINAL_STATUSES:
+                try:
+                    result = await self.cancel_order(request.symbol, result.order_id)
+                except GatewayError:
+                    result = await self.get_order(request.symbol, result.order_id)
+            if result.filled:
+                side = 'SELL' if request.side.upper() == 'BUY' else 'BUY'
+                closing = await self.place_order(OrderRequest(request.symbol, side, result.filled,
+                                                              position_side=position_side(request),
+                                                              reduce_only=True))
+                if closing.filled < result.filled:
+                    raise GatewayError(f'cierre parcial {closing.filled}/{result.filled}')
+        except Exception as e:
+            logger.error(f"🚨 Pata {request.symbol} {request.side} sin deshacer ({result.filled} ejecutado): {e!r}")
+            return replace(result, status=UNWIND_REQUIRED)
+        logger.warning(f"↩️ Pata {request.symbol} {request.side} deshecha tras fallar otra pata")
+        return replace(result, status=UNWOUND, filled=0.0)
+
+    async def execute(self, request: OrderRequest, timeout: Optional[float] = None,
+                      policy: Optional[str] = None, poll_interval: float = 0.25,
+                      on_placed: Optional[Callable[[OrderResult], None]] = None) -> OrderResult:
+        """
+        Coloca la orden y la sigue hasta estado final
+
+        Con 'cancel_remaining' se cancela el resto en cuanto hay un fill
+        parcial; con 'keep_until_timeout' se espera hasta ORDER_TIMEOUT_SEC.
+        En ambos casos lo no ejecutado al vencer el timeout se cancela.
+        on_placed recibe la respuesta de place_order: un error posterior
+        (consulta/cancelación) no significa que la orden no exista.
+        """
+        timeout = self.order_timeout if timeout is None else timeout
+        policy = policy or self.partial_fill_policy
+        started = time.perf_counter()
+        status = 'error'  # excepción en place/get/cancel: también cuenta en la latencia
+        try:
+            result = await self._follow(request, timeout, policy, poll_interval, on_placed)
+            status = result.status
+            return result
+        finally:
+            ORDER_LATENCY.labels(status).observe(time.perf_counter() - started)
+
+    async def _follow(self, request: OrderRequest, timeout: float, policy: str,
+                      poll_interval: float, on_placed: Optional[Callable[[OrderResult], None]]) -> OrderResult:
+        result = await self.place_order(request)
+        if on_placed is not None:
+            on_placed(result)
+        deadline = self._clock() + timeout
+        while result.status not in FINAL_STATUSES:
+            if result.status == 'partially_filled' and policy == 'cancel_remaining':
+                break
+            if self._clock() >= deadline:
+                break
+            await self._sleep(poll_interval)
+            result = await self.get_order(request.symbol, result.order_id)
+
+        if result.status not in FINAL_STATUSES:
+            try:
+                result = await self.cancel_order(request.symbol, result.order_id)
+            except GatewayError as e:
+                # Se llenó entre la consulta y la cancelación
+                logger.info(f"Cancelación de {result.order_id} rechazada ({e}); consultando estado")
+                result = await self.get_order(request.symbol, result.order_id)
+        return result
+
+
+def _failed(result: OrderResult) -> bool:
+    return not result.filled and result.status in FINAL_STATUSES and result.status != 'filled'
+
+
+async def _done(result: OrderResult) -> OrderResult:
+    return result
+
+
+def _failed_result(request: OrderRequest, error: BaseException, now: float) -> OrderResult:
+    """'rejected' si el venue la rechazó con certeza; si no, 'unknown' (puede estar viva)"""
+    if is_rejection(error):
+        logger.warning(f"⚠️ Orden rechazada {request.symbol} {request.side}: {error}")
+        status = 'rejected'
+    else:
+        logger.warning(f"⚠️ Orden {request.symbol} {request.side} en duda ({request.client_order_id}): {error!r}")
+        status = UNKNOWN
+    return OrderResult(symbol=request.symbol, side=request.side.lower(), amount=request.amount,
+                       type=request.type, status=status, timestamp=now, simulated=False)
+
+
+def position_side(request: OrderRequest) -> str:
+    """positionSide en hedge mode: el indicado o el que abre el side de la orden"""
+    return request.position_side or ('LONG' if request.side.upper() == 'BUY' else 'SHORT')
+
+
+def _fmt(value: float) -> str:
+    return f'{value:.8f}'.rstrip('0').rstrip('.')
+
+
+class BinanceFuturesGateway(OrderGateway):
+    """Gateway REST de Binance USDⓈ-M futures con sesión persistente"""
+
+    def __init__(self, api_key: Optional[str] = None, api_secret: Optional[str] = None,
+                 base_url: Optional[str] = None, config: Optional[Dict] = None,
+                 recv_window: int = 5000, max_connections: int = 10,
+                 clock: Callable[[], float] = time.time,
+                 sleep: Callable[[float], Awaitable] = asyncio.sleep):
+        config = config or TRADING_CONFIG
+        super().__init__(config, clock, sleep)
+        self.api_key = api_key or os.getenv('BINANCE_API_KEY', '')
+        self.api_secret = (api_secret or os.getenv('BINANCE_API_SECRET', '')).encode()
+        if base_url is None:
+            base_url = TESTNET_URL if os.getenv('BINANCE_TESTNET', '0') == '1' else MAINNET_URL
+        self.base_url = base_url.rstrip('/')
+        self.recv_window = recv_window
+        self.max_connections = max_connections
+        self.batch_max = config['BATCH_ORDERS_MAX']
+        self.hedge_mode = config['HEDGE_MODE']  # modo de posición de la cuenta: no se recarga en caliente
+        self.weights = RequestWeightTracker(config['REQUEST_WEIGHT_LIMIT_1M'],
+                                            config['REQUEST_WEIGHT_SAFETY'], clock, sleep)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def apply_config(self, config):
+        """Además del timeout: tamaño de lote y presupuesto de peso (la ventana en curso se conserva)"""
+        super().apply_config(config)
+        self.batch_max = config.trading['BATCH_ORDERS_MAX']
+        self.weights.limit = config.trading['REQUEST_WEIGHT_LIMIT_1M']
+        self.weights.budget = int(self.weights.limit * config.trading['REQUEST_WEIGHT_SAFETY'])
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                headers={'X-MBX-APIKEY': self.api_key},
+                timeout=aiohttp.ClientTimeout(total=self.order_timeout),
+                connector=aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=60),
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _sign(self, params: Dict) -> str:
+        params = dict(params, timestamp=int(self._clock() * 1000), recvWindow=self.recv_window)
+        query = urlencode(params)
+        signature = hmac.new(self.api_secret, query.encode(), hashlib.sha256).hexdigest()
+        return f'{query}&signature={signature}'
+
+    async def _request(self, method: str, path: str, params: Dict):
+        await self.weights.acquire(ENDPOINT_WEIGHTS.get(path, 1))
+        session = self._get_session()
+        # encoded=True: la query firmada se envía byte a byte
+        url = URL(f'{self.base_url}{path}?{self._sign(params)}', encoded=True)
+        async with session.request(method, url) as response:
+            self.weights.update_from_headers(response.headers)
+            if response.status in (418, 429):
+                self.weights.block_for(float(response.headers.get('Retry-After', 60)))
+            try:
+                payload = await response.json(content_type=None)
+            except (ValueError, aiohttp.ContentTypeError) as e:  # HTML de un proxy/5xx o cuerpo truncado
+                raise GatewayError(f'Respuesta no JSON (HTTP {response.status}): {e}',
+                                   None, response.status) from e
+            if response.status >= 400:
+                payload = payload if isinstance(payload, dict) else {}
+                raise GatewayError(payload.get('msg', f'HTTP {response.status}'),
+                                   payload.get('code'), response.status)
+            return payload
+
+    def _order_params(self, request: OrderRequest) -> Dict:
+        params = {
+            'symbol': request.symbol,
+            'side': request.side.upper(),
+            'type': request.type.upper(),
+            'quantity': _fmt(request.amount),
+            'newOrderRespType': 'RESULT',
+        }
+        if request.price is not None:
+            params['price'] = _fmt(request.price)
+            params['timeInForce'] = 'GTC'
+        if request.client_order_id:
+            params['newClientOrderId'] = request.client_order_id
+        if self.hedge_mode:
+            # En hedge mode Binance no admite reduceOnly: el cierre lo da positionSide
+            params['positionSide'] = position_side(request)
+        elif request.reduce_only:
+            params['reduceOnly'] = 'true'
+        return params
+
+    def _to_result(self, data: Dict) -> OrderResult:
+        avg_price = float(data.get('avgPrice') or 0)
+        return OrderResult(
+            symbol=data['symbol'],
+            side=data['side'].lower(),
+            amount=float(data['origQty']),
+            type=data['type'].lower(),
+            status=data['status'].lower(),
+            timestamp=data.get('updateTime', self._clock() * 1000) / 1000,
+            simulated=False,
+            order_id=str(data['orderId']),
+            filled=float(data.get('executedQty', 0)),
+            price=avg_price or None,
+        )
+
+    async def place_order(self, request: OrderRequest) -> OrderResult:
+        return self._to_result(await self._request('POST', '/fapi/v1/order', self._order_params(request)))
+
+    async def get_order(self, symbol: str, order_id: str) -> OrderResult:
+        return self._to_result(await self._request('GET', '/fapi/v1/order',
+                                                   {'symbol': symbol, 'orderId': order_id}))
+
+    async def cancel_order(self, symbol: str, order_id: str) -> OrderResult:
+        return self._to_result(await self._request('DELETE', '/fapi/v1/order',
+                                                   {'symbol': symbol, 'orderId': order_id}))
+
+    async def find_order(self, symbol: str, client_order_id: str) -> Optional[OrderResult]:
+        try:
+            return self._to_result(await self._request('GET', '/fapi/v1/order',
+                                                       {'symbol': symbol, 'origClientOrderId': client_order_id}))
+        except GatewayError as e:
+            if e.code == ORDER_NOT_FOUND:
+                return None
+            raise
+
+    async def place_batch(self, requests: Sequence[OrderRequest]) -> List[OrderResult]:
+        """batchOrders en bloques de BATCH_ORDERS_MAX enviados concurrentemente"""
+        chunks = [list(requests[i:i + self.batch_max]) for i in range(0, len(requests), self.batch_max)]
+
+        async def send(chunk: List[OrderRequest]) -> List[OrderResult]:
+            params = {'batchOrders': json.dumps([self._order_params(r) for r in chunk], separators=(',', ':'))}
+            try:
+                payload = await self._request('POST', '/fapi/v1/batchOrders', params)
+            except Exception as e:  # transporte/timeout incluidos: 'unknown' salvo rechazo definitivo
+                return [_failed_result(r, e, self._clock()) for r in chunk]
+            # Error por orden dentro de un 200: rechazo del venue salvo códigos transitorios
+            return [
+                _failed_result(r, GatewayError(item.get('msg', ''), item.get('code'), 400), self._clock())
+                if 'code' in item and 'orderId' not in item else self._to_result(item)
+                for r, item in zip(chunk, payload)
+            ]
+
+        results = await asyncio.gather(*(send(chunk) for chunk in chunks))
+        return [result for chunk in results for result in chunk]
+
+
+class SimulatedGateway(OrderGateway):
+    """Gateway en proceso: llena al instante al precio de price_fn (paper trading)"""
+
+    def __init__(self, price_fn: Optional[Callable[[str], Optional[float]]] = None,
+                 config: Optional[Dict] = None, clock: Callable[[], float] = time.time,
+                 sleep: Callable[[float], Awaitable] = asyncio.sleep):
+        super().__init__(config, clock, sleep)
+        self.price_fn = price_fn or (lambda symbol: None)
+        self._next_id = 0
+        self.orders: Dict[str, OrderResult] = {}
+        self.client_ids: Dict[str, str] = {}
+
+    async def place_order(self, request: OrderRequest) -> OrderResult:
+        if request.client_order_id in self.client_ids:
+            raise GatewayError('ClientOrderId is duplicated.', DUPLICATE_CLIENT_ID, 400)
+        self._next_id += 1
+        order_id = str(self._next_id)
+        result = OrderResult(
+            symbol=request.symbol, side=request.side.lower(), amount=request.amount,
+            type=request.type, status='filled', timestamp=self._clock(), simulated=True,
+            order_id=order_id, filled=request.amount,
+            price=request.price if request.price is not None else self.price_fn(request.symbol),
+        )
+        self.orders[order_id] = result
+        if request.client_order_id:
+            self.client_ids[request.client_order_id] = order_id
+        return result
+
+    async def get_order(self, symbol: str, order_id: str) -> OrderResult:
+        return self.orders[order_id]
+
+    async def cancel_order(self, symbol: str, order_id: str) -> OrderResult:
+        return self.orders[order_id]
+
+    async def find_order(self, symbol: str, client_order_id: str) -> Optional[OrderResult]:
+        order_id = self.client_ids.get(client_order_id)
+        return self.orders[order_id] if order_id is not None else None
+
+
+def arbitrage_legs(signal: str, btc_size: float, eth_size: float,
+                   btc_symbol: str = 'BTCUSDT', eth_symbol: str = 'ETHUSDT') -> List[OrderRequest]:
+    """Patas de mercado para una señal de RelativeArbitrage y calculate_position_sizes"""
+    if signal == 'LONG_ETH_SHORT_BTC':
+        return [OrderRequest(eth_symbol, 'BUY', eth_size), OrderRequest(btc_symbol, 'SELL', btc_size)]
+    if signal == 'LONG_BTC_SHORT_ETH':
+        return [OrderRequest(btc_symbol, 'BUY', btc_size), OrderRequest(eth_symbol, 'SELL', eth_size)]
+    raise ValueError(f"Señal de arbitraje desconocida: {signal}")
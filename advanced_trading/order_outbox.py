@@ -0,0 +1,199 @@
+"""
+Outbox de órdenes: intenciones idempotentes antes de enviar
+Cada etapa/pata se persiste en order_intents con un client_order_id
+determinista (event_id, etapa, pata) antes de tocar el venue. El envío
+reclama la intención con un UPDATE condicional (pending -> sending), así que
+varios dispatchers pueden vaciar el outbox a la vez sin lock global y cada
+intención se envía como mucho una vez.
+
+Estados: pending -> sending -> estado del venue (filled, canceled, ...)
+                          \\-> unknown (transporte, 5xx, -1001/-1007 o fallo tras
+                                      colocarla: puede existir en el venue)
+                          \\-> rejected (place_order rechazada con certeza)
+Al arrancar, reconcile() consulta por client_order_id las que quedaron en
+sending/unknown: si el venue la tiene se copia su estado; si no, vuelve a
+pending (hasta API_RETRY_ATTEMPTS) con el mismo client_order_id.
+"""
+
+import asyncio
+import logging
+import sqlite3
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+from advanced_trading.config.trading_config import TRADING_CONFIG
+from advanced_trading.db_schema import ensure_schema
+from advanced_trading.leader_election import idempotency_key
+from advanced_trading.order_gateway import is_rejection
+from advanced_trading.records import OrderRequest, OrderResult
+
+logger = logging.getLogger(__name__)
+
+IN_DOUBT = ('sending', 'unknown')
+DONE = ('new', 'partially_filled', 'filled', 'canceled', 'expired', 'rejected', 'failed')
+
+
+def client_order_id(event_id, stage: str, leg: str) -> str:
+    """Mismo (event_id, etapa, pata) -> mismo id, también tras un reinicio o failover"""
+    return idempotency_key('order', event_id, stage, leg)
+
+
+def _utc_now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def result_from_row(row: Dict) -> Optional[OrderResult]:
+    """OrderResult guardado en la intención (None si no llegó a enviarse)"""
+    if row['status'] not in DONE or row['status'] == 'failed':
+        return None
+    return OrderResult(symbol=row['symbol'], side=row['side'].lower(), amount=row['amount'], type=row['type'],
+                       status=row['status'], timestamp=0.0, simulated=False, order_id=row['order_id'],
+                       filled=row['filled'] or 0.0, price=row['avg_price'])
+
+
+class OrderOutbox:
+    """Intenciones de orden en order_intents con transiciones condicionales"""
+
+    def __init__(self, db_path: str, max_attempts: int = TRADING_CONFIG['API_RETRY_ATTEMPTS'],
+                 clock: Callable[[], float] = time.time):
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self._clock = clock
+        self.conn = sqlite3.connect(db_path, timeout=5.0, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        ensure_schema(self.conn, ['order_intents'])
+
+    def close(self):
+        self.conn.close()
+
+    def add(self, event_id, stage: str, leg: str, request: OrderRequest, not_before: float = 0.0) -> str:
+        """Persiste la intención (idempotente: repetirla devuelve el mismo id sin duplicar)"""
+        cid = client_order_id(event_id, stage, leg)
+        self.conn.execute(
+            'INSERT INTO order_intents (client_order_id, event_id, stage, leg, symbol, side, amount, type, price, '
+            'not_before, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT(client_order_id) DO NOTHING',
+            (cid, str(event_id), stage, leg, request.symbol, request.side.upper(), request.amount, request.type,
+             request.price, not_before, _utc_now_iso()))
+        return cid
+
+    def get(self, cid: str) -> Optional[Dict]:
+        row = self.conn.execute('SELECT * FROM order_intents WHERE client_order_id = ?', (cid,)).fetchone()
+        return dict(row) if row else None
+
+    def intents(self, event_id=None, statuses: Optional[Iterable[str]] = None) -> List[Dict]:
+        where, params = [], []
+        if event_id is not None:
+            where.append('event_id = ?')
+            params.append(str(event_id))
+        if statuses:
+            statuses = list(statuses)
+            where.append(f"status IN ({','.join('?' * len(statuses))})")
+            params.extend(statuses)
+        sql = 'SELECT * FROM order_intents' + (' WHERE ' + ' AND '.join(where) if where else '')
+        return [dict(r) for r in self.conn.execute(sql + ' ORDER BY rowid', params)]
+
+    def due(self, limit: int = 100) -> List[str]:
+        rows = self.conn.execute("SELECT client_order_id FROM order_intents WHERE status = 'pending' "
+                                 'AND not_before <= ? ORDER BY not_before, rowid LIMIT ?', (self._clock(), limit))
+        return [r[0] for r in rows]
+
+    def transition(self, cid: str, from_statuses: Iterable[str], to: str, **fields) -> bool:
+        """UPDATE condicional: True sólo para quien hace efectiva la transición"""
+        from_statuses = list(from_statuses)
+        sets = ['status = ?', 'updated_at = ?'] + [f'{k} = ?' for k in fields]
+        params = [to, _utc_now_iso(), *fields.values(), cid, *from_statuses]
+        cursor = self.conn.execute(
+            f"UPDATE order_intents SET {', '.join(sets)} WHERE client_order_id = ? "
+            f"AND status IN ({','.join('?' * len(from_statuses))})", params)
+        return cursor.rowcount == 1
+
+    def _claim(self, cid: str) -> Optional[Dict]:
+        cursor = self.conn.execute(
+            "UPDATE order_intents SET status = 'sending', attempts = attempts + 1, claimed_at = ?, "
+            "updated_at = ? WHERE client_order_id = ? AND status = 'pending'", (self._clock(), _utc_now_iso(), cid))
+        return self.get(cid) if cursor.rowcount == 1 else None
+
+    def _store_result(self, cid: str, from_statuses: Iterable[str], result: OrderResult) -> bool:
+        return self.transition(cid, from_statuses, result.status, order_id=result.order_id,
+                               filled=result.filled, avg_price=result.price, error=None)
+
+    async def send(self, gateway, cid: str) -> Optional[OrderResult]:
+        """
+        Envía una intención pendiente con gateway.execute
+
+        None si otro dispatcher la tenía o ya estaba enviada, o si el envío
+        falló (el estado queda en rejected/unknown para reconcile()). Sólo
+        un rechazo definitivo de place_order es 'rejected'; cualquier otro
+        error, o uno al seguir una orden ya colocada, deja 'unknown'.
+        """
+        row = self._claim(cid)
+        if row is None:
+            return None
+        request = OrderRequest(row['symbol'], row['side'], row['amount'], row['type'], row['price'], cid)
+        placed: List[OrderResult] = []
+        try:
+            result = await gateway.execute(request, on_placed=placed.append)
+        except Exception as e:
+            if not placed and is_rejection(e):
+                self.transition(cid, ['sending'], 'rejected', error=f'{e.code}: {e}')
+                logger.warning("⚠️ Intención %s rechazada: %s", cid, e)
+            else:  # puede estar en el venue (o duplicada): lo resuelve reconcile()
+                self.transition(cid, ['sending'], 'unknown', error=repr(e))
+                logger.warning("⚠️ Intención %s en duda tras %r", cid, e)
+            return None
+        self._store_result(cid, ['sending'], result)
+        return result
+
+    async def reconcile(self, gateway, grace_sec: float = 0.0) -> Dict[str, int]:
+        """
+        Resuelve las intenciones en duda consultando el venue por client_order_id
+
+        grace_sec deja fuera las reclamadas hace menos de ese tiempo (pueden
+        seguir en vuelo en otro proceso).
+        """
+        stats = {'found': 0, 'requeued': 0, 'failed': 0}
+        cutoff = self._clock() - grace_sec
+        for row in self.intents(statuses=IN_DOUBT):
+            if row['status'] == 'sending' and (row['claimed_at'] or 0) > cutoff:
+                continue
+            found = await gateway.find_order(row['symbol'], row['client_order_id'])
+            if found is not None:
+                if self._store_result(row['client_order_id'], [row['status']], found):
+                    stats['found'] += 1
+            elif row['attempts'] < self.max_attempts:
+                if self.transition(row['client_order_id'], [row['status']], 'pending'):
+                    stats['requeued'] += 1
+            elif self.transition(row['client_order_id'], [row['status']], 'failed'):
+                stats['failed'] += 1
+        if any(stats.values()):
+            logger.info("🔄 Reconciliación del outbox: %s", stats)
+        return stats
+
+
+class OutboxDispatcher:
+    """Vacía el outbox con hasta `concurrency` envíos en paralelo"""
+
+    def __init__(self, outbox: OrderOutbox, gateway, concurrency: int = 4):
+        self.outbox = outbox
+        self.gateway = gateway
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def _send(self, cid: str) -> Optional[OrderResult]:
+        async with self._semaphore:
+            return await self.outbox.send(self.gateway, cid)
+
+    async def drain(self) -> List[OrderResult]:
+        results = await asyncio.gather(*(self._send(cid) for cid in self.outbox.due()))
+        return [r for r in results if r is not None]
+
+    async def run(self, stop: Optional[asyncio.Event] = None, interval: float = 0.5,
+                  sleep: Callable[[float], Awaitable] = asyncio.sleep):
+        """Reconcilia al arrancar y luego drena periódicamente"""
+        stop = stop or asyncio.Event()
+        await self.outbox.reconcile(self.gateway)
+        while not stop.is_set():
+            await self.drain()
+            await sleep(interval)
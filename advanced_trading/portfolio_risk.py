@@ -0,0 +1,270 @@
+"""
+Agregación de riesgo a nivel cartera
+Posiciones en arrays NumPy, exposición neta por símbolo, VaR ajustado por
+correlación sobre la matriz rodante de retornos y utilización de apalancamiento.
+Los fills actualizan el VaR de forma incremental (O(n) por fill) y cada tick de
+precios actualiza la covarianza rodante con sumas acumuladas (O(n²)).
+
+Los retornos se muestrean en "refresh time": una fila nueva sólo cuando todos
+los símbolos con precio de referencia han vuelto a cotizar, de modo que un
+símbolo sin tick no aporta retornos 0 que sesguen la covarianza. Un símbolo
+sin referencia (primer refresh, o añadido después) no tiene retorno en esa
+fila: queda marcado como ausente y cada covarianza se calcula sólo con las
+filas en que ambos símbolos tienen dato. El VaR se escala a un día
+(√periods_per_day) para compararlo con MAX_DAILY_LOSS.
+"""
+
+from statistics import NormalDist
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from advanced_trading.config.trading_config import TRADING_CONFIG
+
+
+class PortfolioRisk:
+    """Libro de posiciones vectorizado con VaR y apalancamiento"""
+
+    def __init__(self, equity: float, leverage: float = TRADING_CONFIG['LEVERAGE'],
+                 returns_window: int = TRADING_CONFIG['CORRELATION_LOOKBACK_MIN'],
+                 confidence: float = 0.99, max_var_pct: float = TRADING_CONFIG['MAX_DAILY_LOSS'],
+                 symbols: Optional[Iterable[str]] = None, capacity: int = 8,
+                 periods_per_day: float = 24 * 60):
+        self.equity = equity
+        self.leverage = leverage
+        self.returns_window = returns_window
+        self.max_var_pct = max_var_pct
+        self.z_score = NormalDist().inv_cdf(confidence)
+        # Retornos por periodo de update_prices (minutos con CORRELATION_LOOKBACK_MIN) -> VaR diario
+        self.horizon_scale = float(np.sqrt(periods_per_day))
+
+        self.symbol_index: Dict[str, int] = {}
+        self.n = 0
+        self.qty = np.zeros(capacity)
+        self.avg_price = np.zeros(capacity)
+        self.mark = np.zeros(capacity)
+        self._ref = np.zeros(capacity)  # precio en el último refresh (base de los retornos)
+        self._fresh: set = set()
+        self.exposure = np.zeros(capacity)
+        self.realized_pnl = 0.0
+
+        # Ventana rodante de retornos (+ máscara de presentes) y sumas por pares
+        # para la covarianza incremental: Σ xᵢxⱼ, Σ xᵢ·[j presente], Σ [i y j presentes]
+        self._returns = np.zeros((returns_window, capacity))
+        self._present = np.zeros((returns_window, capacity))
+        self._ret_pos = 0
+        self._ret_count = 0
+        self._sum_outer = np.zeros((capacity, capacity))
+        self._sum_cross = np.zeros((capacity, capacity))
+        self._pairs = np.zeros((capacity, capacity))
+        self._cov = np.zeros((capacity, capacity))
+        self._cov_w = np.zeros(capacity)
+        self._quad = 0.0
+
+        for symbol in symbols or []:
+            self._index(symbol)
+
+    # --- Gestión de arrays ---
+
+    def _index(self, symbol: str) -> int:
+        idx = self.symbol_index.get(symbol)
+        if idx is not None:
+            return idx
+        if self.n == len(self.qty):
+            self._grow(2 * len(self.qty))
+        idx = self.n
+        self.symbol_index[symbol] = idx
+        self.n += 1
+        return idx
+
+    def _grow(self, capacity: int):
+        old = len(self.qty)
+        for name in ('qty', 'avg_price', 'mark', '_ref', 'exposure', '_cov_w'):
+            arr = np.zeros(capacity)
+            arr[:old] = getattr(self, name)
+            setattr(self, name, arr)
+        for name in ('_returns', '_present'):
+            window = np.zeros((self.returns_window, capacity))
+            window[:, :old] = getattr(self, name)
+            setattr(self, name, window)
+        for name in ('_sum_outer', '_sum_cross', '_pairs', '_cov'):
+            mat = np.zeros((capacity, capacity))
+            mat[:old, :old] = getattr(self, name)
+            setattr(self, name, mat)
+
+    # --- Actualizaciones ---
+
+    def on_fill(self, symbol: str, side: str, qty: float, price: float) -> float:
+        """
+        Aplica un fill al libro y actualiza exposición y VaR incrementalmente
+
+        Returns:
+            PnL realizado por el fill (si reduce o invierte la posición)
+        """
+        if qty == 0:
+            return 0.0
+        i = self._index(symbol)
+        signed = qty if side.upper() in ('BUY', 'LONG') else -qty
+        current = self.qty[i]
+        realized = 0.0
+
+        if current == 0 or np.sign(current) == np.sign(signed):
+            new_qty = current + signed
+            self.avg_price[i] = (current * self.avg_price[i] + signed * price) / new_qty
+        else:
+            closed = min(abs(current), abs(signed))
+            realized = closed * (price - self.avg_price[i]) * np.sign(current)
+            new_qty = current + signed
+            if new_qty == 0:
+                self.avg_price[i] = 0.0
+            elif np.sign(new_qty) != np.sign(current):
+                self.avg_price[i] = price
+        self.qty[i] = new_qty
+        self.realized_pnl += realized
+
+        if self.mark[i] == 0:
+            self.mark[i] = price
+        self._set_exposure(i, new_qty * self.mark[i])
+        return realized
+
+    def _set_exposure(self, i: int, value: float):
+        """Actualiza w_i y la forma cuadrática wᵀΣw en O(n)"""
+        delta = value - self.exposure[i]
+        if delta == 0:
+            return
+        self._quad += 2 * delta * self._cov_w[i] + delta * delta * self._cov[i, i]
+        self._cov_w += delta * self._cov[:, i]
+        self.exposure[i] = value
+
+    def update_prices(self, prices: Dict[str, float]):
+        """
+        Marca a mercado; cuando todos los símbolos con referencia han cotizado
+        desde el último refresh añade una fila de retornos a la ventana rodante
+
+        Los símbolos que cotizan por primera vez sólo fijan su referencia
+        (ausentes en la fila); si no hay ningún retorno no se añade fila.
+        """
+        for symbol, price in prices.items():
+            i = self._index(symbol)
+            self.mark[i] = price
+            self._fresh.add(i)
+        if any(self._ref[i] > 0 and i not in self._fresh for i in range(self.n)):
+            self._recompute()  # sólo mark-to-market: falta algún símbolo
+            return
+
+        row = np.zeros(len(self.qty))
+        present = np.zeros(len(self.qty))
+        for i in self._fresh:
+            if self._ref[i] > 0:  # sin referencia: ausente, no retorno 0
+                row[i] = self.mark[i] / self._ref[i] - 1.0
+                present[i] = 1.0
+            self._ref[i] = self.mark[i]
+        self._fresh.clear()
+        if not present.any():
+            self._recompute()
+            return
+
+        # Sumas rodantes: añadir la fila nueva y descontar la expulsada
+        if self._ret_count == self.returns_window:
+            old, old_present = self._returns[self._ret_pos], self._present[self._ret_pos]
+            self._sum_outer -= np.outer(old, old)
+            self._sum_cross -= np.outer(old, old_present)
+            self._pairs -= np.outer(old_present, old_present)
+        else:
+            self._ret_count += 1
+        self._returns[self._ret_pos] = row
+        self._present[self._ret_pos] = present
+        self._sum_outer += np.outer(row, row)
+        self._sum_cross += np.outer(row, present)
+        self._pairs += np.outer(present, present)
+        self._ret_pos = (self._ret_pos + 1) % self.returns_window
+
+        self._recompute()
+
+    def _recompute(self):
+        """Recalcula covarianza, exposición y forma cuadrática (vectorizado)"""
+        # cov_ij = (Σ xᵢxⱼ - Σᵢ·Σⱼ / n_ij) / (n_ij - 1) sobre las n_ij filas con ambos presentes
+        n = self._pairs
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = (self._sum_outer - self._sum_cross * self._sum_cross.T / n) / (n - 1)
+        self._cov = np.where(n >= 2, cov, 0.0)
+        self.exposure = self.qty * self.mark
+        self._cov_w = self._cov @ self.exposure
+        self._quad = float(self.exposure @ self._cov_w)
+
+    # --- Métricas ---
+
+    def net_exposure(self) -> Dict[str, float]:
+        """Exposición neta en USD por símbolo"""
+        return {s: float(self.exposure[i]) for s, i in self.symbol_index.items()}
+
+    def gross_exposure(self) -> float:
+        return float(np.abs(self.exposure[:self.n]).sum())
+
+    def portfolio_var(self) -> float:
+        """VaR paramétrico diario (USD) con la covarianza de la ventana"""
+        return self.z_score * self.horizon_scale * float(np.sqrt(max(self._quad, 0.0)))
+
+    def leverage_utilization(self) -> float:
+        """Exposición bruta / (equity × LEVERAGE)"""
+        capacity = self.equity * self.leverage
+        return self.gross_exposure() / capacity if capacity > 0 else float('inf')
+
+    def correlation_matrix(self) -> np.ndarray:
+        cov = self._cov[:self.n, :self.n]
+        std = np.sqrt(np.diag(cov))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = cov / np.outer(std, std)
+        return np.nan_to_num(corr)
+
+    def check_order(self, symbol: str, side: str, qty: float, price: float) -> Tuple[bool, str]:
+        """Simula el fill y verifica apalancamiento y VaR sin modificar el libro"""
+        return self.check_orders([(symbol, side, qty, price)])
+
+    def check_orders(self, orders: Sequence[Tuple[str, str, float, float]]) -> Tuple[bool, str]:
+        """
+        Como check_order pero con todas las órdenes aplicadas a la vez
+
+        Para patas de un mismo trade (arbitraje): la cobertura entre ellas
+        reduce el VaR combinado, que es el que se compara con el límite.
+        orders: (symbol, side, qty, price) por pata.
+        """
+        signed: Dict[str, float] = {}
+        prices: Dict[str, float] = {}
+        for symbol, side, qty, price in orders:
+            signed[symbol] = signed.get(symbol, 0.0) + (qty if side.upper() in ('BUY', 'LONG') else -qty)
+            prices.setdefault(symbol, price)
+
+        gross = self.gross_exposure()
+        delta = np.zeros(len(self.qty))
+        for symbol, change in signed.items():
+            i = self.symbol_index.get(symbol)
+            if i is None:
+                gross += abs(change * prices[symbol])  # sin historial: no aporta covarianza
+                continue
+            mark = self.mark[i] if self.mark[i] > 0 else prices[symbol]
+            new_value = (self.qty[i] + change) * mark
+            delta[i] = new_value - self.exposure[i]
+            gross += abs(new_value) - abs(self.exposure[i])
+        quad = self._quad + 2 * float(delta @ self._cov_w) + float(delta @ self._cov @ delta)
+
+        capacity = self.equity * self.leverage
+        if gross > capacity:
+            return False, f"Leverage limit exceeded: {gross / capacity:.0%} of {self.leverage}x"
+        var_pct = self.z_score * self.horizon_scale * np.sqrt(max(quad, 0.0)) / self.equity
+        if var_pct > self.max_var_pct:
+            return False, f"Portfolio VaR limit exceeded: {var_pct:.2%} > {self.max_var_pct:.2%}"
+        return True, "Within portfolio limits"
+
+    def get_metrics(self) -> Dict:
+        """Resumen de riesgo de la cartera"""
+        var_usd = self.portfolio_var()
+        return {
+            'net_exposure': self.net_exposure(),
+            'gross_exposure': self.gross_exposure(),
+            'portfolio_var_usd': var_usd,
+            'portfolio_var_pct': var_usd / self.equity if self.equity else 0.0,
+            'leverage_utilization': self.leverage_utilization(),
+            'realized_pnl': self.realized_pnl,
+            'observations': self._ret_count,
+        }
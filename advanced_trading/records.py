@@ -0,0 +1,186 @@
+"""
+Tipos de registro compactos compartidos por advanced_trading
+Dataclasses inmutables con __slots__ para señales, etapas de ejecución,
+órdenes y trades. Mantienen compatibilidad de lectura con los dicts que
+sustituyen (record['campo'], record.get('campo')) y se convierten a filas
+de BD sin copias intermedias.
+"""
+
+from dataclasses import dataclass, fields
+from datetime import datetime, timezone
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+
+# Dirección de la señal -> etiqueta de macro_events.impact (la que leen las ventanas de evento)
+MACRO_IMPACTS = {'BUY': 'BULLISH', 'SELL': 'BEARISH'}
+
+
+def _side(side: Optional[str]) -> Optional[str]:
+    """trades.side se guarda en mayúsculas (BUY/SELL) como order_intents"""
+    return side.upper() if side else side
+
+
+class _Record:
+    """Acceso estilo dict de sólo lectura y conversión a fila"""
+    __slots__ = ()
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__slots__
+
+    def keys(self) -> Tuple[str, ...]:
+        return self.__slots__
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def to_row(self) -> Dict[str, Any]:
+        """Columnas de la tabla destino (por defecto, todos los campos)"""
+        return self.to_dict()
+
+    @classmethod
+    def from_mapping(cls, data: Mapping[str, Any]):
+        """Construye el registro desde un dict ignorando claves desconocidas"""
+        names = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in names})
+
+
+@dataclass(frozen=True, slots=True)
+class MacroSignal(_Record):
+    """Resultado de MacroAnalyzer.analyze_event"""
+    event_type: str
+    consensus: float
+    actual: float
+    deviation: float
+    deviation_pct: float
+    impact_score: float
+    direction: str
+    timestamp: str
+    should_trade: bool
+    event_date: Optional[str] = None
+
+    def to_row(self) -> Dict[str, Any]:
+        """Fila para macro_events (sin event_date se usa el día del análisis)"""
+        return {
+            'event_type': self.event_type,
+            'event_date': self.event_date or self.timestamp[:10],
+            'consensus': self.consensus,
+            'actual': self.actual,
+            'deviation': self.deviation,
+            'surprise_bps': int(round(self.deviation * 100)),
+            'impact': MACRO_IMPACTS.get(self.direction, 'NEUTRAL'),
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class ExecutionStage(_Record):
+    """Etapa de un plan de ejecución escalonada"""
+    stage: str
+    amount: float
+    conditions: Optional[Tuple[str, ...]]
+    description: str
+    time_delay: float
+
+
+@dataclass(frozen=True, slots=True)
+class OrderRequest(_Record):
+    """Orden a enviar a un gateway"""
+    symbol: str
+    side: str
+    amount: float
+    type: str = 'market'
+    price: Optional[float] = None
+    client_order_id: Optional[str] = None
+    position_side: Optional[str] = None  # LONG/SHORT en hedge mode (None: según side)
+    reduce_only: bool = False            # cierre: no puede abrir posición nueva
+
+
+@dataclass(frozen=True, slots=True)
+class OrderResult(_Record):
+    """Resultado de colocar una orden"""
+    symbol: str
+    side: str
+    amount: float
+    type: str
+    status: str
+    timestamp: float
+    simulated: bool = True
+    order_id: Optional[str] = None
+    filled: float = 0.0
+    price: Optional[float] = None
+
+    def to_row(self) -> Dict[str, Any]:
+        """Fila para trades"""
+        return {
+            'symbol': self.symbol,
+            'side': _side(self.side),
+            'size': self.filled or self.amount,
+            'entry_price': self.price,
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class TradeRecord(_Record):
+    """Entrada del historial de ejecución"""
+    stage: str
+    amount: float
+    timestamp: float
+    symbol: Optional[str] = None
+    side: Optional[str] = None
+    order: Optional[OrderResult] = None
+    plan_id: Optional[str] = None
+    execution_time: float = 0.0
+    success: bool = False
+    event_id: Optional[int] = None
+
+    def to_row(self) -> Dict[str, Any]:
+        """Fila para trades"""
+        row = {
+            'event_id': self.event_id,
+            'symbol': self.symbol,
+            'side': _side(self.side),
+            'size': self.amount,
+            'execution_time_ms': int(self.execution_time * 1000),
+        }
+        if self.order is not None:
+            row['size'] = self.order.filled or self.order.amount
+            row['entry_price'] = self.order.price
+        return row
+
+
+@dataclass(frozen=True, slots=True)
+class MarketSnapshot(_Record):
+    """Último estado de mercado de un símbolo (compartido sin copias entre consumidores)"""
+    symbol: str
+    price: float
+    ts: float
+    bid: Optional[float] = None
+    ask: Optional[float] = None
+    volume: float = 0.0
+    recv_ts: float = 0.0
+    seq: int = 0
+
+    @property
+    def spread(self) -> float:
+        """Spread relativo al mid (0 si no hay libro)"""
+        if self.bid is None or self.ask is None or self.bid + self.ask <= 0:
+            return 0.0
+        return (self.ask - self.bid) / ((self.ask + self.bid) / 2)
+
+    def to_row(self) -> Dict[str, Any]:
+        """Fila para market_data"""
+        return {
+            'symbol': self.symbol,
+            'timestamp': datetime.fromtimestamp(self.ts, timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+            'close': self.price,
+            'volume': self.volume,
+            'spread_bps': self.spread * 10_000,
+        }
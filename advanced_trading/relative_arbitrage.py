@@ -7,8 +7,11 @@ Implementación completa según especificaciones de DS
 import numpy as np
 from typing import Dict, List, Optional, Tuple
 
+from advanced_trading.config.trading_config import TRADING_CONFIG
+
 class RelativeArbitrage:
-    def __init__(self, correlation_threshold: float = 0.7, divergence_threshold: float = 0.01):
+    def __init__(self, correlation_threshold: float = TRADING_CONFIG['CORRELATION_THRESHOLD'],
+                 divergence_threshold: float = 0.01):
         self.correlation_threshold = correlation_threshold
         self.divergence_threshold = divergence_threshold
         self.price_history = {'BTC/USDT': [], 'ETH/USDT': []}
@@ -102,6 +105,18 @@ class RelativeArbitrage:
             'divergence_threshold': self.divergence_threshold
         }
     
+    def checkpoint_state(self) -> Tuple[Dict[str, np.ndarray], Dict]:
+        """Historial como arrays para checkpoint.py"""
+        return {
+            'btc': np.asarray(self.price_history['BTC/USDT'], dtype=float),
+            'eth': np.asarray(self.price_history['ETH/USDT'], dtype=float),
+        }, {}
+
+    def restore_state(self, arrays: Dict[str, np.ndarray], meta: Dict):
+        """Restaura el historial desde un checkpoint (arrays posiblemente mmap)"""
+        self.price_history = {'BTC/USDT': arrays['btc'][-100:].tolist(),
+                              'ETH/USDT': arrays['eth'][-100:].tolist()}
+
     def reset_history(self):
         """Resetea el historial de precios"""
         self.price_history = {'BTC/USDT': [], 'ETH/USDT': []}
@@ -110,3 +125,19 @@ class RelativeArbitrage:
         """Actualiza los umbrales de detección"""
         self.correlation_threshold = correlation_threshold
         self.divergence_threshold = divergence_threshold
+
+    def apply_config(self, config):
+        """Aplica un RuntimeConfig recargado (CORRELATION_THRESHOLD); conserva el historial"""
+        self.correlation_threshold = config.trading['CORRELATION_THRESHOLD']
+
+def check_arbitrage_opportunity(btc_prices: List[float], eth_prices: List[float],
+                                lookback_period: int = 30, correlation_threshold: float = 0.7,
+                                divergence_threshold: float = 0.01) -> Optional[str]:
+    """
+    Función de conveniencia: señal de arbitraje (en minúsculas) sobre series dadas
+    """
+    arbitrage = RelativeArbitrage(correlation_threshold, divergence_threshold)
+    for btc_price, eth_price in zip(btc_prices, eth_prices):
+        arbitrage.update_prices(btc_price, eth_price)
+    opportunity = arbitrage.check_arbitrage_opportunity(lookback_period)
+    return opportunity['signal'].lower() if opportunity else None
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Harness de replay determinista de ticks
+Reproduce filas de market_data o ficheros de ticks grabados a través de
+MarketDataHub -> RelativeArbitrage / MacroAnalyzer -> StaggeredExecution
+sobre un reloj virtual: los asyncio.sleep de execute_plan avanzan con el
+tiempo de mercado y terminan al instante en tiempo real. Reporta ticks/s,
+latencia de decisión extremo a extremo y asignaciones de memoria.
+
+    python -m advanced_trading.replay --db trading_data.db --speed max
+"""
+
+import argparse
+import asyncio
+import csv
+import gc
+import heapq
+import itertools
+import json
+import sqlite3
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from advanced_trading.macro_analyzer import MacroAnalyzer
+from advanced_trading.market_data_hub import ArbitrageFeed, ExecutionMarketView, MarketDataHub
+from advanced_trading.order_gateway import SimulatedGateway
+from advanced_trading.records import MarketSnapshot
+from advanced_trading.relative_arbitrage import RelativeArbitrage
+from advanced_trading.staggered_execution import StaggeredExecution
+
+
+class VirtualClock:
+    """
+    Reloj virtual para asyncio
+
+    sleep() registra un temporizador en tiempo virtual; advance_to() despierta
+    en orden los temporizadores vencidos, de modo que el replay es
+    reproducible e independiente del tiempo de pared.
+    """
+
+    def __init__(self, start: float = 0.0):
+        self.now = start
+        self._timers: List = []
+        self._counter = itertools.count()
+
+    def time(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float):
+        if seconds <= 0:
+            await asyncio.sleep(0)
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._timers, (self.now + seconds, next(self._counter), future))
+        await future
+
+    async def advance_to(self, target: float):
+        """Avanza hasta target despertando (y dejando correr) cada temporizador vencido"""
+        while self._timers and self._timers[0][0] <= target:
+            deadline, _, future = heapq.heappop(self._timers)
+            self.now = max(self.now, deadline)
+            if not future.done():
+                future.set_result(None)
+            await asyncio.sleep(0)
+        self.now = max(self.now, target)
+
+    async def run_until_idle(self):
+        """Vacía todos los temporizadores pendientes"""
+        while self._timers:
+            await self.advance_to(self._timers[0][0])
+
+    @property
+    def pending(self) -> int:
+        return len(self._timers)
+
+
+# --- Fuentes de ticks ---
+
+def _parse_ts(value) -> float:
+    if isinstance(value, (int, float)):
+        return float(value) / 1000 if value > 1e11 else float(value)
+    text = str(value).strip()
+    try:
+        return _parse_ts(float(text))
+    except ValueError:
+        pass
+    dt = datetime.fromisoformat(text.replace('Z', '+00:00'))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def _snapshot(symbol: str, ts: float, price: float, volume: Optional[float] = None,
+              spread_bps: Optional[float] = None, bid: Optional[float] = None,
+              ask: Optional[float] = None) -> MarketSnapshot:
+    if bid is None and spread_bps:
+        half = price * spread_bps / 20_000
+        bid, ask = price - half, price + half
+    return MarketSnapshot(symbol, price, ts, bid=bid, ask=ask, volume=volume or 0.0, recv_ts=ts)
+
+
+def ticks_from_db(db_path: str, symbols: Optional[Iterable[str]] = None,
+                  start: Optional[str] = None, end: Optional[str] = None) -> Iterator[MarketSnapshot]:
+    """Filas de market_data (close como precio) ordenadas por timestamp"""
+    sql = 'SELECT symbol, timestamp, close, volume, spread_bps FROM market_data WHERE close IS NOT NULL'
+    params: List = []
+    if symbols:
+        symbols = list(symbols)
+        sql += f" AND symbol IN ({', '.join('?' for _ in symbols)})"
+        params += symbols
+    if start:
+        sql += ' AND timestamp >= ?'
+        params.append(start)
+    if end:
+        sql += ' AND timestamp <= ?'
+        params.append(end)
+    sql += ' ORDER BY timestamp, id'
+    conn = sqlite3.connect(db_path)
+    try:
+        for symbol, ts, close, volume, spread_bps in conn.execute(sql, params):
+            yield _snapshot(symbol, _parse_ts(ts), close, volume, spread_bps)
+    finally:
+        conn.close()
+
+
+def ticks_from_csv(path: str) -> Iterator[MarketSnapshot]:
+    """CSV con columnas symbol, ts (epoch s/ms o ISO), price y opcionales bid, ask, volume, spread_bps"""
+    def number(row: Dict, key: str) -> Optional[float]:
+        value = row.get(key)
+        return float(value) if value not in (None, '') else None
+
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            yield _snapshot(row['symbol'], _parse_ts(row['ts']), float(row['price']),
+                            number(row, 'volume'), number(row, 'spread_bps'),
+                            number(row, 'bid'), number(row, 'ask'))
+
+
+# --- Harness ---
+
+def _percentiles_us(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'max': 0.0}
+    values = np.array(samples) * 1e6
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {'p50': float(p50), 'p95': float(p95), 'p99': float(p99), 'max': float(values.max())}
+
+
+class ReplayHarness:
+    """Conecta hub, arbitraje, analyzer macro y ejecución sobre un reloj virtual"""
+
+    def __init__(self, ticks: Iterable[MarketSnapshot], macro_events: Optional[Iterable[Dict]] = None,
+                 speed: Optional[float] = None, capital: float = 10_000.0,
+                 btc_symbol: str = 'BTCUSDT', eth_symbol: str = 'ETHUSDT',
+                 macro_symbol: Optional[str] = None, arbitrage_lookback: int = 30):
+        self.ticks = ticks
+        self.speed = speed
+        self.capital = capital
+        self.macro_symbol = macro_symbol or btc_symbol
+        # Eventos macro: dicts con ts (epoch o ISO), event_type, consensus, actual
+        self.macro_events = sorted(
+            (dict(e, ts=_parse_ts(e['ts'])) for e in (macro_events or [])), key=lambda e: e['ts']
+        )
+
+        self.clock = VirtualClock()
+        self.hub = MarketDataHub(clock=self.clock.time)
+        self.arbitrage = RelativeArbitrage()
+        self.analyzer = MacroAnalyzer()
+        self.feed = ArbitrageFeed(self.hub, self.arbitrage, btc_symbol, eth_symbol,
+                                  on_signal=self._on_arbitrage_signal, lookback_period=arbitrage_lookback)
+        self.view = ExecutionMarketView(self.hub)
+        self.gateway = SimulatedGateway(
+            price_fn=lambda s: self.hub.latest(s).price if self.hub.latest(s) else None,
+            clock=self.clock.time, sleep=self.clock.sleep,
+        )
+        self.executor = StaggeredExecution(gateway=self.gateway, market_data=self.view,
+                                           sleep=self.clock.sleep, clock=self.clock.time)
+
+        self.decisions: List[Dict] = []
+        self.latencies: List[float] = []
+        self._published_at: Dict[int, float] = {}
+        self._executions: List[asyncio.Task] = []
+
+    def _on_arbitrage_signal(self, signal: Dict):
+        snapshot = self.feed.last_snapshot
+        self.latencies.append(time.perf_counter() - self._published_at[snapshot.seq])
+        self.decisions.append({'ts': snapshot.ts, 'kind': 'arbitrage', 'signal': signal['signal']})
+
+    def _fire_macro(self, event: Dict, trigger: MarketSnapshot):
+        event_date = datetime.fromtimestamp(event['ts'], timezone.utc).date().isoformat()
+        signal = self.analyzer.analyze_event(event['event_type'], event['consensus'], event['actual'],
+                                             event_date=event_date)
+        self.decisions.append({'ts': event['ts'], 'kind': 'macro', 'signal': signal.direction})
+        if signal.should_trade and signal.direction in ('BUY', 'SELL'):
+            plan = self.executor.generate_execution_plan(signal.direction, self.capital)
+            self._executions.append(asyncio.ensure_future(
+                self.executor.execute_plan(plan, self.macro_symbol, signal.direction)
+            ))
+        self.latencies.append(time.perf_counter() - self._published_at[trigger.seq])
+
+    async def run(self) -> Dict:
+        gc.collect()
+        blocks_before = sys.getallocatedblocks()
+        gc_before = sum(s['collections'] for s in gc.get_stats())
+        consumers = [asyncio.ensure_future(self.feed.run()), asyncio.ensure_future(self.view.run())]
+        pending_events = list(self.macro_events)
+        next_event = 0
+        n_ticks = 0
+        first_ts = last_ts = None
+
+        start = time.perf_counter()
+        for tick in self.ticks:
+            if first_ts is None:
+                first_ts = tick.ts
+                self.clock.now = tick.ts
+            elif self.speed:
+                await asyncio.sleep(max(0.0, (tick.ts - last_ts) / self.speed))
+            last_ts = tick.ts
+            await self.clock.advance_to(tick.ts)
+
+            published = self.hub.publish(tick)
+            self._published_at[published.seq] = time.perf_counter()
+            await self.hub.drain()
+            while next_event < len(pending_events) and pending_events[next_event]['ts'] <= tick.ts:
+                self._fire_macro(pending_events[next_event], published)
+                next_event += 1
+                await asyncio.sleep(0)
+            # drain() deja a los consumidores al día: ya nadie mide contra este tick
+            del self._published_at[published.seq]
+            n_ticks += 1
+
+        await self.clock.run_until_idle()
+        executed = [r for result in await asyncio.gather(*self._executions) for r in result]
+        for subscription in (self.feed.subscription, self.view.subscription):
+            subscription.close()
+        await asyncio.gather(*consumers)
+        wall = time.perf_counter() - start
+
+        return {
+            'ticks': n_ticks,
+            'wall_sec': wall,
+            'ticks_per_sec': n_ticks / wall if wall > 0 else 0.0,
+            'virtual_span_sec': (last_ts - first_ts) if n_ticks else 0.0,
+            'decisions': len(self.decisions),
+            'orders': len(executed),
+            'decision_latency_us': _percentiles_us(self.latencies),
+            'allocated_blocks_delta': sys.getallocatedblocks() - blocks_before,
+            'gc_collections': sum(s['collections'] for s in gc.get_stats()) - gc_before,
+            'conflated': sum(s['conflated'] for s in self.hub.metrics()['subscribers'].values()),
+        }
+
+
+def run_replay(ticks: Iterable[MarketSnapshot], **kwargs) -> Dict:
+    """Ejecuta un replay completo en un loop nuevo"""
+    return asyncio.run(ReplayHarness(ticks, **kwargs).run())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay determinista de ticks')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--db', help='BD con tabla market_data')
+    source.add_argument('--csv', help='Fichero de ticks grabados')
+    parser.add_argument('--symbols', nargs='*', default=['BTCUSDT', 'ETHUSDT'])
+    parser.add_argument('--speed', default='max', help="'max', 1 (tiempo real) o N veces")
+    parser.add_argument('--events', help='JSON con eventos macro [{ts, event_type, consensus, actual}]')
+    args = parser.parse_args(argv)
+
+    ticks = ticks_from_db(args.db, args.symbols) if args.db else ticks_from_csv(args.csv)
+    events = None
+    if args.events:
+        with open(args.events) as f:
+            events = json.load(f)
+    speed = None if args.speed == 'max' else float(args.speed)
+    report = run_replay(ticks, macro_events=events, speed=speed)
+
+    latency = report['decision_latency_us']
+    print(f"✅ Replay: {report['ticks']} ticks en {report['wall_sec']:.3f}s "
+          f"({report['ticks_per_sec']:,.0f} ticks/s)")
+    print(f"   🧠 Decisiones: {report['decisions']} | Órdenes: {report['orders']}")
+    print(f"   ⏱️ Latencia decisión: p50 {latency['p50']:.0f}µs p95 {latency['p95']:.0f}µs "
+          f"p99 {latency['p99']:.0f}µs")
+    print(f"   📦 Bloques asignados: {report['allocated_blocks_delta']:+d} | GC: {report['gc_collections']}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
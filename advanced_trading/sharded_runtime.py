@@ -0,0 +1,454 @@
+"""
+Runtime por shards: evaluación de estrategias en varios procesos
+El coordinador (proceso principal) recibe los ticks del MarketDataHub y los
+escribe en un buffer de memoria compartida; cada worker evalúa los pares que
+tiene asignados leyendo directamente de ese buffer, sin serializar precios.
+Sólo las señales (raras) vuelven por una cola: un worker emite cuando un par
+entra en divergencia o cambia de sentido, no en cada tick mientras persiste. El coordinador conserva el
+routing de órdenes y el riesgo de cartera (PortfolioRisk).
+
+Los pares son (ARBITRAGE_ANCHOR, símbolo) para cada símbolo de
+config/binance_limits.yaml; un RelativeArbitrage por par.
+
+    runtime = ShardedRuntime(load_symbols()).start()
+    coordinator = Coordinator(runtime, PortfolioRisk(equity=10_000), gateway)
+    await coordinator.run(hub)
+"""
+
+import asyncio
+import logging
+import multiprocessing as mp
+import os
+import queue
+import time
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import yaml
+
+from advanced_trading.config.trading_config import TRADING_CONFIG
+from advanced_trading.leader_election import idempotency_key
+from advanced_trading.metrics import REGISTRY, SIGNALS
+from advanced_trading.records import MarketSnapshot, OrderRequest, OrderResult
+
+logger = logging.getLogger(__name__)
+
+LIMITS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'config', 'binance_limits.yaml')
+STAT_FIELDS = ('cpu_sec', 'wall_sec', 'evaluations', 'signals', 'heartbeat')
+
+SHARD_CPU = REGISTRY.gauge('trading_shard_cpu_seconds', 'CPU consumida por cada shard', ['shard'])
+SHARD_EVALUATIONS = REGISTRY.gauge('trading_shard_evaluations', 'Evaluaciones de pares por shard', ['shard'])
+
+
+def load_symbols(path: str = LIMITS_PATH) -> List[str]:
+    """Símbolos con cantidad mínima en binance_limits.yaml"""
+    with open(path) as f:
+        limits = yaml.safe_load(f)
+    return [s for s in limits['binance']['min_quantities'] if s != 'DEFAULT']
+
+
+def assign_shards(pairs: Sequence[Tuple[str, str]], workers: int) -> List[List[Tuple[str, str]]]:
+    """Reparto round-robin estable (mismo orden de entrada = mismos shards)"""
+    shards: List[List[Tuple[str, str]]] = [[] for _ in range(max(1, workers))]
+    for i, pair in enumerate(pairs):
+        shards[i % len(shards)].append(pair)
+    return [s for s in shards if s]
+
+
+# --- Memoria compartida ---
+
+@dataclass(frozen=True)
+class BufferLayout:
+    """Disposición del bloque compartido (se pasa tal cual a los workers)"""
+    symbols: Tuple[str, ...]
+    capacity: int
+    workers: int
+
+    @property
+    def n(self) -> int:
+        return len(self.symbols)
+
+    def offsets(self) -> Dict[str, Tuple[int, Tuple[int, ...], type]]:
+        n, c = self.n, self.capacity
+        seq = 0
+        prices = seq + 8 * n
+        stamps = prices + 8 * n * c
+        stats = stamps + 8 * n * c
+        return {
+            'seq': (seq, (n,), np.int64),
+            'prices': (prices, (n, c), np.float64),
+            'ts': (stamps, (n, c), np.float64),
+            'stats': (stats, (self.workers, len(STAT_FIELDS)), np.float64),
+        }
+
+    @property
+    def size(self) -> int:
+        return 8 * (self.n * (1 + 2 * self.capacity) + self.workers * len(STAT_FIELDS))
+
+
+class SharedPriceBuffer:
+    """
+    Anillo de precios por símbolo en shared_memory
+
+    Un único escritor (el coordinador): escribe precio y ts en la posición
+    seq % capacity y publica seq después, así que un lector que ve seq=k
+    puede leer la posición k-1 mientras no se quede capacity ticks atrás.
+    La tabla stats tiene una fila por worker y sólo la escribe ese worker.
+    """
+
+    def __init__(self, layout: BufferLayout, shm: shared_memory.SharedMemory, owner: bool):
+        self.layout = layout
+        self.index = {s: i for i, s in enumerate(layout.symbols)}
+        self._shm = shm
+        self._owner = owner
+        for name, (offset, shape, dtype) in layout.offsets().items():
+            setattr(self, name, np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset))
+
+    @classmethod
+    def create(cls, layout: BufferLayout) -> 'SharedPriceBuffer':
+        shm = shared_memory.SharedMemory(create=True, size=layout.size)
+        buffer = cls(layout, shm, owner=True)
+        buffer.seq[:] = 0
+        buffer.stats[:] = 0
+        return buffer
+
+    @classmethod
+    def attach(cls, name: str, layout: BufferLayout) -> 'SharedPriceBuffer':
+        # Los workers comparten el resource_tracker del coordinador: el
+        # registro es idempotente y el unlink lo hace sólo el propietario
+        return cls(layout, shared_memory.SharedMemory(name=name), owner=False)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def write(self, i: int, ts: float, price: float):
+        seq = int(self.seq[i])
+        pos = seq % self.layout.capacity
+        self.prices[i, pos] = price
+        self.ts[i, pos] = ts
+        self.seq[i] = seq + 1  # publicar al final
+
+    def latest(self, i: int) -> Tuple[int, float, float]:
+        """(seq, ts, precio) del último tick; seq=0 si no hay datos"""
+        seq = int(self.seq[i])
+        if seq == 0:
+            return 0, 0.0, 0.0
+        pos = (seq - 1) % self.layout.capacity
+        return seq, float(self.ts[i, pos]), float(self.prices[i, pos])
+
+    def window(self, i: int, n: int) -> np.ndarray:
+        """Copia de los últimos n precios en orden cronológico"""
+        seq = int(self.seq[i])
+        n = min(n, seq, self.layout.capacity)
+        positions = np.arange(seq - n, seq) % self.layout.capacity
+        return self.prices[i, positions].copy()
+
+    def close(self):
+        # Las vistas numpy mantienen exportado el buffer: hay que soltarlas antes
+        for name in self.layout.offsets():
+            setattr(self, name, None)
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+# --- Worker ---
+
+@dataclass(frozen=True)
+class ShardParams:
+    lookback_period: int = 30
+    correlation_threshold: float = TRADING_CONFIG['CORRELATION_THRESHOLD']
+    divergence_threshold: float = 0.01
+    poll_interval: float = 0.05
+    stats_interval: float = 0.5
+
+
+def _pair_signal(shard: int, pair: Tuple[str, str], opportunity: Dict, prices: Tuple[float, float],
+                 ts: float) -> Dict:
+    anchor, symbol = pair
+    # RelativeArbitrage nombra las patas BTC (anchor) y ETH (symbol)
+    long_symbol = opportunity['signal'] == 'LONG_ETH_SHORT_BTC'
+    return {
+        'shard': shard,
+        'pair': pair,
+        'signal': opportunity['signal'],
+        'legs': ((symbol, 'BUY'), (anchor, 'SELL')) if long_symbol else ((anchor, 'BUY'), (symbol, 'SELL')),
+        'prices': {anchor: prices[0], symbol: prices[1]},
+        'correlation': opportunity['correlation'],
+        'divergence': opportunity['divergence'],
+        'ts': ts,
+    }
+
+
+def _shard_main(shard: int, shm_name: str, layout: BufferLayout, pairs: List[Tuple[str, str]],
+                params: ShardParams, wake, stop, out):
+    """
+    Bucle de un worker: un punto por par cuando ambas patas tienen tick nuevo
+
+    La señal de un par se emite al abrirse la divergencia (o al invertirse);
+    vuelve a poder emitirse cuando el par deja de estar en divergencia.
+    """
+    from advanced_trading.relative_arbitrage import RelativeArbitrage
+
+    buffer = SharedPriceBuffer.attach(shm_name, layout)
+    legs = [(buffer.index[a], buffer.index[b]) for a, b in pairs]
+    strategies = [RelativeArbitrage(params.correlation_threshold, params.divergence_threshold) for _ in pairs]
+    seen = np.zeros((len(pairs), 2), dtype=np.int64)
+    active: List[Optional[str]] = [None] * len(pairs)  # señal abierta por par
+    stats = buffer.stats[shard]
+    wall0, cpu0 = time.monotonic(), time.process_time()
+    next_stats = 0.0
+    evaluations = signals = 0
+    stats[:] = (0.0, 0.0, 0, 0, time.time())  # heartbeat != 0: listo
+    try:
+        while not stop.is_set():
+            wake.wait(params.poll_interval)
+            wake.clear()
+            for k, (a, b) in enumerate(legs):
+                seq_a, ts_a, price_a = buffer.latest(a)
+                seq_b, ts_b, price_b = buffer.latest(b)
+                if seq_a == seen[k, 0] or seq_b == seen[k, 1]:
+                    continue
+                seen[k] = (seq_a, seq_b)
+                strategy = strategies[k]
+                strategy.update_prices(price_a, price_b)
+                evaluations += 1
+                opportunity = strategy.check_arbitrage_opportunity(params.lookback_period)
+                current = opportunity['signal'] if opportunity else None
+                if current is not None and current != active[k]:  # sólo transiciones
+                    signals += 1
+                    out.put(_pair_signal(shard, pairs[k], opportunity, (price_a, price_b), max(ts_a, ts_b)))
+                active[k] = current
+            now = time.monotonic()
+            if now >= next_stats:
+                stats[:] = (time.process_time() - cpu0, now - wall0, evaluations, signals, time.time())
+                next_stats = now + params.stats_interval
+        stats[:] = (time.process_time() - cpu0, time.monotonic() - wall0, evaluations, signals, time.time())
+    finally:
+        del stats
+        buffer.close()
+
+
+# --- Coordinador ---
+
+class ShardedRuntime:
+    """Procesos de estrategia + buffer compartido; el proceso actual es el coordinador"""
+
+    def __init__(self, symbols: Optional[Iterable[str]] = None, workers: Optional[int] = None,
+                 anchor: str = TRADING_CONFIG['ARBITRAGE_ANCHOR'],
+                 capacity: int = TRADING_CONFIG['SHARD_BUFFER_TICKS'],
+                 params: Optional[ShardParams] = None, context: str = 'spawn'):
+        symbols = list(dict.fromkeys(symbols or load_symbols()))
+        if anchor not in symbols:
+            symbols.insert(0, anchor)
+        self.anchor = anchor
+        self.pairs = [(anchor, s) for s in symbols if s != anchor]
+        if workers is None or workers <= 0:
+            workers = TRADING_CONFIG['SHARD_WORKERS'] or max(1, (os.cpu_count() or 2) - 1)
+        self.shards = assign_shards(self.pairs, workers)
+        self.layout = BufferLayout(tuple(symbols), capacity, len(self.shards))
+        self.params = params or ShardParams()
+        self._ctx = mp.get_context(context)
+        self.buffer: Optional[SharedPriceBuffer] = None
+        self._processes: List = []
+        self._wakes: List = []
+        self._stop = None
+        self._signals = None
+        self._symbol_shards: Dict[int, List[int]] = {}
+        self._last_stats: Dict[int, Tuple[float, float]] = {}
+
+    def _wait_ready(self, timeout: float):
+        """Espera a que cada worker haya adjuntado el buffer (spawn tarda)"""
+        deadline = time.monotonic() + timeout
+        heartbeat = STAT_FIELDS.index('heartbeat')
+        while not (self.buffer.stats[:, heartbeat] > 0).all():
+            dead = [p.name for p in self._processes if not p.is_alive()]
+            if dead or time.monotonic() > deadline:
+                self.stop()
+                raise RuntimeError(f"Shards sin arrancar: {dead or 'timeout'}")
+            time.sleep(0.01)
+
+    def start(self, ready_timeout: float = 30.0) -> 'ShardedRuntime':
+        if self.buffer is not None:
+            return self
+        self.buffer = SharedPriceBuffer.create(self.layout)
+        self._stop = self._ctx.Event()
+        self._signals = self._ctx.Queue()
+        for shard, pairs in enumerate(self.shards):
+            wake = self._ctx.Event()
+            process = self._ctx.Process(
+                target=_shard_main, name=f'shard-{shard}', daemon=True,
+                args=(shard, self.buffer.name, self.layout, pairs, self.params, wake, self._stop, self._signals),
+            )
+            process.start()
+            self._processes.append(process)
+            self._wakes.append(wake)
+            for pair in pairs:
+                for symbol in pair:
+                    self._symbol_shards.setdefault(self.buffer.index[symbol], []).append(shard)
+            SHARD_CPU.labels(shard).set_function(lambda shard=shard: self.buffer.stats[shard, 0])
+            SHARD_EVALUATIONS.labels(shard).set_function(lambda shard=shard: self.buffer.stats[shard, 2])
+        self._symbol_shards = {i: sorted(set(s)) for i, s in self._symbol_shards.items()}
+        self._wait_ready(ready_timeout)
+        logger.info("🧩 %d pares en %d shards", len(self.pairs), len(self.shards))
+        return self
+
+    def stop(self, timeout: float = 5.0):
+        if self.buffer is None:
+            return
+        self._stop.set()
+        for wake in self._wakes:
+            wake.set()
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        for shard in range(len(self.shards)):
+            SHARD_CPU.remove(shard)
+            SHARD_EVALUATIONS.remove(shard)
+        self._signals.close()
+        self._signals.join_thread()
+        self.buffer.close()
+        self.buffer = None
+        self._processes, self._wakes = [], []
+
+    def __enter__(self) -> 'ShardedRuntime':
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def publish(self, snapshot: MarketSnapshot) -> bool:
+        """Escribe el tick en memoria compartida y despierta a los shards afectados"""
+        i = self.buffer.index.get(snapshot.symbol)
+        if i is None:
+            return False
+        self.buffer.write(i, snapshot.ts, snapshot.price)
+        for shard in self._symbol_shards.get(i, ()):
+            self._wakes[shard].set()
+        return True
+
+    def signals(self, timeout: float = 0.0) -> List[Dict]:
+        """Señales pendientes (espera hasta timeout por la primera)"""
+        found = []
+        try:
+            found.append(self._signals.get(timeout=timeout) if timeout > 0 else self._signals.get_nowait())
+            while True:
+                found.append(self._signals.get_nowait())
+        except queue.Empty:
+            pass
+        return found
+
+    def shard_stats(self) -> List[Dict]:
+        """Por shard: CPU acumulada y utilización desde la consulta anterior"""
+        report = []
+        for shard, pairs in enumerate(self.shards):
+            row = dict(zip(STAT_FIELDS, (float(v) for v in self.buffer.stats[shard])))
+            cpu, wall = row['cpu_sec'], row['wall_sec']
+            prev_cpu, prev_wall = self._last_stats.get(shard, (0.0, 0.0))
+            row['utilization'] = (cpu - prev_cpu) / (wall - prev_wall) if wall > prev_wall else 0.0
+            self._last_stats[shard] = (cpu, wall)
+            row.update(shard=shard, pairs=len(pairs), alive=self._processes[shard].is_alive())
+            report.append(row)
+        return report
+
+
+class Coordinator:
+    """
+    Routing de órdenes y riesgo de cartera en el proceso principal
+
+    Cada señal de un shard se dimensiona con calculate_position_sizes, pasa
+    por PortfolioRisk.check_orders con las dos patas juntas (la cobertura
+    entre ellas cuenta en el VaR) y se envía con place_legs.
+    """
+
+    def __init__(self, runtime: ShardedRuntime, risk, gateway=None,
+                 risk_pct: float = TRADING_CONFIG['ARBITRAGE_RISK_PCT'], mark_interval: float = 60.0,
+                 on_result: Optional[Callable[[Dict, List[OrderResult]], None]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.runtime = runtime
+        self.risk = risk
+        self.gateway = gateway  # None = sólo decisiones (dry-run)
+        self.risk_pct = risk_pct
+        self.mark_interval = mark_interval
+        self.on_result = on_result
+        self.decisions: List[Dict] = []
+        self._clock = clock
+        self._next_mark = 0.0
+
+    def mark_to_market(self):
+        """Una fila de retornos por intervalo con el último precio de cada símbolo"""
+        buffer = self.runtime.buffer
+        prices = {}
+        for symbol, i in buffer.index.items():
+            seq, _, price = buffer.latest(i)
+            if seq:
+                prices[symbol] = price
+        if prices:
+            self.risk.update_prices(prices)
+        self._next_mark = self._clock() + self.mark_interval
+
+    def size_legs(self, signal: Dict) -> List[OrderRequest]:
+        from advanced_trading.relative_arbitrage import RelativeArbitrage
+
+        anchor, symbol = signal['pair']
+        prices = signal['prices']
+        anchor_qty, symbol_qty = RelativeArbitrage().calculate_position_sizes(
+            prices[anchor], prices[symbol], self.risk.equity, self.risk_pct)
+        quantities = {anchor: anchor_qty, symbol: symbol_qty}  # mismo nocional en ambas patas
+        # client_order_id determinista por señal y pata: una pata en duda se busca por él
+        return [OrderRequest(leg, side, quantities[leg],
+                             client_order_id=idempotency_key('arbitrage', signal['pair'], signal['signal'],
+                                                             signal['ts'], leg))
+                for leg, side in signal['legs']]
+
+    async def handle(self, signal: Dict) -> Optional[List[OrderResult]]:
+        SIGNALS.labels('arbitrage', signal['signal']).inc()
+        requests = self.size_legs(signal)
+        ok, reason = self.risk.check_orders([(r.symbol, r.side, r.amount, signal['prices'][r.symbol])
+                                             for r in requests])
+        if not ok:
+            self.decisions.append({'signal': signal, 'accepted': False, 'reason': reason})
+            logger.info("🛑 Señal %s %s rechazada: %s", signal['pair'], signal['signal'], reason)
+            return None
+        self.decisions.append({'signal': signal, 'accepted': True, 'orders': requests})
+        if self.gateway is None:
+            return []
+        results = await self.gateway.place_legs(requests)
+        for result in results:
+            if result.filled:
+                self.risk.on_fill(result.symbol, result.side, result.filled,
+                                  result.price or signal['prices'][result.symbol])
+        if self.on_result:
+            self.on_result(signal, results)
+        return results
+
+    async def drain(self):
+        if self._clock() >= self._next_mark:
+            self.mark_to_market()
+        for signal in self.runtime.signals():
+            await self.handle(signal)
+
+    async def run(self, hub, drain_interval: float = 0.05):
+        """Reenvía los ticks del hub a los shards y atiende sus señales"""
+        subscription = hub.subscribe('sharded-runtime', self.runtime.layout.symbols)
+
+        async def pump():
+            async for snapshot in subscription:
+                self.runtime.publish(snapshot)
+
+        pump_task = asyncio.ensure_future(pump())
+        try:
+            while not pump_task.done():
+                await asyncio.sleep(drain_interval)
+                await self.drain()
+            await asyncio.sleep(drain_interval)  # últimas señales en vuelo
+            await self.drain()
+        finally:
+            pump_task.cancel()
+            hub.unsubscribe(subscription)
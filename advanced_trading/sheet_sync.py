@@ -0,0 +1,233 @@
+"""
+Caché local y sincronización delta de la pestaña Events de Google Sheets
+Guarda el último rango descargado en SQLite junto con un manifiesto de
+ETag/versión y hash por fila; sólo aplica las filas que cambian y sirve las
+lecturas desde la caché, de modo que el arranque y los readiness checks no
+dependen de la latencia ni de la cuota de Sheets.
+"""
+
+import base64
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CACHE_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS sheet_manifest (
+        sheet_key TEXT PRIMARY KEY,
+        etag TEXT,
+        header TEXT,
+        row_count INTEGER,
+        synced_at REAL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS sheet_rows (
+        sheet_key TEXT NOT NULL,
+        row_index INTEGER NOT NULL,
+        row_hash TEXT NOT NULL,
+        row_json TEXT NOT NULL,
+        PRIMARY KEY (sheet_key, row_index)
+    )
+    """,
+]
+
+
+class SheetFetch(NamedTuple):
+    """Resultado de una descarga: rows es None si el rango no cambió"""
+    etag: Optional[str]
+    rows: Optional[List[List[str]]]
+
+
+class CachedSheetEvent(NamedTuple):
+    """Evento leído de la caché (mismos atributos que usa el readiness check)"""
+    id: str
+    kind: str
+    symbols: List[str]
+    raw: Dict[str, str]
+
+
+def row_hash(row: List[str]) -> str:
+    return hashlib.blake2b(json.dumps(row, ensure_ascii=False).encode(), digest_size=16).hexdigest()
+
+
+class GoogleSheetsBackend:
+    """
+    Backend real de Google Sheets
+
+    Consulta primero la versión del fichero en Drive (llamada de metadatos
+    barata) y sólo descarga los valores si cambió respecto al ETag guardado.
+    """
+
+    def __init__(self, credentials_b64: Optional[str] = None):
+        from google.oauth2 import service_account
+        from googleapiclient.discovery import build
+
+        info = json.loads(base64.b64decode(credentials_b64 or os.environ['GOOGLE_SHEETS_CREDENTIALS_B64']))
+        credentials = service_account.Credentials.from_service_account_info(info, scopes=[
+            'https://www.googleapis.com/auth/spreadsheets.readonly',
+            'https://www.googleapis.com/auth/drive.metadata.readonly',
+        ])
+        self._sheets = build('sheets', 'v4', credentials=credentials, cache_discovery=False)
+        self._drive = build('drive', 'v3', credentials=credentials, cache_discovery=False)
+
+    def fetch(self, spreadsheet_id: str, range_name: str, etag: Optional[str] = None) -> SheetFetch:
+        version = None
+        try:
+            version = self._drive.files().get(fileId=spreadsheet_id, fields='version').execute().get('version')
+        except Exception as e:  # sin permiso de Drive: descarga completa
+            logger.warning(f"⚠️ No se pudo leer la versión del sheet: {e}")
+        new_etag = f'{version}:{range_name}' if version else None
+        if new_etag is not None and new_etag == etag:
+            return SheetFetch(etag, None)
+        result = self._sheets.spreadsheets().values().get(
+            spreadsheetId=spreadsheet_id, range=range_name
+        ).execute()
+        return SheetFetch(new_etag, result.get('values', []))
+
+
+class InMemorySheetsBackend:
+    """Backend falso en memoria para tests y desarrollo local"""
+
+    def __init__(self, rows: Optional[List[List[str]]] = None):
+        self.rows = [list(r) for r in rows or []]
+        self.version = 1
+        self.downloads = 0
+        self.fetches = 0
+
+    def set_rows(self, rows: List[List[str]]):
+        self.rows = [list(r) for r in rows]
+        self.version += 1
+
+    def fetch(self, spreadsheet_id: str, range_name: str, etag: Optional[str] = None) -> SheetFetch:
+        self.fetches += 1
+        current = f'{self.version}:{range_name}'
+        if etag == current:
+            return SheetFetch(etag, None)
+        self.downloads += 1
+        return SheetFetch(current, [list(r) for r in self.rows])
+
+
+class SheetSync:
+    """Sincroniza un rango de Sheets contra la caché SQLite"""
+
+    def __init__(self, db_path: str, backend, spreadsheet_id: str, range_name: str):
+        self.db_path = db_path
+        self.backend = backend
+        self.spreadsheet_id = spreadsheet_id
+        self.range_name = range_name
+        self.sheet_key = f'{spreadsheet_id}!{range_name}'
+        conn = self._connect()
+        try:
+            for ddl in CACHE_SCHEMA:
+                conn.execute(ddl)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path)
+
+    def _manifest(self, conn: sqlite3.Connection) -> Tuple[Optional[str], Optional[float]]:
+        row = conn.execute(
+            'SELECT etag, synced_at FROM sheet_manifest WHERE sheet_key = ?', (self.sheet_key,)
+        ).fetchone()
+        return (row[0], row[1]) if row else (None, None)
+
+    def sync(self) -> Dict[str, int]:
+        """Descarga sólo si cambió la versión y aplica las filas modificadas"""
+        conn = self._connect()
+        try:
+            etag, _ = self._manifest(conn)
+            fetched = self.backend.fetch(self.spreadsheet_id, self.range_name, etag)
+            if fetched.rows is None:
+                with conn:
+                    conn.execute('UPDATE sheet_manifest SET synced_at = ? WHERE sheet_key = ?',
+                                 (time.time(), self.sheet_key))
+                return {'downloaded': 0, 'changed': 0, 'deleted': 0}
+
+            header, data = (fetched.rows[0], fetched.rows[1:]) if fetched.rows else ([], [])
+            cached = dict(conn.execute(
+                'SELECT row_index, row_hash FROM sheet_rows WHERE sheet_key = ?', (self.sheet_key,)
+            ))
+            changed = []
+            for index, row in enumerate(data):
+                digest = row_hash(row)
+                if cached.get(index) != digest:
+                    changed.append((self.sheet_key, index, digest, json.dumps(row, ensure_ascii=False)))
+
+            with conn:
+                conn.executemany(
+                    'INSERT OR REPLACE INTO sheet_rows (sheet_key, row_index, row_hash, row_json) VALUES (?, ?, ?, ?)',
+                    changed,
+                )
+                deleted = conn.execute(
+                    'DELETE FROM sheet_rows WHERE sheet_key = ? AND row_index >= ?', (self.sheet_key, len(data))
+                ).rowcount
+                conn.execute(
+                    'INSERT OR REPLACE INTO sheet_manifest (sheet_key, etag, header, row_count, synced_at) VALUES (?, ?, ?, ?, ?)',
+                    (self.sheet_key, fetched.etag, json.dumps(header, ensure_ascii=False), len(data), time.time()),
+                )
+            return {'downloaded': 1, 'changed': len(changed), 'deleted': deleted}
+        finally:
+            conn.close()
+
+    def cache_age(self) -> Optional[float]:
+        """Segundos desde la última sincronización correcta (None si nunca se sincronizó)"""
+        conn = self._connect()
+        try:
+            _, synced_at = self._manifest(conn)
+        finally:
+            conn.close()
+        return time.time() - synced_at if synced_at is not None else None
+
+    def sync_if_stale(self, max_age_sec: float) -> Optional[Dict[str, int]]:
+        """Sincroniza sólo si la caché es más antigua que max_age_sec"""
+        age = self.cache_age()
+        if age is not None and age < max_age_sec:
+            return None
+        return self.sync()
+
+    def read_rows(self) -> List[Dict[str, str]]:
+        """Filas de la caché como dicts indexados por la cabecera"""
+        conn = self._connect()
+        try:
+            header_row = conn.execute(
+                'SELECT header FROM sheet_manifest WHERE sheet_key = ?', (self.sheet_key,)
+            ).fetchone()
+            if not header_row:
+                return []
+            header = [h.strip() for h in json.loads(header_row[0])]
+            rows = conn.execute(
+                'SELECT row_json FROM sheet_rows WHERE sheet_key = ? ORDER BY row_index', (self.sheet_key,)
+            )
+            return [dict(zip(header, json.loads(r[0]))) for r in rows]
+        finally:
+            conn.close()
+
+    def read_events(self) -> List[CachedSheetEvent]:
+        """Eventos con columnas id / kind / symbols (insensible a mayúsculas)"""
+        events = []
+        for row in self.read_rows():
+            lowered = {k.lower(): (v or '').strip() for k, v in row.items()}
+            if not lowered.get('id'):
+                continue
+            symbols = [s.strip() for s in lowered.get('symbols', '').split(',') if s.strip()]
+            events.append(CachedSheetEvent(lowered['id'], lowered.get('kind', ''), symbols, row))
+        return events
+
+
+def sheet_sync_from_env(db_path: Optional[str] = None, backend=None) -> SheetSync:
+    """SheetSync para EVENT_SHEET_ID / EVENT_SHEET_RANGE"""
+    return SheetSync(
+        db_path or os.getenv('SHEET_CACHE_DB', 'trading_data.db'),
+        backend or GoogleSheetsBackend(),
+        os.environ['EVENT_SHEET_ID'],
+        os.environ['EVENT_SHEET_RANGE'],
+    )
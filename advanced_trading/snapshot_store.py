@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Snapshots y rollback de parámetros (SNAPSHOT_ROLLBACK)
+Cada conjunto de parámetros se guarda una sola vez bajo el hash BLAKE2 de su
+JSON canónico (objects/<digest>.json). El parámetro activo es params.json,
+que se sustituye con os.replace: activar o hacer rollback es un cambio de
+puntero atómico que ActiveParams detecta sin reiniciar el motor (el
+ConfigReloader de main_trading_engine lo superpone a TRADING_CONFIG). El hash de
+datos se mantiene con checksums encadenados por tabla que sólo procesan las
+filas nuevas desde la última vez; UPDATE/DELETE se detectan con un contador
+de versión por tabla mantenido por triggers y fuerzan el recálculo.
+
+    python -m advanced_trading.snapshot_store list
+    python -m advanced_trading.snapshot_store rollback --reason "métricas degradadas"
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from advanced_trading.config.trading_config import TRADING_CONFIG
+from advanced_trading.db_schema import ensure_schema
+
+SNAPSHOT_CONFIG = TRADING_CONFIG['SNAPSHOT_ROLLBACK']
+DIGEST_SIZE = 16
+DATA_HASH_TABLES = ('events', 'macro_events', 'token_events', 'market_data', 'trades')
+
+
+def canonical_json(params: Dict[str, Any]) -> str:
+    """JSON determinista: claves ordenadas, sin espacios"""
+    return json.dumps(params, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+
+
+def params_digest(params: Dict[str, Any]) -> str:
+    return hashlib.blake2b(canonical_json(params).encode(), digest_size=DIGEST_SIZE).hexdigest()
+
+
+def atomic_write(path: str, text: str):
+    """Escribe en un temporal del mismo directorio, fsync y os.replace"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+
+# --- Hash de datos incremental ---
+
+class DataHasher:
+    """
+    Checksum encadenado por tabla: d' = BLAKE2(d || fila) para cada fila nueva
+
+    El estado (último id, nº de filas, digest) se guarda en data_checksums;
+    update() sólo lee filas con id > último id. Los triggers de la tabla
+    suben data_versions.version en cada UPDATE o DELETE: si la versión no es
+    la ya hasheada (modificaciones in situ, borrados o purgas) la tabla se
+    recalcula entera. Una tabla sin fila en data_versions (triggers recién
+    instalados) también se recalcula, porque pudo cambiar sin registrarse.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, tables: Iterable[str] = DATA_HASH_TABLES):
+        self.conn = conn
+        self.tables = tuple(tables)
+        ensure_schema(conn, ['data_checksums', 'data_versions'])
+
+    def _state(self, table: str) -> Tuple[int, int, bytes]:
+        row = self.conn.execute(
+            'SELECT last_id, n_rows, digest FROM data_checksums WHERE table_name = ?', (table,)
+        ).fetchone()
+        if row is None:
+            return 0, 0, b''
+        return row[0], row[1], bytes.fromhex(row[2])
+
+    def _table_exists(self, table: str) -> bool:
+        return self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone() is not None
+
+    def _version(self, table: str) -> Tuple[int, int]:
+        """(versión actual, versión hasheada); instala los triggers la primera vez"""
+        row = self.conn.execute(
+            'SELECT version, hashed_version FROM data_versions WHERE table_name = ?', (table,)
+        ).fetchone()
+        if row is not None:
+            return row
+        bump = (f"INSERT INTO data_versions (table_name, version) VALUES ('{table}', 1) "
+                'ON CONFLICT (table_name) DO UPDATE SET version = version + 1;')
+        with self.conn:
+            for event in ('UPDATE', 'DELETE'):
+                self.conn.execute(f'CREATE TRIGGER IF NOT EXISTS trg_{table}_data_version_{event.lower()} '
+                                  f'AFTER {event} ON {table} BEGIN {bump} END')
+            self.conn.execute('INSERT OR IGNORE INTO data_versions (table_name) VALUES (?)', (table,))
+        return 0, -1
+
+    def update_table(self, table: str, full: bool = False) -> str:
+        if not self._table_exists(table):
+            return ''
+        version, hashed_version = self._version(table)
+        if full or version != hashed_version:
+            last_id, n_rows, digest = 0, 0, b''
+        else:
+            last_id, n_rows, digest = self._state(table)
+
+        cursor = self.conn.execute(f'SELECT * FROM {table} WHERE id > ? ORDER BY id', (last_id,))
+        while True:
+            rows = cursor.fetchmany(10_000)
+            if not rows:
+                break
+            for row in rows:
+                digest = hashlib.blake2b(digest + repr(row).encode(), digest_size=DIGEST_SIZE).digest()
+            last_id = rows[-1][0]
+            n_rows += len(rows)
+
+        self.conn.execute(
+            'INSERT INTO data_checksums (table_name, last_id, n_rows, digest, updated_at) '
+            'VALUES (?, ?, ?, ?, ?) ON CONFLICT (table_name) DO UPDATE SET '
+            'last_id = excluded.last_id, n_rows = excluded.n_rows, digest = excluded.digest, '
+            'updated_at = excluded.updated_at',
+            (table, last_id, n_rows, digest.hex(), _now()),
+        )
+        # la versión leída antes de hashear: un cambio concurrente fuerza otro recálculo
+        self.conn.execute('UPDATE data_versions SET hashed_version = ? WHERE table_name = ?', (version, table))
+        self.conn.commit()
+        return digest.hex()
+
+    def update(self, full: bool = False) -> str:
+        """Hash combinado de todas las tablas (actualizando sólo lo nuevo)"""
+        combined = hashlib.blake2b(digest_size=DIGEST_SIZE)
+        for table in self.tables:
+            combined.update(f'{table}:{self.update_table(table, full)};'.encode())
+        return combined.hexdigest()
+
+
+def compute_data_hash(db_path: str, tables: Iterable[str] = DATA_HASH_TABLES, full: bool = False) -> str:
+    conn = sqlite3.connect(db_path)
+    try:
+        return DataHasher(conn, tables).update(full)
+    finally:
+        conn.close()
+
+
+# --- Store ---
+
+class SnapshotStore:
+    """
+    Almacén de snapshots con direccionamiento por contenido
+
+    root/
+      objects/<digest>.json   parámetros (inmutables, escritos una vez)
+      manifest.json           snapshots retenidos, del más antiguo al más nuevo
+      params.json             puntero activo: {digest, parameters, activated_at}
+    """
+
+    def __init__(self, root: str = 'snapshots', db_path: Optional[str] = None,
+                 retention: int = SNAPSHOT_CONFIG['RETENTION_SNAPSHOTS'],
+                 params_file: str = SNAPSHOT_CONFIG['PARAMS_FILE']):
+        self.root = root
+        self.db_path = db_path
+        self.retention = retention
+        self.objects_dir = os.path.join(root, 'objects')
+        self.manifest_path = os.path.join(root, 'manifest.json')
+        self.params_path = os.path.join(root, params_file)
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+    # Objetos
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, f'{digest}.json')
+
+    def put(self, params: Dict[str, Any]) -> str:
+        """Guarda los parámetros (si no existían) y devuelve su digest"""
+        digest = params_digest(params)
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            atomic_write(path, canonical_json(params))
+        return digest
+
+    def get(self, digest: str) -> Dict[str, Any]:
+        try:
+            with open(self._object_path(digest)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise KeyError(f"Snapshot desconocido: {digest}") from None
+
+    # Manifest
+
+    def snapshots(self) -> List[Dict[str, Any]]:
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+
+    def _write_manifest(self, entries: List[Dict[str, Any]]):
+        atomic_write(self.manifest_path, json.dumps(entries, indent=2, ensure_ascii=False))
+
+    def snapshot(self, params: Dict[str, Any], calibration_id: Optional[int] = None,
+                 approver: Optional[str] = None, metrics_before: Optional[Dict] = None,
+                 metrics_after: Optional[Dict] = None, data_hash: Optional[str] = None) -> str:
+        """Registra un snapshot (antes de calibrar) aplicando la retención"""
+        if data_hash is None and self.db_path and SNAPSHOT_CONFIG['DATA_HASH_ENABLED']:
+            data_hash = compute_data_hash(self.db_path)
+        digest = self.put(params)
+        entry = {
+            'digest': digest,
+            'timestamp': _now(),
+            'calibration_id': calibration_id,
+            'approver': approver,
+            'metrics_before': metrics_before,
+            'metrics_after': metrics_after,
+            'data_hash': data_hash,
+        }
+        entries = self.snapshots() + [entry]
+        self._write_manifest(entries[-self.retention:])
+        self._gc()
+        self._record(entry, params)
+        return digest
+
+    def _gc(self):
+        """Borra objetos que ya no referencian ni el manifest ni el puntero activo"""
+        keep = {e['digest'] for e in self.snapshots()}
+        active = self.current_digest()
+        if active:
+            keep.add(active)
+        for name in os.listdir(self.objects_dir):
+            if name.endswith('.json') and name[:-5] not in keep:
+                os.remove(os.path.join(self.objects_dir, name))
+
+    def _record(self, entry: Dict[str, Any], params: Dict[str, Any], rollback_reason: Optional[str] = None):
+        """Copia de auditoría en la tabla snapshots"""
+        if not self.db_path:
+            return
+        conn = sqlite3.connect(self.db_path)
+        try:
+            ensure_schema(conn, ['snapshots'])
+            metrics = {k: entry.get(k) for k in ('metrics_before', 'metrics_after', 'approver')}
+            conn.execute(
+                'INSERT INTO snapshots (calibration_id, snapshot_date, parameters, metrics, data_hash, '
+                'rollback_reason) VALUES (?, ?, ?, ?, ?, ?)',
+                (entry.get('calibration_id'), entry['timestamp'], canonical_json(params),
+                 json.dumps(metrics), entry.get('data_hash'), rollback_reason),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    # Puntero activo
+
+    def current_digest(self) -> Optional[str]:
+        try:
+            with open(self.params_path) as f:
+                return json.load(f)['digest']
+        except FileNotFoundError:
+            return None
+
+    def activate(self, digest: str, reason: Optional[str] = None) -> Dict[str, Any]:
+        """Publica digest como parámetros activos (os.replace atómico)"""
+        params = self.get(digest)
+        pointer = {'digest': digest, 'parameters': params, 'activated_at': _now()}
+        if reason:
+            pointer['reason'] = reason
+        atomic_write(self.params_path, json.dumps(pointer, indent=2, ensure_ascii=False))
+        return params
+
+    def rollback(self, to: Optional[str] = None, reason: Optional[str] = None) -> str:
+        """
+        Vuelve al snapshot indicado o al anterior al activo
+
+        Sin 'to', toma el snapshot más reciente distinto del activo.
+        """
+        if to is None:
+            active = self.current_digest()
+            candidates = [e['digest'] for e in reversed(self.snapshots()) if e['digest'] != active]
+            if not candidates:
+                raise LookupError("No hay snapshot anterior al que volver")
+            to = candidates[0]
+        params = self.activate(to, reason or 'rollback')
+        entry = next((e for e in self.snapshots() if e['digest'] == to), {'digest': to})
+        self._record(dict(entry, timestamp=_now()), params, rollback_reason=reason or 'rollback')
+        return to
+
+
+class ActiveParams:
+    """
+    Vista de params.json para el motor en ejecución
+
+    get() sólo hace un stat(); recarga cuando cambian inodo, mtime o tamaño,
+    que es justo lo que provoca el os.replace de activate()/rollback().
+    """
+
+    def __init__(self, path: str, default: Optional[Dict[str, Any]] = None):
+        self.path = path
+        self.default = default or {}
+        self.digest: Optional[str] = None
+        self._params = self.default
+        self._stamp = None
+
+    def get(self) -> Dict[str, Any]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return self._params
+        stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if stamp != self._stamp:
+            with open(self.path) as f:
+                pointer = json.load(f)
+            self._params, self.digest, self._stamp = pointer['parameters'], pointer['digest'], stamp
+        return self._params
+
+    def __getitem__(self, key: str) -> Any:
+        return self.get()[key]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Snapshots y rollback de parámetros')
+    parser.add_argument('--root', default='snapshots')
+    parser.add_argument('--db', default=None, help='BD para hash de datos y auditoría')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('list')
+    save = sub.add_parser('save', help='Snapshot de un fichero JSON de parámetros')
+    save.add_argument('params')
+    save.add_argument('--activate', action='store_true')
+    rollback = sub.add_parser('rollback')
+    rollback.add_argument('--to')
+    rollback.add_argument('--reason')
+    data_hash = sub.add_parser('data-hash')
+    data_hash.add_argument('--full', action='store_true')
+    args = parser.parse_args(argv)
+
+    store = SnapshotStore(args.root, db_path=args.db)
+    if args.command == 'list':
+        active = store.current_digest()
+        for entry in store.snapshots():
+            mark = '👉' if entry['digest'] == active else '  '
+            print(f"{mark} {entry['digest']}  {entry['timestamp']}  data={entry.get('data_hash') or '-'}")
+    elif args.command == 'save':
+        with open(args.params) as f:
+            digest = store.snapshot(json.load(f))
+        if args.activate:
+            store.activate(digest)
+        print(f"✅ Snapshot {digest}")
+    elif args.command == 'rollback':
+        try:
+            digest = store.rollback(args.to, args.reason)
+        except (LookupError, KeyError) as e:
+            print(f"❌ {e}")
+            return 1
+        print(f"⏪ Parámetros activos: {digest}")
+    elif args.command == 'data-hash':
+        if not args.db:
+            print("❌ --db es obligatorio para data-hash")
+            return 2
+        print(compute_data_hash(args.db, full=args.full))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -5,17 +5,38 @@ Implementación completa según especificaciones de DS
 """
 
 import asyncio
-from typing import Dict, List, Any
+import logging
+from typing import Awaitable, Callable, Dict, List, Any, Optional, Union
 import time
 import numpy as np
 
+from advanced_trading.order_gateway import OrderGateway
+from advanced_trading.order_outbox import client_order_id, result_from_row
+from advanced_trading.records import ExecutionStage, OrderRequest, OrderResult, TradeRecord
+
+logger = logging.getLogger(__name__)
+
 class StaggeredExecution:
-    def __init__(self, volatility_adjustment: bool = True):
+    def __init__(self, volatility_adjustment: bool = True, gateway: Optional[OrderGateway] = None,
+                 market_data=None, sleep: Callable[[float], Awaitable] = asyncio.sleep,
+                 clock: Callable[[], float] = time.time, outbox=None):
         self.volatility_adjustment = volatility_adjustment
+        self.gateway = gateway  # None = órdenes simuladas
+        self.outbox = outbox  # OrderOutbox: etapas idempotentes por event_id (requiere gateway)
+        self.market_data = market_data  # p. ej. ExecutionMarketView; None = datos simulados
+        self._sleep = sleep  # reloj virtual en replay
+        self._clock = clock
         self.execution_history = []
+        self.config = None  # RuntimeConfig vigente (hot_reload)
+
+    def apply_config(self, config):
+        """Aplica un RuntimeConfig recargado al gateway; conserva el historial"""
+        self.config = config
+        if self.gateway is not None:
+            self.gateway.apply_config(config)
         
     def generate_execution_plan(self, signal: str, total_amount: float, 
-                              volatility_factor: float = 1.0) -> List[Dict[str, Any]]:
+                              volatility_factor: float = 1.0) -> List[ExecutionStage]:
         """
         Genera plan de ejecución escalonada
         """
@@ -23,71 +44,107 @@ class StaggeredExecution:
         size_multiplier = min(1.0, 1.0 / volatility_factor) if volatility_factor > 1.0 else 1.0
         
         execution_plan = [
-            {
-                'stage': 'T0',
-                'amount': total_amount * 0.15 * size_multiplier,
-                'conditions': None,
-                'description': 'Entrada inicial inmediata',
-                'time_delay': 0
-            },
-            {
-                'stage': 'T+30s',
-                'amount': total_amount * 0.30 * size_multiplier,
-                'conditions': ['price_confirmation', 'volume_spike'],
-                'description': 'Segunda entrada con confirmación',
-                'time_delay': 30
-            },
-            {
-                'stage': 'T+2min', 
-                'amount': total_amount * 0.55 * size_multiplier,
-                'conditions': ['trend_confirmation', 'volatility_decrease'],
-                'description': 'Entrada final con confirmación de tendencia',
-                'time_delay': 120
-            }
+            ExecutionStage(
+                stage='T0',
+                amount=total_amount * 0.15 * size_multiplier,
+                conditions=None,
+                description='Entrada inicial inmediata',
+                time_delay=0
+            ),
+            ExecutionStage(
+                stage='T+30s',
+                amount=total_amount * 0.30 * size_multiplier,
+                conditions=('price_confirmation', 'volume_spike'),
+                description='Segunda entrada con confirmación',
+                time_delay=30
+            ),
+            ExecutionStage(
+                stage='T+2min',
+                amount=total_amount * 0.55 * size_multiplier,
+                conditions=('trend_confirmation', 'volatility_decrease'),
+                description='Entrada final con confirmación de tendencia',
+                time_delay=120
+            )
         ]
         
         return execution_plan
     
-    async def execute_plan(self, plan: List[Dict[str, Any]], symbol: str, signal: str):
+    async def execute_plan(self, plan: List[Union[ExecutionStage, Dict[str, Any]]], symbol: str,
+                           signal: str, event_id: Optional[str] = None) -> List[TradeRecord]:
         """
         Ejecuta el plan de trading escalonado
+
+        Con outbox y event_id cada etapa se persiste como intención antes de
+        enviarse; al reejecutar el plan tras un reinicio las etapas ya
+        enviadas no se repiten (se devuelven con su resultado guardado).
         """
         executed_orders = []
+        idempotent = self.outbox is not None and self.gateway is not None and event_id is not None
         
         for stage in plan:
+            if not isinstance(stage, ExecutionStage):
+                stage = ExecutionStage.from_mapping(stage)
+
+            if idempotent:
+                intent = self.outbox.get(client_order_id(event_id, stage.stage, symbol))
+                if intent is not None:
+                    if intent['status'] == 'pending':  # persistida pero no enviada: el delay ya pasó
+                        order = await self._send_intent(intent['client_order_id'])
+                    else:
+                        order = result_from_row(intent)
+                        logger.info("⏭️ Etapa %s de %s ya enviada (%s)", stage.stage, event_id, intent['status'])
+                    if order is not None:
+                        executed_orders.append(TradeRecord(stage=stage.stage, amount=stage.amount,
+                                                           timestamp=self._clock(), symbol=symbol,
+                                                           side=order.side, order=order))
+                    continue
+
             # Esperar el delay apropiado
-            if stage['time_delay'] > 0:
-                await asyncio.sleep(stage['time_delay'])
+            if stage.time_delay > 0:
+                await self._sleep(stage.time_delay)
             
             # Verificar condiciones si existen
-            if stage['conditions']:
+            if stage.conditions:
                 market_data = await self._get_market_data(symbol)
-                if not self._check_conditions(stage['conditions'], market_data, signal):
-                    print(f"❌ Condiciones no cumplidas para {stage['stage']}. Saltando etapa.")
+                if not self._check_conditions(stage.conditions, market_data, signal):
+                    logger.info("❌ Condiciones no cumplidas para %s. Saltando etapa.", stage.stage)
                     continue
             
             # Ejecutar orden (simulado - integrar con API real)
-            order = await self._place_order(
-                symbol=symbol,
-                side=signal.lower(),
-                amount=stage['amount'],
-                order_type='market'
-            )
+            if idempotent:
+                cid = self.outbox.add(event_id, stage.stage, symbol,
+                                      OrderRequest(symbol, signal.lower(), stage.amount, 'market'))
+                order = await self._send_intent(cid)
+                if order is None:
+                    logger.warning("⚠️ Etapa %s de %s sin confirmar; queda para reconciliación",
+                                   stage.stage, event_id)
+                    continue
+            else:
+                order = await self._place_order(
+                    symbol=symbol,
+                    side=signal.lower(),
+                    amount=stage.amount,
+                    order_type='market'
+                )
             
-            executed_orders.append({
-                'stage': stage['stage'],
-                'order': order,
-                'amount': stage['amount'],
-                'timestamp': time.time()
-            })
+            executed_orders.append(TradeRecord(
+                stage=stage.stage,
+                amount=stage.amount,
+                timestamp=self._clock(),
+                symbol=symbol,
+                side=order.side,
+                order=order
+            ))
             
-            print(f"✅ Ejecutado {stage['stage']}: {stage['amount']} {symbol}")
+            logger.info("✅ Ejecutado %s: %s %s", stage.stage, stage.amount, symbol,
+                        extra={'stage': stage.stage, 'symbol': symbol, 'amount': stage.amount})
         
         return executed_orders
     
     async def _get_market_data(self, symbol: str) -> Dict:
-        """Obtiene data de mercado (simulado - integrar con API real)"""
-        # Simulación - en producción conectar con API de exchange
+        """Obtiene data de mercado del hub o simulada si no hay fuente"""
+        if self.market_data is not None:
+            return await self.market_data.get_market_data(symbol)
         return {
             'price_change_pct': 0.002,  # +0.2%
             'volume': 1000000,
@@ -96,7 +153,7 @@ class StaggeredExecution:
             'spread': 0.0001  # 1bps
         }
     
-    def _check_conditions(self, conditions: List[str], market_data: Dict, signal: str) -> bool:
+    def _check_conditions(self, conditions: Union[List[str], tuple], market_data: Dict, signal: str) -> bool:
         """Verifica condiciones de ejecución"""
         checks = []
         
@@ -125,18 +182,28 @@ class StaggeredExecution:
         
         return all(checks)
     
-    async def _place_order(self, symbol: str, side: str, amount: float, order_type: str) -> Dict:
-        """Place order (simulado - integrar con API real)"""
-        # Simulación - en producción conectar con API de exchange
-        return {
-            'symbol': symbol,
-            'side': side,
-            'amount': amount,
-            'type': order_type,
-            'status': 'filled',
-            'timestamp': time.time(),
-            'simulated': True  # Indicador de orden simulada
-        }
+    async def _send_intent(self, cid: str) -> Optional[OrderResult]:
+        """Envía la intención por el outbox; si otro proceso la envió, su resultado guardado"""
+        order = await self.outbox.send(self.gateway, cid)
+        if order is None:
+            intent = self.outbox.get(cid)
+            order = result_from_row(intent) if intent is not None else None
+        return order
+
+    async def _place_order(self, symbol: str, side: str, amount: float, order_type: str) -> OrderResult:
+        """Place order vía gateway (timeout / fills parciales) o simulada si no hay gateway"""
+        if self.gateway is not None:
+            return await self.gateway.execute(OrderRequest(symbol, side, amount, order_type))
+        return OrderResult(
+            symbol=symbol,
+            side=side,
+            amount=amount,
+            type=order_type,
+            status='filled',
+            timestamp=self._clock(),
+            simulated=True,  # Indicador de orden simulada
+            filled=amount
+        )
     
     def get_execution_metrics(self) -> Dict:
         """Retorna métricas de performance de la ejecución"""
@@ -144,37 +211,37 @@ class StaggeredExecution:
             return {}
         
         total_orders = len(self.execution_history)
-        successful_stages = len([e for e in self.execution_history if e.get('order', {}).get('status') == 'filled'])
+        successful_stages = len([e for e in self.execution_history if e.order is not None and e.order.status == 'filled'])
         
         return {
-            'total_execution_plans': len(set([e.get('plan_id', 0) for e in self.execution_history])),
+            'total_execution_plans': len(set([e.plan_id or 0 for e in self.execution_history])),
             'total_orders_placed': total_orders,
             'successful_executions': successful_stages,
             'execution_success_rate': successful_stages / total_orders if total_orders > 0 else 0,
-            'avg_execution_time': np.mean([e.get('execution_time', 0) for e in self.execution_history]) if self.execution_history else 0
+            'avg_execution_time': np.mean([e.execution_time for e in self.execution_history]) if self.execution_history else 0
         }
     
     def add_execution_record(self, plan_id: str, stage: str, amount: float, 
                            execution_time: float, success: bool):
         """Agrega registro de ejecución para métricas"""
-        self.execution_history.append({
-            'plan_id': plan_id,
-            'stage': stage,
-            'amount': amount,
-            'execution_time': execution_time,
-            'success': success,
-            'timestamp': time.time()
-        })
+        self.execution_history.append(TradeRecord(
+            stage=stage,
+            amount=amount,
+            timestamp=self._clock(),
+            plan_id=plan_id,
+            execution_time=execution_time,
+            success=success
+        ))
 
 def generate_staggered_plan(signal: str, total_amount: float, 
-                          volatility_factor: float = 1.0) -> List[Dict[str, Any]]:
+                          volatility_factor: float = 1.0) -> List[ExecutionStage]:
     """
     Función de conveniencia para generar plan de ejecución
     """
     executor = StaggeredExecution()
     return executor.generate_execution_plan(signal, total_amount, volatility_factor)
 
-async def execute_staggered_plan(plan: List[Dict[str, Any]], symbol: str, signal: str):
+async def execute_staggered_plan(plan: List[Union[ExecutionStage, Dict[str, Any]]], symbol: str, signal: str):
     """
     Función de conveniencia para ejecutar plan de ejecución
     """
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Generador de trading_data.db sintética a escala de producción
+Rellena market_data (barras de 1 minuto para 20 símbolos), macro_events,
+token_events, events y trades con un RNG con semilla, de modo que dos
+ejecuciones con la misma semilla producen la misma BD. Las inserciones van
+en bloque (executemany por lotes, PRAGMAs de carga masiva e índices creados
+al final).
+
+    python -m advanced_trading.synthetic_db --size M --db trading_data.db --overwrite
+"""
+
+import argparse
+import os
+import sqlite3
+import time
+from datetime import date, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from advanced_trading.db_schema import INDEXES, TABLES
+
+SYMBOLS = {
+    'BTCUSDT': 42_000.0, 'ETHUSDT': 2_300.0, 'BNBUSDT': 310.0, 'SOLUSDT': 95.0,
+    'XRPUSDT': 0.62, 'ADAUSDT': 0.55, 'DOGEUSDT': 0.085, 'AVAXUSDT': 35.0,
+    'DOTUSDT': 7.2, 'LINKUSDT': 14.5, 'MATICUSDT': 0.85, 'LTCUSDT': 72.0,
+    'ATOMUSDT': 9.8, 'UNIUSDT': 6.3, 'ARBUSDT': 1.15, 'OPUSDT': 2.4,
+    'APTUSDT': 8.9, 'NEARUSDT': 3.1, 'FILUSDT': 5.4, 'INJUSDT': 24.0,
+}
+
+# Familia -> (tabla, tipos de evento)
+FAMILIES = {
+    'macro_US': ('macro_events', ('CPI', 'GDP', 'UNEMPLOYMENT', 'FOMC')),
+    'macro_EU': ('macro_events', ('CPI', 'GDP', 'ECB_RATE')),
+    'crypto_unlocks': ('token_events', ('UNLOCK',)),
+    'listings': ('token_events', ('LISTING',)),
+    'security_incidents': ('token_events', ('HACK',)),
+}
+
+# days: días de barras de 1 minuto por símbolo; events_per_family: por familia
+# y tabla (histórico y events); trades: filas de trades
+PRESETS = {
+    'S': {'symbols': 20, 'days': 7, 'events_per_family': 200, 'trades': 10_000},
+    'M': {'symbols': 20, 'days': 90, 'events_per_family': 1_000, 'trades': 100_000},
+    'L': {'symbols': 20, 'days': 365, 'events_per_family': 5_000, 'trades': 300_000},
+    'XL': {'symbols': 20, 'days': 3 * 365, 'events_per_family': 20_000, 'trades': 1_000_000},
+}
+
+BATCH_SIZE = 50_000
+MINUTE_VOL = 0.0008
+_MINUTES = [f'{h:02d}:{m:02d}:00' for h in range(24) for m in range(60)]
+
+
+def _bulk_pragmas(conn: sqlite3.Connection):
+    conn.execute('PRAGMA journal_mode = OFF')
+    conn.execute('PRAGMA synchronous = OFF')
+    conn.execute('PRAGMA temp_store = MEMORY')
+    conn.execute('PRAGMA cache_size = -262144')  # 256 MiB
+
+
+def _insert(conn: sqlite3.Connection, sql: str, rows: Iterator[Tuple]) -> int:
+    """executemany por lotes de BATCH_SIZE, un commit por lote"""
+    total = 0
+    batch: List[Tuple] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            conn.executemany(sql, batch)
+            conn.commit()
+            total += len(batch)
+            batch = []
+    if batch:
+        conn.executemany(sql, batch)
+        conn.commit()
+        total += len(batch)
+    return total
+
+
+def _bars(rng: np.random.Generator, symbols: List[str], start: date, days: int) -> Iterator[Tuple]:
+    """
+    Barras OHLCV de 1 minuto, día a día y entrelazadas por símbolo
+
+    Retornos log = beta · factor de mercado común + ruido propio, para que
+    los pares mantengan la correlación alta que espera el arbitraje.
+    """
+    closes = {symbol: SYMBOLS[symbol] for symbol in symbols}
+    betas = dict(zip(symbols, rng.uniform(0.8, 1.4, len(symbols))))
+    betas['BTCUSDT'] = 1.0
+    for day_index in range(days):
+        day = (start + timedelta(days=day_index)).isoformat()
+        stamps = [f'{day} {minute}' for minute in _MINUTES]
+        market = rng.normal(0, MINUTE_VOL * 0.8, 1440)
+        for symbol in symbols:
+            returns = betas[symbol] * market + rng.normal(0, MINUTE_VOL * 0.6, 1440)
+            close = closes[symbol] * np.exp(np.cumsum(returns))
+            open_ = np.concatenate(([closes[symbol]], close[:-1]))
+            wick = np.abs(rng.normal(0, MINUTE_VOL / 2, (2, 1440)))
+            high = np.maximum(open_, close) * (1 + wick[0])
+            low = np.minimum(open_, close) * (1 - wick[1])
+            volume = rng.lognormal(3, 1, 1440)
+            spread = rng.gamma(2, 0.8, 1440)
+            depth = rng.lognormal(15, 0.5, 1440)
+            volatility = np.abs(returns) * np.sqrt(1440)
+            closes[symbol] = float(close[-1])
+            yield from zip(
+                [symbol] * 1440, stamps, open_.tolist(), high.tolist(), low.tolist(), close.tolist(),
+                volume.tolist(), spread.tolist(), depth.tolist(), volatility.tolist(),
+            )
+
+
+def _event_dates(rng: np.random.Generator, start: date, span_days: int, n: int) -> List[str]:
+    offsets = np.sort(rng.integers(0, span_days, n))
+    return [str(d) for d in np.datetime64(start.isoformat()) + offsets]
+
+
+def _macro_events(rng: np.random.Generator, start: date, span_days: int, n: int) -> Iterator[Tuple]:
+    for family, (table, types) in FAMILIES.items():
+        if table != 'macro_events':
+            continue
+        consensus = rng.uniform(0.5, 5.0, n)
+        actual = consensus + rng.normal(0, 0.2, n)
+        impact = np.where(actual > consensus, 'BEARISH', 'BULLISH')
+        for i, event_date in enumerate(_event_dates(rng, start, span_days, n)):
+            yield (types[i % len(types)], family, event_date, float(consensus[i]), float(actual[i]),
+                   float(actual[i] - consensus[i]), int((actual[i] - consensus[i]) * 10_000),
+                   str(impact[i]))
+
+
+def _token_events(rng: np.random.Generator, start: date, span_days: int, n: int) -> Iterator[Tuple]:
+    symbols = [s[:-4] for s in SYMBOLS]
+    for family, (table, types) in FAMILIES.items():
+        if table != 'token_events':
+            continue
+        tokens = rng.choice(symbols, n)
+        impact = rng.uniform(0, 10, n)
+        supply = rng.uniform(0, 0.1, n)
+        market_cap = rng.lognormal(20, 1.5, n)
+        for i, event_date in enumerate(_event_dates(rng, start, span_days, n)):
+            yield (types[0], family, str(tokens[i]), event_date, f'{types[0]} {tokens[i]}',
+                   float(impact[i]), float(supply[i]), float(market_cap[i]))
+
+
+def _events(rng: np.random.Generator, start: date, span_days: int, n: int) -> Iterator[Tuple]:
+    symbols = list(SYMBOLS)
+    for family, (_, types) in FAMILIES.items():
+        executed = rng.random(n) < 0.6
+        pnl = rng.normal(5, 40, n)
+        minutes = rng.integers(0, 1440, n)
+        for i, event_date in enumerate(_event_dates(rng, start, span_days, n)):
+            t0 = f'{event_date}T{_MINUTES[minutes[i]]}Z'
+            yield (types[i % len(types)], family, event_date, t0, symbols[i % len(symbols)],
+                   int(executed[i]), float(pnl[i]) if executed[i] else None)
+
+
+def _trades(rng: np.random.Generator, start: date, span_days: int, n: int, max_event_id: int) -> Iterator[Tuple]:
+    symbols = list(SYMBOLS)
+    picks = rng.integers(0, len(symbols), n)
+    sides = rng.random(n) < 0.5
+    entries = np.array(list(SYMBOLS.values()))[picks] * (1 + rng.normal(0, 0.01, n))
+    exits = entries * (1 + rng.normal(0, 0.004, n))
+    sizes = rng.lognormal(6, 1, n)
+    entry_offsets = np.sort(rng.integers(0, span_days * 86_400, n))
+    holds = rng.integers(60, 4 * 3600, n)
+    exec_ms = rng.integers(20, 800, n)
+    spread = rng.gamma(2, 0.8, n)
+    slippage = np.abs(rng.normal(0, 1.5, n))
+    event_ids = rng.integers(1, max_event_id + 1, n) if max_event_id else np.zeros(n, dtype=int)
+    origin = np.datetime64(start.isoformat(), 's')
+    entry_times = np.datetime_as_string(origin + entry_offsets)
+    exit_times = np.datetime_as_string(origin + entry_offsets + holds)
+    for i in range(n):
+        symbol = symbols[picks[i]]
+        entry, exit_ = float(entries[i]), float(exits[i])
+        side = 'BUY' if sides[i] else 'SELL'
+        size = float(sizes[i]) / entry
+        pnl = (exit_ - entry) * size * (1 if side == 'BUY' else -1)
+        yield (int(event_ids[i]) or None, symbol, side, entry, exit_, size, pnl,
+               entry_times[i].replace('T', ' '), exit_times[i].replace('T', ' '),
+               int(exec_ms[i]), float(spread[i]), float(slippage[i]))
+
+
+def generate(db_path: str, size: str = 'S', seed: int = 42, start: str = '2023-01-01',
+             end: str = '2024-12-31', **overrides) -> Dict[str, float]:
+    """
+    Rellena db_path según el preset (overrides: symbols, days, events_per_family, trades)
+
+    Los eventos se reparten en [start, end]; las barras empiezan en start.
+    Devuelve filas insertadas por tabla y segundos empleados.
+    """
+    if size not in PRESETS:
+        raise ValueError(f"Preset desconocido: {size} (usa {', '.join(PRESETS)})")
+    params = dict(PRESETS[size], **overrides)
+    rng = np.random.default_rng(seed)
+    first_day = date.fromisoformat(start)
+    span_days = (date.fromisoformat(end) - first_day).days + 1
+    symbols = list(SYMBOLS)[:params['symbols']]
+    n_events = params['events_per_family']
+
+    began = time.perf_counter()
+    conn = sqlite3.connect(db_path)
+    try:
+        _bulk_pragmas(conn)
+        tables = ('market_data', 'macro_events', 'token_events', 'events', 'trades')
+        for name in tables:
+            conn.execute(TABLES[name])
+        stats = {
+            'market_data': _insert(conn, (
+                'INSERT INTO market_data (symbol, timestamp, open, high, low, close, volume, '
+                'spread_bps, book_depth_usd, volatility) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'
+            ), _bars(rng, symbols, first_day, params['days'])),
+            'macro_events': _insert(conn, (
+                'INSERT INTO macro_events (event_type, family, event_date, consensus, actual, '
+                'deviation, surprise_bps, impact) VALUES (?, ?, ?, ?, ?, ?, ?, ?)'
+            ), _macro_events(rng, first_day, span_days, n_events)),
+            'token_events': _insert(conn, (
+                'INSERT INTO token_events (event_type, family, token_symbol, event_date, description, '
+                'impact_score, supply_affected, market_cap_usd) VALUES (?, ?, ?, ?, ?, ?, ?, ?)'
+            ), _token_events(rng, first_day, span_days, n_events)),
+            'events': _insert(conn, (
+                'INSERT INTO events (event_type, family, event_date, t0_iso, symbol, executed, pnl) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)'
+            ), _events(rng, first_day, span_days, n_events)),
+        }
+        max_event_id = conn.execute('SELECT MAX(id) FROM events').fetchone()[0] or 0
+        stats['trades'] = _insert(conn, (
+            'INSERT INTO trades (event_id, symbol, side, entry_price, exit_price, size, pnl, entry_time, '
+            'exit_time, execution_time_ms, spread_bps, slippage_bps) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'
+        ), _trades(rng, first_day, span_days, params['trades'], max_event_id))
+
+        for index_sql in INDEXES:
+            if index_sql.split(' ON ')[1].split()[0] in tables:
+                conn.execute(index_sql)
+        conn.commit()
+        conn.execute('ANALYZE')
+    finally:
+        conn.close()
+    stats['seconds'] = time.perf_counter() - began
+    return stats
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Genera una trading_data.db sintética')
+    parser.add_argument('--db', default='trading_data.db')
+    parser.add_argument('--size', choices=list(PRESETS), default='S')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--start', default='2023-01-01')
+    parser.add_argument('--end', default='2024-12-31')
+    parser.add_argument('--overwrite', action='store_true', help='Borra la BD si ya existe')
+    for key in ('symbols', 'days', 'events_per_family', 'trades'):
+        parser.add_argument(f"--{key.replace('_', '-')}", dest=key, type=int, help='Sobrescribe el preset')
+    args = parser.parse_args(argv)
+
+    if os.path.exists(args.db):
+        if not args.overwrite:
+            print(f"❌ {args.db} ya existe (usa --overwrite para regenerarla)")
+            return 2
+        os.remove(args.db)
+    overrides = {k: getattr(args, k) for k in ('symbols', 'days', 'events_per_family', 'trades')
+                 if getattr(args, k) is not None}
+
+    print(f"🔧 Generando {args.db} (preset {args.size}, seed {args.seed})...")
+    stats = generate(args.db, args.size, args.seed, args.start, args.end, **overrides)
+    for table in ('market_data', 'macro_events', 'token_events', 'events', 'trades'):
+        print(f"   📊 {table}: {stats[table]:,} filas")
+    total = sum(v for k, v in stats.items() if k != 'seconds')
+    print(f"✅ {total:,} filas en {stats['seconds']:.1f}s ({total / stats['seconds']:,.0f} filas/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
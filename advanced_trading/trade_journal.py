@@ -0,0 +1,345 @@
+"""
+Journal asíncrono de trades y auditoría
+Los productores encolan registros sin bloquear; un único hilo escritor agrupa
+los INSERT en transacciones (group commit) cada N ms o M registros, de modo que
+la latencia de fsync de SQLite nunca cae en el camino de envío de órdenes.
+"""
+
+import json
+import logging
+import queue
+from collections import deque
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from advanced_trading.config.trading_config import TRADING_CONFIG
+from advanced_trading.db_schema import ensure_schema, table_columns
+from advanced_trading.metrics import DB_ROWS_WRITTEN, DB_WRITE_LATENCY, QUEUE_DEPTH
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_TABLES = ('trades', 'snapshots', 'calibrations', 'event_fires', 'order_audit')
+AUDIT_TABLE = 'order_audit'
+AUDIT_PURGE_INTERVAL_SEC = 3600
+DEAD_LETTER_MAX = 1_000
+STOP_POLL_SEC = 0.1  # cadencia con la que close() reintenta encolar _STOP si la cola está llena
+
+_STOP = object()
+
+
+class _FlushRequest:
+    """Marcador que el escritor confirma cuando todo lo anterior está en disco"""
+
+    __slots__ = ('done',)
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+def _utc_now_iso() -> str:
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _to_text(value: Any) -> Any:
+    """Serializa dicts/listas a JSON para columnas TEXT"""
+    if isinstance(value, (dict, list, tuple)):
+        return json.dumps(value, sort_keys=True, default=str)
+    return value
+
+
+def _insert_sql(table: str, columns: Tuple[str, ...]) -> str:
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})"
+
+
+class TradeJournal:
+    """Escritor en segundo plano con cola acotada y group commit"""
+
+    def __init__(self, db_path: str = 'trading_data.db', batch_size: int = 256,
+                 flush_interval_ms: int = 50, max_queue: int = 10_000,
+                 audit_retention_days: int = TRADING_CONFIG['AUDIT_LOG_RETENTION_DAYS'],
+                 log_order_blocks: bool = TRADING_CONFIG['LOG_ORDER_BLOCKS']):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.audit_retention_days = audit_retention_days
+        self.log_order_blocks = log_order_blocks
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._startup_error: Optional[BaseException] = None
+        self.dead_letters: deque = deque(maxlen=DEAD_LETTER_MAX)  # (tabla, fila, error) que no entraron
+        self._columns: Dict[str, set] = {}
+        self._last_purge = 0.0
+        self._stats_lock = threading.Lock()  # productores y escritor incrementan stats
+        self.stats = {
+            'enqueued': 0,
+            'written': 0,
+            'dropped': 0,
+            'invalid_columns': 0,
+            'batches': 0,
+            'errors': 0,
+            'dead_lettered': 0,
+            'last_commit_ms': 0.0,
+        }
+
+    # --- Ciclo de vida ---
+
+    def start(self) -> 'TradeJournal':
+        """Arranca el hilo escritor (idempotente); relanza el error si no pudo abrir la BD"""
+        if self._thread is None or not self._thread.is_alive():
+            self._ready.clear()
+            self._startup_error = None
+            self._thread = threading.Thread(target=self._run, name='trade-journal', daemon=True)
+            self._thread.start()
+            self._ready.wait()
+            if self._startup_error is not None:
+                self._thread.join()
+                self._thread = None
+                raise self._startup_error
+            QUEUE_DEPTH.labels('journal').set_function(lambda: self.queue_depth)
+        return self
+
+    def close(self, timeout: Optional[float] = None):
+        """
+        Vacía la cola completa y detiene el escritor
+
+        Si el escritor ha muerto (o no termina en timeout) no se espera más:
+        lo que quede en la cola se pierde y se avisa en el log.
+        """
+        if self._thread is None:
+            return
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._thread.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=STOP_POLL_SEC)
+                break
+            except queue.Full:
+                if deadline is not None and time.monotonic() >= deadline:
+                    break
+        self._thread.join(None if deadline is None else max(deadline - time.monotonic(), 0))
+        if self._thread.is_alive() or self.queue_depth:
+            logger.error(f"❌ Journal cerrado sin vaciar la cola: {self.queue_depth} registros sin escribir")
+        self._thread = None
+        QUEUE_DEPTH.remove('journal')
+
+    def __enter__(self) -> 'TradeJournal':
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Espera a que todo lo encolado hasta ahora esté confirmado en disco"""
+        if self._thread is None:
+            return True
+        if not self._thread.is_alive():
+            return False
+        request = _FlushRequest()
+        try:
+            self._queue.put(request, timeout=timeout)
+        except queue.Full:
+            return False
+        return request.done.wait(timeout)
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    # --- Productores (no bloqueantes) ---
+
+    def enqueue(self, table: str, row: Dict[str, Any]) -> bool:
+        """Encola un registro (dict o record con to_row()); False si la cola está llena"""
+        if table not in JOURNAL_TABLES:
+            raise ValueError(f"Tabla no soportada por el journal: {table}")
+        if not isinstance(row, dict):
+            row = row.to_row()
+        try:
+            self._queue.put_nowait((table, row))
+        except queue.Full:
+            self._count('dropped')
+            return False
+        self._count('enqueued')
+        return True
+
+    def record_trade(self, symbol: str, side: str, **fields) -> bool:
+        """Registra un trade (columnas de la tabla trades)"""
+        return self.enqueue('trades', dict(fields, symbol=symbol, side=side))
+
+    def record_event_fire(self, event_id: str, symbol: Optional[str] = None,
+                          action: Optional[str] = None, details: Optional[Dict] = None) -> bool:
+        """Registra el disparo de un evento"""
+        return self.enqueue('event_fires', {
+            'event_id': str(event_id),
+            'symbol': symbol,
+            'action': action,
+            'fired_at': _utc_now_iso(),
+            'details': details,
+        })
+
+    def record_snapshot(self, parameters: Dict, metrics: Optional[Dict] = None,
+                        data_hash: Optional[str] = None, calibration_id: Optional[int] = None,
+                        rollback_reason: Optional[str] = None) -> bool:
+        """Registra un snapshot de parámetros"""
+        return self.enqueue('snapshots', {
+            'calibration_id': calibration_id,
+            'snapshot_date': _utc_now_iso(),
+            'parameters': parameters,
+            'metrics': metrics,
+            'data_hash': data_hash,
+            'rollback_reason': rollback_reason,
+        })
+
+    def record_calibration(self, family: str, **fields) -> bool:
+        """Registra una calibración"""
+        fields.setdefault('calibration_date', _utc_now_iso())
+        return self.enqueue('calibrations', dict(fields, family=family))
+
+    def record_order_block(self, symbol: str, reason: str, side: Optional[str] = None,
+                           amount: Optional[float] = None, **fields) -> bool:
+        """Registra una orden bloqueada por microestructura (si LOG_ORDER_BLOCKS)"""
+        if not self.log_order_blocks:
+            return False
+        return self.enqueue(AUDIT_TABLE, dict(fields, symbol=symbol, reason=reason,
+                                              side=side, amount=amount))
+
+    def _count(self, key: str, amount: int = 1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    # --- Escritor ---
+
+    def _run(self):
+        conn = None
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            ensure_schema(conn, JOURNAL_TABLES)
+            self._columns = {t: set(table_columns(conn, t)) for t in JOURNAL_TABLES}
+            self._purge_audit(conn)
+        except BaseException as e:  # start() lo relanza en el hilo llamante
+            self._startup_error = e
+            if conn is not None:
+                conn.close()
+            return
+        finally:
+            self._ready.set()
+
+        try:
+            stopping = False
+            while not stopping:
+                batch, waiters, stopping = self._collect()
+                if batch:
+                    self._write_batch(conn, batch)
+                for request in waiters:
+                    request.done.set()
+                if time.monotonic() - self._last_purge >= AUDIT_PURGE_INTERVAL_SEC:
+                    self._purge_audit(conn)
+        except Exception:
+            logger.exception(f"❌ Escritor del journal detenido: {self.queue_depth} registros en cola")
+        finally:
+            conn.close()
+
+    def _collect(self) -> Tuple[List[Tuple[str, Dict]], List[_FlushRequest], bool]:
+        """Agrupa registros hasta batch_size o hasta que venza flush_interval"""
+        batch: List[Tuple[str, Dict]] = []
+        waiters: List[_FlushRequest] = []
+        try:
+            item = self._queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return batch, waiters, False
+
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            if item is _STOP:
+                # Drenar lo que quede antes de salir
+                batch.extend(self._drain_nowait(waiters))
+                return batch, waiters, True
+            if isinstance(item, _FlushRequest):
+                waiters.append(item)
+                return batch, waiters, False
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                return batch, waiters, False
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                return batch, waiters, False
+
+    def _drain_nowait(self, waiters: List[_FlushRequest]) -> List[Tuple[str, Dict]]:
+        items = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return items
+            if isinstance(item, _FlushRequest):
+                waiters.append(item)
+            elif item is not _STOP:
+                items.append(item)
+
+    def _write_batch(self, conn: sqlite3.Connection, batch: List[Tuple[str, Dict]]):
+        """Escribe el lote en una sola transacción agrupando por tabla y columnas"""
+        groups: Dict[Tuple[str, Tuple[str, ...]], List[Tuple]] = {}
+        for table, row in batch:
+            valid = self._columns[table]
+            columns = tuple(sorted(k for k in row if k in valid))
+            if len(columns) != len(row):
+                self._count('invalid_columns')
+                logger.warning(f"⚠️ Columnas desconocidas en {table}: {sorted(set(row) - valid)}")
+            groups.setdefault((table, columns), []).append(
+                tuple(_to_text(row[c]) for c in columns)
+            )
+
+        started = time.perf_counter()
+        try:
+            with conn:
+                for (table, columns), rows in groups.items():
+                    conn.executemany(_insert_sql(table, columns), rows)
+            written = len(batch)
+        except sqlite3.Error as e:
+            self._count('errors')
+            logger.error(f"❌ Error escribiendo lote del journal ({len(batch)} registros): {e}; "
+                         f"reintentando fila a fila")
+            written = self._write_rows(conn, groups)
+        elapsed = time.perf_counter() - started
+        DB_WRITE_LATENCY.observe(elapsed)
+        DB_ROWS_WRITTEN.inc(written)
+        with self._stats_lock:
+            self.stats['last_commit_ms'] = elapsed * 1000
+            self.stats['written'] += written
+            self.stats['batches'] += 1
+
+    def _write_rows(self, conn: sqlite3.Connection,
+                    groups: Dict[Tuple[str, Tuple[str, ...]], List[Tuple]]) -> int:
+        """Reintento de un lote fallido: cada fila en su transacción; las que fallan van a dead_letters"""
+        written = 0
+        for (table, columns), rows in groups.items():
+            sql = _insert_sql(table, columns)
+            for values in rows:
+                try:
+                    with conn:
+                        conn.execute(sql, values)
+                    written += 1
+                except sqlite3.Error as e:
+                    row = dict(zip(columns, values))
+                    self.dead_letters.append((table, row, str(e)))
+                    self._count('dead_lettered')
+                    logger.error(f"❌ Registro descartado en {table}: {e} | {json.dumps(row, default=str)}")
+        return written
+
+    def _purge_audit(self, conn: sqlite3.Connection):
+        """Aplica AUDIT_LOG_RETENTION_DAYS sobre la tabla de auditoría"""
+        self._last_purge = time.monotonic()
+        try:
+            with conn:
+                conn.execute(
+                    f"DELETE FROM {AUDIT_TABLE} WHERE created_at < datetime('now', ?)",
+                    (f'-{int(self.audit_retention_days)} days',),
+                )
+        except sqlite3.Error as e:
+            logger.error(f"❌ Error purgando auditoría: {e}")
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+CLI de la suite de benchmarks
+
+    python -m benchmarks run --size S --output benchmarks/baselines/baseline.json
+    python -m benchmarks compare --threshold 0.25
+
+El baseline versionado se genera con las versiones de requirements.txt.
+"""
+
+import argparse
+
+from benchmarks import suite
+
+
+def _print_rows(rows):
+    for row in rows:
+        current = f"{row['current_s'] * 1e6:10.2f}µs"
+        if row['baseline_s'] is None:
+            print(f"🆕 {row['name']:<50} {current}  (sin baseline)")
+            continue
+        mark = '❌' if row['regression'] else '✅'
+        print(f"{mark} {row['name']:<50} {current}  vs {row['baseline_s'] * 1e6:10.2f}µs  "
+              f"x{row['ratio']:.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks de advanced_trading')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    run = sub.add_parser('run', help='Ejecuta la suite y guarda los resultados en JSON')
+    compare = sub.add_parser('compare', help='Ejecuta (o carga) resultados y compara con el baseline')
+    for p in (run, compare):
+        p.add_argument('--size', choices=sorted(suite.SIZES), default='S')
+        p.add_argument('--repeat', type=int, default=5)
+        p.add_argument('--only', nargs='*', help='Subcadenas de los casos a ejecutar')
+    run.add_argument('--output', default=suite.DEFAULT_BASELINE)
+    compare.add_argument('--baseline', default=suite.DEFAULT_BASELINE)
+    compare.add_argument('--current', help='JSON ya generado (si no, se ejecuta la suite)')
+    compare.add_argument('--threshold', type=float, default=0.25,
+                         help='Regresión si la mediana supera baseline × (1 + threshold)')
+    compare.add_argument('--allow-env-mismatch', action='store_true',
+                         help='Comparar aunque el baseline sea de otro entorno (python/numpy/máquina)')
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        report = suite.run_suite(args.size, args.repeat, args.only)
+        suite.save(report, args.output)
+        for name, result in report['results'].items():
+            print(f"⏱️ {name:<50} {result['median_s'] * 1e6:10.2f}µs/op")
+        print(f"💾 Resultados guardados en {args.output}")
+        return 0
+
+    baseline = suite.load(args.baseline)
+    if args.current:
+        current = suite.load(args.current)
+    else:
+        current = suite.run_suite(baseline['meta'].get('size', args.size), args.repeat, args.only)
+    mismatch = suite.environment_diff(baseline, current)
+    if mismatch:
+        details = ', '.join(f'{key} {base} → {cur}' for key, (base, cur) in mismatch.items())
+        print(f"⚠️ Baseline de otro entorno ({details}): regenéralo con 'run' en este entorno")
+        if not args.allow_env_mismatch:
+            return 2
+    rows = suite.compare(baseline, current, args.threshold)
+    _print_rows(rows)
+    regressions = [row['name'] for row in rows if row['regression']]
+    if regressions:
+        print(f"❌ {len(regressions)} regresiones (umbral {args.threshold:.0%})")
+        return 1
+    print(f"✅ Sin regresiones (umbral {args.threshold:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
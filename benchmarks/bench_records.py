@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark: dicts vs records con __slots__
+Compara memoria retenida (tracemalloc) y tiempo de acceso a campos en el
+bucle caliente para señales macro y entradas del historial de ejecución.
+
+    python -m benchmarks.bench_records [--n 100000]
+"""
+
+import argparse
+import gc
+import time
+import timeit
+import tracemalloc
+from typing import Callable, Dict, List
+
+from advanced_trading.records import MacroSignal, TradeRecord
+
+
+def _signal_dict(i: int) -> Dict:
+    return {
+        'event_type': 'CPI', 'consensus': 3.2, 'actual': 3.2 + i * 1e-6, 'deviation': i * 1e-6,
+        'deviation_pct': i * 1e-4, 'impact_score': 0.5, 'direction': 'SELL',
+        'timestamp': '2024-01-11T13:30:00', 'should_trade': True,
+    }
+
+
+def _signal_record(i: int) -> MacroSignal:
+    return MacroSignal('CPI', 3.2, 3.2 + i * 1e-6, i * 1e-6, i * 1e-4, 0.5, 'SELL', '2024-01-11T13:30:00', True)
+
+
+def _trade_dict(i: int) -> Dict:
+    return {'plan_id': 'p1', 'stage': 'T0', 'amount': 100.0 + i, 'execution_time': 0.01,
+            'success': True, 'timestamp': 1.7e9 + i}
+
+
+def _trade_record(i: int) -> TradeRecord:
+    return TradeRecord('T0', 100.0 + i, 1.7e9 + i, plan_id='p1', execution_time=0.01, success=True)
+
+
+def retained_bytes(factory: Callable[[int], object], n: int) -> int:
+    """Bytes retenidos por n objetos creados con factory"""
+    gc.collect()
+    tracemalloc.start()
+    items = [factory(i) for i in range(n)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del items
+    return current
+
+
+def access_ns(items: List, accessor: Callable, repeat: int = 5) -> float:
+    """Mejor tiempo por elemento (ns) de recorrer items con accessor"""
+    def loop():
+        total = 0.0
+        for item in items:
+            total += accessor(item)
+        return total
+    best = min(timeit.repeat(loop, number=1, repeat=repeat))
+    return best / len(items) * 1e9
+
+
+def run(n: int = 100_000) -> Dict[str, float]:
+    results = {}
+    cases = {
+        'signal': (_signal_dict, _signal_record,
+                   lambda d: d['impact_score'] + d['deviation'], lambda r: r.impact_score + r.deviation),
+        'trade': (_trade_dict, _trade_record,
+                  lambda d: d['amount'] * d['execution_time'], lambda r: r.amount * r.execution_time),
+    }
+    for name, (make_dict, make_record, read_dict, read_record) in cases.items():
+        results[f'{name}_dict_bytes'] = retained_bytes(make_dict, n) / n
+        results[f'{name}_record_bytes'] = retained_bytes(make_record, n) / n
+        dicts = [make_dict(i) for i in range(n)]
+        records = [make_record(i) for i in range(n)]
+        results[f'{name}_dict_access_ns'] = access_ns(dicts, read_dict)
+        results[f'{name}_record_access_ns'] = access_ns(records, read_record)
+        start = time.perf_counter()
+        for record in records:
+            record.to_row()
+        results[f'{name}_to_row_ns'] = (time.perf_counter() - start) / n * 1e9
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark de records con __slots__')
+    parser.add_argument('--n', type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    results = run(args.n)
+    for name in ('signal', 'trade'):
+        saved = 1 - results[f'{name}_record_bytes'] / results[f'{name}_dict_bytes']
+        print(f"📦 {name}: {results[f'{name}_dict_bytes']:.0f} B/dict -> "
+              f"{results[f'{name}_record_bytes']:.0f} B/record ({saved:.0%} menos)")
+        print(f"⚡ {name}: acceso {results[f'{name}_dict_access_ns']:.1f} ns (dict) vs "
+              f"{results[f'{name}_record_access_ns']:.1f} ns (record), to_row {results[f'{name}_to_row_ns']:.0f} ns")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
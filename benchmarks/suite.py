@@ -0,0 +1,251 @@
+"""
+Suite de benchmarks de los hot paths de advanced_trading
+Cada caso mide segundos por operación (mediana de varias repeticiones) y
+los resultados se guardan como JSON; compare() marca como regresión todo
+caso cuya mediana empeore más que el umbral respecto al baseline.
+
+El baseline versionado se genera con las dependencias fijadas en
+requirements.txt; los tiempos sólo son comparables en el mismo entorno
+(environment_diff() lo comprueba antes de usarlo como gate).
+"""
+
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from advanced_trading.advanced_risk_manager import AdvancedRiskManager
+from advanced_trading.macro_analyzer import MacroAnalyzer
+from advanced_trading.relative_arbitrage import RelativeArbitrage
+from advanced_trading.staggered_execution import StaggeredExecution
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), 'baselines')
+DEFAULT_BASELINE = os.path.join(BASELINE_DIR, 'baseline.json')
+
+# Volumen de datos sintéticos por tamaño
+SIZES = {
+    'S': {'events_per_family': 200, 'ops': 2_000},
+    'M': {'events_per_family': 2_000, 'ops': 10_000},
+    'L': {'events_per_family': 20_000, 'ops': 50_000},
+}
+
+# name -> (setup(size) -> (callable, ops por llamada))
+Case = Callable[[Dict], Tuple[Callable[[], object], int]]
+CASES: Dict[str, Case] = {}
+
+
+def benchmark(name: str):
+    def register(fn: Case) -> Case:
+        CASES[name] = fn
+        return fn
+    return register
+
+
+def _price_paths(n: int, seed: int = 42) -> Tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    common = rng.normal(0, 0.001, n)
+    btc = 50_000 * np.exp(np.cumsum(common + rng.normal(0, 0.0003, n)))
+    eth = 3_000 * np.exp(np.cumsum(common + rng.normal(0, 0.0003, n)))
+    return btc, eth
+
+
+@benchmark('arbitrage.update_prices')
+def _update_prices(size: Dict):
+    ops = size['ops']
+    btc, eth = _price_paths(ops)
+    btc, eth = btc.tolist(), eth.tolist()
+
+    def run():
+        arbitrage = RelativeArbitrage()
+        for b, e in zip(btc, eth):
+            arbitrage.update_prices(b, e)
+    return run, ops
+
+
+def _check_opportunity(lookback: int):
+    def setup(size: Dict):
+        ops = size['ops'] // 10
+        arbitrage = RelativeArbitrage()
+        for b, e in zip(*(p.tolist() for p in _price_paths(100))):
+            arbitrage.update_prices(b, e)
+
+        def run():
+            for _ in range(ops):
+                arbitrage.check_arbitrage_opportunity(lookback)
+        return run, ops
+    return setup
+
+
+for _lookback in (10, 30, 100):
+    benchmark(f'arbitrage.check_opportunity[lookback={_lookback}]')(_check_opportunity(_lookback))
+
+
+def _check_opportunity_series(history: int):
+    def setup(size: Dict):
+        from advanced_trading.relative_arbitrage import check_arbitrage_opportunity
+
+        ops = max(1, size['ops'] // 100)
+        btc, eth = (p.tolist() for p in _price_paths(history))
+
+        def run():
+            for _ in range(ops):
+                check_arbitrage_opportunity(btc, eth)
+        return run, ops
+    return setup
+
+
+for _history in (100, 1_000):
+    benchmark(f'arbitrage.check_opportunity_series[history={_history}]')(_check_opportunity_series(_history))
+
+
+@benchmark('risk.calculate_trade_parameters')
+def _trade_parameters(size: Dict):
+    ops = size['ops']
+    rng = np.random.default_rng(1)
+    prices = (50_000 * (1 + rng.normal(0, 0.01, ops))).tolist()
+    atrs = rng.uniform(0.002, 0.02, ops).tolist()
+    manager = AdvancedRiskManager(10_000)
+
+    def run():
+        for price, atr in zip(prices, atrs):
+            manager.calculate_trade_parameters('BTCUSDT', price, atr, 0.0002)
+    return run, ops
+
+
+@benchmark('macro.analyze_event')
+def _analyze_event(size: Dict):
+    ops = size['ops']
+    rng = np.random.default_rng(2)
+    events = list(zip(
+        rng.choice(['CPI', 'GDP', 'UNEMPLOYMENT', 'INTEREST_RATE'], ops).tolist(),
+        rng.uniform(1, 5, ops).tolist(),
+        rng.uniform(1, 5, ops).tolist(),
+    ))
+
+    def run():
+        analyzer = MacroAnalyzer()
+        for event_type, consensus, actual in events:
+            analyzer.analyze_event(event_type, consensus, actual)
+    return run, ops
+
+
+@benchmark('execution.generate_plan')
+def _generate_plan(size: Dict):
+    ops = size['ops']
+    executor = StaggeredExecution()
+
+    def run():
+        for i in range(ops):
+            executor.generate_execution_plan('BUY', 10_000.0, 1.0 + (i % 3) * 0.5)
+    return run, ops
+
+
+_WORKDIR: Optional[tempfile.TemporaryDirectory] = None
+
+
+def _workdir() -> str:
+    """Directorio temporal de la sesión (se borra al salir del intérprete)"""
+    global _WORKDIR
+    if _WORKDIR is None:
+        _WORKDIR = tempfile.TemporaryDirectory(prefix='bench_')
+    return _WORKDIR.name
+
+
+def _coverage_case(full: bool):
+    def setup(size: Dict):
+        from advanced_trading.coverage_counters import compute_counts, install_counters
+        from advanced_trading.synthetic_db import generate
+        from fixed_validate_data_coverage import COVERAGE_SPECS, END_DATE, START_DATE
+
+        path = os.path.join(_workdir(), f"coverage_{size['events_per_family']}_{int(full)}.db")
+        generate(path, seed=7, days=0, trades=0, events_per_family=size['events_per_family'])
+        conn = sqlite3.connect(path)
+        try:
+            install_counters(conn)
+        finally:
+            conn.close()
+
+        def run():
+            compute_counts(path, COVERAGE_SPECS, START_DATE, END_DATE, full=full)
+        return run, 1
+    return setup
+
+
+benchmark('coverage.summary_counters')(_coverage_case(full=False))
+benchmark('coverage.full_scan')(_coverage_case(full=True))
+
+
+def run_suite(size: str = 'S', repeat: int = 5, only: Optional[List[str]] = None) -> Dict:
+    """Ejecuta los casos y devuelve {'meta': ..., 'results': {name: {...}}}"""
+    params = SIZES[size]
+    results = {}
+    for name, setup in CASES.items():
+        if only and not any(pattern in name for pattern in only):
+            continue
+        fn, ops = setup(params)
+        fn()  # calentamiento
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - start) / ops)
+        results[name] = {
+            'median_s': statistics.median(timings),
+            'min_s': min(timings),
+            'ops': ops,
+        }
+    return {
+        'meta': {
+            'size': size,
+            'repeat': repeat,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        },
+        'results': results,
+    }
+
+
+def save(report: Dict, path: str):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def load(path: str) -> Dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+ENVIRONMENT_KEYS = ('python', 'numpy', 'machine')
+
+
+def environment_diff(baseline: Dict, current: Dict) -> Dict[str, Tuple]:
+    """Claves de entorno en las que difieren baseline y resultados actuales"""
+    base, cur = baseline.get('meta', {}), current.get('meta', {})
+    return {key: (base.get(key), cur.get(key)) for key in ENVIRONMENT_KEYS
+            if key in base and key in cur and base[key] != cur[key]}
+
+
+def compare(baseline: Dict, current: Dict, threshold: float = 0.25) -> List[Dict]:
+    """Filas de comparación por caso; 'regression' si current > baseline × (1 + threshold)"""
+    rows = []
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            rows.append({'name': name, 'baseline_s': None, 'current_s': result['median_s'],
+                         'ratio': None, 'regression': False})
+            continue
+        ratio = result['median_s'] / base['median_s'] if base['median_s'] else float('inf')
+        rows.append({'name': name, 'baseline_s': base['median_s'], 'current_s': result['median_s'],
+                     'ratio': ratio, 'regression': ratio > 1 + threshold})
+    return rows
@@ -7,7 +7,22 @@ Confirma que Sheets esté configurado correctamente antes de arrancar
 import os
 import sys
 
-from eventarb.ingest.sheets_reader import read_events_from_sheet
+from dotenv import load_dotenv
+
+from advanced_trading.sheet_sync import SheetSync, sheet_sync_from_env
+
+# Antigüedad máxima de la caché local antes de consultar Sheets
+SHEET_CACHE_MAX_AGE_SEC = 300
+# Con Sheets caído, antigüedad máxima de la caché para dar el arranque por bueno
+SHEET_CACHE_MAX_STALE_SEC = int(os.getenv("SHEET_CACHE_MAX_STALE_SEC", "3600"))
+
+
+def _format_age(seconds: float) -> str:
+    if seconds < 3600:
+        return f"{seconds / 60:.0f} min"
+    if seconds < 86400:
+        return f"{seconds / 3600:.1f} h"
+    return f"{seconds / 86400:.1f} días"
 
 
 def main():
@@ -16,8 +31,7 @@ def main():
 
     # Verificar configuración
     print("📊 Verificando configuración...")
-    export_cmd = "export $(grep -v '^#' .env.production | xargs)"
-    os.system(export_cmd)
+    load_dotenv(".env.production")
 
     # Verificar variables críticas
     required_vars = [
@@ -42,8 +56,33 @@ def main():
 
     # Verificar conexión a Sheets
     print("📋 Verificando conexión a Google Sheets...")
+    sheets_online = True
     try:
-        events = read_events_from_sheet()
+        try:
+            sync = sheet_sync_from_env()
+            stats = sync.sync_if_stale(SHEET_CACHE_MAX_AGE_SEC)
+            if stats is None:
+                print(f"✅ Caché local de Sheets vigente ({_format_age(sync.cache_age())})")
+            else:
+                print(f"✅ Sheets sincronizado: {stats['changed']} filas cambiadas")
+        except Exception as e:
+            sheets_online = False
+            sync = SheetSync(
+                os.getenv("SHEET_CACHE_DB", "trading_data.db"),
+                None,
+                os.environ["EVENT_SHEET_ID"],
+                os.environ["EVENT_SHEET_RANGE"],
+            )
+            age = sync.cache_age()
+            if age is None:
+                print(f"❌ Sheets no disponible ({e}) y no hay caché local")
+                return False
+            if age > SHEET_CACHE_MAX_STALE_SEC:
+                print(f"❌ Sheets no disponible ({e}); caché local de hace {_format_age(age)} "
+                      f"(máximo {_format_age(SHEET_CACHE_MAX_STALE_SEC)})")
+                return False
+            print(f"⚠️  Sheets no disponible ({e}); usando caché local de hace {_format_age(age)}")
+        events = sync.read_events()
         if not events:
             print("❌ No se pudieron leer eventos de Sheets")
             print("   Verificar:")
@@ -52,7 +91,10 @@ def main():
             print("   3. Formato de datos correcto")
             return False
 
-        print(f"✅ Sheets OK: {len(events)} eventos leídos")
+        if sheets_online:
+            print(f"✅ Sheets OK: {len(events)} eventos leídos")
+        else:
+            print(f"⚠️  Caché de Sheets: {len(events)} eventos leídos (sin conexión)")
 
         # Verificar estructura de eventos
         print("🔍 Verificando estructura de eventos...")
@@ -103,7 +145,10 @@ def main():
 
     print("\n🎯 RESUMEN DE VERIFICACIÓN:")
     print("✅ Configuración básica")
-    print("✅ Conexión a Google Sheets")
+    if sheets_online:
+        print("✅ Conexión a Google Sheets")
+    else:
+        print(f"⚠️  Google Sheets caído: caché de hace {_format_age(sync.cache_age())}")
     print(f"✅ {valid_events} eventos válidos")
     print("✅ Kill switch desactivado")
 
@@ -35,7 +35,12 @@ VALIDATION_CONFIG = {
         'end': '2024-12-31',
         'description': 'Período completo 2023-2024'
     },
-    'validation_mode': 'fixed_dates',  # Usar fechas específicas, no relativas
+    'validation_mode': 'fixed_dates',  # 'fixed_dates' o 'relative' (ventanas móviles)
+    'relative': {
+        'source': 'events',           # 'events' (executed=1) o 'history' (macro_events + token_events)
+        'window_days': 365,           # ventana de COVERAGE_VALIDATION.MINIMUM_REQUIREMENTS.last_365d
+        'as_of': None                 # None = hoy (UTC); o fecha ISO fija
+    },
     'strict_mode': True,  # Requerir cumplimiento estricto de mínimos
     'auto_adjust': False  # No ajustar automáticamente los mínimos
 }
@@ -66,5 +71,8 @@ if __name__ == "__main__":
     
     print(f"\n⚙️ Configuración de validación:")
     print(f"   Modo: {VALIDATION_CONFIG['validation_mode']}")
-    print(f"   Rango de fechas: {VALIDATION_CONFIG['date_range']['start']} a {VALIDATION_CONFIG['date_range']['end']}")
+    if VALIDATION_CONFIG['validation_mode'] == 'relative':
+        print(f"   Ventana: últimos {VALIDATION_CONFIG['relative']['window_days']} días")
+    else:
+        print(f"   Rango de fechas: {VALIDATION_CONFIG['date_range']['start']} a {VALIDATION_CONFIG['date_range']['end']}")
     print(f"   Modo estricto: {VALIDATION_CONFIG['strict_mode']}")
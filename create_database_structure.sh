@@ -11,10 +11,11 @@ mkdir -p logs/validation
 echo "🗄️ Inicializando base de datos SQLite con estructura completa..."
 
 # Inicializar SQLite con todas las tablas necesarias
-python3 -c "
+PYTHONPATH="$(cd "$(dirname "$0")" && pwd)${PYTHONPATH:+:$PYTHONPATH}" python3 -c "
 import sqlite3
 import os
 from datetime import datetime, timedelta
+from advanced_trading.db_schema import ensure_schema
 
 print('🔧 Creando base de datos trading_data.db...')
 
@@ -22,143 +23,8 @@ print('🔧 Creando base de datos trading_data.db...')
 conn = sqlite3.connect('trading_data.db')
 cursor = conn.cursor()
 
-# Tabla principal de eventos con todas las columnas necesarias
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS events (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    event_type TEXT NOT NULL,
-    family TEXT NOT NULL,
-    event_date TEXT NOT NULL,
-    t0_iso TEXT NOT NULL,
-    symbol TEXT DEFAULT 'BTCUSDT',
-    consensus REAL,
-    actual REAL,
-    deviation REAL,
-    impact TEXT,
-    executed INTEGER DEFAULT 0,
-    outcome TEXT,
-    pnl REAL,
-    execution_time_ms INTEGER,
-    spread_bps REAL,
-    slippage_bps REAL,
-    book_depth_usd REAL,
-    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
-)
-''')
-
-# Tabla de eventos macroeconómicos específicos
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS macro_events (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    event_type TEXT NOT NULL,
-    family TEXT DEFAULT 'macro_US',
-    event_date TEXT NOT NULL,
-    consensus REAL,
-    actual REAL,
-    deviation REAL,
-    surprise_bps INTEGER,
-    impact TEXT,
-    market_reaction REAL,
-    created_at TEXT DEFAULT CURRENT_TIMESTAMP
-)
-''')
-
-# Tabla de token events (unlocks, listings, etc.)
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS token_events (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    event_type TEXT NOT NULL,
-    family TEXT DEFAULT 'crypto_events',
-    token_symbol TEXT NOT NULL,
-    event_date TEXT NOT NULL,
-    description TEXT,
-    impact_score REAL,
-    supply_affected REAL,
-    market_cap_usd REAL,
-    created_at TEXT DEFAULT CURRENT_TIMESTAMP
-)
-''')
-
-# Tabla de market data para análisis
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS market_data (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    symbol TEXT NOT NULL,
-    timestamp TEXT NOT NULL,
-    open REAL,
-    high REAL,
-    low REAL,
-    close REAL,
-    volume REAL,
-    spread_bps REAL,
-    book_depth_usd REAL,
-    volatility REAL,
-    created_at TEXT DEFAULT CURRENT_TIMESTAMP
-)
-''')
-
-# Tabla de trades ejecutados
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS trades (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    event_id INTEGER,
-    symbol TEXT NOT NULL,
-    side TEXT NOT NULL,
-    entry_price REAL,
-    exit_price REAL,
-    size REAL,
-    pnl REAL,
-    entry_time TEXT,
-    exit_time TEXT,
-    execution_time_ms INTEGER,
-    spread_bps REAL,
-    slippage_bps REAL,
-    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (event_id) REFERENCES events (id)
-)
-''')
-
-# Tabla de calibraciones del sistema
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS calibrations (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    family TEXT NOT NULL,
-    calibration_date TEXT NOT NULL,
-    parameters_before TEXT,
-    parameters_after TEXT,
-    metrics_before TEXT,
-    metrics_after TEXT,
-    improvement REAL,
-    approver TEXT,
-    approved_at TEXT,
-    data_hash TEXT,
-    created_at TEXT DEFAULT CURRENT_TIMESTAMP
-)
-''')
-
-# Tabla de snapshots para rollback
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS snapshots (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    calibration_id INTEGER,
-    snapshot_date TEXT NOT NULL,
-    parameters TEXT,
-    metrics TEXT,
-    data_hash TEXT,
-    rollback_reason TEXT,
-    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (calibration_id) REFERENCES calibrations (id)
-)
-''')
-
-# Crear índices para performance
-cursor.execute('CREATE INDEX IF NOT EXISTS idx_events_family ON events (family)')
-cursor.execute('CREATE INDEX IF NOT EXISTS idx_events_executed ON events (executed)')
-cursor.execute('CREATE INDEX IF NOT EXISTS idx_events_date ON events (event_date)')
-cursor.execute('CREATE INDEX IF NOT EXISTS idx_trades_symbol ON trades (symbol)')
-cursor.execute('CREATE INDEX IF NOT EXISTS idx_trades_time ON trades (entry_time)')
-cursor.execute('CREATE INDEX IF NOT EXISTS idx_calibrations_family ON calibrations (family)')
+# Tablas e índices desde advanced_trading/db_schema.py (fuente única del DDL)
+ensure_schema(conn)
 
 # Insertar datos de ejemplo para testing
 print('📊 Insertando datos de ejemplo para validación...')
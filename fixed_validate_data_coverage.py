@@ -4,15 +4,45 @@ Validador corregido - usa fechas específicas 2023-2024
 Resuelve el problema de validación identificado por DS
 """
 
+import argparse
 import sqlite3
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple
 
+from advanced_trading.coverage_counters import (
+    CoverageSpec, compute_counts, counters_installed, install_counters,
+)
+from advanced_trading.coverage_windows import check_rolling_requirements, load_buckets
+from config.coverage_requirements import VALIDATION_CONFIG
+
+# Rango fijo del dataset histórico
+START_DATE = '2023-01-01'
+END_DATE = '2024-12-31'
+
+MACRO_TYPES = ('CPI', 'FOMC', 'GDP', 'UNEMPLOYMENT', 'ECB_RATE')
+TOKEN_TYPES = ('UNLOCK', 'LISTING', 'HACK')
+MACRO_FAMILIES = ('macro_US', 'macro_EU')
+TOKEN_FAMILIES = ('crypto_unlocks', 'listings', 'security_incidents')
+
+COVERAGE_SPECS = (
+    [CoverageSpec('macro_events', event_type=t, distinct_dates=True) for t in MACRO_TYPES]
+    + [CoverageSpec('token_events', event_type=t) for t in TOKEN_TYPES]
+    + [CoverageSpec('macro_events', family=f) for f in MACRO_FAMILIES]
+    + [CoverageSpec('token_events', family=f) for f in TOKEN_FAMILIES]
+)
+
 class FixedDataCoverageValidator:
-    def __init__(self, db_path: str = 'trading_data.db'):
+    def __init__(self, db_path: str = 'trading_data.db', full: bool = False, workers: int = 4,
+                 mode: str = None, install: bool = False):
         self.db_path = db_path
+        self.install = install
+        self.mode = mode or VALIDATION_CONFIG['validation_mode']
+        self.full = full
+        self.workers = workers
         self.conn = None
         self.cursor = None
+        self.counts: Dict[CoverageSpec, int] = {}
+        self.mismatches: List[Tuple[CoverageSpec, int, int]] = []
         
     def connect(self):
         """Conectar a la base de datos"""
@@ -30,58 +60,52 @@ class FixedDataCoverageValidator:
         if self.conn:
             self.conn.close()
     
+    def load_counts(self):
+        """
+        Cargar todos los conteos de cobertura
+
+        Por defecto lee la tabla resumen coverage_counters (mantenida por
+        triggers). Con --full recalcula escaneando las tablas en paralelo por
+        familia y comprueba que ambos caminos coinciden. La tabla resumen sólo
+        se instala con --install-counters; sin ella se escanea.
+        """
+        if self.install and install_counters(self.conn):
+            print("✅ Contadores de cobertura instalados")
+        if not counters_installed(self.conn):
+            print("⚠️ coverage_counters no instalada (usa --install-counters): escaneando tablas")
+            self.full = True
+            self.mismatches = []
+            self.counts = compute_counts(self.db_path, COVERAGE_SPECS, START_DATE, END_DATE,
+                                         full=True, workers=self.workers)
+            return self.counts
+        self.counts = compute_counts(self.db_path, COVERAGE_SPECS, START_DATE, END_DATE)
+        self.mismatches = []
+        if self.full:
+            scanned = compute_counts(self.db_path, COVERAGE_SPECS, START_DATE, END_DATE,
+                                     full=True, workers=self.workers)
+            self.mismatches = [(spec, self.counts[spec], scanned[spec])
+                               for spec in COVERAGE_SPECS if self.counts[spec] != scanned[spec]]
+            for spec, summary, full_count in self.mismatches:
+                print(f"   ⚠️ Contador desalineado {spec}: resumen={summary} recalculado={full_count}")
+            self.counts = scanned
+        return self.counts
+
+    def _count(self, source: str, event_type: str = None, family: str = None,
+               distinct_dates: bool = False) -> int:
+        spec = CoverageSpec(source, event_type, family, distinct_dates)
+        if spec not in self.counts:
+            self.counts.update(compute_counts(self.db_path, [spec], START_DATE, END_DATE, full=self.full))
+        return self.counts[spec]
+
     def check_macro_coverage_fixed(self) -> Dict[str, bool]:
         """Verificar cobertura de eventos macro con fechas 2023-2024"""
         print("\n📊 Verificando cobertura de eventos macro (2023-2024)...")
         
-        # Fechas específicas para nuestro dataset (2023-2024)
-        start_date = '2023-01-01'
-        end_date = '2024-12-31'
-        
-        # Verificar CPI (mínimo 24 eventos en 2023-2024)
-        self.cursor.execute(f"""
-            SELECT COUNT(DISTINCT event_date) 
-            FROM macro_events 
-            WHERE event_type = 'CPI' 
-            AND event_date BETWEEN '{start_date}' AND '{end_date}'
-        """)
-        cpi_count = self.cursor.fetchone()[0]
-        
-        # Verificar FOMC (mínimo 8 eventos en 2023-2024)
-        self.cursor.execute(f"""
-            SELECT COUNT(DISTINCT event_date) 
-            FROM macro_events 
-            WHERE event_type = 'FOMC' 
-            AND event_date BETWEEN '{start_date}' AND '{end_date}'
-        """)
-        fomc_count = self.cursor.fetchone()[0]
-        
-        # Verificar GDP (mínimo 12 eventos en 2023-2024)
-        self.cursor.execute(f"""
-            SELECT COUNT(DISTINCT event_date) 
-            FROM macro_events 
-            WHERE event_type = 'GDP' 
-            AND event_date BETWEEN '{start_date}' AND '{end_date}'
-        """)
-        gdp_count = self.cursor.fetchone()[0]
-        
-        # Verificar Unemployment (mínimo 24 eventos en 2023-2024)
-        self.cursor.execute(f"""
-            SELECT COUNT(DISTINCT event_date) 
-            FROM macro_events 
-            WHERE event_type = 'UNEMPLOYMENT' 
-            AND event_date BETWEEN '{start_date}' AND '{end_date}'
-        """)
-        unemployment_count = self.cursor.fetchone()[0]
-        
-        # Verificar ECB (mínimo 15 eventos en 2023-2024)
-        self.cursor.execute(f"""
-            SELECT COUNT(DISTINCT event_date) 
-            FROM macro_events 
-            WHERE event_type = 'ECB_RATE' 
-            AND event_date BETWEEN '{start_date}' AND '{end_date}'
-        """)
-        ecb_count = self.cursor.fetchone()[0]
+        cpi_count = self._count('macro_events', 'CPI', distinct_dates=True)
+        fomc_count = self._count('macro_events', 'FOMC', distinct_dates=True)
+        gdp_count = self._count('macro_events', 'GDP', distinct_dates=True)
+        unemployment_count = self._count('macro_events', 'UNEMPLOYMENT', distinct_dates=True)
+        ecb_count = self._count('macro_events', 'ECB_RATE', distinct_dates=True)
         
         print(f"   📈 CPI: {cpi_count}/24 eventos requeridos (2023-2024)")
         print(f"   🏦 FOMC: {fomc_count}/8 eventos requeridos (2023-2024)")
@@ -111,36 +135,9 @@ class FixedDataCoverageValidator:
         """Verificar cobertura de eventos de tokens con fechas 2023-2024"""
         print("\n🪙 Verificando cobertura de eventos de tokens (2023-2024)...")
         
-        # Fechas específicas para nuestro dataset (2023-2024)
-        start_date = '2023-01-01'
-        end_date = '2024-12-31'
-        
-        # Verificar Unlocks (mínimo 50 eventos en 2023-2024)
-        self.cursor.execute(f"""
-            SELECT COUNT(*) 
-            FROM token_events 
-            WHERE event_type = 'UNLOCK' 
-            AND event_date BETWEEN '{start_date}' AND '{end_date}'
-        """)
-        unlock_count = self.cursor.fetchone()[0]
-        
-        # Verificar Listings (mínimo 25 eventos en 2023-2024)
-        self.cursor.execute(f"""
-            SELECT COUNT(*) 
-            FROM token_events 
-            WHERE event_type = 'LISTING' 
-            AND event_date BETWEEN '{start_date}' AND '{end_date}'
-        """)
-        listing_count = self.cursor.fetchone()[0]
-        
-        # Verificar Security Incidents (mínimo 10 eventos en 2023-2024)
-        self.cursor.execute(f"""
-            SELECT COUNT(*) 
-            FROM token_events 
-            WHERE event_type = 'HACK' 
-            AND event_date BETWEEN '{start_date}' AND '{end_date}'
-        """)
-        hack_count = self.cursor.fetchone()[0]
+        unlock_count = self._count('token_events', 'UNLOCK')
+        listing_count = self._count('token_events', 'LISTING')
+        hack_count = self._count('token_events', 'HACK')
         
         print(f"   🔓 Unlocks: {unlock_count}/50 eventos requeridos (2023-2024)")
         print(f"   📈 Listings: {listing_count}/25 eventos requeridos (2023-2024)")
@@ -210,49 +207,11 @@ class FixedDataCoverageValidator:
         """Verificar cobertura por familia de eventos con fechas 2023-2024"""
         print("\n🏗️ Verificando cobertura por familia de eventos (2023-2024)...")
         
-        # Fechas específicas para nuestro dataset (2023-2024)
-        start_date = '2023-01-01'
-        end_date = '2024-12-31'
-        
-        # Macro US (mínimo 20 eventos en 2023-2024)
-        self.cursor.execute(f"""
-            SELECT COUNT(*) FROM macro_events 
-            WHERE family = 'macro_US' 
-            AND event_date BETWEEN '{start_date}' AND '{end_date}'
-        """)
-        macro_us_count = self.cursor.fetchone()[0]
-        
-        # Macro EU (mínimo 15 eventos en 2023-2024)
-        self.cursor.execute(f"""
-            SELECT COUNT(*) FROM macro_events 
-            WHERE family = 'macro_EU' 
-            AND event_date BETWEEN '{start_date}' AND '{end_date}'
-        """)
-        macro_eu_count = self.cursor.fetchone()[0]
-        
-        # Crypto Unlocks (mínimo 30 eventos en 2023-2024)
-        self.cursor.execute(f"""
-            SELECT COUNT(*) FROM token_events 
-            WHERE family = 'crypto_unlocks' 
-            AND event_date BETWEEN '{start_date}' AND '{end_date}'
-        """)
-        crypto_unlocks_count = self.cursor.fetchone()[0]
-        
-        # Listings (mínimo 25 eventos en 2023-2024)
-        self.cursor.execute(f"""
-            SELECT COUNT(*) FROM token_events 
-            WHERE family = 'listings' 
-            AND event_date BETWEEN '{start_date}' AND '{end_date}'
-        """)
-        listings_count = self.cursor.fetchone()[0]
-        
-        # Security Incidents (mínimo 10 eventos en 2023-2024)
-        self.cursor.execute(f"""
-            SELECT COUNT(*) FROM token_events 
-            WHERE family = 'security_incidents' 
-            AND event_date BETWEEN '{start_date}' AND '{end_date}'
-        """)
-        security_count = self.cursor.fetchone()[0]
+        macro_us_count = self._count('macro_events', family='macro_US')
+        macro_eu_count = self._count('macro_events', family='macro_EU')
+        crypto_unlocks_count = self._count('token_events', family='crypto_unlocks')
+        listings_count = self._count('token_events', family='listings')
+        security_count = self._count('token_events', family='security_incidents')
         
         print(f"   🇺🇸 Macro US: {macro_us_count}/20 eventos requeridos (2023-2024)")
         print(f"   🇪🇺 Macro EU: {macro_eu_count}/15 eventos requeridos (2023-2024)")
@@ -278,6 +237,22 @@ class FixedDataCoverageValidator:
             'OVERALL': family_ok
         }
     
+    def check_family_coverage_relative(self) -> Dict[str, bool]:
+        """Verificar cobertura por familia en ventana móvil (MINIMUM_REQUIREMENTS)"""
+        settings = VALIDATION_CONFIG['relative']
+        window = settings['window_days']
+        print(f"\n🏗️ Verificando cobertura por familia de eventos (últimos {window} días)...")
+
+        buckets = load_buckets(self.db_path, settings['source'])
+        report = check_rolling_requirements(buckets, settings['as_of'], window_days=window)
+        for family, row in report.items():
+            status = "✅" if row['ok'] else "❌"
+            print(f"   {status} {family}: total={row['total']} últimos {window}d={row['last_365d']}")
+
+        results = {family: row['ok'] for family, row in report.items()}
+        results['OVERALL'] = all(results.values())
+        return results
+
     def run_fixed_validation(self) -> Dict[str, bool]:
         """Ejecutar validación corregida con fechas 2023-2024"""
         print("🚀 INICIANDO VALIDACIÓN CORREGIDA (2023-2024)")
@@ -289,11 +264,16 @@ class FixedDataCoverageValidator:
             return {'ERROR': 'No se pudo conectar a la BD'}
         
         try:
+            self.load_counts()
+
             # Ejecutar todas las validaciones corregidas
             macro_results = self.check_macro_coverage_fixed()
             token_results = self.check_token_events_coverage_fixed()
             market_results = self.check_market_data_coverage()
-            family_results = self.check_family_coverage_fixed()
+            if self.mode == 'relative':
+                family_results = self.check_family_coverage_relative()
+            else:
+                family_results = self.check_family_coverage_fixed()
             
             # Resumen final
             print("\n" + "=" * 60)
@@ -306,6 +286,8 @@ class FixedDataCoverageValidator:
                 'MARKET_DATA': market_results['OVERALL'],
                 'FAMILY_COVERAGE': family_results['OVERALL']
             }
+            if self.full:
+                all_validations['COUNTERS_CONSISTENT'] = not self.mismatches
             
             for category, result in all_validations.items():
                 status = "✅ CUMPLE" if result else "❌ NO CUMPLE"
@@ -335,7 +317,19 @@ class FixedDataCoverageValidator:
 
 def main():
     """Función principal"""
-    validator = FixedDataCoverageValidator()
+    parser = argparse.ArgumentParser(description='Validación de cobertura de datos 2023-2024')
+    parser.add_argument('--db', default='trading_data.db')
+    parser.add_argument('--full', action='store_true',
+                        help='Recalcular escaneando las tablas y verificar los contadores resumen')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--install-counters', action='store_true',
+                        help='Instala la tabla resumen coverage_counters y sus triggers si no existen')
+    parser.add_argument('--mode', choices=['fixed_dates', 'relative'],
+                        help='Cobertura por familia con fechas fijas o ventana móvil (por defecto VALIDATION_CONFIG)')
+    args = parser.parse_args()
+
+    validator = FixedDataCoverageValidator(args.db, full=args.full, workers=args.workers, mode=args.mode,
+                                           install=args.install_counters)
     results = validator.run_fixed_validation()
     
     # Retornar código de salida apropiado
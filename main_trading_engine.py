@@ -7,16 +7,23 @@ Solo permite operaciones después de validación completa del sistema
 import sys
 import os
 import argparse
+import logging
+import signal
+import threading
 from datetime import datetime
 import pytz
 
+from advanced_trading.logging_setup import setup_logging
+
+logger = logging.getLogger('trading_engine')
+
 def check_system_readiness():
     """Verificar que el sistema esté listo para operaciones"""
-    print("🔒 VERIFICANDO READINESS DEL SISTEMA...")
+    logger.info("🔒 VERIFICANDO READINESS DEL SISTEMA...")
     
     # Verificar que existe la BD
     if not os.path.exists('trading_data.db'):
-        print("❌ Base de datos no encontrada")
+        logger.error("❌ Base de datos no encontrada")
         return False
     
     # Verificar cobertura de datos
@@ -25,46 +32,170 @@ def check_system_readiness():
         result = subprocess.run(['python3', 'validate_data_coverage.py'], 
                               capture_output=True, text=True)
         if result.returncode != 0:
-            print("❌ Validación de cobertura falló")
+            logger.error("❌ Validación de cobertura falló")
             return False
     except Exception as e:
-        print(f"❌ Error en validación: {e}")
+        logger.error("❌ Error en validación: %s", e)
         return False
     
-    print("✅ Sistema verificado y listo")
+    logger.info("✅ Sistema verificado y listo")
     return True
 
+def build_components(account_balance: float, db_path: str = 'trading_data.db') -> dict:
+    """Componentes del motor que siguen la configuración en caliente"""
+    from advanced_trading.advanced_risk_manager import AdvancedRiskManager
+    from advanced_trading.exposure_tracker import ExposureTracker
+    from advanced_trading.macro_analyzer import MacroAnalyzer
+    from advanced_trading.relative_arbitrage import RelativeArbitrage
+    from advanced_trading.staggered_execution import StaggeredExecution
+
+    # Límites diarios, posiciones abiertas y cooldown reconstruidos desde trades
+    tracker = ExposureTracker.from_db(db_path, account_balance)
+    logger.info("📊 Estado diario desde %s: %d trades, PnL %.2f, %d posiciones abiertas",
+                db_path, tracker.daily_trades, tracker.daily_pnl, len(tracker.open_positions))
+    return {
+        'risk': AdvancedRiskManager(account_balance, exposure_tracker=tracker),
+        'macro': MacroAnalyzer(),
+        'arbitrage': RelativeArbitrage(),
+        'execution': StaggeredExecution(),
+    }
+
+def warm_start_components(components: dict, checkpoint_dir: str = 'checkpoints',
+                          db_path: str = 'trading_data.db'):
+    """
+    CheckpointManager con el arbitraje y el riesgo, restaurados desde el último checkpoint
+
+    El hueco desde el checkpoint se rellena con market_data. Hay que llamarlo
+    antes de start_hot_reload para que la config se aplique sobre el estado ya
+    restaurado.
+    """
+    from advanced_trading.checkpoint import CheckpointManager, warm_start
+
+    manager = CheckpointManager(checkpoint_dir)
+    manager.register('arbitrage', components['arbitrage']).register('risk', components['risk'])
+    report = warm_start(manager, db_path, arbitrage=components['arbitrage'])
+    logger.info("♻️ Arranque en caliente: restaurados %s, %d pares de backfill",
+                report['restored'] or 'ninguno', report['arbitrage_pairs'])
+    return manager
+
+def start_checkpoints(manager):
+    """
+    CheckpointManager.run en un hilo con su propio loop
+
+    Devuelve la función que lo para: cancela el bucle, cuyo finally escribe
+    un último checkpoint, y espera al hilo.
+    """
+    import asyncio
+
+    loop = asyncio.new_event_loop()
+    task = loop.create_task(manager.run())
+
+    def run():
+        try:
+            loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            logger.exception("❌ Checkpoints detenidos por error")
+        finally:
+            loop.close()
+
+    thread = threading.Thread(target=run, name='checkpoints', daemon=True)
+    thread.start()
+    logger.info("💾 Checkpoints cada %.0fs en %s", manager.interval_sec, manager.directory)
+
+    def stop():
+        if thread.is_alive():
+            loop.call_soon_threadsafe(task.cancel)
+        thread.join()
+
+    return stop
+
+def start_hot_reload(*targets, snapshots_root: str = 'snapshots'):
+    """
+    ConfigReloader con SIGHUP (ExecReload de systemd) y polling de los ficheros de config
+
+    También vigila el params.json de snapshot_store: un activate/rollback se
+    aplica a los componentes sin reiniciar el motor.
+    """
+    from advanced_trading.hot_reload import ConfigReloader
+    from advanced_trading.snapshot_store import SNAPSHOT_CONFIG
+
+    paths = {}
+    if SNAPSHOT_CONFIG['ENABLED']:
+        paths['params'] = os.path.join(snapshots_root, SNAPSHOT_CONFIG['PARAMS_FILE'])
+    reloader = ConfigReloader(paths).register(*targets)
+    reloader.install_signal_handler()
+    logger.info("🔄 Recarga en caliente activa (SIGHUP o cambios en config, v%d)", reloader.current.version)
+    return reloader.start()
+
+def start_metrics(reloader):
+    """/metrics y /health (HEALTHCHECK del Dockerfile) con el estado de la config en caliente"""
+    from advanced_trading.metrics import start_metrics_server
+
+    def health():
+        return {'config_version': reloader.current.version, 'config_failures': reloader.failures}
+
+    return start_metrics_server(health=health)
+
+def wait_for_shutdown(stop: threading.Event = None):
+    """Bloquea hasta SIGTERM/SIGINT"""
+    stop = stop or threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: stop.set())
+    stop.wait()
+
 def main():
     parser = argparse.ArgumentParser(description='Trading Engine Principal')
     parser.add_argument('--dry-run', action='store_true', help='Ejecutar en modo simulación')
     parser.add_argument('--validate-only', action='store_true', help='Solo validar sistema')
+    parser.add_argument('--log-level', default=None,
+                        help='Nivel de log (DEBUG, INFO, ...); sin él se usa settings.log_level y se recarga en caliente')
+    parser.add_argument('--account-balance', type=float, default=10_000.0, help='Capital de la cuenta (USD)')
+    parser.add_argument('--snapshots', default='snapshots',
+                        help='Directorio de snapshot_store cuyo params.json activo se aplica en caliente')
+    parser.add_argument('--checkpoint-dir', default='checkpoints',
+                        help='Directorio de checkpoints del estado en memoria (arranque en caliente)')
     
     args = parser.parse_args()
+    log_runtime = setup_logging(level=args.log_level or 'INFO')
     
-    print("🚀 TRADING ENGINE - SISTEMA DE SEGURIDAD ACTIVO")
-    print("=" * 60)
+    logger.info("🚀 TRADING ENGINE - SISTEMA DE SEGURIDAD ACTIVO")
     
     # Verificar readiness
     if not check_system_readiness():
-        print("❌ SISTEMA NO LISTO - ABORTANDO")
+        logger.error("❌ SISTEMA NO LISTO - ABORTANDO")
         sys.exit(1)
     
     if args.validate_only:
-        print("✅ Validación completada - Sistema listo")
+        logger.info("✅ Validación completada - Sistema listo")
         return
     
     # Modo dry-run por defecto
     if args.dry_run:
-        print("🧪 MODO DRY-RUN ACTIVADO - Sin operaciones reales")
+        logger.info("🧪 MODO DRY-RUN ACTIVADO - Sin operaciones reales")
     else:
-        print("⚠️ MODO PRODUCCIÓN - Requiere aprobación manual")
+        logger.warning("⚠️ MODO PRODUCCIÓN - Requiere aprobación manual")
         response = input("¿Continuar con operaciones reales? (yes/no): ")
         if response.lower() != 'yes':
-            print("❌ Operación cancelada por el usuario")
+            logger.error("❌ Operación cancelada por el usuario")
             return
     
-    print("🎯 Iniciando trading engine...")
+    logger.info("🎯 Iniciando trading engine...")
+    components = build_components(args.account_balance)
+    checkpoints = warm_start_components(components, args.checkpoint_dir)
+    targets = list(components.values()) + ([log_runtime] if args.log_level is None else [])
+    reloader = start_hot_reload(*targets, snapshots_root=args.snapshots)
+    stop_checkpoints = start_checkpoints(checkpoints)
+    metrics_server = start_metrics(reloader)
     # Aquí iría la lógica principal del trading
+    try:
+        wait_for_shutdown()
+    finally:
+        metrics_server.stop()
+        reloader.stop()
+        stop_checkpoints()
+        logger.info("🛑 Trading engine detenido")
 
 if __name__ == "__main__":
     main()
@@ -24,28 +24,28 @@ class TestAdvancedTrading(unittest.TestCase):
         self.assertAlmostEqual(calculate_deviation_percentage(100, 95), -5.0)
     
     def test_staggered_execution(self):
+        # Entrada escalonada 15/30/55% (T0, T+30s, T+2min); TP_ALLOCATION es el reparto de salidas
         plan = generate_staggered_plan('BUY', 10000)
         self.assertEqual(len(plan), 3)
-        self.assertEqual(plan[0]['amount'], 4000)  # 40% (TP_ALLOCATION[0])
-        self.assertEqual(plan[1]['amount'], 3500)  # 35% (TP_ALLOCATION[1])
-        self.assertEqual(plan[2]['amount'], 2500)  # 25% (TP_ALLOCATION[2])
+        self.assertEqual([stage['stage'] for stage in plan], ['T0', 'T+30s', 'T+2min'])
+        self.assertEqual(plan[0]['amount'], 1500)  # 15%
+        self.assertEqual(plan[1]['amount'], 3000)  # 30%
+        self.assertEqual(plan[2]['amount'], 5500)  # 55%
     
     def test_dynamic_sl(self):
         sl = calculate_dynamic_sl(0.02, 0.001)  # ATR 2%, spread 0.1%
         self.assertAlmostEqual(sl, 0.04)  # max(4%, 0.3%) = 4%
     
     def test_arbitrage_opportunity(self):
-        # Datos que cumplan umbrales: correlación alta + divergencia > 1%
-        btc_prices = [50000, 50100, 50200, 50300, 50400, 50500]  # +1%
-        eth_prices = [3000, 3000, 3000, 3000, 3000, 3000]       # 0%
+        # Datos que cumplan umbrales: correlación alta + divergencia > 1%.
+        # Mismos movimientos, BTC con el doble de amplitud (una serie constante
+        # no tiene correlación definida)
+        btc_prices = [50000, 50000, 50800, 50400, 51600, 51200, 52000]  # +2.4% en 5 períodos
+        eth_prices = [3000, 3000, 3024, 3012, 3048, 3036, 3060]         # +1.2%
         
-        # Usar lookback=5 y verificar que los datos cumplan los requisitos
         signal = check_arbitrage_opportunity(btc_prices, eth_prices, lookback_period=5)
-        
-        # Verificar que la correlación sea alta y la divergencia > 1%
-        # BTC: +1% en 5 períodos, ETH: 0% → divergencia = 1% (umbral mínimo)
-        self.assertIsNotNone(signal, "Debería detectar oportunidad con divergencia = 1%")
-        self.assertIn(signal, ['long_eth_short_btc', 'long_btc_short_eth'])
+        self.assertEqual(signal, 'long_eth_short_btc')  # BTC sube más: largo en el rezagado
+        self.assertEqual(check_arbitrage_opportunity(eth_prices, btc_prices, lookback_period=5), 'long_btc_short_eth')
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from benchmarks import suite
+from benchmarks.__main__ import main
+
+
+def _report(**medians):
+    return {'meta': {'size': 'S'}, 'results': {k: {'median_s': v, 'min_s': v, 'ops': 1} for k, v in medians.items()}}
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+    def test_compare_flags_only_regressions_beyond_threshold(self):
+        rows = {r['name']: r for r in suite.compare(_report(a=1.0, b=1.0), _report(a=1.2, b=1.3, c=5.0), 0.25)}
+        self.assertFalse(rows['a']['regression'])
+        self.assertTrue(rows['b']['regression'])
+        self.assertIsNone(rows['c']['baseline_s'])
+        self.assertFalse(rows['c']['regression'])
+
+    def test_run_suite_subset(self):
+        report = suite.run_suite('S', repeat=1, only=['execution.', 'coverage.summary'])
+        self.assertEqual(set(report['results']), {'execution.generate_plan', 'coverage.summary_counters'})
+        self.assertGreater(report['results']['execution.generate_plan']['median_s'], 0)
+
+    def test_committed_baseline_covers_all_cases(self):
+        baseline = suite.load(suite.DEFAULT_BASELINE)
+        self.assertEqual(set(baseline['results']), set(suite.CASES))
+
+    def test_committed_baseline_uses_pinned_numpy(self):
+        with open(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'requirements.txt')) as f:
+            pinned = dict(line.strip().split('==') for line in f if line.startswith('numpy=='))
+        self.assertEqual(suite.load(suite.DEFAULT_BASELINE)['meta']['numpy'], pinned['numpy'])
+
+    def test_cli_refuses_baseline_from_other_environment(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            baseline, current = os.path.join(tmp, 'base.json'), os.path.join(tmp, 'cur.json')
+            report = _report(a=1.0)
+            suite.save(dict(report, meta={'size': 'S', 'numpy': '1.26.4'}), baseline)
+            suite.save(dict(report, meta={'size': 'S', 'numpy': '2.0.0'}), current)
+            with redirect_stdout(StringIO()):
+                self.assertEqual(main(['compare', '--baseline', baseline, '--current', current]), 2)
+                self.assertEqual(main(['compare', '--baseline', baseline, '--current', current,
+                                       '--allow-env-mismatch']), 0)
+
+    def test_cli_compare_exit_code(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            baseline, current = os.path.join(tmp, 'base.json'), os.path.join(tmp, 'cur.json')
+            suite.save(_report(a=1.0), baseline)
+            suite.save(_report(a=2.0), current)
+            with redirect_stdout(StringIO()):
+                self.assertEqual(main(['compare', '--baseline', baseline, '--current', current]), 1)
+                self.assertEqual(main(['compare', '--baseline', baseline, '--current', current,
+                                       '--threshold', '1.5']), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,182 @@
+import asyncio
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timezone
+
+import numpy as np
+
+from advanced_trading.advanced_risk_manager import AdvancedRiskManager
+from advanced_trading.checkpoint import CheckpointManager, warm_start
+from advanced_trading.db_schema import ensure_schema
+from advanced_trading.exposure_tracker import ExposureTracker
+from advanced_trading.market_data_hub import ExecutionMarketView, MarketDataHub
+from advanced_trading.records import MarketSnapshot
+from advanced_trading.relative_arbitrage import RelativeArbitrage
+from main_trading_engine import build_components, start_checkpoints, warm_start_components
+
+T0 = datetime(2024, 3, 5, 15, 0, tzinfo=timezone.utc).timestamp()
+
+
+def _db_time(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.dir = os.path.join(self.tmp.name, 'state')
+        self.now = T0
+
+    def _components(self):
+        return RelativeArbitrage(), ExecutionMarketView(MarketDataHub()), AdvancedRiskManager(10_000)
+
+    def _manager(self, arbitrage, view, risk):
+        return CheckpointManager(self.dir, {'arbitrage': arbitrage, 'view': view, 'risk': risk},
+                                 interval_sec=60, clock=lambda: self.now)
+
+    def _fill(self, arbitrage, view, risk):
+        for i in range(150):
+            arbitrage.update_prices(50_000 + i, 3_000 + i / 10)
+            view.update(MarketSnapshot('BTCUSDT', 50_000 + i, T0 - 150 + i, bid=49_999 + i, ask=50_001 + i, volume=i))
+        risk.update_daily_stats(-25.0, trades=2)
+
+    def test_roundtrip_with_mmap(self):
+        arbitrage, view, risk = self._components()
+        self._fill(arbitrage, view, risk)
+        self._manager(arbitrage, view, risk).save()
+
+        fresh = self._components()
+        meta = self._manager(*fresh).load()
+        self.assertEqual(sorted(meta['restored']), ['arbitrage', 'risk', 'view'])
+        self.assertEqual(fresh[0].price_history, arbitrage.price_history)
+        self.assertEqual(fresh[1].market_data('BTCUSDT'), view.market_data('BTCUSDT'))
+        self.assertEqual((fresh[2].daily_pnl, fresh[2].daily_trades), (-25.0, 2))
+
+    def test_generations_and_interval(self):
+        manager = self._manager(*self._components())
+        self.assertIsNotNone(manager.maybe_save())
+        self.assertIsNone(manager.maybe_save())
+        for _ in range(3):
+            self.now += 61
+            manager.maybe_save()
+        generations = sorted(d for d in os.listdir(self.dir) if d.startswith('gen-'))
+        self.assertEqual(generations, ['gen-000003', 'gen-000004'])
+        self.assertTrue(manager.latest_path().endswith('gen-000004'))
+
+    def test_interrupted_write_keeps_previous(self):
+        manager = self._manager(*self._components())
+        manager.save()
+        os.makedirs(os.path.join(self.dir, 'gen-000002.tmp'))  # escritura a medias
+        self.assertTrue(manager.latest_path().endswith('gen-000001'))
+        self.assertIsNotNone(self._manager(*self._components()).load())
+
+    def test_daily_counters_not_restored_on_new_trading_day(self):
+        arbitrage, view, risk = self._components()
+        self._fill(arbitrage, view, risk)
+        self._manager(arbitrage, view, risk).save()
+        self.now += 86_400
+        fresh = self._components()
+        meta = self._manager(*fresh).load()
+        self.assertEqual(meta['skipped'], ['risk'])
+        self.assertEqual(fresh[2].daily_trades, 0)
+        self.assertEqual(len(fresh[0].price_history['BTC/USDT']), 100)
+
+    def test_tracker_counters_are_not_overwritten(self):
+        arbitrage, view, risk = self._components()
+        self._fill(arbitrage, view, risk)
+        self._manager(arbitrage, view, risk).save()
+
+        tracker = ExposureTracker(10_000, clock=lambda: self.now)
+        tracker.record_daily(-5.0, 1)
+        fresh = (RelativeArbitrage(), ExecutionMarketView(MarketDataHub()),
+                 AdvancedRiskManager(10_000, exposure_tracker=tracker))
+        self.assertIn('risk', self._manager(*fresh).load()['restored'])
+        self.assertEqual((tracker.daily_pnl, tracker.daily_trades), (-5.0, 1))
+
+    def test_engine_warm_starts_and_checkpoints_components(self):
+        db = os.path.join(self.tmp.name, 'trading_data.db')
+        conn = sqlite3.connect(db)
+        ensure_schema(conn, ['events', 'trades', 'market_data'])
+        conn.execute("INSERT INTO trades (event_id, symbol, side, entry_time) "
+                     "VALUES (7, 'BTCUSDT', 'BUY', datetime('now'))")
+        conn.commit()
+        conn.close()
+
+        components = build_components(10_000, db)
+        manager = warm_start_components(components, self.dir, db)
+        self.assertEqual(sorted(manager.components), ['arbitrage', 'risk'])
+        for i in range(30):
+            components['arbitrage'].update_prices(50_000 + i, 3_000 + i)
+        components['risk'].daily_trades = 9  # el checkpoint no debe ganar a trades
+        start_checkpoints(manager)()
+        self.assertIsNotNone(manager.latest_path())
+
+        fresh = build_components(10_000, db)
+        warm_start_components(fresh, self.dir, db)
+        self.assertEqual(fresh['arbitrage'].price_history, components['arbitrage'].price_history)
+        self.assertEqual(fresh['risk'].daily_trades, 1)
+
+    def test_warm_start_backfills_gap_from_market_data(self):
+        db = os.path.join(self.tmp.name, 'trading.db')
+        conn = sqlite3.connect(db)
+        ensure_schema(conn, ['market_data'])
+        rng = np.random.default_rng(0)
+        rows = []
+        for minute in range(1, 11):  # 10 min de barras posteriores al checkpoint
+            ts = T0 + minute * 60
+            rows += [('BTCUSDT', _db_time(ts), 60_000 + rng.normal(), 1.0, 2.0),
+                     ('ETHUSDT', _db_time(ts), 3_500 + rng.normal(), 1.0, 2.0)]
+        rows.append(('BTCUSDT', _db_time(T0 - 60), 1.0, 1.0, 2.0))  # anterior: ya en el checkpoint
+        conn.executemany('INSERT INTO market_data (symbol, timestamp, close, volume, spread_bps) '
+                         'VALUES (?, ?, ?, ?, ?)', rows)
+        conn.commit()
+        conn.close()
+
+        arbitrage, view, risk = self._components()
+        self._fill(arbitrage, view, risk)
+        self._manager(arbitrage, view, risk).save()
+
+        self.now = T0 + 11 * 60
+        fresh = self._components()
+        report = warm_start(self._manager(*fresh), db, arbitrage=fresh[0], view=fresh[1])
+        self.assertEqual(report['arbitrage_pairs'], 10)
+        self.assertEqual(report['view_rows'], 20)
+        self.assertAlmostEqual(report['gap_sec'], 660)
+        history = fresh[0].price_history['BTC/USDT']
+        self.assertEqual(len(history), 100)
+        self.assertGreater(history[-1], 59_000)
+        self.assertEqual(history[-11], arbitrage.price_history['BTC/USDT'][-1])
+
+    def test_run_captures_on_loop_and_writes_in_thread(self):
+        arbitrage, view, risk = self._components()
+        self._fill(arbitrage, view, risk)
+        manager = self._manager(arbitrage, view, risk)
+        captured, written = set(), []
+        checkpoint_state, write = arbitrage.checkpoint_state, manager._write
+        arbitrage.checkpoint_state = lambda: captured.add(threading.get_ident()) or checkpoint_state()
+        manager._write = lambda state: written.append(threading.get_ident()) or write(state)
+        stop = asyncio.Event()
+
+        async def sleep(seconds):
+            stop.set()
+
+        asyncio.run(manager.run(stop, sleep))
+        loop_thread = threading.get_ident()
+        self.assertEqual(captured, {loop_thread})
+        self.assertEqual(len(written), 2)  # periódico + final al parar
+        self.assertNotEqual(written[0], loop_thread)
+        self.assertTrue(manager.latest_path().endswith('gen-000002'))
+
+    def test_warm_start_without_checkpoint(self):
+        arbitrage, view, risk = self._components()
+        report = warm_start(self._manager(arbitrage, view, risk), None, now=T0)
+        self.assertIsNone(report['checkpoint'])
+        self.assertEqual(report['restored'], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
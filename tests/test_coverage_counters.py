@@ -0,0 +1,98 @@
+"""
+Tests de los contadores incrementales de cobertura
+"""
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from advanced_trading.coverage_counters import (
+    CoverageSpec, compute_counts, count_from_counters, count_from_scan, counters_installed, install_counters,
+    rebuild_counters,
+)
+from advanced_trading.db_schema import ensure_schema
+
+START, END = '2023-01-01', '2024-12-31'
+SPECS = [
+    CoverageSpec('macro_events', event_type='CPI', distinct_dates=True),
+    CoverageSpec('macro_events', event_type='FOMC', distinct_dates=True),
+    CoverageSpec('macro_events', family='macro_US'),
+    CoverageSpec('macro_events', family='macro_EU'),
+    CoverageSpec('token_events', event_type='UNLOCK'),
+    CoverageSpec('token_events', family='crypto_unlocks'),
+]
+
+
+class TestCoverageCounters(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'coverage.db')
+        self.conn = sqlite3.connect(self.db_path)
+        ensure_schema(self.conn, ['macro_events', 'token_events'])
+        # Filas previas a los triggers: se cuentan en la reconstrucción inicial
+        self.conn.execute("INSERT INTO macro_events (event_type, family, event_date) VALUES ('CPI', 'macro_US', '2023-01-12')")
+        self.conn.commit()
+        self.assertTrue(install_counters(self.conn))
+        self.assertFalse(install_counters(self.conn))
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmpdir.cleanup()
+
+    def assertCountersMatchScan(self):
+        for spec in SPECS:
+            self.assertEqual(count_from_counters(self.conn, spec, START, END),
+                             count_from_scan(self.conn, spec, START, END), spec)
+
+    def test_triggers_track_inserts_updates_and_deletes(self):
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO macro_events (event_type, family, event_date) VALUES (?, ?, ?)",
+                [('CPI', 'macro_EU', '2023-01-12'),   # misma fecha que CPI US
+                 ('CPI', 'macro_US', '2023-02-14'),
+                 ('FOMC', 'macro_US', '2023-02-01'),
+                 ('FOMC', 'macro_US', '2024-12-31 18:00:00'),  # con hora el último día: dentro
+                 ('FOMC', 'macro_US', '2025-02-01')],  # fuera de rango
+            )
+            self.conn.executemany(
+                "INSERT INTO token_events (event_type, family, token_symbol, event_date) VALUES (?, ?, ?, ?)",
+                [('UNLOCK', 'crypto_unlocks', 'ARB', '2023-03-16'),
+                 ('UNLOCK', 'crypto_unlocks', 'OP', '2023-03-16')],
+            )
+        self.assertEqual(count_from_counters(self.conn, SPECS[0], START, END), 2)
+        self.assertEqual(count_from_scan(self.conn, SPECS[1], START, END), 2)
+        self.assertCountersMatchScan()
+
+        with self.conn:
+            self.conn.execute("DELETE FROM macro_events WHERE family = 'macro_US' AND event_date = '2023-01-12'")
+            self.conn.execute("UPDATE macro_events SET event_date = '2023-03-14' WHERE event_date = '2023-02-14'")
+            self.conn.execute("UPDATE macro_events SET family = 'macro_US' WHERE family = 'macro_EU'")
+            self.conn.execute("UPDATE token_events SET description = 'x'")
+        self.assertCountersMatchScan()
+
+    def test_full_scan_agrees_with_rebuild(self):
+        rebuild_counters(self.conn)
+        summary = compute_counts(self.db_path, SPECS, START, END)
+        full = compute_counts(self.db_path, SPECS, START, END, full=True, workers=3)
+        self.assertEqual(summary, full)
+        with self.assertRaises(ValueError):
+            count_from_counters(self.conn, SPECS[0], '2023-01-15', END)
+
+    def test_summary_requires_explicit_install(self):
+        other = os.path.join(self.tmpdir.name, 'other.db')
+        conn = sqlite3.connect(other)
+        ensure_schema(conn, ['macro_events', 'token_events'])
+        conn.close()
+        with self.assertRaises(RuntimeError):
+            compute_counts(other, SPECS, START, END)
+        conn = sqlite3.connect(other)
+        try:
+            self.assertFalse(counters_installed(conn))
+        finally:
+            conn.close()
+        self.assertEqual(compute_counts(other, SPECS, START, END, full=True), {spec: 0 for spec in SPECS})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+"""
+Tests de cobertura en ventanas relativas
+"""
+import os
+import sqlite3
+import tempfile
+import unittest
+from datetime import date, timedelta
+
+import numpy as np
+
+from advanced_trading.coverage_windows import (
+    DailyBuckets, calibration_gate, check_rolling_requirements, load_buckets,
+)
+from advanced_trading.db_schema import ensure_schema
+
+
+class TestCoverageWindows(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        base = date(2023, 1, 1)
+        self.events = [(str(rng.choice(['macro_US', 'listings'])), base + timedelta(days=int(d)))
+                       for d in rng.integers(0, 800, size=400)]
+        rows = {}
+        for family, day in self.events:
+            rows[(family, day.isoformat())] = rows.get((family, day.isoformat()), 0) + 1
+        self.buckets = DailyBuckets((f, d, n) for (f, d), n in rows.items())
+
+    def brute(self, family, start, end):
+        return sum(1 for f, d in self.events if f == family and start <= d <= end)
+
+    def test_window_counts_match_brute_force(self):
+        as_of = [date(2023, 1, 1) + timedelta(days=k) for k in range(-10, 900, 37)]
+        windows = [1, 30, 365]
+        counts = self.buckets.window_counts(as_of, windows, ['macro_US', 'listings', 'unknown'])
+        self.assertEqual(counts.shape, (3, len(as_of), 3))
+        for i, family in enumerate(['macro_US', 'listings']):
+            for j, end in enumerate(as_of):
+                for k, w in enumerate(windows):
+                    self.assertEqual(counts[i, j, k], self.brute(family, end - timedelta(days=w - 1), end))
+        self.assertFalse(counts[2].any())
+        self.assertEqual(self.buckets.count('listings', '2023-03-01', '2023-05-31'),
+                         self.brute('listings', date(2023, 3, 1), date(2023, 5, 31)))
+
+    def test_requirements_and_gate(self):
+        requirements = {'macro_US': {'total': 50, 'last_365d': 30}, 'listings': {'total': 10, 'last_365d': 5}}
+        report = check_rolling_requirements(self.buckets, '2024-06-30', requirements)
+        self.assertEqual(report['macro_US']['last_365d'], self.brute('macro_US', date(2023, 7, 2), date(2024, 6, 30)))
+        gate = calibration_gate(self.buckets, ['2022-12-31', '2024-06-30'], requirements)
+        self.assertEqual(gate.tolist(), [False, all(r['ok'] for r in report.values())])
+
+    def test_load_buckets_from_events_table(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_path = os.path.join(tmpdir, 'events.db')
+            conn = sqlite3.connect(db_path)
+            ensure_schema(conn, ['events'])
+            conn.executemany(
+                "INSERT INTO events (event_type, family, event_date, t0_iso, executed) VALUES ('CPI', 'macro_US', ?, ?, ?)",
+                [('2024-01-11', '2024-01-11T13:30:00Z', 1), ('2024-02-13', '2024-02-13T13:30:00Z', 0)],
+            )
+            conn.commit()
+            conn.close()
+            buckets = load_buckets(db_path)
+            self.assertIs(load_buckets(db_path), buckets)
+            self.assertEqual(buckets.count('macro_US', '2024-01-01', '2024-12-31'), 1)
+
+    def test_load_buckets_sees_uncheckpointed_wal_writes(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_path = os.path.join(tmpdir, 'events.db')
+            writer = sqlite3.connect(db_path)
+            writer.execute('PRAGMA journal_mode=WAL')
+            writer.execute('PRAGMA wal_autocheckpoint=0')
+            ensure_schema(writer, ['events'])
+            insert = ("INSERT INTO events (event_type, family, event_date, t0_iso, executed) "
+                      "VALUES ('CPI', 'macro_US', ?, ?, 1)")
+            try:
+                writer.execute(insert, ('2024-01-11', '2024-01-11T13:30:00Z'))
+                writer.commit()
+                self.assertEqual(load_buckets(db_path).count('macro_US', '2024-01-01', '2024-12-31'), 1)
+                db_stat = os.stat(db_path)
+                writer.execute(insert, ('2024-02-13', '2024-02-13T13:30:00Z'))
+                writer.commit()
+                # la escritura sólo está en el -wal: el fichero principal no cambia
+                self.assertEqual((os.stat(db_path).st_mtime_ns, os.stat(db_path).st_size),
+                                 (db_stat.st_mtime_ns, db_stat.st_size))
+                self.assertEqual(load_buckets(db_path).count('macro_US', '2024-01-01', '2024-12-31'), 2)
+            finally:
+                writer.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+"""
+Tests del pipeline de ingesta de eventos contra servidores HTTP locales
+"""
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from aiohttp import web
+
+from advanced_trading.config.trading_config import TRADING_CONFIG
+from advanced_trading.event_ingestion import EventIngestionPipeline, EventSource
+
+MACRO_EVENTS = [
+    {'event_type': 'CPI', 'event_date': '2024-01-11', 'consensus': 3.2, 'actual': 3.4},
+    {'event_type': 'CPI', 'event_date': '2024-01-11', 'consensus': 3.2, 'actual': 3.4},  # duplicado
+    {'event_type': 'GDP', 'event_date': '2024-01-25', 'consensus': 2.0, 'actual': 3.3},
+    {'event_type': 'GDP'},  # sin fecha: inválido
+]
+TOKEN_EVENTS = {'data': [
+    {'event_type': 'UNLOCK', 'family': 'crypto_unlocks', 'token_symbol': 'ARB', 'event_date': '2024-03-16'},
+]}
+
+
+class TestEventIngestion(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.calls = {'flaky': 0, 'down': 0}
+
+        async def macro(request):
+            return web.json_response(MACRO_EVENTS)
+
+        async def flaky_tokens(request):
+            self.calls['flaky'] += 1
+            if self.calls['flaky'] < 3:
+                return web.Response(status=503)
+            return web.json_response(TOKEN_EVENTS)
+
+        async def down(request):
+            self.calls['down'] += 1
+            return web.Response(status=500)
+
+        app = web.Application()
+        app.router.add_get('/macro', macro)
+        app.router.add_get('/tokens', flaky_tokens)
+        app.router.add_get('/down', down)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base = f'http://127.0.0.1:{port}'
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'events.db')
+        self.config = dict(TRADING_CONFIG, API_RETRY_DELAY_SEC=0.01, API_TIMEOUT_SEC=5)
+
+    async def asyncTearDown(self):
+        await self.runner.cleanup()
+        self.tmpdir.cleanup()
+
+    def _rows(self, table):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return conn.execute(f'SELECT event_type, event_date FROM {table} ORDER BY event_date').fetchall()
+        finally:
+            conn.close()
+
+    async def test_dedupe_retry_and_fallback(self):
+        sources = [
+            EventSource('tradingeconomics', f'{self.base}/down'),
+            EventSource('messari', f'{self.base}/tokens'),
+            EventSource('alphavantage', f'{self.base}/macro', fallback=True),
+        ]
+        pipeline = EventIngestionPipeline(self.db_path, sources, config=self.config)
+        stats = await pipeline.run_once()
+
+        self.assertEqual(self.calls['down'], 3)
+        self.assertEqual(self.calls['flaky'], 3)
+        self.assertEqual(stats['duplicates'], 1)
+        self.assertEqual(stats['invalid'], 1)
+        self.assertEqual(self._rows('macro_events'), [('CPI', '2024-01-11'), ('GDP', '2024-01-25')])
+        self.assertEqual(self._rows('token_events'), [('UNLOCK', '2024-03-16')])
+
+        # Re-ejecutar no duplica filas: upsert por clave natural
+        await EventIngestionPipeline(self.db_path, sources, config=self.config).run_once()
+        self.assertEqual(len(self._rows('macro_events')), 2)
+
+    async def test_rate_cap(self):
+        config = dict(self.config, MAX_EVENTS_PER_HOUR=1)
+        pipeline = EventIngestionPipeline(self.db_path, [EventSource('tradingeconomics', f'{self.base}/macro')],
+                                          config=config, clock=lambda: 1000.0)
+        stats = await pipeline.run_once()
+        self.assertEqual(stats['inserted'], 1)
+        self.assertEqual(stats['rate_limited'], 1)
+
+    def test_rate_limited_event_is_not_remembered_as_duplicate(self):
+        now = [1000.0]
+        config = dict(self.config, MAX_EVENTS_PER_HOUR=1, EVENT_DEBOUNCE_SEC=0)
+        pipeline = EventIngestionPipeline(self.db_path, [], config=config, clock=lambda: now[0])
+        cpi = {'event_type': 'CPI', 'family': 'macro_US', 'event_date': '2024-01-11'}
+        gdp = {'event_type': 'GDP', 'family': 'macro_US', 'event_date': '2024-01-25'}
+        self.assertTrue(pipeline.accept('macro', cpi))
+        self.assertFalse(pipeline.accept('macro', gdp))
+        now[0] += 3600
+        self.assertTrue(pipeline.accept('macro', gdp))
+        self.assertFalse(pipeline.accept('macro', gdp))
+        self.assertEqual(pipeline.stats, {'rate_limited': 1, 'duplicates': 1})
+
+    def test_refetch_with_actual_is_not_debounced(self):
+        config = dict(self.config, EVENT_DEBOUNCE_SEC=3600)
+        pipeline = EventIngestionPipeline(self.db_path, [], config=config)
+        pending = {'event_type': 'CPI', 'family': 'macro_US', 'event_date': '2024-01-11T13:30:00Z',
+                   'consensus': 3.2}
+        self.assertTrue(pipeline.accept('macro', pending))
+        self.assertTrue(pipeline.accept('macro', dict(pending, actual=3.4)))
+        # otro evento similar dentro de la ventana sí rebota
+        self.assertFalse(pipeline.accept('macro', dict(pending, event_date='2024-01-11T13:45:00Z')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+"""
+Tests de la vista materializada de ventanas de evento
+"""
+import os
+import sqlite3
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from advanced_trading.db_schema import ensure_schema
+from advanced_trading.event_windows import (
+    Bar, EventWindows, WindowEvent, _epoch, merge_windows, window_row,
+)
+
+START = datetime(2024, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def _stamp(minute: int) -> str:
+    return (START + timedelta(minutes=minute)).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _bar(minute: int, close: float, spread: float = 1.0):
+    return ('BTCUSDT', _stamp(minute), close - 1, close + 2, close - 3, close, 10.0, spread)
+
+
+class TestMergeWindows(unittest.TestCase):
+
+    def test_matches_per_event_scan(self):
+        bars = [Bar(START.timestamp() + 60 * k, 100.0 + k, 101.0 + k, 99.0 + k, 100.5 + k, 1.0, 2.0)
+                for k in range(120)]
+        # ventanas solapadas, una sin barras previas y otra sin cerrar
+        events = [WindowEvent(i, 'BTCUSDT', '', START.timestamp() + 60 * m, side)
+                  for i, (m, side) in enumerate([(5, 1), (20, -1), (28, 1), (60, 1), (110, -1)])]
+        merged = list(merge_windows(events, iter(bars), 900.0))
+        expected = [window_row(e, bars, 900.0, complete=e.t0 + 900 <= bars[-1].ts) for e in events]
+        self.assertEqual(merged, expected)
+        self.assertEqual([r['complete'] for r in merged], [1, 1, 1, 1, 0])
+
+    def test_excursions_follow_side(self):
+        bars = [Bar(60.0 * k, 100.0, 100.0 + k, 100.0 - 2 * k, 100.0, 1.0, None) for k in range(1, 4)]
+        long_row = window_row(WindowEvent(1, 'X', '', 60.0, 1), bars, 600.0, True)
+        short_row = window_row(WindowEvent(2, 'X', '', 60.0, -1), bars, 600.0, True)
+        self.assertAlmostEqual(long_row['mfe'], 0.03)
+        self.assertAlmostEqual(long_row['mae'], -0.06)
+        self.assertAlmostEqual(short_row['mfe'], 0.06)
+        self.assertAlmostEqual(short_row['mae'], -0.03)
+        self.assertIsNone(long_row['avg_spread_bps'])
+
+
+class TestEventWindows(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'trading_data.db')
+        self.conn = sqlite3.connect(self.db_path)
+        ensure_schema(self.conn, ['events', 'market_data'])
+        self.add_bars(range(0, 40))
+        self.add_event(10)
+        self.view = EventWindows(self.db_path, window_minutes=15)
+
+    def tearDown(self):
+        self.view.close()
+        self.conn.close()
+        self.tmpdir.cleanup()
+
+    def add_bars(self, minutes, close=lambda m: 100.0 + m):
+        self.conn.executemany('INSERT INTO market_data (symbol, timestamp, open, high, low, close, volume, '
+                              'spread_bps) VALUES (?, ?, ?, ?, ?, ?, ?, ?)', [_bar(m, close(m)) for m in minutes])
+        self.conn.commit()
+
+    def add_event(self, minute, impact=None, symbol='BTCUSDT'):
+        t0 = (START + timedelta(minutes=minute)).strftime('%Y-%m-%dT%H:%M:%SZ')
+        cursor = self.conn.execute("INSERT INTO events (event_type, family, event_date, t0_iso, symbol, impact) "
+                                   "VALUES ('CPI', 'macro_US', ?, ?, ?, ?)", (t0[:10], t0, symbol, impact))
+        self.conn.commit()
+        return cursor.lastrowid
+
+    def test_build_values(self):
+        stats = self.view.refresh()
+        self.assertEqual((stats['events'], stats['complete']), (1, 1))
+        row = self.view.get(1)
+        self.assertEqual(row['bars'], 15)
+        self.assertEqual(row['ref_price'], 109.0)  # open de la barra T0
+        self.assertAlmostEqual(row['t0_return'], 110.0 / 109.0 - 1)
+        self.assertAlmostEqual(row['post_return'], 124.0 / 109.0 - 1)
+        self.assertAlmostEqual(row['pre_return'], 109.0 / 99.0 - 1)  # barras 0..9
+        self.assertAlmostEqual(row['mfe'], 126.0 / 109.0 - 1)
+        self.assertAlmostEqual(row['volume'], 150.0)
+        self.assertEqual(row['avg_spread_bps'], 1.0)
+
+    def test_incremental_refresh(self):
+        self.view.refresh()
+        self.assertEqual(self.view.refresh()['events'], 0)
+
+        late = self.add_event(30)  # ventana aún abierta
+        stats = self.view.refresh()
+        self.assertEqual((stats['events'], stats['complete']), (1, 0))
+        self.assertEqual(self.view.get(late)['bars'], 10)
+
+        self.add_bars(range(40, 60))  # cierra la ventana del segundo evento
+        stats = self.view.refresh()
+        self.assertEqual((stats['events'], stats['complete']), (1, 1))
+        self.assertEqual(self.view.get(late)['bars'], 15)
+
+        # barra corregida (T0 del primero y pre-ventana del segundo): sólo esos eventos
+        self.conn.execute('DELETE FROM market_data WHERE timestamp = ?', (_stamp(24),))
+        self.add_bars([24], close=lambda m: 500.0)
+        self.assertEqual(self.view.refresh()['events'], 2)
+        self.assertAlmostEqual(self.view.get(1)['post_return'], 500.0 / 109.0 - 1)
+        self.assertAlmostEqual(_epoch(self.view.get(late)['t0_iso']), START.timestamp() + 1800)
+
+    def test_new_bars_reach_events_without_symbol(self):
+        legacy = self.add_event(12, symbol=None)  # filas antiguas sin símbolo: BTCUSDT por defecto
+        self.view.refresh()
+        self.assertEqual(self.view.get(legacy)['symbol'], 'BTCUSDT')
+        self.conn.execute('DELETE FROM market_data WHERE timestamp = ?', (_stamp(20),))
+        self.add_bars([20], close=lambda m: 500.0)
+        self.assertEqual(self.view.refresh()['events'], 2)
+        self.assertAlmostEqual(self.view.get(legacy)['mfe'], 502.0 / 111.0 - 1)  # high de la barra corregida
+
+    def test_impact_change_recomputes_side(self):
+        self.view.refresh()
+        self.assertEqual(self.view.get(1)['side'], 1)
+        self.conn.execute("UPDATE events SET impact = 'bearish' WHERE id = 1")
+        self.conn.commit()
+        self.assertEqual(self.view.refresh()['events'], 1)
+        row = self.view.get(1)
+        self.assertEqual(row['side'], -1)
+        self.assertAlmostEqual(row['mfe'], 1 - 107.0 / 109.0)  # low de la barra T0
+        self.assertEqual(self.view.refresh()['events'], 0)
+
+    def test_deleted_and_full_rebuild(self):
+        self.view.refresh()
+        self.conn.execute('DELETE FROM events')
+        self.conn.commit()
+        self.view.refresh()
+        self.assertIsNone(self.view.get(1))
+        self.add_event(12, impact='BEARISH')
+        self.assertEqual(self.view.refresh(full=True)['events'], 1)
+        self.assertEqual(self.view.get(2)['side'], -1)
+
+
+if __name__ == '__main__':
+    unittest.main()
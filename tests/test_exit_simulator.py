@@ -0,0 +1,68 @@
+"""
+Tests del simulador vectorizado de salidas TP/SL
+"""
+import unittest
+
+import numpy as np
+
+from advanced_trading.exit_simulator import build_bar_windows, simulate_exits, summarize_exits
+
+LEVELS = [0.005, 0.01, 0.02]
+ALLOCATION = [0.4, 0.35, 0.25]
+
+
+def naive_exit(entry, direction, highs, lows, closes, sl):
+    """Referencia con bucle por barra"""
+    remaining, pnl, hit = 1.0, 0.0, [False] * 3
+    for h, lo, c in zip(highs, lows, closes):
+        if np.isnan(c):
+            break
+        adverse = (1 - lo / entry) if direction > 0 else (h / entry - 1)
+        if adverse >= sl:
+            return pnl - remaining * sl
+        favorable = (h / entry - 1) if direction > 0 else (1 - lo / entry)
+        for k, level in enumerate(LEVELS):
+            if not hit[k] and favorable >= level:
+                hit[k] = True
+                pnl += ALLOCATION[k] * level
+                remaining -= ALLOCATION[k]
+        last = c
+    return pnl + remaining * (last / entry - 1) * direction
+
+
+class TestExitSimulator(unittest.TestCase):
+
+    def test_matches_naive_loop(self):
+        rng = np.random.default_rng(11)
+        n, m = 400, 120
+        closes = 100 * np.cumprod(1 + rng.normal(0, 0.002, (n, m)), axis=1)
+        highs = closes * (1 + np.abs(rng.normal(0, 0.001, (n, m))))
+        lows = closes * (1 - np.abs(rng.normal(0, 0.001, (n, m))))
+        closes[:5, 60:] = highs[:5, 60:] = lows[:5, 60:] = np.nan  # horizonte más corto
+        entry = np.full(n, 100.0)
+        direction = np.where(rng.random(n) < 0.5, 1, -1)
+        sl = rng.uniform(0.004, 0.015, n)
+
+        result = simulate_exits(entry, direction, highs, lows, closes, sl, LEVELS, ALLOCATION)
+        expected = [naive_exit(entry[i], direction[i], highs[i], lows[i], closes[i], sl[i]) for i in range(n)]
+        np.testing.assert_allclose(result['pnl_pct'], expected, atol=1e-12)
+
+    def test_ladder_and_stop(self):
+        highs = np.array([[100.6, 101.1, 101.0], [100.6, 100.2, 100.0]])
+        lows = np.array([[100.0, 100.5, 100.4], [100.1, 98.9, 98.0]])
+        closes = np.array([[100.5, 101.0, 100.8], [100.2, 99.0, 98.5]])
+        result = simulate_exits([100.0, 100.0], [1, 1], highs, lows, closes, 0.01)
+        np.testing.assert_array_equal(result['tp_hit_bar'], [[0, 1, -1], [0, -1, -1]])
+        np.testing.assert_array_equal(result['sl_hit_bar'], [-1, 1])
+        self.assertAlmostEqual(result['pnl_pct'][0], 0.4 * 0.005 + 0.35 * 0.01 + 0.25 * 0.008)
+        self.assertAlmostEqual(result['pnl_pct'][1], 0.4 * 0.005 - 0.6 * 0.01)
+        self.assertEqual(summarize_exits(result)['trades'], 2)
+
+    def test_build_bar_windows(self):
+        windows = build_bar_windows(np.arange(6.0), np.array([0, 4]), 3)
+        np.testing.assert_array_equal(windows[0], [1, 2, 3])
+        self.assertTrue(np.isnan(windows[1, 1:]).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+"""
+Tests del tracker de límites diarios y exposición
+"""
+import os
+import sqlite3
+import tempfile
+import unittest
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from advanced_trading.advanced_risk_manager import AdvancedRiskManager
+from advanced_trading.config.trading_config import TRADING_CONFIG
+from advanced_trading.db_schema import ensure_schema
+from advanced_trading.exposure_tracker import ExposureTracker, trading_day_bounds
+from advanced_trading.hot_reload import RuntimeConfig
+from main_trading_engine import build_components
+
+CHICAGO = ZoneInfo('America/Chicago')
+
+
+class FakeClock:
+    def __init__(self, ts):
+        self.ts = ts
+
+    def __call__(self):
+        return self.ts
+
+
+def chicago_ts(*args):
+    return datetime(*args, tzinfo=CHICAGO).timestamp()
+
+
+class TestExposureTracker(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock(chicago_ts(2025, 8, 25, 10, 0))
+        config = dict(TRADING_CONFIG, COOLDOWN_SEC=0)
+        self.tracker = ExposureTracker(10_000, config=config, clock=self.clock)
+
+    def test_daily_trade_limit_and_midnight_rollover(self):
+        for i in range(TRADING_CONFIG['MAX_DAILY_TRADES']):
+            self.tracker.on_trade_opened(i)
+            self.tracker.on_trade_closed(i, pnl=1.0)
+        ok, message = self.tracker.can_open()
+        self.assertFalse(ok)
+        self.assertIn('Daily trade limit', message)
+
+        self.clock.ts = chicago_ts(2025, 8, 26, 0, 0, 1)
+        ok, _ = self.tracker.can_open()
+        self.assertTrue(ok)
+        self.assertEqual(self.tracker.daily_trades, 0)
+
+    def test_open_positions_and_per_event_limits(self):
+        self.tracker.on_trade_opened('a', event_id='cpi')
+        self.tracker.on_trade_opened('b', event_id='cpi')
+        self.assertFalse(self.tracker.can_open('cpi')[0])
+        self.assertTrue(self.tracker.can_open('gdp')[0])
+        self.tracker.on_trade_opened('c', event_id='gdp')
+        ok, message = self.tracker.can_open('fomc')
+        self.assertFalse(ok)
+        self.assertIn('open positions', message)
+
+    def test_cooldown_and_daily_loss(self):
+        tracker = ExposureTracker(10_000, clock=self.clock)
+        tracker.on_trade_opened(1)
+        tracker.on_trade_closed(1, pnl=-100)
+        self.assertIn('Cooldown', tracker.can_open()[1])
+        self.clock.ts += TRADING_CONFIG['COOLDOWN_SEC'] + 1
+        self.assertTrue(tracker.can_open()[0])
+        tracker.on_trade_opened(2)
+        tracker.on_trade_closed(2, pnl=-500)
+        self.clock.ts += TRADING_CONFIG['COOLDOWN_SEC'] + 1
+        self.assertIn('Daily loss limit', tracker.can_open()[1])
+
+    def test_rebuild_from_trades_table(self):
+        conn = sqlite3.connect(':memory:')
+        ensure_schema(conn, ['events', 'trades'])
+        rows = [
+            # event_id, entry_time (UTC), exit_time, pnl
+            (7, '2025-08-25 13:00:00', '2025-08-25 13:10:00', -20.0),
+            (7, '2025-08-25 14:00:00', None, None),
+            (8, '2025-08-24 13:00:00', '2025-08-24 13:30:00', 50.0),  # día anterior
+        ]
+        conn.executemany(
+            "INSERT INTO trades (event_id, symbol, side, entry_time, exit_time, pnl) VALUES (?, 'BTCUSDT', 'BUY', ?, ?, ?)",
+            rows,
+        )
+        self.tracker.rebuild_from_db(conn)
+        self.assertEqual(self.tracker.daily_trades, 2)
+        self.assertEqual(self.tracker.event_trades, {'7': 2})
+        self.assertAlmostEqual(self.tracker.daily_pnl, -20.0)
+        self.assertEqual(len(self.tracker.open_positions), 1)
+
+        risk_manager = AdvancedRiskManager(10_000, exposure_tracker=self.tracker)
+        ok, message = risk_manager.can_trade(event_id=7)
+        self.assertFalse(ok)
+        self.assertIn('Per-event', message)
+
+    def test_risk_manager_routes_daily_stats_through_tracker(self):
+        risk_manager = AdvancedRiskManager(10_000, exposure_tracker=self.tracker)
+        risk_manager.update_daily_stats(-120.0, trades=2)
+        self.assertEqual((self.tracker.daily_pnl, self.tracker.daily_trades), (-120.0, 2))
+        self.assertEqual((risk_manager.daily_pnl, risk_manager.daily_trades), (-120.0, 2))
+
+        self.clock.ts = chicago_ts(2025, 8, 26, 0, 5)  # reseteo local: el tracker manda
+        self.assertTrue(risk_manager.can_trade()[0])
+        self.assertEqual((risk_manager.daily_pnl, risk_manager.daily_trades), (0.0, 0))
+
+    def test_hot_reload_reaches_tracker_through_risk_manager(self):
+        risk_manager = AdvancedRiskManager(10_000, exposure_tracker=self.tracker)
+        trading = dict(TRADING_CONFIG, MAX_DAILY_TRADES=1, COOLDOWN_SEC=0)
+        risk_manager.apply_config(RuntimeConfig(trading, {}, {}, 'test'))
+        self.assertEqual(self.tracker.max_daily_trades, 1)
+        risk_manager.update_daily_stats(0.0, trades=1)
+        ok, message = risk_manager.can_trade()
+        self.assertFalse(ok)
+        self.assertIn('Daily trade limit', message)
+
+    def test_engine_builds_risk_on_tracker_from_db(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_path = os.path.join(tmpdir, 'trading_data.db')
+            conn = sqlite3.connect(db_path)
+            ensure_schema(conn, ['events', 'trades'])
+            conn.execute("INSERT INTO trades (event_id, symbol, side, entry_time) "
+                         "VALUES (7, 'BTCUSDT', 'BUY', datetime('now'))")
+            conn.commit()
+            conn.close()
+            risk = build_components(10_000, db_path)['risk']
+        self.assertIsNotNone(risk.exposure_tracker)
+        self.assertEqual(risk.daily_trades, 1)
+        self.assertEqual(len(risk.exposure_tracker.open_positions), 1)
+
+    def test_risk_manager_resets_without_tracker(self):
+        risk_manager = AdvancedRiskManager(10_000, clock=self.clock)
+        risk_manager.update_daily_stats(-600.0, trades=1)  # -6% del balance
+        ok, message = risk_manager.can_trade()
+        self.assertFalse(ok)
+        self.assertIn('Daily loss', message)
+
+        self.clock.ts = chicago_ts(2025, 8, 26, 0, 5)
+        self.assertTrue(risk_manager.can_trade()[0])
+        self.assertEqual(risk_manager.daily_trades, 0)
+
+    def test_trading_day_bounds_across_dst(self):
+        start, end = trading_day_bounds(chicago_ts(2025, 11, 2, 12, 0), CHICAGO, 0)
+        self.assertEqual(end - start, 25 * 3600)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,159 @@
+import os
+import shutil
+import signal
+import tempfile
+import time
+import unittest
+
+from advanced_trading.advanced_risk_manager import AdvancedRiskManager
+from advanced_trading.hot_reload import DEFAULT_PATHS, ConfigError, ConfigReloader, load_config
+from advanced_trading.macro_analyzer import MacroAnalyzer
+from advanced_trading.order_gateway import SimulatedGateway
+from advanced_trading.relative_arbitrage import RelativeArbitrage
+from advanced_trading.snapshot_store import SnapshotStore
+from advanced_trading.staggered_execution import StaggeredExecution
+
+
+class TestHotReload(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.paths = {}
+        for name, path in DEFAULT_PATHS.items():
+            self.paths[name] = os.path.join(self.tmp.name, os.path.basename(path))
+            shutil.copy(path, self.paths[name])
+
+    def _edit(self, name, old, new):
+        path = self.paths[name]
+        with open(path) as f:
+            text = f.read()
+        self.assertIn(old, text)
+        with open(path, 'w') as f:
+            f.write(text.replace(old, new, 1))
+        st = os.stat(path)  # fuerza un mtime distinto aunque el fs tenga poca resolución
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+    def test_snapshot_is_immutable(self):
+        config = load_config(self.paths)
+        with self.assertRaises(TypeError):
+            config.trading['RISK_PER_TRADE'] = 1
+        self.assertIsInstance(config.trading['TP_ALLOCATION'], tuple)
+
+    def test_reload_swaps_config_and_keeps_state(self):
+        risk = AdvancedRiskManager(10_000)
+        analyzer = MacroAnalyzer()
+        arbitrage = RelativeArbitrage()
+        gateway = SimulatedGateway(price_fn=lambda s: 100.0)
+        executor = StaggeredExecution(gateway=gateway)
+        reloader = ConfigReloader(self.paths).register(risk, analyzer, arbitrage, executor)
+        self.assertEqual(arbitrage.correlation_threshold, 0.8)
+
+        risk.update_daily_stats(-50.0, trades=3)
+        for i in range(40):
+            arbitrage.update_prices(50_000 + i, 3_000 + i)
+        analyzer.analyze_event('CPI', 3.0, 3.5)
+
+        self.assertFalse(reloader.reload())
+        self._edit('trading', "'RISK_PER_TRADE': 0.015", "'RISK_PER_TRADE': 0.01")
+        self._edit('trading', "'CORRELATION_THRESHOLD': 0.8", "'CORRELATION_THRESHOLD': 0.75")
+        self._edit('trading', "'ORDER_TIMEOUT_SEC': 10", "'ORDER_TIMEOUT_SEC': 4")
+        self.assertTrue(reloader.reload())
+
+        self.assertEqual(reloader.current.version, 1)
+        self.assertEqual(risk.risk_per_trade, 0.01)
+        self.assertEqual(arbitrage.correlation_threshold, 0.75)
+        self.assertEqual(gateway.order_timeout, 4)
+        self.assertIs(executor.config, reloader.current)
+        self.assertEqual((risk.daily_pnl, risk.daily_trades), (-50.0, 3))
+        self.assertEqual(len(arbitrage.price_history['BTC/USDT']), 40)
+        self.assertEqual(len(analyzer.event_history), 1)
+
+    def test_invalid_config_is_rejected(self):
+        errors = []
+        risk = AdvancedRiskManager(10_000)
+        reloader = ConfigReloader(self.paths, on_error=errors.append).register(risk)
+        self._edit('trading', "'TP_ALLOCATION': [0.4, 0.35, 0.25]", "'TP_ALLOCATION': [0.4, 0.35, 0.35]")
+        self.assertFalse(reloader.reload())
+        self.assertIsInstance(errors[0], ConfigError)
+        self.assertIn('TP_ALLOCATION', str(errors[0]))
+        self.assertEqual(reloader.current.version, 0)
+        self.assertEqual(risk.limits['TP_ALLOCATION'], (0.4, 0.35, 0.25))
+
+        self._edit('settings', 'log_level: INFO', 'log_level: [')
+        self.assertFalse(reloader.reload())
+        self.assertEqual(reloader.failures, 2)
+
+    def test_snapshot_rollback_reaches_components(self):
+        store = SnapshotStore(os.path.join(self.tmp.name, 'snapshots'))
+        errors = []
+        arbitrage = RelativeArbitrage()
+        reloader = ConfigReloader(dict(self.paths, params=store.params_path),
+                                  on_error=errors.append).register(arbitrage)
+        self.assertEqual(arbitrage.correlation_threshold, 0.8)
+
+        old = store.snapshot({'CORRELATION_THRESHOLD': 0.7})
+        store.activate(old)
+        self.assertTrue(reloader.reload())
+        self.assertEqual(arbitrage.correlation_threshold, 0.7)
+
+        store.activate(store.snapshot({'CORRELATION_THRESHOLD': 1.5}))
+        self.assertFalse(reloader.reload())
+        self.assertIn('CORRELATION_THRESHOLD', str(errors[0]))
+        self.assertEqual(arbitrage.correlation_threshold, 0.7)
+
+        store.activate(store.snapshot({'CORRELATION_THRESHOLD': 0.6}))
+        self.assertTrue(reloader.reload())
+        self.assertEqual(arbitrage.correlation_threshold, 0.6)
+        store.rollback(to=old)
+        self.assertTrue(reloader.reload())
+        self.assertEqual(arbitrage.correlation_threshold, 0.7)
+
+    def test_register_keeps_constructor_defaults(self):
+        analyzer, arbitrage = MacroAnalyzer(), RelativeArbitrage()
+        before = (analyzer.impact_threshold, arbitrage.correlation_threshold)
+        ConfigReloader(self.paths).register(analyzer, arbitrage)
+        self.assertEqual((analyzer.impact_threshold, arbitrage.correlation_threshold), before)
+
+    def test_failing_target_rolls_back_the_others(self):
+        class Picky:
+            def apply_config(self, config):
+                if config.trading['CORRELATION_THRESHOLD'] < 0.8:
+                    raise ValueError('umbral no soportado')
+
+        errors = []
+        risk, arbitrage = AdvancedRiskManager(10_000), RelativeArbitrage()
+        reloader = ConfigReloader(self.paths, on_error=errors.append).register(risk, arbitrage, Picky())
+        self._edit('trading', "'RISK_PER_TRADE': 0.015", "'RISK_PER_TRADE': 0.01")
+        self._edit('trading', "'CORRELATION_THRESHOLD': 0.8", "'CORRELATION_THRESHOLD': 0.75")
+        self.assertFalse(reloader.reload())
+        self.assertEqual((risk.risk_per_trade, arbitrage.correlation_threshold), (0.015, 0.8))
+        self.assertIs(risk.limits, reloader.current.trading)
+        self.assertEqual((reloader.current.version, reloader.failures), (0, 1))
+        self.assertIn('Picky', str(errors[0]))
+
+    def test_unchanged_content_is_not_reapplied(self):
+        reloader = ConfigReloader(self.paths)
+        self._edit('event_rules', '"impact": "HIGH"', '"impact": "HIGH"')
+        self.assertFalse(reloader.reload())
+        self._edit('event_rules', '"size_multiplier": 1.5', '"size_multiplier": 1.6')
+        self.assertTrue(reloader.reload())
+        self.assertEqual(reloader.current.event_rules['CPI']['size_multiplier'], 1.6)
+
+    def test_sighup_triggers_reload(self):
+        previous = signal.getsignal(signal.SIGHUP)
+        self.addCleanup(signal.signal, signal.SIGHUP, previous)
+        reloaded = []
+        reloader = ConfigReloader(self.paths, poll_interval=60, on_reload=reloaded.append)
+        reloader.install_signal_handler()
+        reloader.start()
+        self.addCleanup(reloader.stop)
+        self._edit('settings', 'default_notional_usd: 50.0', 'default_notional_usd: 75.0')
+        os.kill(os.getpid(), signal.SIGHUP)
+        deadline = time.time() + 5
+        while not reloaded and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(reloaded[0].settings['default_notional_usd'], 75.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,193 @@
+"""
+Tests del lease con fencing token y del router de órdenes con líder
+"""
+import asyncio
+import os
+import tempfile
+import unittest
+
+from advanced_trading.leader_election import (
+    ClusterMembership, LeaderOrderRouter, LeaseManager, NotLeaderError, idempotency_key,
+)
+from advanced_trading.order_gateway import GatewayError, SimulatedGateway
+from advanced_trading.records import OrderRequest, OrderResult
+
+
+class FakeClock:
+    def __init__(self, now=1_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakeGateway:
+    def __init__(self):
+        self.sent = []
+
+    async def place_order(self, request):
+        self.sent.append(request)
+        return OrderResult(request.symbol, request.side.lower(), request.amount, request.type, 'new', 0.0,
+                           simulated=False, order_id=str(len(self.sent)))
+
+
+class ClusterTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'trades.db')
+        self.clock = FakeClock()
+        self._open = []
+
+    def tearDown(self):
+        for item in self._open:
+            item.close()
+        self.tmpdir.cleanup()
+
+    def lease(self, node_id, ttl=10.0):
+        lease = LeaseManager(self.db_path, node_id=node_id, ttl=ttl, clock=self.clock)
+        self._open.append(lease)
+        return lease
+
+
+class TestLease(ClusterTestCase):
+
+    def test_single_leader_and_failover_bumps_token(self):
+        a, b = self.lease('a'), self.lease('b')
+        self.assertTrue(a.try_acquire())
+        self.assertFalse(b.try_acquire())
+        self.clock.now += 5
+        self.assertTrue(a.try_acquire())  # renovación: mismo token
+        self.assertEqual(a.token, 1)
+
+        self.clock.now += 11  # a deja de renovar
+        self.assertFalse(a.is_leader)
+        self.assertTrue(b.try_acquire())
+        self.assertEqual(b.token, 2)
+        self.assertFalse(a.try_acquire())
+        self.assertIsNone(a.token)
+
+    def test_release_allows_immediate_takeover(self):
+        a, b = self.lease('a'), self.lease('b')
+        a.try_acquire()
+        a.release()
+        self.assertTrue(b.try_acquire())
+
+    def test_stale_leader_cannot_claim(self):
+        a, b = self.lease('a', ttl=10), self.lease('b', ttl=10)
+        a.try_acquire()
+        a._valid_until = float('inf')  # a cree seguir siendo líder (pausa larga)
+        self.clock.now += 11
+        b.try_acquire()
+        with self.assertRaises(NotLeaderError):
+            a.claim('k1', 'order')
+        self.assertTrue(b.claim('k1', 'order'))
+        self.assertFalse(b.claim('k1', 'order'))
+
+
+class TestMembership(ClusterTestCase):
+
+    def test_symbols_split_between_live_nodes(self):
+        symbols = [f'S{i}USDT' for i in range(40)]
+        nodes = [ClusterMembership(self.db_path, node_id=n, node_ttl=15, clock=self.clock) for n in 'abc']
+        self._open.extend(nodes)
+        for node in nodes:
+            node.heartbeat()
+        shares = [node.assigned(symbols) for node in nodes]
+        self.assertEqual(sorted(s for share in shares for s in share), sorted(symbols))
+        self.assertTrue(all(shares))
+
+        # c deja de latir: sólo sus símbolos se redistribuyen
+        self.clock.now += 20
+        nodes[0].heartbeat()
+        nodes[1].heartbeat()
+        after = [nodes[0].assigned(symbols), nodes[1].assigned(symbols)]
+        self.assertEqual(sorted(after[0] + after[1]), sorted(symbols))
+        self.assertTrue(set(shares[0]) <= set(after[0]))
+        self.assertTrue(set(shares[1]) <= set(after[1]))
+
+
+class TestLeaderOrderRouter(ClusterTestCase, unittest.IsolatedAsyncioTestCase):
+
+    def test_key_is_deterministic_and_fits_binance(self):
+        key = idempotency_key('order', 'cpi-2025-08', 'BTCUSDT', 'stage1')
+        self.assertEqual(key, idempotency_key('order', 'cpi-2025-08', 'BTCUSDT', 'stage1'))
+        self.assertNotEqual(key, idempotency_key('order', 'cpi-2025-08', 'BTCUSDT', 'stage2'))
+        self.assertLessEqual(len(key), 36)
+        self.assertRegex(key, r'^[A-Za-z0-9_-]+$')
+
+    async def test_failover_does_not_duplicate(self):
+        gateway = FakeGateway()
+        a, b = self.lease('a'), self.lease('b')
+        a.try_acquire()
+        b.try_acquire()
+        router_a, router_b = LeaderOrderRouter(a, gateway), LeaderOrderRouter(b, gateway)
+        request = OrderRequest('BTCUSDT', 'BUY', 0.01)
+
+        self.assertIsNone(await router_b.submit(request, 'evt-1', 'BTCUSDT', 'stage1'))  # réplica
+        result = await router_a.submit(request, 'evt-1', 'BTCUSDT', 'stage1')
+        self.assertEqual(result.order_id, '1')
+        self.assertEqual(gateway.sent[0].client_order_id, idempotency_key('order', 'evt-1', 'BTCUSDT', 'stage1'))
+
+        self.clock.now += 11  # a cae; b toma el relevo y reintenta la misma intención
+        self.assertTrue(b.try_acquire())
+        self.assertIsNone(await router_b.submit(request, 'evt-1', 'BTCUSDT', 'stage1'))
+        self.assertEqual(len(gateway.sent), 1)
+        self.assertEqual(router_b.duplicates, 1)
+        self.assertIsNotNone(await router_b.submit(request, 'evt-1', 'BTCUSDT', 'stage2'))
+
+    async def test_timeout_is_reconciled_not_failed(self):
+        class LostAckGateway(SimulatedGateway):
+            async def place_order(self, request):
+                await super().place_order(request)
+                raise asyncio.TimeoutError()
+
+        gateway = LostAckGateway()
+        a = self.lease('a')
+        a.try_acquire()
+        router = LeaderOrderRouter(a, gateway)
+        request = OrderRequest('BTCUSDT', 'BUY', 0.01)
+        with self.assertRaises(asyncio.TimeoutError):
+            await router.submit(request, 'evt-1', 'BTCUSDT', 'stage1')
+        [claim] = a.pending_claims('order')
+        self.assertEqual((claim['status'], claim['result']['symbol']), ('unknown', 'BTCUSDT'))
+        self.assertIsNone(await router.submit(request, 'evt-1', 'BTCUSDT', 'stage1'))  # no se reenvía a ciegas
+
+        self.assertEqual(await router.reconcile(), {'found': 1, 'missing': 0})
+        self.assertEqual(a.pending_claims(), [])
+        self.assertEqual(len(gateway.orders), 1)
+
+    async def test_missing_order_can_be_resent_and_rejection_is_final(self):
+        class FlakyGateway(SimulatedGateway):
+            failures = [ConnectionResetError(), GatewayError('Margin is insufficient.', -2019, 400)]
+
+            async def place_order(self, request):
+                if self.failures:
+                    raise self.failures.pop(0)
+                return await super().place_order(request)
+
+        gateway = FlakyGateway()
+        a = self.lease('a')
+        a.try_acquire()
+        router = LeaderOrderRouter(a, gateway)
+        request = OrderRequest('BTCUSDT', 'BUY', 0.01)
+        with self.assertRaises(ConnectionResetError):
+            await router.submit(request, 'evt-1', 'BTCUSDT', 'stage1')
+        self.assertEqual(await router.reconcile(), {'found': 0, 'missing': 1})
+        with self.assertRaises(GatewayError):  # reintento con la misma clave: rechazo definitivo
+            await router.submit(request, 'evt-1', 'BTCUSDT', 'stage1')
+        self.assertEqual(a.pending_claims(), [])
+        self.assertIsNone(await router.submit(request, 'evt-1', 'BTCUSDT', 'stage1'))
+        self.assertEqual(gateway.orders, {})
+
+    async def test_event_fires_once(self):
+        a = self.lease('a')
+        a.try_acquire()
+        router = LeaderOrderRouter(a)
+        self.assertIsNotNone(router.fire_event('evt-9', 'ETHUSDT', 'LONG'))
+        self.assertIsNone(router.fire_event('evt-9', 'ETHUSDT', 'LONG'))
+        self.assertEqual(a.pending_claims(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+"""
+Tests del índice FTS5 de logs
+"""
+import json
+import os
+import tempfile
+import unittest
+from datetime import timezone
+from unittest import mock
+
+from advanced_trading import log_index
+from advanced_trading.log_index import LogIndex, parse_line, parse_time
+
+LEGACY = (
+    "[2025-08-25_12-46-51] Iniciando app.py...\n"
+    "2025-08-25 12:46:51,991 - INFO - EventArb Bot — Semana 5 (MAINNET MODE)\n"
+    "2025-08-25 12:46:52,100 - WARNING - Trading halted due to daily limits\n"
+    "Traceback (most recent call last):\n"
+    "  File \"app.py\", line 34, in can_trade\n"
+    "Daily trade limit reached (528/20)\n"
+)
+RUNNER = (
+    "2025-08-26 15:49:24,001 INFO bot_runner 🧠 Plan: BTCUSDT BUY notional=$3.000\n"
+    "2025-08-26 15:50:00,000 ERROR bot_runner app.py ERROR: 2025-08-26 15:49:59,500 - WARNING - "
+    "Trading halted for ETHUSDT event_id=cpi-2025-08\n"
+)
+
+
+class TestParsing(unittest.TestCase):
+
+    def test_formats(self):
+        dashed = parse_line("2025-08-25 12:46:51,991 - INFO - hola", timezone.utc)
+        self.assertEqual((dashed['level'], dashed['message']), ('INFO', 'hola'))
+        self.assertAlmostEqual(dashed['ts'] % 1, 0.991, places=3)
+        self.assertEqual(parse_line("[2025-08-25_12-46-51] Iniciando", timezone.utc)['level'], None)
+        self.assertIsNone(parse_line("  File \"app.py\", line 34"))
+
+    def test_runner_uses_embedded_level(self):
+        entry = parse_line(RUNNER.splitlines()[1], timezone.utc)
+        self.assertEqual(entry['level'], 'WARNING')
+        self.assertEqual(entry['logger'], 'bot_runner')
+        self.assertTrue(entry['message'].startswith('Trading halted'))
+
+    def test_json_record(self):
+        line = json.dumps({'ts': '2025-08-25T10:00:00.000+00:00', 'level': 'INFO', 'logger': 'x',
+                           'msg': 'orden', 'symbol': 'SOLUSDT', 'event_id': 7})
+        entry = parse_line(line)
+        self.assertEqual((entry['symbol'], entry['event_id']), ('SOLUSDT', '7'))
+
+    def test_parse_time(self):
+        self.assertEqual(parse_time('7d', now=10 * 86400), 3 * 86400)
+        self.assertEqual(parse_time(123.0), 123.0)
+
+
+class TestLogIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.logs = os.path.join(self.tmpdir.name, 'logs')
+        os.makedirs(self.logs)
+        self.index = LogIndex(os.path.join(self.tmpdir.name, 'index.db'), self.logs, tz=timezone.utc)
+
+    def tearDown(self):
+        self.index.close()
+        self.tmpdir.cleanup()
+
+    def _write(self, name, text, mode='w'):
+        with open(os.path.join(self.logs, name), mode) as f:
+            f.write(text)
+
+    def test_search_filters(self):
+        self._write('app_2025-08-25_12-46-51.log', LEGACY)
+        self._write('runner.log', RUNNER)
+        self.index.update()
+
+        halts = self.index.search('halt')
+        self.assertEqual(len(halts), 2)
+        self.assertIn('Daily trade limit reached', halts[1]['message'])  # traza agrupada
+        self.assertEqual([r['symbol'] for r in self.index.search('halt', symbol='ethusdt')], ['ETHUSDT'])
+        self.assertEqual(self.index.search(event_id='cpi-2025-08')[0]['symbol'], 'ETHUSDT')
+        self.assertEqual(len(self.index.search(level='WARNING')), 2)
+        self.assertEqual(len(self.index.search(since='2025-08-26T00:00:00+00:00')), 2)
+        self.assertEqual(self.index.search(symbol='BTCUSDT')[0]['level'], 'INFO')
+
+    def test_incremental_and_partial_lines(self):
+        self._write('runner.log', RUNNER.splitlines(keepends=True)[0])
+        self.assertEqual(self.index.update()['new_entries'], 1)
+        self.assertEqual(self.index.update()['new_entries'], 0)
+
+        second = RUNNER.splitlines(keepends=True)[1]
+        self._write('runner.log', second[:20], 'a')
+        self.assertEqual(self.index.update()['new_entries'], 0)
+        self._write('runner.log', second[20:], 'a')
+        stats = self.index.update()
+        self.assertEqual(stats['new_entries'], 1)
+        self.assertEqual(stats['bytes'], len(second.encode()))
+
+    def test_repeated_messages_stored_once(self):
+        for i in range(5):
+            self._write(f'app_2025-08-25_12-46-5{i}.log', LEGACY)
+        self.index.update()
+        stats = self.index.stats()
+        self.assertEqual(stats['entries'], 15)
+        self.assertEqual(stats['messages'], 3)
+        self.assertEqual(len(self.index.search('halted')), 5)
+
+    def test_batch_flush_keeps_continuation_lines(self):
+        self._write('app_2025-08-25_12-46-51.log', LEGACY)
+        with mock.patch.object(log_index, 'BATCH', 1):
+            self.assertEqual(self.index.update()['new_entries'], 3)
+        halted = self.index.search('halted')
+        self.assertEqual(len(halted), 1)
+        self.assertIn('Daily trade limit reached', halted[0]['message'])
+
+    def test_rotation_keeps_entries_and_truncation_reindexes(self):
+        self._write('app.log', RUNNER)
+        self.index.update()
+        os.rename(os.path.join(self.logs, 'app.log'), os.path.join(self.logs, 'app.log.2025-08-26'))
+        self._write('app.log', LEGACY)
+        stats = self.index.update()
+        self.assertEqual(stats['new_entries'], 3)
+        self.assertEqual(self.index.stats()['entries'], 5)
+
+        self._write('app.log', RUNNER.splitlines(keepends=True)[0])  # truncado
+        stats = self.index.update()
+        self.assertEqual(stats['reset'], 1)
+        self.assertEqual(self.index.stats()['entries'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+"""
+Tests del logging estructurado asíncrono
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from advanced_trading import logging_setup
+from advanced_trading.logging_setup import (
+    JsonFormatter, RetentionFileHandler, SamplingFilter, purge_old_logs, setup_logging,
+)
+
+
+def _record(msg='hola %s', args=('mundo',), level=logging.INFO, **extra):
+    record = logging.LogRecord('trading.test', level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+class TestFormatterAndFilter(unittest.TestCase):
+
+    def test_json_includes_extra_fields(self):
+        entry = json.loads(JsonFormatter().format(_record(symbol='BTCUSDT')))
+        self.assertEqual(entry['msg'], 'hola mundo')
+        self.assertEqual(entry['level'], 'INFO')
+        self.assertEqual(entry['symbol'], 'BTCUSDT')
+        self.assertNotIn('args', entry)
+
+    def test_sampling_only_marked_debug(self):
+        sampler = SamplingFilter(every=10)
+        kept = sum(sampler.filter(_record(level=logging.DEBUG, sample=True)) for _ in range(100))
+        self.assertEqual(kept, 10)
+        self.assertEqual(sampler.dropped, 90)
+        self.assertTrue(all(sampler.filter(_record(level=logging.DEBUG)) for _ in range(5)))
+        self.assertTrue(all(sampler.filter(_record(level=logging.INFO, sample=True)) for _ in range(5)))
+
+
+class TestRetentionFileHandler(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'app.log')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _rotated(self):
+        return sorted(f for f in os.listdir(self.tmpdir.name) if f.startswith('app.log.'))
+
+    def test_rotates_by_size(self):
+        handler = RetentionFileHandler(self.path, max_bytes=500, rotate_sec=0)
+        handler.setFormatter(JsonFormatter())
+        for i in range(50):
+            handler.handle(_record('linea %d', (i,)))
+        handler.close()
+        self.assertGreater(len(self._rotated()), 1)
+        for name in self._rotated() + ['app.log']:
+            self.assertLessEqual(os.path.getsize(os.path.join(self.tmpdir.name, name)), 500)
+
+    def test_rotates_by_time(self):
+        now = [86400 * 100 + 10.0]
+        handler = RetentionFileHandler(self.path, max_bytes=0, rotate_sec=3600, clock=lambda: now[0])
+        handler.handle(_record())
+        now[0] += 3600
+        handler.handle(_record())
+        handler.close()
+        self.assertEqual(handler.rollovers, 1)
+        self.assertEqual(len(self._rotated()), 1)
+
+    def test_retention_purges_old_and_legacy_files(self):
+        old = time.time() - 40 * 86400
+        for name in ('app.log.2020-01-01_00-00-00', 'app_2020-01-01_00-00-00.log', 'runner.log'):
+            path = os.path.join(self.tmpdir.name, name)
+            open(path, 'w').close()
+            os.utime(path, (old, old))
+        recent = os.path.join(self.tmpdir.name, 'app_reciente.log')
+        open(recent, 'w').close()
+        self.assertEqual(purge_old_logs(self.tmpdir.name, 30), 2)
+        self.assertEqual(sorted(os.listdir(self.tmpdir.name)), ['app_reciente.log', 'runner.log'])
+
+
+class TestSetupLogging(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.root = logging.getLogger()
+        self.saved = (list(self.root.handlers), self.root.level)
+
+    def tearDown(self):
+        if logging_setup._runtime is not None:
+            logging_setup._runtime.stop()
+            logging_setup._runtime = None
+        self.root.handlers[:] = self.saved[0]
+        self.root.setLevel(self.saved[1])
+        self.tmpdir.cleanup()
+
+    def test_records_written_by_listener_thread(self):
+        runtime = setup_logging(self.tmpdir.name, level='INFO', console=False)
+        self.assertIs(setup_logging(self.tmpdir.name, console=False), runtime)
+        logger = logging.getLogger('trading.hot')
+        writers = []
+        original = runtime.file_handler.emit
+        runtime.file_handler.emit = lambda record: (writers.append(threading.current_thread()), original(record))
+
+        logger.debug("descartado")
+        logger.info("orden %s", 'BTCUSDT', extra={'order_id': 'abc'})
+        try:
+            raise RuntimeError('fallo')
+        except RuntimeError:
+            logger.exception("error")
+        runtime.stop()
+
+        with open(os.path.join(self.tmpdir.name, 'app.log')) as f:
+            entries = [json.loads(line) for line in f]
+        self.assertEqual([e['msg'] for e in entries], ['orden BTCUSDT', 'error'])
+        self.assertEqual(entries[0]['order_id'], 'abc')
+        self.assertIn('RuntimeError: fallo', entries[1]['exc'])
+        self.assertTrue(writers)
+        self.assertNotIn(threading.main_thread(), writers)
+
+
+if __name__ == '__main__':
+    unittest.main()
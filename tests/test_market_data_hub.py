@@ -0,0 +1,99 @@
+"""
+Tests del hub de market data
+"""
+import asyncio
+import json
+import unittest
+
+from aiohttp import web
+
+from advanced_trading.market_data_hub import (
+    ArbitrageFeed, ExecutionMarketView, MarketDataHub, replay_source, websocket_source,
+)
+from advanced_trading.records import MarketSnapshot
+from advanced_trading.relative_arbitrage import RelativeArbitrage
+from advanced_trading.staggered_execution import StaggeredExecution
+
+
+def ticks(symbol, prices, start=1000.0):
+    return [MarketSnapshot(symbol, p, start + i, bid=p - 0.5, ask=p + 0.5, volume=1.0 + i)
+            for i, p in enumerate(prices)]
+
+
+class TestMarketDataHub(unittest.IsolatedAsyncioTestCase):
+
+    async def test_fan_out_shares_snapshots(self):
+        hub = MarketDataHub(clock=lambda: 1000.25)
+        hub.add_stream('BTCUSDT', replay_source(ticks('BTCUSDT', [100, 101, 102])))
+        fast_a = hub.subscribe('a')
+        fast_b = hub.subscribe('b', ['BTCUSDT'])
+
+        async def drain(subscription):
+            return [s async for s in subscription]
+
+        _, got_a, got_b = await asyncio.gather(hub.run(), drain(fast_a), drain(fast_b))
+        self.assertEqual([s.price for s in got_a], [100, 101, 102])
+        self.assertTrue(all(x is y for x, y in zip(got_a, got_b)))
+        self.assertEqual([s.seq for s in got_a], [1, 2, 3])
+
+        metrics = hub.metrics()
+        self.assertEqual(metrics['streams']['BTCUSDT']['messages'], 3)
+        self.assertAlmostEqual(metrics['streams']['BTCUSDT']['max_lag_ms'], 250.0)
+        self.assertEqual(metrics['subscribers']['a']['conflated'], 0)
+
+    async def test_slow_consumer_is_conflated(self):
+        hub = MarketDataHub()
+        slow = hub.subscribe('slow')
+        for snapshot in ticks('BTCUSDT', range(100, 200)) + ticks('ETHUSDT', [10, 11]):
+            hub.publish(snapshot)
+        self.assertEqual(slow.pending, 2)
+        self.assertEqual((await slow.get()).price, 199)
+        self.assertEqual((await slow.get()).price, 11)
+        self.assertEqual(slow.conflated, 100)
+
+    async def test_adapters(self):
+        hub = MarketDataHub()
+        hub.add_stream('BTCUSDT', replay_source(ticks('BTCUSDT', [50000 + 100 * i for i in range(6)])))
+        hub.add_stream('ETHUSDT', replay_source(ticks('ETHUSDT', [3000 + 3 * i for i in range(6)])))
+        arbitrage = RelativeArbitrage()
+        feed = ArbitrageFeed(hub, arbitrage)
+        view = ExecutionMarketView(hub)
+        await asyncio.gather(hub.run(), feed.run(), view.run())
+
+        self.assertGreaterEqual(len(arbitrage.price_history['BTC/USDT']), 6)
+        executor = StaggeredExecution(market_data=view)
+        data = await executor._get_market_data('BTCUSDT')
+        self.assertAlmostEqual(data['price_change_pct'], 500 / 50000)
+        self.assertAlmostEqual(data['spread'], 1 / 50500)
+
+    async def test_websocket_source(self):
+        async def stream(request):
+            ws = web.WebSocketResponse()
+            await ws.prepare(request)
+            for i in range(3):
+                await ws.send_str(json.dumps({'s': 'BTCUSDT', 'b': str(100 + i), 'a': str(101 + i), 'E': 1_000_000}))
+            await ws.close()
+            return ws
+
+        app = web.Application()
+        app.router.add_get('/ws', stream)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        try:
+            hub = MarketDataHub()
+            hub.add_stream('BTCUSDT', websocket_source(f'http://127.0.0.1:{port}/ws', 'BTCUSDT'))
+            subscription = hub.subscribe('test')
+            _, received = await asyncio.gather(hub.run(), self._collect(subscription))
+            self.assertEqual(received[-1].price, 102.5)
+        finally:
+            await runner.cleanup()
+
+    async def _collect(self, subscription):
+        return [s async for s in subscription]
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,168 @@
+"""
+Tests de métricas en proceso y endpoint /metrics
+"""
+import asyncio
+import gc
+import json
+import threading
+import unittest
+import urllib.error
+import urllib.request
+from dataclasses import replace
+
+from advanced_trading import metrics
+from advanced_trading.market_data_hub import MarketDataHub, replay_source
+from advanced_trading.metrics import MetricsServer, Registry, _Metric, _Sharded
+from advanced_trading.order_gateway import GatewayError, SimulatedGateway
+from advanced_trading.records import OrderRequest
+from advanced_trading.records import MarketSnapshot
+
+
+async def _no_sleep(seconds):
+    pass
+
+
+class TestMetricTypes(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = Registry()
+
+    def test_counter_sums_thread_shards(self):
+        counter = self.registry.counter('ticks_total', 'ticks', ['symbol'])
+
+        def work():
+            for _ in range(10_000):
+                counter.labels('BTCUSDT').inc()
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(counter.labels('BTCUSDT').value, 40_000)
+        self.assertIn('ticks_total{symbol="BTCUSDT"} 40000', self.registry.render())
+
+    def test_labels_arity_checked(self):
+        counter = self.registry.counter('signals_total', 'señales', ['source', 'signal'])
+        with self.assertRaises(ValueError):
+            counter.labels('arbitrage')
+
+    def test_duplicate_name_rejected(self):
+        self.registry.counter('x_total', 'x')
+        with self.assertRaises(ValueError):
+            self.registry.gauge('x_total', 'x')
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = self.registry.histogram('latency_seconds', 'latencia', buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value)
+        text = self.registry.render()
+        self.assertIn('# TYPE latency_seconds histogram', text)
+        self.assertIn('latency_seconds_bucket{le="0.1"} 2', text)
+        self.assertIn('latency_seconds_bucket{le="1"} 3', text)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 4', text)
+        self.assertIn('latency_seconds_count 4', text)
+        self.assertIn('latency_seconds_sum 3.65', text)
+
+    def test_gauge_function_evaluated_on_scrape(self):
+        gauge = self.registry.gauge('depth', 'profundidad', ['queue'])
+        items = [1, 2]
+        gauge.labels('journal').set_function(lambda: len(items))
+        items.append(3)
+        self.assertIn('depth{queue="journal"} 3', self.registry.render())
+        gauge.remove('journal')
+        self.assertNotIn('journal', self.registry.render())
+
+    def test_gc_pause_recorded(self):
+        metrics.install_gc_metrics()
+        metrics.install_gc_metrics()
+        self.assertEqual(gc.callbacks.count(metrics._gc_callback), 1)
+        before = metrics.GC_PAUSE.labels(2).count
+        gc.collect()
+        self.assertEqual(metrics.GC_PAUSE.labels(2).count, before + 1)
+
+    def test_metric_bases_are_abstract(self):
+        class NoSamples(_Metric):
+            pass
+
+        class NoShard(_Sharded):
+            def samples(self, name, labels):
+                return []
+
+        with self.assertRaises(TypeError):
+            NoSamples('x', 'x')
+        with self.assertRaises(TypeError):
+            NoShard('y', 'y')
+
+
+class TestMetricsServer(unittest.TestCase):
+
+    def _get(self, url):
+        try:
+            with urllib.request.urlopen(url, timeout=5) as response:
+                return response.status, response.headers['Content-Type'], response.read().decode()
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers['Content-Type'], e.read().decode()
+
+    def test_metrics_and_health(self):
+        registry = Registry()
+        registry.counter('hits_total', 'hits').inc(3)
+        state = {'status': 'ok'}
+        server = MetricsServer('127.0.0.1', 0, registry, health=lambda: dict(state)).start()
+        try:
+            base = f'http://127.0.0.1:{server.port}'
+            status, content_type, body = self._get(base + '/metrics')
+            self.assertEqual(status, 200)
+            self.assertTrue(content_type.startswith('text/plain; version=0.0.4'))
+            self.assertIn('hits_total 3', body)
+
+            status, _, body = self._get(base + '/health')
+            self.assertEqual(status, 200)
+            self.assertEqual(json.loads(body)['status'], 'ok')
+
+            state['status'] = 'degraded'
+            status, _, _ = self._get(base + '/health')
+            self.assertEqual(status, 503)
+            self.assertEqual(self._get(base + '/nope')[0], 404)
+        finally:
+            server.stop()
+
+
+class TestHubInstrumentation(unittest.IsolatedAsyncioTestCase):
+
+    async def test_ticks_counted_and_queue_gauge(self):
+        ticks = [MarketSnapshot('METRICUSDT', 100.0 + i, 1000.0 + i) for i in range(5)]
+        before = metrics.TICKS_PROCESSED.labels('METRICUSDT').value
+        hub = MarketDataHub()
+        hub.add_stream('METRICUSDT', replay_source(ticks))
+        subscription = hub.subscribe('metrics-test')
+        self.assertIn('trading_queue_depth{queue="hub.metrics-test"}', metrics.REGISTRY.render())
+
+        async def drain():
+            return [s async for s in subscription]
+
+        await asyncio.gather(hub.run(), drain())
+        self.assertEqual(metrics.TICKS_PROCESSED.labels('METRICUSDT').value - before, 5)
+        hub.unsubscribe(subscription)
+        self.assertNotIn('hub.metrics-test', metrics.REGISTRY.render())
+
+
+class TestOrderLatency(unittest.IsolatedAsyncioTestCase):
+
+    async def test_failed_follow_is_observed(self):
+        class LostGateway(SimulatedGateway):
+            async def place_order(self, request):
+                result = await super().place_order(request)
+                return replace(result, status='new', filled=0.0)
+
+            async def get_order(self, symbol, order_id):
+                raise GatewayError('Unknown order sent.', -2013, 400)
+
+        before = metrics.ORDER_LATENCY.labels('error').count
+        with self.assertRaises(GatewayError):
+            await LostGateway(sleep=_no_sleep).execute(OrderRequest('BTCUSDT', 'buy', 0.01, 'limit', 50000.0))
+        self.assertEqual(metrics.ORDER_LATENCY.labels('error').count, before + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+"""
+Tests del simulador Monte Carlo de estrés
+"""
+import unittest
+
+import numpy as np
+
+from advanced_trading.monte_carlo import (
+    apply_daily_limits, max_consecutive_losses, max_drawdowns, run_stress_test
+)
+
+
+class TestMonteCarlo(unittest.TestCase):
+
+    def test_daily_loss_blocks_rest_of_day(self):
+        returns = np.array([[-0.03, -0.03, 0.01, 0.02, 0.01, -0.01, 0.01, 0.01]])
+        limited = apply_daily_limits(returns, trades_per_day=4, max_daily_loss=0.05)
+        np.testing.assert_allclose(limited, [[-0.03, -0.03, 0.0, 0.0, 0.01, -0.01, 0.01, 0.01]])
+
+    def test_loss_streak_and_drawdown(self):
+        returns = np.array([[-0.01, -0.01, 0.0, -0.01, 0.02, -0.01]])
+        self.assertEqual(max_consecutive_losses(returns)[0], 3)
+        self.assertAlmostEqual(max_drawdowns(returns)[0], 1 - 0.99 ** 3, places=10)
+
+    def test_deterministic_across_workers(self):
+        single = run_stress_test(n_paths=600, n_days=5, chunk_size=200, workers=1, seed=3)
+        multi = run_stress_test(n_paths=600, n_days=5, chunk_size=200, workers=2, seed=3)
+        self.assertEqual(single, multi)
+        self.assertEqual(single['paths'], 600)
+
+    def test_positive_drift_improves_outcomes(self):
+        base = run_stress_test(n_paths=1000, n_days=10, workers=1, params={'cost_bps': 0})
+        edge = run_stress_test(n_paths=1000, n_days=10, workers=1, params={'cost_bps': 0, 'drift': 200.0})
+        self.assertGreater(edge['final_return_mean'], base['final_return_mean'])
+        self.assertLess(edge['prob_consecutive_losses_stop'], base['prob_consecutive_losses_stop'])
+
+
+if __name__ == '__main__':
+    unittest.main()
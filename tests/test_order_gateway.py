@@ -0,0 +1,260 @@
+"""
+Tests del gateway de órdenes contra un venue simulado local
+"""
+import asyncio
+import hashlib
+import hmac
+import json
+import unittest
+from urllib.parse import parse_qsl
+
+from aiohttp import web
+
+from advanced_trading.order_gateway import (
+    BinanceFuturesGateway, GatewayError, OrderGateway, RequestWeightTracker, SimulatedGateway, arbitrage_legs,
+)
+from advanced_trading.config.trading_config import TRADING_CONFIG
+from advanced_trading.records import OrderRequest
+from advanced_trading.staggered_execution import StaggeredExecution
+
+SECRET = 'secret'
+
+
+class MockVenue:
+    """Venue tipo Binance futures: market se llena, limit queda NEW y se llena a medias al consultarlo"""
+
+    def __init__(self):
+        self.orders = {}
+        self.next_id = 0
+        self.weight = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.batch_calls = 0
+        self.connections = set()
+
+    def _params(self, request):
+        query = request.url.raw_query_string
+        payload, signature = query.rsplit('&signature=', 1)
+        expected = hmac.new(SECRET.encode(), payload.encode(), hashlib.sha256).hexdigest()
+        assert signature == expected, 'firma inválida'
+        assert request.headers['X-MBX-APIKEY'] == 'key'
+        self.connections.add(request.transport.get_extra_info('peername'))
+        return dict(parse_qsl(payload))
+
+    def _respond(self, data, weight, status=200):
+        self.weight += weight
+        return web.json_response(data, status=status, headers={'X-MBX-USED-WEIGHT-1M': str(self.weight)})
+
+    def _new_order(self, params):
+        if float(params['quantity']) <= 0:
+            return {'code': -4003, 'msg': 'Quantity less than or equal to zero.'}
+        self.next_id += 1
+        market = params['type'] == 'MARKET'
+        order = {
+            'orderId': self.next_id, 'symbol': params['symbol'], 'side': params['side'],
+            'type': params['type'], 'origQty': params['quantity'],
+            'executedQty': params['quantity'] if market else '0',
+            'avgPrice': params.get('price', '100'), 'status': 'FILLED' if market else 'NEW',
+            'updateTime': 1_700_000_000_000,
+            'positionSide': params.get('positionSide', 'BOTH'), 'reduceOnly': params.get('reduceOnly') == 'true',
+        }
+        self.orders[self.next_id] = order
+        return order
+
+    async def order(self, request):
+        params = self._params(request)
+        if params['symbol'] == 'HTMLUSDT':  # proxy delante del venue
+            return web.Response(text='<html>502 Bad Gateway</html>', status=502, content_type='text/html')
+        if request.method == 'POST':
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            await asyncio.sleep(0.05)
+            self.in_flight -= 1
+            order = self._new_order(params)
+            return self._respond(order, 1, 400 if 'code' in order else 200)
+        order = self.orders[int(params['orderId'])]
+        if request.method == 'GET' and order['status'] == 'NEW':
+            order['status'] = 'PARTIALLY_FILLED'
+            order['executedQty'] = str(float(order['origQty']) / 2)
+        elif request.method == 'DELETE':
+            order['status'] = 'CANCELED'
+        return self._respond(order, 1)
+
+    async def batch(self, request):
+        self.batch_calls += 1
+        params = self._params(request)
+        return self._respond([self._new_order(p) for p in json.loads(params['batchOrders'])], 5)
+
+
+class TestOrderGateway(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.venue = MockVenue()
+        app = web.Application()
+        app.router.add_route('*', '/fapi/v1/order', self.venue.order)
+        app.router.add_post('/fapi/v1/batchOrders', self.venue.batch)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.gateway = BinanceFuturesGateway('key', SECRET, base_url=f'http://127.0.0.1:{port}')
+
+    async def asyncTearDown(self):
+        await self.gateway.close()
+        await self.runner.cleanup()
+
+    async def test_arbitrage_legs_sent_concurrently(self):
+        legs = arbitrage_legs('LONG_ETH_SHORT_BTC', btc_size=0.01, eth_size=0.2)
+        results = await self.gateway.place_legs(legs)
+        self.assertEqual(self.venue.max_in_flight, 2)
+        self.assertEqual([(r.symbol, r.side, r.status) for r in results],
+                         [('ETHUSDT', 'buy', 'filled'), ('BTCUSDT', 'sell', 'filled')])
+        self.assertEqual(self.gateway.weights.used, 2)
+
+    async def test_failed_leg_unwinds_the_other(self):
+        results = await self.gateway.place_legs([OrderRequest('BTCUSDT', 'BUY', 0), OrderRequest('ETHUSDT', 'SELL', 1)])
+        self.assertEqual([(r.status, r.filled) for r in results], [('rejected', 0.0), ('unwound', 0.0)])
+        closing = self.venue.orders[max(self.venue.orders)]
+        self.assertEqual((closing['symbol'], closing['side'], closing['executedQty']), ('ETHUSDT', 'BUY', '1'))
+        self.assertEqual(closing['positionSide'], 'SHORT')  # hedge mode: cierra el short, no abre un long
+
+    async def test_non_json_response_is_gateway_error(self):
+        with self.assertRaises(GatewayError) as ctx:
+            await self.gateway.place_order(OrderRequest('HTMLUSDT', 'BUY', 1))
+        self.assertEqual((ctx.exception.status, ctx.exception.code), (502, None))
+
+    async def test_batch_orders_are_chunked(self):
+        requests = [OrderRequest('BTCUSDT', 'BUY', 0.001 * (i + 1)) for i in range(6)] + [OrderRequest('BTCUSDT', 'BUY', 0)]
+        results = await self.gateway.place_batch(requests)
+        self.assertEqual(self.venue.batch_calls, 2)
+        self.assertEqual([r.status for r in results], ['filled'] * 6 + ['rejected'])
+        self.assertEqual(self.gateway.weights.used, 10)
+
+    async def test_batch_transport_error_is_unknown(self):
+        down = BinanceFuturesGateway('key', SECRET, base_url='http://127.0.0.1:1')
+        try:
+            results = await down.place_batch([OrderRequest('BTCUSDT', 'BUY', 0.001)])
+        finally:
+            await down.close()
+        self.assertEqual([r.status for r in results], ['unknown'])
+
+    def test_one_way_mode_sends_reduce_only(self):
+        gateway = BinanceFuturesGateway('key', SECRET, config=dict(TRADING_CONFIG, HEDGE_MODE=False))
+        closing = gateway._order_params(OrderRequest('BTCUSDT', 'SELL', 1, reduce_only=True))
+        self.assertEqual(closing['reduceOnly'], 'true')
+        self.assertNotIn('positionSide', closing)
+        hedged = self.gateway._order_params(OrderRequest('BTCUSDT', 'SELL', 1, position_side='LONG', reduce_only=True))
+        self.assertEqual(hedged['positionSide'], 'LONG')
+        self.assertNotIn('reduceOnly', hedged)
+
+    async def test_partial_fill_policies(self):
+        limit = OrderRequest('BTCUSDT', 'BUY', 1.0, type='limit', price=100.0)
+        result = await self.gateway.execute(limit, policy='cancel_remaining', poll_interval=0.01)
+        self.assertEqual((result.status, result.filled), ('canceled', 0.5))
+
+        result = await self.gateway.execute(limit, timeout=0.05, policy='keep_until_timeout', poll_interval=0.01)
+        self.assertEqual((result.status, result.filled), ('canceled', 0.5))
+        self.assertEqual(len(self.venue.connections), 1)  # keep-alive: una sola conexión
+
+    async def test_staggered_execution_uses_gateway(self):
+        executor = StaggeredExecution(gateway=self.gateway)
+        plan = executor.generate_execution_plan('BUY', 1.0)
+        executed = await executor.execute_plan(plan[:1], 'BTCUSDT', 'BUY')
+        self.assertFalse(executed[0].order.simulated)
+        self.assertEqual(executed[0].order.status, 'filled')
+
+
+class TestPlaceLegs(unittest.IsolatedAsyncioTestCase):
+
+    def test_gateway_interface_is_abstract(self):
+        with self.assertRaises(TypeError):
+            OrderGateway()
+
+        class NoLookupGateway(OrderGateway):  # sin find_order no se puede reconciliar
+            place_order = get_order = cancel_order = SimulatedGateway.place_order
+
+        with self.assertRaises(TypeError):
+            NoLookupGateway()
+
+    async def test_unwind_failure_is_reported(self):
+        class ClosingFailsGateway(SimulatedGateway):
+            async def place_order(self, request):
+                if request.symbol == 'BTCUSDT' or self.orders:
+                    raise GatewayError('Margin is insufficient.', -2019, 400)
+                return await super().place_order(request)
+
+        gateway = ClosingFailsGateway()
+        results = await gateway.place_legs(arbitrage_legs('LONG_ETH_SHORT_BTC', btc_size=0.01, eth_size=0.2))
+        self.assertEqual([(r.symbol, r.status, r.filled) for r in results],
+                         [('ETHUSDT', 'unwind_required', 0.2), ('BTCUSDT', 'rejected', 0.0)])
+
+    async def test_lost_reply_is_resolved_before_unwinding(self):
+        class LostReplyGateway(SimulatedGateway):
+            async def place_order(self, request):
+                result = await super().place_order(request)
+                if request.symbol == 'BTCUSDT':
+                    raise asyncio.TimeoutError()  # llegó al venue pero la respuesta se perdió
+                return result
+
+        gateway = LostReplyGateway()
+        results = await gateway.place_legs(arbitrage_legs('LONG_ETH_SHORT_BTC', btc_size=0.01, eth_size=0.2))
+        self.assertEqual([(r.symbol, r.status, r.filled) for r in results],
+                         [('ETHUSDT', 'filled', 0.2), ('BTCUSDT', 'filled', 0.01)])
+        self.assertEqual(len(gateway.orders), 2)  # nada deshecho
+
+    async def test_unresolved_leg_is_unwind_required(self):
+        class BlindGateway(SimulatedGateway):
+            async def place_order(self, request):
+                if request.symbol == 'ETHUSDT':
+                    raise GatewayError('Margin is insufficient.', -2019, 400)
+                await super().place_order(request)
+                raise ConnectionResetError()
+
+            async def find_order(self, symbol, client_order_id):
+                raise ConnectionResetError()
+
+        gateway = BlindGateway()
+        results = await gateway.place_legs(arbitrage_legs('LONG_ETH_SHORT_BTC', btc_size=0.01, eth_size=0.2))
+        self.assertEqual([(r.symbol, r.status) for r in results],
+                         [('ETHUSDT', 'rejected'), ('BTCUSDT', 'unwind_required')])
+        self.assertEqual(len(gateway.orders), 1)  # sin cierre a ciegas
+
+    async def test_batch_does_not_unwind(self):
+        class HalfGateway(SimulatedGateway):
+            async def place_order(self, request):
+                if request.amount <= 0:
+                    raise GatewayError('Quantity less than or equal to zero.', -4003, 400)
+                return await super().place_order(request)
+
+        gateway = HalfGateway()
+        results = await gateway.place_batch([OrderRequest('BTCUSDT', 'BUY', 0), OrderRequest('ETHUSDT', 'SELL', 1)])
+        self.assertEqual([r.status for r in results], ['rejected', 'filled'])
+        self.assertEqual(len(gateway.orders), 1)
+
+
+class TestRequestWeightTracker(unittest.IsolatedAsyncioTestCase):
+
+    async def test_waits_for_next_window(self):
+        now = [120.0]
+        sleeps = []
+
+        async def fake_sleep(seconds):
+            sleeps.append(seconds)
+            now[0] += seconds
+
+        tracker = RequestWeightTracker(limit=10, safety=0.9, clock=lambda: now[0], sleep=fake_sleep)
+        for _ in range(9):
+            await tracker.acquire(1)
+        tracker.update_from_headers({'X-MBX-USED-WEIGHT-1M': '9'})
+        await tracker.acquire(1)
+        self.assertEqual(sleeps, [60.0])
+        self.assertEqual(tracker.used, 1)
+
+        tracker.block_for(5)
+        await tracker.acquire(1)
+        self.assertEqual(sleeps[-1], 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,185 @@
+"""
+Tests del outbox de intenciones de orden
+"""
+import asyncio
+import os
+import tempfile
+import unittest
+from dataclasses import replace
+
+from advanced_trading.order_gateway import GatewayError, SimulatedGateway, is_rejection
+from advanced_trading.order_outbox import OrderOutbox, OutboxDispatcher, client_order_id
+from advanced_trading.records import ExecutionStage, OrderRequest
+from advanced_trading.staggered_execution import StaggeredExecution
+
+
+async def _no_sleep(seconds):
+    pass
+
+
+class SlowGateway(SimulatedGateway):
+    """Cede el control en cada envío para intercalar dispatchers"""
+
+    async def place_order(self, request):
+        await asyncio.sleep(0)
+        return await super().place_order(request)
+
+
+class LostAckGateway(SimulatedGateway):
+    """La orden llega al venue pero la respuesta se pierde"""
+
+    async def place_order(self, request):
+        await super().place_order(request)
+        raise asyncio.TimeoutError()
+
+
+class OutboxTestCase(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'trades.db')
+        self._open = []
+
+    def tearDown(self):
+        for outbox in self._open:
+            outbox.close()
+        self.tmpdir.cleanup()
+
+    def outbox(self, **kwargs):
+        outbox = OrderOutbox(self.db_path, **kwargs)
+        self._open.append(outbox)
+        return outbox
+
+
+class TestOrderOutbox(OutboxTestCase):
+
+    async def test_add_is_idempotent(self):
+        outbox = self.outbox()
+        request = OrderRequest('BTCUSDT', 'buy', 0.01)
+        cid = outbox.add('evt-1', 'T0', 'BTCUSDT', request)
+        self.assertEqual(outbox.add('evt-1', 'T0', 'BTCUSDT', request), cid)
+        self.assertEqual(cid, client_order_id('evt-1', 'T0', 'BTCUSDT'))
+        self.assertNotEqual(cid, client_order_id('evt-1', 'T+30s', 'BTCUSDT'))
+        self.assertEqual(len(outbox.intents('evt-1')), 1)
+
+    async def test_concurrent_dispatchers_send_once(self):
+        gateway = SlowGateway()
+        writer = self.outbox()
+        for i in range(10):
+            writer.add(f'evt-{i}', 'T0', 'ETHUSDT', OrderRequest('ETHUSDT', 'sell', 1.0))
+        dispatchers = [OutboxDispatcher(self.outbox(), gateway, concurrency=3) for _ in range(3)]
+        batches = await asyncio.gather(*(d.drain() for d in dispatchers))
+        self.assertEqual(sum(len(b) for b in batches), 10)
+        self.assertEqual(len(gateway.orders), 10)
+        self.assertEqual({i['status'] for i in writer.intents()}, {'filled'})
+
+    async def test_lost_ack_is_reconciled_not_resent(self):
+        gateway = LostAckGateway()
+        outbox = self.outbox()
+        cid = outbox.add('evt-1', 'T0', 'BTCUSDT', OrderRequest('BTCUSDT', 'buy', 0.01))
+        self.assertIsNone(await outbox.send(gateway, cid))
+        self.assertEqual(outbox.get(cid)['status'], 'unknown')
+        self.assertIsNone(await outbox.send(gateway, cid))  # no se reenvía a ciegas
+
+        stats = await outbox.reconcile(gateway)
+        self.assertEqual(stats['found'], 1)
+        intent = outbox.get(cid)
+        self.assertEqual((intent['status'], intent['order_id']), ('filled', '1'))
+        self.assertEqual(len(gateway.orders), 1)
+
+    async def test_missing_order_is_requeued_then_failed(self):
+        class DownGateway(SimulatedGateway):
+            async def place_order(self, request):
+                raise ConnectionError('reset')
+
+        gateway = DownGateway()
+        outbox = self.outbox(max_attempts=2)
+        cid = outbox.add('evt-1', 'T0', 'BTCUSDT', OrderRequest('BTCUSDT', 'buy', 0.01))
+        await outbox.send(gateway, cid)
+        self.assertEqual((await outbox.reconcile(gateway))['requeued'], 1)
+        await outbox.send(gateway, cid)
+        self.assertEqual((await outbox.reconcile(gateway))['failed'], 1)
+        self.assertEqual(outbox.get(cid)['attempts'], 2)
+
+    async def test_venue_rejection_is_final(self):
+        class RejectingGateway(SimulatedGateway):
+            async def place_order(self, request):
+                raise GatewayError('Margin is insufficient.', -2019, 400)
+
+        outbox = self.outbox()
+        cid = outbox.add('evt-1', 'T0', 'BTCUSDT', OrderRequest('BTCUSDT', 'buy', 0.01))
+        await outbox.send(RejectingGateway(), cid)
+        self.assertEqual(outbox.get(cid)['status'], 'rejected')
+        self.assertEqual(outbox.intents(statuses=('sending', 'unknown')), [])
+
+    async def test_error_after_place_is_unknown(self):
+        class LostOrderGateway(SimulatedGateway):
+            """La orden queda abierta y la consulta posterior falla"""
+
+            async def place_order(self, request):
+                return replace(await super().place_order(request), status='new', filled=0.0)
+
+            async def get_order(self, symbol, order_id):
+                raise GatewayError('Unknown order sent.', -2013, 400)
+
+        gateway = LostOrderGateway(sleep=_no_sleep)
+        outbox = self.outbox()
+        cid = outbox.add('evt-1', 'T0', 'BTCUSDT', OrderRequest('BTCUSDT', 'buy', 0.01, 'limit', 50000.0))
+        self.assertIsNone(await outbox.send(gateway, cid))
+        self.assertEqual(outbox.get(cid)['status'], 'unknown')
+        self.assertEqual((await outbox.reconcile(gateway))['found'], 1)
+        self.assertEqual(len(gateway.orders), 1)
+
+    async def test_ambiguous_venue_errors_are_unknown(self):
+        errors = [GatewayError('Service Unavailable.', None, 503),
+                  GatewayError('Timeout waiting for response from backend server.', -1007, 408),
+                  GatewayError('Internal error; unable to process your request.', -1001, 400),
+                  GatewayError('Too many requests.', -1003, 429)]
+        for i, error in enumerate(errors):
+            class FailingGateway(SimulatedGateway):
+                async def place_order(self, request):
+                    raise error
+
+            outbox = self.outbox()
+            cid = outbox.add(f'evt-{i}', 'T0', 'BTCUSDT', OrderRequest('BTCUSDT', 'buy', 0.01))
+            await outbox.send(FailingGateway(), cid)
+            self.assertEqual(outbox.get(cid)['status'], 'unknown', error)
+            self.assertFalse(is_rejection(error))
+        self.assertTrue(is_rejection(GatewayError('Margin is insufficient.', -2019, 400)))
+
+
+class TestStaggeredWithOutbox(OutboxTestCase):
+
+    def _plan(self):
+        return [ExecutionStage('T0', 1.0, None, 'inicial', 0), ExecutionStage('T+30s', 2.0, None, 'segunda', 30)]
+
+    async def test_restart_skips_sent_stages(self):
+        gateway = SimulatedGateway()
+        first = StaggeredExecution(gateway=gateway, sleep=_no_sleep, outbox=self.outbox())
+        records = await first.execute_plan(self._plan()[:1], 'BTCUSDT', 'BUY', event_id='evt-7')
+        self.assertEqual(len(records), 1)
+
+        # reinicio: el plan completo se vuelve a ejecutar con el mismo event_id
+        sleeps = []
+
+        async def sleep(seconds):
+            sleeps.append(seconds)
+
+        second = StaggeredExecution(gateway=gateway, sleep=sleep, outbox=self.outbox())
+        records = await second.execute_plan(self._plan(), 'BTCUSDT', 'BUY', event_id='evt-7')
+        self.assertEqual([r.stage for r in records], ['T0', 'T+30s'])
+        self.assertEqual([r.order.order_id for r in records], ['1', '2'])
+        self.assertEqual(len(gateway.orders), 2)
+        self.assertEqual(sleeps, [30])
+
+    async def test_without_event_id_keeps_plain_path(self):
+        gateway = SimulatedGateway()
+        outbox = self.outbox()
+        executor = StaggeredExecution(gateway=gateway, sleep=_no_sleep, outbox=outbox)
+        await executor.execute_plan(self._plan(), 'BTCUSDT', 'BUY')
+        self.assertEqual(len(gateway.orders), 2)
+        self.assertEqual(outbox.intents(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+"""
+Tests de agregación de riesgo de cartera
+"""
+import unittest
+
+import numpy as np
+
+from advanced_trading.advanced_risk_manager import AdvancedRiskManager
+from advanced_trading.portfolio_risk import PortfolioRisk
+
+
+class TestPortfolioRisk(unittest.TestCase):
+
+    def setUp(self):
+        self.portfolio = PortfolioRisk(equity=10_000, leverage=3, returns_window=50)
+        rng = np.random.default_rng(7)
+        btc, eth = 50_000.0, 3_000.0
+        for _ in range(80):
+            shock = rng.normal(0, 0.002)
+            btc *= 1 + shock + rng.normal(0, 0.0005)
+            eth *= 1 + 1.2 * shock + rng.normal(0, 0.0005)
+            self.portfolio.update_prices({'BTC/USDT': btc, 'ETH/USDT': eth})
+
+    def test_net_exposure_and_realized_pnl(self):
+        p = self.portfolio
+        mark = p.mark[p.symbol_index['BTC/USDT']]
+        p.on_fill('BTC/USDT', 'BUY', 0.2, mark)
+        realized = p.on_fill('BTC/USDT', 'SELL', 0.1, mark + 100)
+        self.assertAlmostEqual(realized, 10.0)
+        self.assertAlmostEqual(p.net_exposure()['BTC/USDT'], 0.1 * mark)
+
+    def test_incremental_var_matches_full_recompute(self):
+        p = self.portfolio
+        p.on_fill('BTC/USDT', 'BUY', 0.1, p.mark[0])
+        p.on_fill('ETH/USDT', 'SELL', 1.5, p.mark[1])
+        p.on_fill('SOL/USDT', 'BUY', 10, 150.0)  # símbolo nuevo sin historial
+        incremental = p.portfolio_var()
+
+        w = p.exposure[:p.n]
+        cov = np.cov(p._returns[:, :p.n], rowvar=False)
+        expected = p.z_score * np.sqrt(1440) * np.sqrt(w @ cov @ w)  # VaR diario con retornos por minuto
+        self.assertAlmostEqual(incremental, expected, places=6)
+
+    def test_hedged_legs_reduce_var(self):
+        p = self.portfolio
+        p.on_fill('BTC/USDT', 'BUY', 0.1, p.mark[0])
+        long_only = p.portfolio_var()
+        hedge_qty = 0.1 * p.mark[0] / p.mark[1]
+        p.on_fill('ETH/USDT', 'SELL', hedge_qty, p.mark[1])
+        self.assertLess(p.portfolio_var(), long_only)
+        self.assertGreater(p.correlation_matrix()[0, 1], 0.8)
+
+    def test_var_limit_uses_daily_horizon(self):
+        p = self.portfolio
+        qty = 2.0 * p.equity / p.mark[0]  # 2x equity sin cubrir: VaR de un minuto < 5%, diario no
+        one_period = p.z_score * np.sqrt(p._cov[0, 0]) * qty * p.mark[0] / p.equity
+        self.assertLess(one_period, p.max_var_pct)
+        ok, message = p.check_order('BTC/USDT', 'BUY', qty, p.mark[0])
+        self.assertFalse(ok)
+        self.assertIn('VaR', message)
+
+    def test_combined_legs_checked_together(self):
+        p = self.portfolio
+        notional = 0.5 * p.equity
+        legs = [('BTC/USDT', 'BUY', notional / p.mark[0], p.mark[0]),
+                ('ETH/USDT', 'SELL', notional / p.mark[1], p.mark[1])]
+        self.assertFalse(p.check_order(*legs[0])[0])  # cada pata sola excede el VaR
+        self.assertFalse(p.check_order(*legs[1])[0])
+        self.assertEqual(p.check_orders(legs), (True, "Within portfolio limits"))
+        self.assertEqual(p.gross_exposure(), 0.0)
+
+        p.leverage = 0.9  # el bruto sí suma ambas patas
+        ok, message = p.check_orders(legs)
+        self.assertFalse(ok)
+        self.assertIn('Leverage', message)
+
+    def test_missing_symbol_does_not_add_zero_returns(self):
+        p = PortfolioRisk(equity=10_000, returns_window=10)
+        p.update_prices({'A': 100.0, 'B': 50.0})
+        self.assertEqual(p._ret_count, 0)  # primer refresh: sólo referencias
+        p.update_prices({'A': 101.0})  # B no cotiza: sin fila nueva
+        self.assertEqual(p._ret_count, 0)
+        self.assertEqual(p.mark[0], 101.0)
+        p.update_prices({'A': 102.0, 'B': 51.0})
+        self.assertEqual(p._ret_count, 1)
+        np.testing.assert_allclose(p._returns[0, :2], [0.02, 0.02])
+
+    def test_new_symbol_does_not_add_zero_return(self):
+        p = PortfolioRisk(equity=10_000, returns_window=20)
+        prices = {'A': 100.0, 'B': 50.0}
+        for k in range(10):
+            if k == 5:
+                prices['C'] = 10.0  # entra a mitad de la ventana
+            p.update_prices(prices)
+            prices = {s: v * 1.01 for s, v in prices.items()}
+        self.assertEqual(p._ret_count, 9)  # sin fila en el primer refresh
+        self.assertEqual(p._pairs[2, 2], 4)  # C sólo cuenta desde su segundo precio
+        np.testing.assert_allclose(p._cov[:p.n, :p.n], 0.0, atol=1e-15)  # retornos constantes del 1%
+
+    def test_leverage_limit_via_risk_manager(self):
+        risk_manager = AdvancedRiskManager(10_000, portfolio=self.portfolio)
+        price = self.portfolio.mark[0]
+        ok, _ = risk_manager.can_add_position('BTC/USDT', 'BUY', 0.02, price)
+        self.assertTrue(ok)
+        ok, message = risk_manager.can_add_position('BTC/USDT', 'BUY', 1.0, price)
+        self.assertFalse(ok)
+        self.assertIn('Leverage', message)
+        self.assertEqual(self.portfolio.gross_exposure(), 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+"""
+Tests de los records compactos
+"""
+import asyncio
+import dataclasses
+import unittest
+
+from advanced_trading.macro_analyzer import MacroAnalyzer
+from advanced_trading.records import ExecutionStage, OrderResult, TradeRecord
+from advanced_trading.staggered_execution import StaggeredExecution
+
+
+class TestRecords(unittest.TestCase):
+
+    def test_records_are_slotted_and_frozen(self):
+        signal = MacroAnalyzer().analyze_event('CPI', 3.2, 3.6)
+        self.assertFalse(hasattr(signal, '__dict__'))
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            signal.direction = 'BUY'
+
+    def test_dict_compatible_reads(self):
+        signal = MacroAnalyzer().analyze_event('CPI', 3.2, 3.6)
+        self.assertEqual(signal['direction'], 'SELL')
+        self.assertEqual(signal.get('missing', 'x'), 'x')
+        self.assertIn('impact_score', signal)
+        with self.assertRaises(KeyError):
+            signal['missing']
+        self.assertEqual(signal.to_row()['event_type'], 'CPI')
+
+    def test_macro_signal_row_uses_event_fields(self):
+        signal = MacroAnalyzer().analyze_event('CPI', 3.2, 3.6, event_date='2024-01-11')
+        row = signal.to_row()
+        self.assertEqual(row['event_date'], '2024-01-11')
+        self.assertEqual(row['impact'], 'BEARISH')
+        self.assertEqual(row['surprise_bps'], 40)
+        self.assertEqual(MacroAnalyzer().analyze_event('FOMC', 5.25, 5.25).to_row()['impact'], 'NEUTRAL')
+        self.assertEqual(MacroAnalyzer().analyze_event('CPI', 3.2, 3.2).to_row()['impact'], 'NEUTRAL')  # sin sorpresa
+
+    def test_execution_uses_records(self):
+        executor = StaggeredExecution()
+        plan = executor.generate_execution_plan('BUY', 10000)
+        self.assertIsInstance(plan[0], ExecutionStage)
+        self.assertAlmostEqual(sum(stage.amount for stage in plan), 10000)
+
+        first = [dict(plan[0].to_dict())]  # los planes en dict siguen aceptándose
+        executed = asyncio.run(executor.execute_plan(first, 'BTCUSDT', 'BUY'))
+        self.assertIsInstance(executed[0], TradeRecord)
+        self.assertIsInstance(executed[0].order, OrderResult)
+        self.assertEqual(executed[0].to_row(), {
+            'event_id': None, 'symbol': 'BTCUSDT', 'side': 'BUY', 'size': 1500.0,
+            'execution_time_ms': 0, 'entry_price': None,
+        })
+
+        self.assertEqual(executed[0].order.to_row()['side'], 'BUY')
+
+        executor.add_execution_record('p1', 'T0', 100.0, 0.2, True)
+        self.assertEqual(executor.get_execution_metrics()['total_orders_placed'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+"""
+Tests del harness de replay determinista
+"""
+import asyncio
+import math
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+
+from advanced_trading.db_schema import ensure_schema
+from advanced_trading.records import MarketSnapshot
+from advanced_trading.replay import ReplayHarness, VirtualClock, run_replay, ticks_from_csv, ticks_from_db
+
+START = 1_700_000_000.0
+
+
+def synthetic_ticks(n=400):
+    ticks = []
+    for i in range(n):
+        ts = START + i
+        common = 0.01 * math.sin(i / 3)  # factor común: BTC y ETH correlacionados
+        ticks.append(MarketSnapshot('BTCUSDT', 50_000 * (1 + 0.0005 * i + common), ts, volume=1.0, recv_ts=ts))
+        ticks.append(MarketSnapshot('ETHUSDT', 3_000 * (1 + common), ts, volume=1.0, recv_ts=ts))
+    return ticks
+
+
+EVENTS = [{'ts': START + 10, 'event_type': 'CPI', 'consensus': 3.2, 'actual': 3.9}]
+
+
+class TestReplay(unittest.TestCase):
+
+    def test_virtual_clock_orders_timers(self):
+        async def scenario():
+            clock = VirtualClock(100.0)
+            woke = []
+
+            async def sleeper(name, delay):
+                await clock.sleep(delay)
+                woke.append((name, clock.time()))
+
+            tasks = [asyncio.ensure_future(sleeper('b', 30)), asyncio.ensure_future(sleeper('a', 5))]
+            await asyncio.sleep(0)
+            await clock.advance_to(110.0)
+            self.assertEqual(woke, [('a', 105.0)])
+            await clock.run_until_idle()
+            await asyncio.gather(*tasks)
+            return woke
+
+        self.assertEqual(asyncio.run(scenario()), [('a', 105.0), ('b', 130.0)])
+
+    def test_replay_is_deterministic_and_instant(self):
+        started = time.perf_counter()
+        first = run_replay(synthetic_ticks(), macro_events=EVENTS)
+        second = run_replay(synthetic_ticks(), macro_events=EVENTS)
+        self.assertLess(time.perf_counter() - started, 10)  # el plan de 120s no espera en tiempo real
+
+        self.assertEqual(first['ticks'], 800)
+        self.assertAlmostEqual(first['virtual_span_sec'], 399)
+        self.assertGreater(first['decisions'], 1)
+        self.assertGreaterEqual(first['orders'], 1)
+        for key in ('ticks', 'decisions', 'orders'):
+            self.assertEqual(first[key], second[key])
+        self.assertGreater(first['ticks_per_sec'], 0)
+        self.assertGreaterEqual(first['decision_latency_us']['p99'], first['decision_latency_us']['p50'])
+
+    def test_publish_times_do_not_accumulate(self):
+        harness = ReplayHarness(synthetic_ticks(100), macro_events=EVENTS)
+        report = asyncio.run(harness.run())
+        self.assertGreater(len(harness.latencies), 1)
+        self.assertEqual(report['ticks'], 200)
+        self.assertEqual(harness._published_at, {})
+
+    def test_tick_sources(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            csv_path = os.path.join(tmpdir, 'ticks.csv')
+            with open(csv_path, 'w') as f:
+                f.write('symbol,ts,price,volume,spread_bps\n')
+                f.write('BTCUSDT,1700000000000,50000,2,2\n')
+                f.write('BTCUSDT,2023-11-14T22:13:21Z,50010,,\n')
+            ticks = list(ticks_from_csv(csv_path))
+            self.assertEqual([t.ts for t in ticks], [START, START + 1])
+            self.assertAlmostEqual(ticks[0].ask - ticks[0].bid, 10.0)
+
+            db_path = os.path.join(tmpdir, 'md.db')
+            conn = sqlite3.connect(db_path)
+            ensure_schema(conn, ['market_data'])
+            conn.executemany(
+                "INSERT INTO market_data (symbol, timestamp, close, volume, spread_bps) VALUES (?, ?, ?, ?, ?)",
+                [('ETHUSDT', '2024-01-01 00:01:00', 2300.0, 5.0, 1.0),
+                 ('BTCUSDT', '2024-01-01 00:00:00', 42000.0, 1.0, 1.0)],
+            )
+            conn.commit()
+            conn.close()
+            self.assertEqual([t.symbol for t in ticks_from_db(db_path)], ['BTCUSDT', 'ETHUSDT'])
+            self.assertEqual(len(list(ticks_from_db(db_path, ['ETHUSDT']))), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+"""
+Tests del runtime por shards con memoria compartida
+"""
+import time
+import unittest
+
+import numpy as np
+
+from advanced_trading.portfolio_risk import PortfolioRisk
+from advanced_trading.records import MarketSnapshot, OrderResult
+from advanced_trading.sharded_runtime import (
+    BufferLayout, Coordinator, SharedPriceBuffer, ShardedRuntime, ShardParams, assign_shards, load_symbols,
+)
+
+
+class TestSharding(unittest.TestCase):
+
+    def test_symbols_from_binance_limits(self):
+        symbols = load_symbols()
+        self.assertIn('BTCUSDT', symbols)
+        self.assertNotIn('DEFAULT', symbols)
+
+    def test_assign_round_robin(self):
+        pairs = [('BTCUSDT', s) for s in ('A', 'B', 'C', 'D', 'E')]
+        shards = assign_shards(pairs, 2)
+        self.assertEqual([len(s) for s in shards], [3, 2])
+        self.assertEqual(len(assign_shards(pairs[:1], 4)), 1)
+        self.assertEqual(sorted(p for s in shards for p in s), sorted(pairs))
+
+
+class TestSharedPriceBuffer(unittest.TestCase):
+
+    def test_ring_and_attach(self):
+        layout = BufferLayout(('BTCUSDT', 'ETHUSDT'), capacity=4, workers=1)
+        owner = SharedPriceBuffer.create(layout)
+        reader = SharedPriceBuffer.attach(owner.name, layout)
+        try:
+            self.assertEqual(reader.latest(1), (0, 0.0, 0.0))
+            for k in range(6):
+                owner.write(1, 100.0 + k, 10.0 + k)
+            self.assertEqual(reader.latest(1), (6, 105.0, 15.0))
+            np.testing.assert_array_equal(reader.window(1, 10), [12.0, 13.0, 14.0, 15.0])
+            np.testing.assert_array_equal(reader.window(1, 2), [14.0, 15.0])
+        finally:
+            reader.close()
+            owner.close()
+
+
+def _correlated_ticks(symbols, steps, seed=3):
+    rng = np.random.default_rng(seed)
+    prices = {s: 100.0 for s in symbols}
+    for k in range(steps):
+        common = rng.normal(0, 0.003)
+        for i, symbol in enumerate(symbols):
+            prices[symbol] *= 1 + common + 0.002 * (i - 1) + rng.normal(0, 0.0005)
+            yield MarketSnapshot(symbol, prices[symbol], 1000.0 + k)
+
+
+class TestShardedRuntime(unittest.TestCase):
+
+    def test_workers_evaluate_from_shared_memory(self):
+        symbols = ['BTCUSDT', 'ETHUSDT', 'SOLUSDT']
+        params = ShardParams(lookback_period=10, correlation_threshold=0.3, divergence_threshold=0.001,
+                             poll_interval=0.01, stats_interval=0.01)
+        with ShardedRuntime(symbols, workers=2, params=params) as runtime:
+            self.assertEqual(len(runtime.shards), 2)
+            self.assertFalse(runtime.publish(MarketSnapshot('XRPUSDT', 1.0, 1.0)))
+            for snapshot in _correlated_ticks(symbols, 60):
+                runtime.publish(snapshot)
+                if snapshot.symbol == symbols[-1]:
+                    time.sleep(0.005)  # deja a los workers ver cada punto
+
+            signals = []
+            deadline = time.monotonic() + 10
+            while not signals and time.monotonic() < deadline:
+                signals += runtime.signals(timeout=0.2)
+            self.assertTrue(signals)
+            signal = signals[0]
+            self.assertEqual(signal['pair'][0], 'BTCUSDT')
+            self.assertEqual({leg for leg, _ in signal['legs']}, set(signal['pair']))
+
+            stats = runtime.shard_stats()
+            self.assertEqual([s['shard'] for s in stats], [0, 1])
+            self.assertTrue(all(s['alive'] and s['evaluations'] > 0 for s in stats))
+            self.assertTrue(all(0.0 <= s['utilization'] <= 1.5 for s in stats))
+        self.assertIsNone(runtime.buffer)
+
+    def test_persistent_divergence_signals_once(self):
+        symbols = ['BTCUSDT', 'ETHUSDT']
+        params = ShardParams(lookback_period=10, correlation_threshold=0.3, divergence_threshold=0.001,
+                             poll_interval=0.01, stats_interval=0.01)
+        with ShardedRuntime(symbols, workers=1, params=params) as runtime:
+            for snapshot in _correlated_ticks(symbols, 60, seed=5):
+                runtime.publish(snapshot)
+                if snapshot.symbol == symbols[-1]:
+                    time.sleep(0.005)
+            time.sleep(0.1)
+            signals = runtime.signals(timeout=0.5)
+            evaluations = runtime.shard_stats()[0]['evaluations']
+        self.assertGreater(evaluations, 20)  # la divergencia siguió abierta muchos puntos
+        self.assertEqual([s['signal'] for s in signals], ['LONG_BTC_SHORT_ETH'])
+
+
+class FakeGateway:
+    def __init__(self):
+        self.sent = []
+
+    async def place_legs(self, requests):
+        self.sent.append(requests)
+        return [OrderResult(r.symbol, r.side.lower(), r.amount, r.type, 'filled', 0.0,
+                            filled=r.amount, price=None) for r in requests]
+
+
+class TestCoordinator(unittest.IsolatedAsyncioTestCase):
+
+    def _signal(self):
+        return {'shard': 0, 'pair': ('BTCUSDT', 'ETHUSDT'), 'signal': 'LONG_ETH_SHORT_BTC',
+                'legs': (('ETHUSDT', 'BUY'), ('BTCUSDT', 'SELL')),
+                'prices': {'BTCUSDT': 60_000.0, 'ETHUSDT': 3_000.0}, 'correlation': 0.9,
+                'divergence': 0.02, 'ts': 0.0}
+
+    async def test_routes_and_updates_risk(self):
+        gateway = FakeGateway()
+        risk = PortfolioRisk(equity=100_000)
+        coordinator = Coordinator(runtime=None, risk=risk, gateway=gateway)
+        results = await coordinator.handle(self._signal())
+        self.assertEqual([r.symbol for r in results], ['ETHUSDT', 'BTCUSDT'])
+        legs = gateway.sent[0]
+        self.assertAlmostEqual(legs[0].amount * 3_000, legs[1].amount * 60_000)  # mismo nocional
+        self.assertEqual([r.client_order_id for r in coordinator.size_legs(self._signal())],
+                         [r.client_order_id for r in legs])  # determinista: la pata se puede buscar
+        self.assertEqual(len({r.client_order_id for r in legs}), 2)
+        exposure = risk.net_exposure()
+        self.assertGreater(exposure['ETHUSDT'], 0)
+        self.assertLess(exposure['BTCUSDT'], 0)
+
+    async def test_rejected_by_portfolio_risk(self):
+        gateway = FakeGateway()
+        coordinator = Coordinator(runtime=None, risk=PortfolioRisk(equity=100, leverage=0.1),
+                                  gateway=gateway, risk_pct=0.5)
+        self.assertIsNone(await coordinator.handle(self._signal()))
+        self.assertEqual(gateway.sent, [])
+        self.assertFalse(coordinator.decisions[-1]['accepted'])
+
+
+if __name__ == '__main__':
+    unittest.main()
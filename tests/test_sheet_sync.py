@@ -0,0 +1,58 @@
+"""
+Tests de la caché local y sincronización delta de Sheets
+"""
+import os
+import tempfile
+import unittest
+
+from advanced_trading.sheet_sync import InMemorySheetsBackend, SheetSync
+
+HEADER = ['ID', 'Kind', 'Symbols', 'T0']
+
+
+class TestSheetSync(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.backend = InMemorySheetsBackend([
+            HEADER,
+            ['cpi-1', 'CPI', 'BTCUSDT, ETHUSDT', '2025-09-10T12:30'],
+            ['fomc-1', 'FOMC', 'BTCUSDT', '2025-09-17T18:00'],
+            ['gdp-1', 'GDP', 'BTCUSDT', '2025-09-25T12:30'],
+        ])
+        self.sync = SheetSync(os.path.join(self.tmpdir.name, 'cache.db'), self.backend, 'sheet', 'Events!A:D')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_only_changed_rows_are_applied(self):
+        self.assertEqual(self.sync.sync(), {'downloaded': 1, 'changed': 3, 'deleted': 0})
+        self.assertEqual(self.sync.sync(), {'downloaded': 0, 'changed': 0, 'deleted': 0})
+        self.assertEqual(self.backend.downloads, 1)
+
+        self.backend.set_rows([
+            HEADER,
+            ['cpi-1', 'CPI', 'BTCUSDT, ETHUSDT', '2025-09-10T12:30'],
+            ['fomc-1', 'FOMC', 'BTCUSDT, SOLUSDT', '2025-09-17T18:00'],
+        ])
+        self.assertEqual(self.sync.sync(), {'downloaded': 1, 'changed': 1, 'deleted': 1})
+
+        events = self.sync.read_events()
+        self.assertEqual([e.id for e in events], ['cpi-1', 'fomc-1'])
+        self.assertEqual(events[1].symbols, ['BTCUSDT', 'SOLUSDT'])
+
+    def test_reads_served_from_cache(self):
+        self.sync.sync()
+        self.assertIsNone(self.sync.sync_if_stale(max_age_sec=300))
+        cached_only = SheetSync(self.sync.db_path, None, 'sheet', 'Events!A:D')
+        self.assertEqual(len(cached_only.read_events()), 3)
+        self.assertEqual(self.backend.fetches, 1)
+
+    def test_cache_age(self):
+        self.assertIsNone(self.sync.cache_age())
+        self.sync.sync()
+        self.assertLess(self.sync.cache_age(), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from advanced_trading.db_schema import ensure_schema
+from advanced_trading.snapshot_store import (
+    ActiveParams, DataHasher, SnapshotStore, canonical_json, params_digest,
+)
+
+
+class TestSnapshotStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = os.path.join(self.tmp.name, 'snapshots')
+
+    def test_digest_is_canonical(self):
+        a = {'sl': 0.02, 'family': {'CPI': 1, 'GDP': 2}}
+        b = {'family': {'GDP': 2, 'CPI': 1}, 'sl': 0.02}
+        self.assertEqual(canonical_json(a), canonical_json(b))
+        self.assertEqual(params_digest(a), params_digest(b))
+        self.assertNotEqual(params_digest(a), params_digest(dict(a, sl=0.021)))
+
+    def test_content_addressed_and_retention(self):
+        store = SnapshotStore(self.root, retention=3)
+        digests = [store.snapshot({'threshold': i}) for i in range(5)]
+        self.assertEqual(store.put({'threshold': 4}), digests[4])
+        self.assertEqual([e['digest'] for e in store.snapshots()], digests[2:])
+        self.assertEqual(sorted(os.listdir(store.objects_dir)), sorted(f'{d}.json' for d in digests[2:]))
+        with self.assertRaises(KeyError):
+            store.get(digests[0])
+
+    def test_active_object_survives_gc(self):
+        store = SnapshotStore(self.root, retention=1)
+        first = store.snapshot({'v': 1})
+        store.activate(first)
+        store.snapshot({'v': 2})
+        self.assertEqual(store.get(first), {'v': 1})
+
+    def test_rollback_swaps_pointer_seen_by_running_engine(self):
+        store = SnapshotStore(self.root)
+        old = store.snapshot({'max_spread_bps': 5})
+        store.activate(old)
+        new = store.snapshot({'max_spread_bps': 8})
+        store.activate(new)
+
+        live = ActiveParams(store.params_path)
+        self.assertEqual(live['max_spread_bps'], 8)
+        self.assertEqual(store.rollback(reason='degradación'), old)
+        self.assertEqual(live['max_spread_bps'], 5)
+        self.assertEqual(live.digest, old)
+        with open(store.params_path) as f:
+            self.assertEqual(json.load(f)['reason'], 'degradación')
+
+    def test_rollback_without_previous(self):
+        store = SnapshotStore(self.root)
+        store.activate(store.snapshot({'v': 1}))
+        with self.assertRaises(LookupError):
+            store.rollback()
+
+    def test_audit_rows_in_db(self):
+        db = os.path.join(self.tmp.name, 'trading.db')
+        store = SnapshotStore(self.root, db_path=db)
+        store.activate(store.snapshot({'v': 1}, calibration_id=7))
+        store.snapshot({'v': 2})
+        store.rollback(reason='manual')
+        conn = sqlite3.connect(db)
+        rows = conn.execute('SELECT calibration_id, data_hash, rollback_reason FROM snapshots ORDER BY id').fetchall()
+        conn.close()
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0][0], 7)
+        self.assertTrue(rows[0][1])
+        self.assertEqual(rows[2][2], 'manual')
+
+
+class TestDataHasher(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        ensure_schema(self.conn, ['macro_events'])
+        self.addCleanup(self.conn.close)
+
+    def _insert(self, *dates):
+        self.conn.executemany(
+            "INSERT INTO macro_events (event_type, event_date, created_at) VALUES ('CPI', ?, 'x')",
+            [(d,) for d in dates],
+        )
+        self.conn.commit()
+
+    def test_incremental_matches_full(self):
+        hasher = DataHasher(self.conn, ['macro_events'])
+        self._insert('2024-01-01', '2024-02-01')
+        first = hasher.update()
+        self._insert('2024-03-01')
+        incremental = hasher.update()
+        self.assertNotEqual(first, incremental)
+        self.assertEqual(incremental, hasher.update(full=True))
+        self.assertEqual(incremental, hasher.update())
+
+    def test_delete_triggers_rehash(self):
+        hasher = DataHasher(self.conn, ['macro_events'])
+        self._insert('2024-01-01', '2024-02-01', '2024-03-01')
+        hasher.update()
+        self.conn.execute('DELETE FROM macro_events WHERE id = 2')
+        self.conn.commit()
+        self.assertEqual(hasher.update(), hasher.update(full=True))
+        n_rows = self.conn.execute("SELECT n_rows FROM data_checksums WHERE table_name = 'macro_events'").fetchone()[0]
+        self.assertEqual(n_rows, 2)
+
+    def test_in_place_update_triggers_rehash(self):
+        hasher = DataHasher(self.conn, ['macro_events'])
+        self._insert('2024-01-01', '2024-02-01')
+        before = hasher.update()
+        self.conn.execute("UPDATE macro_events SET actual = 3.9 WHERE id = 1")
+        self.conn.commit()
+        after = hasher.update()
+        self.assertNotEqual(before, after)
+        self.assertEqual(after, hasher.update(full=True))
+        self.assertEqual(after, hasher.update())
+
+    def test_existing_checksums_are_rehashed_once(self):
+        # estado previo a los triggers: una modificación sin registrar no se pierde
+        hasher = DataHasher(self.conn, ['macro_events'])
+        self._insert('2024-01-01')
+        hasher.update()
+        self.conn.execute('DROP TABLE data_versions')
+        self.conn.execute('DROP TRIGGER trg_macro_events_data_version_update')
+        self.conn.execute("UPDATE macro_events SET actual = 1.0")
+        self.conn.commit()
+        fresh = DataHasher(self.conn, ['macro_events'])
+        self.assertEqual(fresh.update(), fresh.update(full=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from advanced_trading.synthetic_db import FAMILIES, PRESETS, generate, main
+
+SMALL = {'symbols': 3, 'days': 2, 'events_per_family': 50, 'trades': 500}
+
+
+class TestSyntheticDb(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def _path(self, name='t.db'):
+        return os.path.join(self.tmp.name, name)
+
+    def test_row_counts_and_indexes(self):
+        stats = generate(self._path(), **SMALL)
+        self.assertEqual(stats['market_data'], 3 * 2 * 1440)
+        self.assertEqual(stats['events'], 50 * len(FAMILIES))
+        self.assertEqual(stats['macro_events'] + stats['token_events'], 50 * len(FAMILIES))
+        self.assertEqual(stats['trades'], 500)
+        conn = sqlite3.connect(self._path())
+        try:
+            indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+            self.assertIn('idx_market_data_symbol_time', indexes)
+            bad = conn.execute('SELECT COUNT(*) FROM market_data WHERE low > MIN(open, close) '
+                               'OR high < MAX(open, close)').fetchone()[0]
+            self.assertEqual(bad, 0)
+            first, last = conn.execute('SELECT MIN(event_date), MAX(event_date) FROM macro_events').fetchone()
+            self.assertGreaterEqual(first, '2023-01-01')
+            self.assertLessEqual(last, '2024-12-31')
+        finally:
+            conn.close()
+
+    def test_same_seed_same_data(self):
+        generate(self._path('a.db'), seed=3, **SMALL)
+        generate(self._path('b.db'), seed=3, **SMALL)
+        generate(self._path('c.db'), seed=4, **SMALL)
+        query = 'SELECT SUM(close), SUM(volume) FROM market_data'
+
+        def fingerprint(name):
+            conn = sqlite3.connect(self._path(name))
+            try:
+                return conn.execute(query).fetchone(), conn.execute('SELECT SUM(pnl) FROM trades').fetchone()
+            finally:
+                conn.close()
+        self.assertEqual(fingerprint('a.db'), fingerprint('b.db'))
+        self.assertNotEqual(fingerprint('a.db'), fingerprint('c.db'))
+
+    def test_presets_and_cli_overwrite_guard(self):
+        self.assertEqual(list(PRESETS), ['S', 'M', 'L', 'XL'])
+        self.assertTrue(all(p['symbols'] == 20 for p in PRESETS.values()))
+        with self.assertRaises(ValueError):
+            generate(self._path(), size='XXL')
+        args = ['--db', self._path(), '--days', '1', '--symbols', '2', '--trades', '10',
+                '--events-per-family', '5']
+        with redirect_stdout(StringIO()):
+            self.assertEqual(main(args), 0)
+            self.assertEqual(main(args), 2)
+            self.assertEqual(main(args + ['--overwrite']), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
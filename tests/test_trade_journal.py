@@ -0,0 +1,112 @@
+"""
+Tests del journal asíncrono de trades y auditoría
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from advanced_trading.trade_journal import TradeJournal
+
+
+class TestTradeJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'journal.db')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _count(self, table):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_close_flushes_all_records(self):
+        journal = TradeJournal(self.db_path, batch_size=7, flush_interval_ms=1000).start()
+        for i in range(50):
+            self.assertTrue(journal.record_trade('BTCUSDT', 'BUY', entry_price=50000 + i, size=0.01))
+        journal.record_event_fire('evt-1', symbol='BTCUSDT', action='BUY', details={'k': 1})
+        journal.record_order_block('ETHUSDT', 'spread', spread_bps=5.0)
+        journal.close()
+
+        self.assertEqual(self._count('trades'), 50)
+        self.assertEqual(self._count('event_fires'), 1)
+        self.assertEqual(self._count('order_audit'), 1)
+        self.assertEqual(journal.stats['written'], 52)
+        self.assertGreater(journal.stats['batches'], 1)
+
+    def test_flush_waits_for_commit(self):
+        with TradeJournal(self.db_path, flush_interval_ms=500) as journal:
+            journal.record_snapshot({'RISK_PER_TRADE': 0.015}, data_hash='abc')
+            self.assertTrue(journal.flush(timeout=5))
+            self.assertEqual(self._count('snapshots'), 1)
+
+    def test_bounded_queue_drops_without_blocking(self):
+        journal = TradeJournal(self.db_path, max_queue=3)  # sin arrancar: nada consume
+        results = [journal.record_trade('BTCUSDT', 'SELL') for _ in range(5)]
+        self.assertEqual(results, [True, True, True, False, False])
+        self.assertEqual(journal.stats['dropped'], 2)
+
+    def test_close_does_not_hang_when_writer_died_with_full_queue(self):
+        journal = TradeJournal(self.db_path, max_queue=3).start()
+
+        def fail(conn, batch):
+            raise RuntimeError('disco lleno')
+
+        journal._write_batch = fail
+        with self.assertLogs('advanced_trading.trade_journal', 'ERROR'):
+            journal.record_trade('BTCUSDT', 'BUY')
+            journal._thread.join(5)
+        self.assertFalse(journal._thread.is_alive())
+        for _ in range(3):
+            self.assertTrue(journal.record_trade('BTCUSDT', 'BUY'))
+        self.assertFalse(journal.flush())
+        with self.assertLogs('advanced_trading.trade_journal', 'ERROR') as logs:
+            journal.close()
+        self.assertIn('3 registros sin escribir', logs.output[0])
+        self.assertIsNone(journal._thread)
+
+    def test_stats_are_exact_with_concurrent_producers(self):
+        journal = TradeJournal(self.db_path, max_queue=100_000)  # sin arrancar: nada consume
+        producers = [threading.Thread(target=lambda: [journal.record_trade('BTCUSDT', 'BUY') for _ in range(5_000)])
+                     for _ in range(8)]
+        for producer in producers:
+            producer.start()
+        for producer in producers:
+            producer.join()
+        self.assertEqual(journal.stats['enqueued'], 40_000)
+
+    def test_order_blocks_respect_flag(self):
+        journal = TradeJournal(self.db_path, log_order_blocks=False)
+        self.assertFalse(journal.record_order_block('BTCUSDT', 'slippage'))
+        self.assertEqual(journal.queue_depth, 0)
+
+    def test_failed_batch_retries_row_by_row(self):
+        journal = TradeJournal(self.db_path, batch_size=10, flush_interval_ms=1000).start()
+        journal.record_trade('BTCUSDT', 'BUY', size=0.01)
+        journal.record_trade(None, 'SELL', size=0.02)  # symbol NOT NULL: rompe la transacción del lote
+        journal.record_event_fire('evt-2', symbol='ETHUSDT')
+        journal.close()
+
+        self.assertEqual(self._count('trades'), 1)
+        self.assertEqual(self._count('event_fires'), 1)
+        self.assertEqual(journal.stats['written'], 2)
+        self.assertEqual(journal.stats['dead_lettered'], 1)
+        table, row, _ = journal.dead_letters[0]
+        self.assertEqual((table, row['side']), ('trades', 'SELL'))
+
+    def test_start_raises_when_db_cannot_open(self):
+        journal = TradeJournal(os.path.join(self.tmpdir.name, 'missing', 'journal.db'))
+        with self.assertRaises(sqlite3.Error):
+            journal.start()
+        self.assertTrue(journal.flush(timeout=1))
+        journal.close()
+
+
+if __name__ == '__main__':
+    unittest.main()